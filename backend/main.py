@@ -1,5 +1,6 @@
 # src/main.py
 from contextlib import asynccontextmanager
+import asyncio
 from fastapi.middleware.cors import CORSMiddleware
 import os
 import signal
@@ -10,10 +11,19 @@ from fastapi import FastAPI
 from fastapi.staticfiles import StaticFiles
 
 from neo4j_db.utils import run_neo4j
+from neo4j_db.AsyncNeo4jHandler import AsyncNeo4jHandler
 from sqlite_db.sqlite_handler import SQLiteHandler
+from sqlite_db.pool import close_all_pools
+from services.executor_service import shutdown_executors, run_asr
+from services.pdf_service import shutdown_pdf_pool
+from services.upload_service import REJECTED_FILES_HEADER
+from services import ingest_queue
+from services import voiceService
+from services import transcribe_stream
+from services import transcribe_queue
 
 # 기존 라우터
-from routers import brainGraph, userRouter, brainRouter, folderRouter, memoRouter, pdfRouter, textFileRouter, voiceRouter, chatRouter, searchRouter
+from routers import brainGraph, userRouter, brainRouter, folderRouter, memoRouter, pdfRouter, textFileRouter, voiceRouter, chatRouter, searchRouter, systemRouter, ingestRouter, metricsRouter
 # 새로 추가할 파일/텍스트/음성 라우터
 
 # ─── 로깅 설정 ─────────────────────────────────────
@@ -44,8 +54,27 @@ async def lifespan(app: FastAPI):
             logging.error("❌ Neo4j 실행 실패")
     except Exception as e:
         logging.error("Neo4j 실행 중 오류: %s", e)
+    # 3) 백그라운드 수집 워커 시작 (중단된 작업은 이어서 처리)
+    await ingest_queue.start_workers()
+    await transcribe_queue.start_workers()
+    # 4) (선택) Whisper 모델 미리 로딩 — 서버 기동을 막지 않도록 백그라운드에서 실행
+    warmup_task = None
+    if voiceService.ASR_WARMUP:
+        warmup_task = asyncio.create_task(run_asr(voiceService.warm_up))
     yield
-    # 3) 종료 시 Neo4j 정리
+    if warmup_task is not None and not warmup_task.done():
+        warmup_task.cancel()
+    await ingest_queue.stop_workers()
+    await transcribe_queue.stop_workers()
+    await transcribe_stream.close_all_sessions()
+    # 5) 종료 시 Neo4j 드라이버/프로세스 정리
+    try:
+        await AsyncNeo4jHandler.close_driver()
+    except Exception as e:
+        logging.error("Neo4j 드라이버 종료 중 오류: %s", e)
+    shutdown_executors(wait=False)
+    shutdown_pdf_pool()
+    close_all_pools()
     if neo4j_process:
         logging.info("🛑 Neo4j 프로세스를 종료합니다...")
         try:
@@ -75,6 +104,7 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=[REJECTED_FILES_HEADER],
 )
 
 # ─── 라우터 등록 ────────────────────────────────────
@@ -88,6 +118,9 @@ app.include_router(textFileRouter.router)
 app.include_router(voiceRouter.router)      
 app.include_router(chatRouter.router)
 app.include_router(searchRouter.router)
+app.include_router(systemRouter.router)
+app.include_router(ingestRouter.router)
+app.include_router(metricsRouter.router)
 
 app.mount("/uploaded_pdfs", StaticFiles(directory="uploaded_pdfs"), name="uploaded_pdfs")
 app.mount("/uploaded_txts", StaticFiles(directory="uploaded_txts"), name="uploaded_txts")
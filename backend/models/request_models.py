@@ -1,5 +1,5 @@
 from pydantic import BaseModel, Field
-from typing import List
+from typing import List, Optional
 # Pydantic은 FastAPI가 사용하는 데이터 검증 및 직렬화 라이브러리
 
 
@@ -32,11 +32,57 @@ class GraphResponse(BaseModel):
             }
         }
 
+class GraphPageResponse(BaseModel):
+    nodes: List[NodeModel] = Field(..., description="이번 페이지의 노드 목록")
+    links: List[LinkModel] = Field(..., description="이번 페이지 노드에서 나가는 엣지 목록")
+    next_cursor: Optional[str] = Field(None, description="다음 페이지 요청에 사용할 커서 (마지막 페이지면 null)")
+
+class NodeDelta(BaseModel):
+    added: List[NodeModel] = Field(..., description="추가(또는 갱신)된 노드")
+    removed: List[NodeModel] = Field(..., description="삭제된 노드")
+
+class LinkDelta(BaseModel):
+    added: List[LinkModel] = Field(..., description="추가된 엣지")
+    removed: List[LinkModel] = Field(..., description="삭제된 엣지")
+
+class GraphDeltaResponse(BaseModel):
+    since: int = Field(..., description="요청한 기준 버전")
+    version: int = Field(..., description="현재 그래프 버전 (다음 요청의 since로 사용)")
+    full_resync: bool = Field(..., description="true이면 변경 이력이 없어 getNodeEdge로 전체를 다시 받아야 함")
+    cleared: bool = Field(False, description="true이면 기준 버전 이후 그래프 전체가 삭제되었으므로 기존 데이터를 비운 뒤 적용")
+    nodes: Optional[NodeDelta] = None
+    links: Optional[LinkDelta] = None
+
 class ProcessTextRequest(BaseModel):
     text: str
     brain_id: str = Field(..., description="브레인 ID (문자열)")
     source_id: str = Field(..., description="소스 ID (문자열)")
 
+class ProcessPdfRequest(BaseModel):
+    pdf_id: int = Field(..., description="서버에 업로드된 PDF ID (source_id로 사용)")
+    # 중복 소스 조회에 SQLite 브레인 ID(정수)로 쓰이므로 숫자 문자열만 허용 (그 외는 422)
+    brain_id: Optional[str] = Field(None, pattern=r"^\d+$", description="브레인 ID (숫자 문자열, 생략하면 PDF의 브레인)")
+    force: bool = Field(False, description="같은 내용이 이미 반영되어 있어도 다시 추출할지 여부")
+
 class AnswerRequest(BaseModel):
     question: str
     brain_id: str = Field(..., description="브레인 ID (문자열)")
+
+# 일괄 이동/삭제 한 번에 처리할 수 있는 최대 항목 수 (한 트랜잭션이 너무 길어지지 않도록)
+BATCH_MAX_IDS = 1000
+
+class BatchMoveRequest(BaseModel):
+    ids: List[int] = Field(..., min_length=1, max_length=BATCH_MAX_IDS, description="이동할 항목 ID 목록")
+    target_folder_id: Optional[int] = Field(None, description="대상 폴더 ID (null이면 폴더 밖으로 이동)")
+    brain_id: Optional[int] = Field(None, description="브레인 ID (지정하면 함께 변경)")
+
+class BatchDeleteRequest(BaseModel):
+    ids: List[int] = Field(..., min_length=1, max_length=BATCH_MAX_IDS, description="삭제할 항목 ID 목록")
+
+class BatchMoveResponse(BaseModel):
+    requested: int = Field(..., description="요청한 항목 수")
+    moved: int = Field(..., description="실제로 이동된 항목 수")
+
+class BatchDeleteResponse(BaseModel):
+    requested: int = Field(..., description="요청한 항목 수")
+    deleted_ids: List[int] = Field(..., description="실제로 삭제된 항목 ID 목록")
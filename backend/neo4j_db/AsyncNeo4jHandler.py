@@ -0,0 +1,359 @@
+from neo4j import AsyncGraphDatabase
+import asyncio
+import logging
+from typing import List, Dict, Any, AsyncIterator, Optional
+from neo4j_db import graph_cache
+from services import metrics_service, tracing
+from neo4j_db.Neo4jHandler import NEO4J_URI, NEO4J_AUTH
+from neo4j_db.cypher import (
+    GRAPH_PAGE_SIZE, SCHEMA_MAX_HOPS, SCHEMA_FAN_OUT, SCHEMA_MAX_NODES, SCHEMA_HOP_DECAY, SCHEMA_SCAN_LIMIT,
+    INDEX_QUERIES, MERGE_NODE_QUERY, MERGE_EDGE_QUERY, FETCH_ALL_NODES_QUERY,
+    SCHEMA_DIRECT_QUERY, K_HOP_SEED_QUERY, K_HOP_EXPAND_QUERY, FETCH_ALL_EDGES_QUERY,
+    GRAPH_NODES_QUERY, GRAPH_EDGES_QUERY, DELETE_BRAIN_QUERY,
+    STRIP_SOURCE_DESCRIPTIONS_QUERY, DELETE_EMPTY_NODES_QUERY,
+    NODE_DESCRIPTIONS_QUERY, NODES_BY_SOURCE_ID_QUERY,
+    SOURCE_NODE_DESCRIPTIONS_QUERY, APPEND_DESCRIPTIONS_QUERY, copied_description_rows,
+    merge_node_params, merge_edge_params, node_record_to_dict, parse_descriptions,
+    clamp_page_size, graph_page_query, graph_page_from_records, select_k_hop_neighbours,
+)
+
+
+class AsyncNeo4jHandler:
+    """
+    Neo4jHandler와 같은 메서드를 제공하는 비동기 핸들러.
+    async 엔드포인트에서 그래프 쿼리가 이벤트 루프를 막지 않도록 neo4j.AsyncGraphDatabase를 사용합니다.
+
+    드라이버는 내부에 커넥션 풀을 가지므로 프로세스 전체에서 하나만 만들어 공유하고,
+    핸들러 인스턴스는 가볍게 생성해서 써도 됩니다. 드라이버는 서버 종료 시 close_driver()로 닫습니다.
+    """
+    _driver = None
+    _indexes_ready = False
+    _init_lock: Optional[asyncio.Lock] = None
+
+    @classmethod
+    async def _get_driver(cls):
+        if cls._driver is not None and cls._indexes_ready:
+            return cls._driver
+        if cls._init_lock is None:
+            cls._init_lock = asyncio.Lock()
+        async with cls._init_lock:
+            if cls._driver is None:
+                cls._driver = AsyncGraphDatabase.driver(NEO4J_URI, auth=NEO4J_AUTH)
+            if not cls._indexes_ready:
+                await cls._ensure_indexes(cls._driver)
+        return cls._driver
+
+    @classmethod
+    async def _ensure_indexes(cls, driver):
+        """
+        Node(brain_id), Node(brain_id, name), REL(brain_id) 인덱스를 생성합니다.
+        실패하면(예: Neo4j 기동 전) 다음 요청에서 다시 시도합니다.
+        """
+        try:
+            async with driver.session() as session:
+                for query in INDEX_QUERIES:
+                    result = await session.run(query)
+                    await result.consume()
+            cls._indexes_ready = True
+            logging.info("✅ Neo4j 인덱스 확인 완료 (async)")
+        except Exception as e:
+            logging.warning("Neo4j 인덱스 생성 실패 (다음 요청에서 재시도): %s", str(e))
+
+    @classmethod
+    async def close_driver(cls):
+        """공유 드라이버를 닫습니다. (서버 종료 시 호출)"""
+        if cls._driver is not None:
+            await cls._driver.close()
+            cls._driver = None
+            cls._indexes_ready = False
+            logging.info("✅ Neo4j async 드라이버 종료")
+
+    async def close(self):
+        # 드라이버는 공유 자원이므로 인스턴스 단위로는 닫지 않습니다.
+        pass
+
+    @tracing.traced("neo4j.write")
+    async def insert_nodes_and_edges(self, nodes, edges, brain_id):
+        """
+        노드와 엣지를 Neo4j에 저장합니다.
+        하나의 쓰기 트랜잭션(session.execute_write)에서 한 번에 처리합니다.
+        """
+        async def _insert(tx, nodes, edges, brain_id):
+            for node in nodes:
+                await tx.run(MERGE_NODE_QUERY, merge_node_params(node, brain_id))
+            stored_edges = []
+            for edge in edges:
+                result = await tx.run(MERGE_EDGE_QUERY, merge_edge_params(edge, brain_id))
+                record = await result.single()
+                if record is not None:
+                    stored_edges.append(record.data())
+            return stored_edges
+
+        try:
+            driver = await self._get_driver()
+            async with driver.session() as session:
+                stored_edges = await session.execute_write(_insert, nodes, edges, brain_id)
+                logging.info("✅ Neo4j 노드와 엣지 삽입 및 트랜잭션 커밋 완료")
+            if len(stored_edges) < len(edges):
+                logging.warning("양끝 노드가 없어 저장되지 않은 엣지 %d개", len(edges) - len(stored_edges))
+            tracing.current_span().set_attributes(nodes=len(nodes), edges=len(stored_edges))
+            metrics_service.INGEST_NODES.inc(len(nodes), stage="stored")
+            metrics_service.INGEST_EDGES.inc(len(stored_edges), stage="stored")
+            # 변경 이력에는 실제로 저장된 엣지만 기록 (없는 노드를 가리키는 링크가 delta로 나가지 않도록)
+            graph_cache.record_changes(
+                brain_id,
+                added_nodes=[node["name"] for node in nodes],
+                added_links=stored_edges
+            )
+        except Exception as e:
+            logging.error(f"❌ Neo4j 쓰기 트랜잭션 오류: {str(e)}")
+            raise RuntimeError(f"Neo4j 쓰기 트랜잭션 오류: {str(e)}")
+
+    async def fetch_all_nodes(self):
+        """모든 노드를 읽어와 JSON 형식의 리스트로 반환합니다."""
+        nodes = []
+        try:
+            driver = await self._get_driver()
+            async with driver.session() as session:
+                result = await session.run(FETCH_ALL_NODES_QUERY)
+                nodes = [node_record_to_dict(record) async for record in result]
+        except Exception as e:
+            logging.error(f"❌ Neo4j 읽기 오류: {str(e)}")
+        return nodes
+
+    async def query_schema_by_node_names(self, node_names, brain_id):
+        """입력된 노드 이름들을 기준으로 직접 연결된 노드 및 관계를 조회합니다."""
+        if not node_names or not isinstance(node_names, list):
+            logging.error("유효하지 않은 node_names: %s", node_names)
+            return None
+
+        logging.info("Neo4j 스키마 조회 시작 (노드 이름 목록: %s, brain_id: %s)", node_names, brain_id)
+        try:
+            driver = await self._get_driver()
+            async with driver.session() as session:
+                result = await session.run(SCHEMA_DIRECT_QUERY, names=node_names, brain_id=brain_id)
+                record = await result.single()
+                if not record:
+                    logging.warning("Neo4j 조회 결과가 없습니다.")
+                    return None
+
+                nodes = record.get("start_nodes", [])
+                related_nodes = record.get("direct_nodes", [])
+                relationships = record.get("direct_relationships", [])
+                logging.info("Neo4j 스키마 조회 결과: 노드=%d개, 관련 노드=%d개, 관계=%d개",
+                             len(nodes), len(related_nodes), len(relationships))
+                return {
+                    "nodes": nodes,
+                    "relatedNodes": related_nodes,
+                    "relationships": relationships
+                }
+        except Exception as e:
+            logging.error("❌ Neo4j 스키마 조회 오류: %s", str(e))
+            raise RuntimeError(f"Neo4j 스키마 조회 오류: {str(e)}")
+
+    @tracing.traced("neo4j.schema_k_hop")
+    async def query_schema_k_hop(self, node_names: List[str], brain_id: str,
+                                 max_hops: int = SCHEMA_MAX_HOPS,
+                                 fan_out: int = SCHEMA_FAN_OUT,
+                                 max_nodes: int = SCHEMA_MAX_NODES,
+                                 seed_scores: Optional[Dict[str, float]] = None) -> Optional[Dict[str, Any]]:
+        """
+        시드 노드에서 출발해 단계별로 제한된 k-hop 이웃을 조회합니다.
+        동작과 반환 형식은 Neo4jHandler.query_schema_k_hop과 같습니다.
+        """
+        if not node_names or not isinstance(node_names, list):
+            logging.error("유효하지 않은 node_names: %s", node_names)
+            return None
+
+        seed_scores = seed_scores or {}
+        names = list(dict.fromkeys(node_names))
+        logging.info("Neo4j k-hop 스키마 조회 시작 (시드: %d개, hops: %d, fan_out: %d, brain_id: %s)",
+                     len(names), max_hops, fan_out, brain_id)
+        try:
+            driver = await self._get_driver()
+            async with driver.session() as session:
+                seed_result = await session.run(K_HOP_SEED_QUERY, names=names, brain_id=brain_id)
+                nodes = [record["n"] async for record in seed_result][:max_nodes]
+                if not nodes:
+                    logging.warning("Neo4j 조회 결과가 없습니다.")
+                    return None
+
+                scores = {node["name"]: float(seed_scores.get(node["name"], 1.0)) for node in nodes}
+                related_nodes = []
+                relationships = {}
+                frontier = [{"name": name, "score": score} for name, score in scores.items()]
+
+                for hop in range(max_hops):
+                    if not frontier or len(scores) >= max_nodes:
+                        break
+                    result = await session.run(K_HOP_EXPAND_QUERY, frontier=frontier, brain_id=brain_id,
+                                               fan_out=fan_out, scan_limit=max(SCHEMA_SCAN_LIMIT, fan_out),
+                                               decay=SCHEMA_HOP_DECAY)
+                    records = [record async for record in result]
+                    frontier, candidate_count = select_k_hop_neighbours(
+                        records, scores, related_nodes, relationships, max_nodes
+                    )
+                    logging.info("k-hop %d단계: 후보 %d개, 채택 %d개", hop + 1, candidate_count, len(frontier))
+
+            tracing.current_span().set_attributes(seeds=len(nodes), related_nodes=len(related_nodes),
+                                                  relationships=len(relationships))
+            logging.info("Neo4j k-hop 스키마 조회 결과: 노드=%d개, 관련 노드=%d개, 관계=%d개",
+                         len(nodes), len(related_nodes), len(relationships))
+            return {
+                "nodes": nodes,
+                "relatedNodes": related_nodes,
+                "relationships": list(relationships.values()),
+                "scores": scores
+            }
+        except Exception as e:
+            logging.error("❌ Neo4j k-hop 스키마 조회 오류: %s", str(e))
+            raise RuntimeError(f"Neo4j k-hop 스키마 조회 오류: {str(e)}")
+
+    @tracing.traced("neo4j.query")
+    async def _execute_with_retry(self, query: str, parameters: dict, retries: int = 3):
+        """
+        간단한 재시도 로직: 지정된 쿼리를 여러 번 시도하여 실행
+        """
+        for attempt in range(retries):
+            try:
+                driver = await self._get_driver()
+                async with driver.session() as session:
+                    result = await session.run(query, parameters)
+                    return await result.data()
+            except Exception as e:
+                logging.warning(f"재시도 {attempt+1}회 실패: {e}")
+                if attempt == retries - 1:
+                    raise
+                tracing.current_span().add("retries")
+                metrics_service.RETRIES.inc(operation="neo4j")
+        return []
+
+    async def fetch_all_edges(self, brain_id: str) -> List[Dict]:
+        try:
+            return await self._execute_with_retry(FETCH_ALL_EDGES_QUERY, {"brain_id": brain_id})
+        except Exception as e:
+            logging.error(f"❌ Neo4j 엣지 조회 실패: {str(e)}")
+            raise RuntimeError(f"Neo4j 엣지 조회 실패: {str(e)}")
+
+    async def get_brain_graph(self, brain_id: str) -> Dict[str, List]:
+        """특정 브레인의 노드와 엣지 정보 조회"""
+        logging.info(f"Neo4j get_brain_graph 시작 - brain_id: {brain_id}")
+        try:
+            driver = await self._get_driver()
+            async with driver.session() as session:
+                nodes_result = await session.run(GRAPH_NODES_QUERY, brain_id=brain_id)
+                nodes = [{"name": record["name"]} async for record in nodes_result]
+
+                edges_result = await session.run(GRAPH_EDGES_QUERY, brain_id=brain_id)
+                links = [
+                    {
+                        "source": record["source"],
+                        "target": record["target"],
+                        "relation": record["relation"]
+                    }
+                    async for record in edges_result
+                ]
+
+            logging.info("조회된 그래프 - brain_id: %s, 노드 수: %d, 엣지 수: %d",
+                         brain_id, len(nodes), len(links))
+            return {
+                "nodes": nodes,
+                "links": links
+            }
+        except Exception as e:
+            logging.error("Neo4j 그래프 조회 오류: %s", str(e))
+            raise RuntimeError(f"그래프 조회 오류: {str(e)}")
+
+    async def get_brain_graph_page(self, brain_id: str, cursor: Optional[str] = None,
+                                   limit: int = GRAPH_PAGE_SIZE) -> Dict[str, Any]:
+        """브레인 그래프를 노드 이름 기준 커서 페이지 단위로 조회합니다. (Neo4jHandler.get_brain_graph_page 참고)"""
+        limit = clamp_page_size(limit)
+        query = graph_page_query(cursor)
+        try:
+            driver = await self._get_driver()
+            async with driver.session() as session:
+                result = await session.run(query, brain_id=brain_id, cursor=cursor, limit=limit)
+                records = [record async for record in result]
+            return graph_page_from_records(records, limit)
+        except Exception as e:
+            logging.error("Neo4j 그래프 페이지 조회 오류: %s", str(e))
+            raise RuntimeError(f"그래프 페이지 조회 오류: {str(e)}")
+
+    async def iter_brain_graph(self, brain_id: str, page_size: int = GRAPH_PAGE_SIZE) -> AsyncIterator[Dict[str, Any]]:
+        """get_brain_graph_page를 커서가 끝날 때까지 반복 호출하며 페이지를 하나씩 내보냅니다."""
+        cursor = None
+        while True:
+            page = await self.get_brain_graph_page(brain_id, cursor, page_size)
+            yield page
+            cursor = page["next_cursor"]
+            if cursor is None:
+                break
+
+    async def delete_brain(self, brain_id: str) -> None:
+        try:
+            await self._execute_with_retry(DELETE_BRAIN_QUERY, {"brain_id": brain_id})
+            logging.info(f"✅ brain_id {brain_id}의 모든 데이터 삭제 완료")
+            graph_cache.record_changes(brain_id, cleared=True)
+        except Exception as e:
+            logging.error(f"❌ Neo4j 데이터 삭제 실패: {str(e)}")
+            graph_cache.bump_version(brain_id)
+            raise RuntimeError(f"Neo4j 데이터 삭제 실패: {str(e)}")
+
+    async def delete_descriptions_by_source_id(self, source_id: str, brain_id: str) -> None:
+        """
+        특정 source_id를 가진 description들을 삭제하고, description이 비어있는 노드는 삭제합니다.
+        """
+        try:
+            await self._execute_with_retry(STRIP_SOURCE_DESCRIPTIONS_QUERY, {"source_id": str(source_id), "brain_id": brain_id})
+            deleted = await self._execute_with_retry(DELETE_EMPTY_NODES_QUERY, {"brain_id": brain_id})
+
+            logging.info(f"✅ source_id {source_id}의 descriptions 삭제 완료")
+            graph_cache.record_changes(
+                brain_id,
+                removed_nodes=[row["name"] for row in deleted],
+                removed_links=[rel for row in deleted for rel in row["rels"]]
+            )
+        except Exception as e:
+            logging.error(f"❌ descriptions 삭제 실패: {str(e)}")
+            # 일부 쿼리만 성공했을 수도 있으므로 내용 없이 버전만 올림
+            graph_cache.bump_version(brain_id)
+            raise RuntimeError(f"descriptions 삭제 실패: {str(e)}")
+
+    async def delete_descriptions_by_brain_id(self, brain_id: str) -> None:
+        """특정 brain_id를 가진 모든 노드와 관계를 삭제합니다."""
+        await self.delete_brain(brain_id)
+
+    async def get_node_descriptions(self, node_name: str, brain_id: str) -> List[Dict]:
+        """특정 노드의 descriptions 배열을 조회합니다."""
+        try:
+            result = await self._execute_with_retry(NODE_DESCRIPTIONS_QUERY, {"node_name": node_name, "brain_id": brain_id})
+            if not result or not result[0].get("descriptions"):
+                return []
+            return parse_descriptions(result[0]["descriptions"])
+        except Exception as e:
+            logging.error(f"❌ 노드 descriptions 조회 실패: {str(e)}")
+            raise RuntimeError(f"노드 descriptions 조회 실패: {str(e)}")
+
+    async def get_nodes_by_source_id(self, source_id: str, brain_id: str) -> List[str]:
+        """특정 source_id가 descriptions에 포함된 모든 노드의 이름을 반환합니다."""
+        try:
+            result = await self._execute_with_retry(NODES_BY_SOURCE_ID_QUERY, {"source_id": str(source_id), "brain_id": brain_id})
+            return [record["name"] for record in result]
+        except Exception as e:
+            logging.error(f"❌ source_id로 노드 조회 실패: {str(e)}")
+            raise RuntimeError(f"source_id로 노드 조회 실패: {str(e)}")
+
+    async def copy_descriptions_by_source_id(self, from_source_id: str, to_source_id: str, brain_id: str) -> int:
+        """from_source_id의 description을 to_source_id로 복사합니다. (중복 업로드가 원본과 별개로 그래프를 갖도록)"""
+        try:
+            records = await self._execute_with_retry(SOURCE_NODE_DESCRIPTIONS_QUERY,
+                                                     {"source_id": str(from_source_id), "brain_id": brain_id})
+            rows = copied_description_rows(records, from_source_id, to_source_id)
+            if rows:
+                await self._execute_with_retry(APPEND_DESCRIPTIONS_QUERY, {"rows": rows, "brain_id": brain_id})
+                graph_cache.record_changes(brain_id, added_nodes=[row["name"] for row in rows])
+            logging.info(f"✅ source_id {from_source_id} → {to_source_id} descriptions 복사 완료 ({len(rows)}개 노드)")
+            return len(rows)
+        except Exception as e:
+            logging.error(f"❌ descriptions 복사 실패: {str(e)}")
+            raise RuntimeError(f"descriptions 복사 실패: {str(e)}")
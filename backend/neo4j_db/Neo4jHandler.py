@@ -1,76 +1,83 @@
 from neo4j import GraphDatabase
 import logging
 import os
-from typing import List, Dict, Any
-import json
+from typing import List, Dict, Any, Iterator, Optional
+from neo4j_db import graph_cache
+from services import metrics_service, tracing
+from neo4j_db.cypher import (
+    GRAPH_PAGE_SIZE, SCHEMA_MAX_HOPS, SCHEMA_FAN_OUT, SCHEMA_MAX_NODES, SCHEMA_HOP_DECAY, SCHEMA_SCAN_LIMIT,
+    INDEX_QUERIES, MERGE_NODE_QUERY, MERGE_EDGE_QUERY, FETCH_ALL_NODES_QUERY,
+    SCHEMA_DIRECT_QUERY, K_HOP_SEED_QUERY, K_HOP_EXPAND_QUERY, FETCH_ALL_EDGES_QUERY,
+    GRAPH_NODES_QUERY, GRAPH_EDGES_QUERY, DELETE_BRAIN_QUERY,
+    STRIP_SOURCE_DESCRIPTIONS_QUERY, DELETE_EMPTY_NODES_QUERY,
+    NODE_DESCRIPTIONS_QUERY, NODES_BY_SOURCE_ID_QUERY,
+    SOURCE_NODE_DESCRIPTIONS_QUERY, APPEND_DESCRIPTIONS_QUERY, copied_description_rows,
+    merge_node_params, merge_edge_params, node_record_to_dict, parse_descriptions,
+    clamp_page_size, graph_page_query, graph_page_from_records, select_k_hop_neighbours,
+)
 
-NEO4J_URI = "bolt://localhost:7687"
+NEO4J_URI = os.getenv("BRAINTRACE_NEO4J_URI", "bolt://localhost:7687")
 NEO4J_AUTH = ("neo4j", "YOUR_PASSWORD")  # 실제 비밀번호로 교체
 
 class Neo4jHandler:
+    # 인덱스 생성은 프로세스당 한 번만 수행
+    _indexes_ready = False
+
     def __init__(self):
         self.driver = GraphDatabase.driver(NEO4J_URI, auth=NEO4J_AUTH)
+        if not Neo4jHandler._indexes_ready:
+            self._ensure_indexes()
+
+    def _ensure_indexes(self):
+        """
+        Node(brain_id), Node(brain_id, name), REL(brain_id) 인덱스를 생성합니다.
+        실패하면(예: Neo4j 기동 전) 다음 핸들러 생성 시 다시 시도합니다.
+        """
+        try:
+            with self.driver.session() as session:
+                for query in INDEX_QUERIES:
+                    session.run(query).consume()
+            Neo4jHandler._indexes_ready = True
+            logging.info("✅ Neo4j 인덱스 확인 완료")
+        except Exception as e:
+            logging.warning("Neo4j 인덱스 생성 실패 (다음 요청에서 재시도): %s", str(e))
 
     def close(self):
         self.driver.close()
 
+    @tracing.traced("neo4j.write")
     def insert_nodes_and_edges(self, nodes, edges, brain_id):
         """
         노드와 엣지를 Neo4j에 저장합니다.
         쓰기 트랜잭션은 session.write_transaction()을 사용하여 한 번에 처리합니다.
         """
         def _insert(tx, nodes, edges, brain_id):
-            # 노드 저장
+            # 노드 저장 (descriptions는 source_id를 포함한 JSON 문자열로 저장)
             for node in nodes:
-                # descriptions를 JSON 문자열로 변환 (한글 깨짐 방지를 위해 ensure_ascii=False)
-                # source_id를 descriptions에 포함하여 저장
-                new_descriptions = []
-                for desc in node.get("descriptions", []):
-                    # 이미 source_id가 포함되어 있지 않으면 추가
-                    if isinstance(desc, dict) and "source_id" not in desc and "description" in desc:
-                        desc["source_id"] = node.get("source_id", "")
-                    new_descriptions.append(json.dumps(desc, ensure_ascii=False))
-                
-                tx.run(
-                    """
-                    MERGE (n:Node {name: $name, brain_id: $brain_id})
-                    ON CREATE SET 
-                        n.label = $label, 
-                        n.descriptions = $new_descriptions,
-                        n.source_id = $source_id,
-                        n.brain_id = $brain_id
-                    ON MATCH SET 
-                        n.label = $label, 
-                        n.source_id = $source_id,
-                        n.brain_id = $brain_id,
-                        n.descriptions = CASE 
-                            WHEN n.descriptions IS NULL THEN $new_descriptions 
-                            ELSE n.descriptions + [item IN $new_descriptions WHERE NOT item IN n.descriptions] 
-                        END
-                    """,
-                    name=node["name"],
-                    label=node["label"],
-                    source_id=node.get("source_id", ""),
-                    new_descriptions=new_descriptions,
-                    brain_id=brain_id
-                )
-            # 엣지 저장
+                tx.run(MERGE_NODE_QUERY, merge_node_params(node, brain_id))
+            # 엣지 저장 (양끝 노드가 없는 엣지는 만들어지지 않으므로 저장된 엣지만 모아 반환)
+            stored_edges = []
             for edge in edges:
-                tx.run(
-                    """
-                    MATCH (a:Node {name: $source, brain_id: $brain_id}), (b:Node {name: $target, brain_id: $brain_id})
-                    MERGE (a)-[r:REL {relation: $relation, brain_id: $brain_id}]->(b)
-                    """,
-                    source=edge["source"],
-                    target=edge["target"],
-                    relation=edge["relation"],
-                    brain_id=brain_id
-                )
+                record = tx.run(MERGE_EDGE_QUERY, merge_edge_params(edge, brain_id)).single()
+                if record is not None:
+                    stored_edges.append(record.data())
+            return stored_edges
 
         try:
             with self.driver.session() as session:
-                session.execute_write(_insert, nodes, edges, brain_id)
+                stored_edges = session.execute_write(_insert, nodes, edges, brain_id)
                 logging.info("✅ Neo4j 노드와 엣지 삽입 및 트랜잭션 커밋 완료")
+            if len(stored_edges) < len(edges):
+                logging.warning("양끝 노드가 없어 저장되지 않은 엣지 %d개", len(edges) - len(stored_edges))
+            tracing.current_span().set_attributes(nodes=len(nodes), edges=len(stored_edges))
+            metrics_service.INGEST_NODES.inc(len(nodes), stage="stored")
+            metrics_service.INGEST_EDGES.inc(len(stored_edges), stage="stored")
+            # 변경 이력에는 실제로 저장된 엣지만 기록 (없는 노드를 가리키는 링크가 delta로 나가지 않도록)
+            graph_cache.record_changes(
+                brain_id,
+                added_nodes=[node["name"] for node in nodes],
+                added_links=stored_edges
+            )
         except Exception as e:
             logging.error(f"❌ Neo4j 쓰기 트랜잭션 오류: {str(e)}")
             raise RuntimeError(f"Neo4j 쓰기 트랜잭션 오류: {str(e)}")
@@ -83,15 +90,8 @@ class Neo4jHandler:
         nodes = []
         try:
             with self.driver.session() as session:
-                result = session.run("MATCH (n:Node) RETURN n.label AS label, n.name AS name, n.descriptions AS descriptions")
-                for record in result:
-                    raw = record["descriptions"]
-                    descriptions = [json.loads(desc) for desc in raw] if raw is not None else []
-                    nodes.append({
-                        "label": record["label"],
-                        "name": record["name"],
-                        "descriptions": descriptions
-                    })
+                result = session.run(FETCH_ALL_NODES_QUERY)
+                nodes = [node_record_to_dict(record) for record in result]
         except Exception as e:
             logging.error(f"❌ Neo4j 읽기 오류: {str(e)}")
         return nodes
@@ -110,16 +110,7 @@ class Neo4jHandler:
             # 두 개의 별도 쿼리로 분리: 1단계 관계와 2단계 관계
             with self.driver.session() as session:
                 # 1단계: 직접 연결된 노드 및 관계
-                query1 = '''
-                MATCH (n:Node)
-                WHERE n.name IN $names AND n.brain_id = $brain_id
-                OPTIONAL MATCH (n)-[r]-(m:Node)
-                WHERE m.brain_id = $brain_id
-                RETURN 
-                collect(DISTINCT n) AS start_nodes,
-                collect(DISTINCT m) AS direct_nodes,
-                collect(DISTINCT r) AS direct_relationships
-                '''
+                query1 = SCHEMA_DIRECT_QUERY
                     
                 # 2단계: 중간 노드(m)와 간접 연결된 노드(p) 및 관계(r2)
                 # query2 = '''
@@ -185,6 +176,78 @@ class Neo4jHandler:
             logging.error("❌ Neo4j 스키마 조회 오류: %s", str(e))
             raise RuntimeError(f"Neo4j 스키마 조회 오류: {str(e)}")
 
+    @tracing.traced("neo4j.schema_k_hop")
+    def query_schema_k_hop(self, node_names: List[str], brain_id: str,
+                           max_hops: int = SCHEMA_MAX_HOPS,
+                           fan_out: int = SCHEMA_FAN_OUT,
+                           max_nodes: int = SCHEMA_MAX_NODES,
+                           seed_scores: Optional[Dict[str, float]] = None) -> Optional[Dict[str, Any]]:
+        """
+        시드 노드에서 출발해 단계별로 제한된 k-hop 이웃을 조회합니다.
+
+        - 각 단계에서 노드마다 관계를 최대 SCHEMA_SCAN_LIMIT개만 읽고, 그중 연결 수(degree)가 많은 이웃 fan_out개만 따라갑니다.
+        - 이웃 점수 = 출발 노드 점수 × SCHEMA_HOP_DECAY (관계에는 가중치가 저장되지 않으므로 점수가 같으면 degree 순)
+        - 전체 노드 수가 max_nodes에 도달하면 확장을 멈춥니다.
+
+        Args:
+            node_names: 시드 노드 이름 목록
+            brain_id: 브레인 ID
+            max_hops: 최대 확장 단계
+            fan_out: 노드당 다음 단계로 따라갈 최대 관계 수
+            max_nodes: 결과에 포함할 최대 노드 수
+            seed_scores: 시드 노드별 유사도 점수 (없으면 모두 1.0)
+        Returns:
+            {"nodes", "relatedNodes", "relationships", "scores": {노드 이름: 점수}} 또는 None
+        """
+        if not node_names or not isinstance(node_names, list):
+            logging.error("유효하지 않은 node_names: %s", node_names)
+            return None
+
+        seed_scores = seed_scores or {}
+        names = list(dict.fromkeys(node_names))
+        logging.info("Neo4j k-hop 스키마 조회 시작 (시드: %d개, hops: %d, fan_out: %d, brain_id: %s)",
+                     len(names), max_hops, fan_out, brain_id)
+
+        try:
+            with self.driver.session() as session:
+                seed_result = session.run(K_HOP_SEED_QUERY, names=names, brain_id=brain_id)
+                nodes = [record["n"] for record in seed_result][:max_nodes]
+                if not nodes:
+                    logging.warning("Neo4j 조회 결과가 없습니다.")
+                    return None
+
+                scores = {node["name"]: float(seed_scores.get(node["name"], 1.0)) for node in nodes}
+                related_nodes = []
+                relationships = {}
+                frontier = [{"name": name, "score": score} for name, score in scores.items()]
+
+                for hop in range(max_hops):
+                    if not frontier or len(scores) >= max_nodes:
+                        break
+                    result = session.run(K_HOP_EXPAND_QUERY, frontier=frontier, brain_id=brain_id,
+                                         fan_out=fan_out, scan_limit=max(SCHEMA_SCAN_LIMIT, fan_out),
+                                         decay=SCHEMA_HOP_DECAY)
+                    # 점수 순으로 남은 노드 수만큼만 채택
+                    frontier, candidate_count = select_k_hop_neighbours(
+                        result, scores, related_nodes, relationships, max_nodes
+                    )
+                    logging.info("k-hop %d단계: 후보 %d개, 채택 %d개", hop + 1, candidate_count, len(frontier))
+
+            tracing.current_span().set_attributes(seeds=len(nodes), related_nodes=len(related_nodes),
+                                                  relationships=len(relationships))
+            logging.info("Neo4j k-hop 스키마 조회 결과: 노드=%d개, 관련 노드=%d개, 관계=%d개",
+                         len(nodes), len(related_nodes), len(relationships))
+            return {
+                "nodes": nodes,
+                "relatedNodes": related_nodes,
+                "relationships": list(relationships.values()),
+                "scores": scores
+            }
+        except Exception as e:
+            logging.error("❌ Neo4j k-hop 스키마 조회 오류: %s", str(e))
+            raise RuntimeError(f"Neo4j k-hop 스키마 조회 오류: {str(e)}")
+
+    @tracing.traced("neo4j.query")
     def _execute_with_retry(self, query: str, parameters: dict, retries: int = 3):
         """
         간단한 재시도 로직: 지정된 쿼리를 여러 번 시도하여 실행
@@ -198,15 +261,13 @@ class Neo4jHandler:
                 logging.warning(f"재시도 {attempt+1}회 실패: {e}")
                 if attempt == retries - 1:
                     raise
+                tracing.current_span().add("retries")
+                metrics_service.RETRIES.inc(operation="neo4j")
         return []
 
     def fetch_all_edges(self, brain_id: str) -> List[Dict]:
         try:
-            query = """
-            MATCH (source:Node {brain_id: $brain_id})-[r:RELATES_TO {brain_id: $brain_id}]->(target:Node {brain_id: $brain_id})
-            RETURN source.name AS source, target.name AS target, r.type AS type
-            """
-            return self._execute_with_retry(query, {"brain_id": brain_id})
+            return self._execute_with_retry(FETCH_ALL_EDGES_QUERY, {"brain_id": brain_id})
         except Exception as e:
             logging.error(f"❌ Neo4j 엣지 조회 실패: {str(e)}")
             raise RuntimeError(f"Neo4j 엣지 조회 실패: {str(e)}")
@@ -216,25 +277,12 @@ class Neo4jHandler:
         logging.info(f"Neo4j get_brain_graph 시작 - brain_id: {brain_id}")
         try:
             with self.driver.session() as session:
-                # 노드 조회
-                logging.info("노드 조회 쿼리 실행")
-                nodes_result = session.run("""
-                    MATCH (n)
-                    WHERE n.brain_id = $brain_id
-                    RETURN DISTINCT n.name as name
-                    """, brain_id=brain_id)
-                
+                # 노드 조회 (Node 라벨 + brain_id 인덱스 사용)
+                nodes_result = session.run(GRAPH_NODES_QUERY, brain_id=brain_id)
                 nodes = [{"name": record["name"]} for record in nodes_result]
-                logging.info(f"조회된 노드 수: {len(nodes)}")
 
                 # 엣지(관계) 조회
-                logging.info("엣지 조회 쿼리 실행")
-                edges_result = session.run("""
-                    MATCH (source)-[r]->(target)
-                    WHERE source.brain_id = $brain_id AND target.brain_id = $brain_id
-                    RETURN DISTINCT source.name as source, target.name as target, r.relation as relation
-                    """, brain_id=brain_id)
-                
+                edges_result = session.run(GRAPH_EDGES_QUERY, brain_id=brain_id)
                 links = [
                     {
                         "source": record["source"],
@@ -243,28 +291,62 @@ class Neo4jHandler:
                     }
                     for record in edges_result
                 ]
-                logging.info(f"조회된 엣지 수: {len(links)}")
 
-                result = {
+                logging.info("조회된 그래프 - brain_id: %s, 노드 수: %d, 엣지 수: %d",
+                             brain_id, len(nodes), len(links))
+                return {
                     "nodes": nodes,
                     "links": links
                 }
-                logging.info(f"반환할 데이터: {result}")
-                return result
         except Exception as e:
             logging.error("Neo4j 그래프 조회 오류: %s", str(e))
-            raise RuntimeError(f"그래프 조회 오류: {str(e)}") 
-        
+            raise RuntimeError(f"그래프 조회 오류: {str(e)}")
+
+    def get_brain_graph_page(self, brain_id: str, cursor: Optional[str] = None,
+                             limit: int = GRAPH_PAGE_SIZE) -> Dict[str, Any]:
+        """
+        브레인 그래프를 노드 이름 기준 커서 페이지 단위로 조회합니다.
+        각 페이지에는 노드들과 그 노드에서 나가는 엣지가 함께 담기므로,
+        모든 페이지를 이어 붙이면 각 엣지는 정확히 한 번씩 등장합니다.
+
+        Args:
+            brain_id: 브레인 ID
+            cursor: 이전 페이지의 next_cursor (첫 페이지는 None)
+            limit: 페이지당 최대 노드 수
+        Returns:
+            {"nodes": [...], "links": [...], "next_cursor": str | None}
+        """
+        limit = clamp_page_size(limit)
+        query = graph_page_query(cursor)
+        try:
+            with self.driver.session() as session:
+                result = session.run(query, brain_id=brain_id, cursor=cursor, limit=limit)
+                return graph_page_from_records(result, limit)
+        except Exception as e:
+            logging.error("Neo4j 그래프 페이지 조회 오류: %s", str(e))
+            raise RuntimeError(f"그래프 페이지 조회 오류: {str(e)}")
+
+    def iter_brain_graph(self, brain_id: str, page_size: int = GRAPH_PAGE_SIZE) -> Iterator[Dict[str, Any]]:
+        """
+        get_brain_graph_page를 커서가 끝날 때까지 반복 호출하며 페이지를 하나씩 내보냅니다.
+        전체 그래프를 메모리에 올리지 않고 스트리밍 응답을 만들 때 사용합니다.
+        """
+        cursor = None
+        while True:
+            page = self.get_brain_graph_page(brain_id, cursor, page_size)
+            yield page
+            cursor = page["next_cursor"]
+            if cursor is None:
+                break
+
     def delete_brain(self, brain_id: str) -> None:
         try:
-            query = """
-            MATCH (n:Node {brain_id: $brain_id})
-            DETACH DELETE n
-            """
-            self._execute_with_retry(query, {"brain_id": brain_id})
+            self._execute_with_retry(DELETE_BRAIN_QUERY, {"brain_id": brain_id})
             logging.info(f"✅ brain_id {brain_id}의 모든 데이터 삭제 완료")
+            graph_cache.record_changes(brain_id, cleared=True)
         except Exception as e:
             logging.error(f"❌ Neo4j 데이터 삭제 실패: {str(e)}")
+            graph_cache.bump_version(brain_id)
             raise RuntimeError(f"Neo4j 데이터 삭제 실패: {str(e)}")
 
     def delete_descriptions_by_source_id(self, source_id: str, brain_id: str) -> None:
@@ -276,24 +358,21 @@ class Neo4jHandler:
         """
         try:
             # 1. description 삭제
-            query1 = """
-            MATCH (n:Node {brain_id: $brain_id})
-            WITH n, [d in n.descriptions WHERE NOT (d CONTAINS $source_id)] as filtered_descriptions
-            SET n.descriptions = filtered_descriptions
-            """
-            self._execute_with_retry(query1, {"source_id": source_id, "brain_id": brain_id})
+            self._execute_with_retry(STRIP_SOURCE_DESCRIPTIONS_QUERY, {"source_id": str(source_id), "brain_id": brain_id})
             
-            # 2. description이 비어있는 노드 삭제
-            query2 = """
-            MATCH (n:Node {brain_id: $brain_id})
-            WHERE size(n.descriptions) = 0
-            DETACH DELETE n
-            """
-            self._execute_with_retry(query2, {"brain_id": brain_id})
+            # 2. description이 비어있는 노드 삭제 (변경 이력 기록을 위해 삭제된 노드/엣지 반환)
+            deleted = self._execute_with_retry(DELETE_EMPTY_NODES_QUERY, {"brain_id": brain_id})
             
             logging.info(f"✅ source_id {source_id}의 descriptions 삭제 완료")
+            graph_cache.record_changes(
+                brain_id,
+                removed_nodes=[row["name"] for row in deleted],
+                removed_links=[rel for row in deleted for rel in row["rels"]]
+            )
         except Exception as e:
             logging.error(f"❌ descriptions 삭제 실패: {str(e)}")
+            # 일부 쿼리만 성공했을 수도 있으므로 내용 없이 버전만 올림
+            graph_cache.bump_version(brain_id)
             raise RuntimeError(f"descriptions 삭제 실패: {str(e)}")
 
     def delete_descriptions_by_brain_id(self, brain_id: str) -> None:
@@ -303,14 +382,12 @@ class Neo4jHandler:
             brain_id: 삭제할 브레인의 ID
         """
         try:
-            query = """
-            MATCH (n:Node {brain_id: $brain_id})
-            DETACH DELETE n
-            """
-            self._execute_with_retry(query, {"brain_id": brain_id})
+            self._execute_with_retry(DELETE_BRAIN_QUERY, {"brain_id": brain_id})
             logging.info(f"✅ brain_id {brain_id}의 모든 데이터 삭제 완료")
+            graph_cache.record_changes(brain_id, cleared=True)
         except Exception as e:
             logging.error(f"❌ Neo4j 데이터 삭제 실패: {str(e)}")
+            graph_cache.bump_version(brain_id)
             raise RuntimeError(f"Neo4j 데이터 삭제 실패: {str(e)}")
 
     def get_node_descriptions(self, node_name: str, brain_id: str) -> List[Dict]:
@@ -325,27 +402,13 @@ class Neo4jHandler:
             List[Dict]: descriptions 배열 (각 항목은 description과 source_id를 포함)
         """
         try:
-            query = """
-            MATCH (n:Node {name: $node_name, brain_id: $brain_id})
-            RETURN n.descriptions as descriptions
-            """
-            result = self._execute_with_retry(query, {"node_name": node_name, "brain_id": brain_id})
+            result = self._execute_with_retry(NODE_DESCRIPTIONS_QUERY, {"node_name": node_name, "brain_id": brain_id})
             
             if not result or not result[0].get("descriptions"):
                 return []
                 
             # descriptions 배열의 각 항목을 JSON으로 파싱
-            descriptions = []
-            for desc in result[0]["descriptions"]:
-                if isinstance(desc, str):
-                    try:
-                        descriptions.append(json.loads(desc))
-                    except json.JSONDecodeError:
-                        logging.warning(f"JSON 파싱 실패: {desc}")
-                else:
-                    descriptions.append(desc)
-                    
-            return descriptions
+            return parse_descriptions(result[0]["descriptions"])
             
         except Exception as e:
             logging.error(f"❌ 노드 descriptions 조회 실패: {str(e)}")
@@ -363,17 +426,37 @@ class Neo4jHandler:
             List[str]: 노드 이름 목록
         """
         try:
-            query = """
-            MATCH (n:Node {brain_id: $brain_id})
-            WHERE ANY(desc IN n.descriptions WHERE desc CONTAINS $source_id)
-            RETURN n.name as name
-            """
-            result = self._execute_with_retry(query, {"source_id": source_id, "brain_id": brain_id})
+            result = self._execute_with_retry(NODES_BY_SOURCE_ID_QUERY, {"source_id": str(source_id), "brain_id": brain_id})
             return [record["name"] for record in result]
             
         except Exception as e:
             logging.error(f"❌ source_id로 노드 조회 실패: {str(e)}")
             raise RuntimeError(f"source_id로 노드 조회 실패: {str(e)}")
 
+    def copy_descriptions_by_source_id(self, from_source_id: str, to_source_id: str, brain_id: str) -> int:
+        """
+        from_source_id의 description을 to_source_id로 복사합니다.
+        같은 내용이라 추출을 생략한 중복 업로드도 자기 description을 갖게 되어,
+        원본을 삭제(delete_descriptions_by_source_id)해도 중복 업로드 쪽 그래프는 남습니다.
+        Args:
+            from_source_id: 원본 source_id
+            to_source_id: 복사본에 붙일 source_id
+            brain_id: 브레인 ID
+        Returns:
+            int: description이 복사된 노드 수
+        """
+        try:
+            records = self._execute_with_retry(SOURCE_NODE_DESCRIPTIONS_QUERY,
+                                               {"source_id": str(from_source_id), "brain_id": brain_id})
+            rows = copied_description_rows(records, from_source_id, to_source_id)
+            if rows:
+                self._execute_with_retry(APPEND_DESCRIPTIONS_QUERY, {"rows": rows, "brain_id": brain_id})
+                graph_cache.record_changes(brain_id, added_nodes=[row["name"] for row in rows])
+            logging.info(f"✅ source_id {from_source_id} → {to_source_id} descriptions 복사 완료 ({len(rows)}개 노드)")
+            return len(rows)
+        except Exception as e:
+            logging.error(f"❌ descriptions 복사 실패: {str(e)}")
+            raise RuntimeError(f"descriptions 복사 실패: {str(e)}")
+
     def __del__(self):
         self.close()
\ No newline at end of file
@@ -0,0 +1,293 @@
+"""
+Neo4j 핸들러 동시성 벤치마크.
+
+async 라우트에서 그래프 쿼리를 처리하는 세 가지 방식의 처리량과 이벤트 루프 지연을 비교합니다.
+
+- sync: 동기 Neo4jHandler를 라우트에서 바로 호출 (user-030 이전 방식, 쿼리마다 이벤트 루프가 멈춤)
+- sync_io: 동기 Neo4jHandler를 I/O 풀(run_io)에서 호출
+- async: AsyncNeo4jHandler를 await
+
+--uri를 주지 않으면 쿼리(RUN)마다 --latency-ms만큼 기다렸다가 빈 결과를 돌려주는
+최소 Bolt 4.4 스텁 서버를 프로세스 안에 띄우고 실제 neo4j 드라이버로 접속해 측정합니다.
+
+    python -m neo4j_db.benchmark --requests 200 --concurrency 50 --latency-ms 20
+    python -m neo4j_db.benchmark --uri bolt://localhost:7687
+"""
+import argparse
+import asyncio
+import logging
+import os
+import statistics
+import struct
+import sys
+import threading
+import time
+from typing import Any, Dict, List, Tuple
+
+# ───────── PackStream (Bolt 메시지 직렬화) ─────────
+
+
+def _pack(value: Any) -> bytes:
+    if value is None:
+        return b"\xC0"
+    if value is True:
+        return b"\xC3"
+    if value is False:
+        return b"\xC2"
+    if isinstance(value, int):
+        if -16 <= value < 128:
+            return struct.pack(">b", value)
+        return b"\xCB" + struct.pack(">q", value)
+    if isinstance(value, float):
+        return b"\xC1" + struct.pack(">d", value)
+    if isinstance(value, str):
+        data = value.encode("utf-8")
+        header = bytes([0x80 | len(data)]) if len(data) < 16 else b"\xD2" + struct.pack(">I", len(data))
+        return header + data
+    if isinstance(value, list):
+        header = bytes([0x90 | len(value)]) if len(value) < 16 else b"\xD6" + struct.pack(">I", len(value))
+        return header + b"".join(_pack(item) for item in value)
+    if isinstance(value, dict):
+        header = bytes([0xA0 | len(value)]) if len(value) < 16 else b"\xDA" + struct.pack(">I", len(value))
+        return header + b"".join(_pack(key) + _pack(item) for key, item in value.items())
+    raise TypeError(f"직렬화할 수 없는 값: {type(value)}")
+
+
+def _unpack(data: bytes, offset: int = 0) -> Tuple[Any, int]:
+    marker = data[offset]
+    offset += 1
+    high, low = marker & 0xF0, marker & 0x0F
+    if marker < 0x80:
+        return marker, offset
+    if marker >= 0xF0:
+        return marker - 0x100, offset
+    if high == 0x80:
+        return data[offset:offset + low].decode("utf-8"), offset + low
+    if high == 0x90:
+        return _unpack_items(data, offset, low, list)
+    if high == 0xA0:
+        return _unpack_items(data, offset, low, dict)
+    if high == 0xB0:
+        signature = data[offset]
+        fields, offset = _unpack_items(data, offset + 1, low, list)
+        return (signature, fields), offset
+    if marker == 0xC0:
+        return None, offset
+    if marker in (0xC2, 0xC3):
+        return marker == 0xC3, offset
+    if marker == 0xC1:
+        return struct.unpack_from(">d", data, offset)[0], offset + 8
+    sized = {0xC8: ">b", 0xC9: ">h", 0xCA: ">i", 0xCB: ">q"}
+    if marker in sized:
+        fmt = sized[marker]
+        return struct.unpack_from(fmt, data, offset)[0], offset + struct.calcsize(fmt)
+    lengths = {0xD0: ">B", 0xD1: ">H", 0xD2: ">I", 0xD4: ">B", 0xD5: ">H", 0xD6: ">I",
+               0xD8: ">B", 0xD9: ">H", 0xDA: ">I", 0xCC: ">B", 0xCD: ">H", 0xCE: ">I"}
+    if marker in lengths:
+        fmt = lengths[marker]
+        size = struct.unpack_from(fmt, data, offset)[0]
+        offset += struct.calcsize(fmt)
+        if marker in (0xD0, 0xD1, 0xD2):
+            return data[offset:offset + size].decode("utf-8"), offset + size
+        if marker in (0xCC, 0xCD, 0xCE):
+            return data[offset:offset + size], offset + size
+        return _unpack_items(data, offset, size, list if marker in (0xD4, 0xD5, 0xD6) else dict)
+    raise ValueError(f"알 수 없는 PackStream 마커: {marker:#x}")
+
+
+def _unpack_items(data: bytes, offset: int, count: int, kind) -> Tuple[Any, int]:
+    if kind is dict:
+        result = {}
+        for _ in range(count):
+            key, offset = _unpack(data, offset)
+            result[key], offset = _unpack(data, offset)
+        return result, offset
+    result = []
+    for _ in range(count):
+        item, offset = _unpack(data, offset)
+        result.append(item)
+    return result, offset
+
+
+# ───────── Bolt 4.4 스텁 서버 ─────────
+
+_HELLO, _GOODBYE, _RESET, _RUN, _DISCARD, _PULL, _BEGIN, _COMMIT, _ROLLBACK = (
+    0x01, 0x02, 0x0F, 0x10, 0x2F, 0x3F, 0x11, 0x12, 0x13)
+_SUCCESS = 0x70
+
+
+class StubBoltServer:
+    """
+    모든 쿼리에 latency초 뒤 빈 결과로 응답하는 Bolt 4.4 서버.
+    실제 Neo4j 대신 드라이버/핸들러의 동시성만 측정하기 위한 것으로, 인증과 쿼리 내용은 확인하지 않습니다.
+    """
+
+    def __init__(self, latency: float):
+        self.latency = latency
+        self.queries = 0
+        self.port = None
+        self._loop = asyncio.new_event_loop()
+        self._started = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="bolt-stub", daemon=True)
+
+    def start(self) -> str:
+        self._thread.start()
+        self._started.wait()
+        return f"bolt://127.0.0.1:{self.port}"
+
+    def stop(self) -> None:
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        self._thread.join()
+
+    def _run(self) -> None:
+        asyncio.set_event_loop(self._loop)
+        server = self._loop.run_until_complete(asyncio.start_server(self._handle, "127.0.0.1", 0))
+        self.port = server.sockets[0].getsockname()[1]
+        self._started.set()
+        self._loop.run_forever()
+        server.close()
+
+    async def _handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        try:
+            await reader.readexactly(4 + 16)       # 매직 + 버전 제안 4개
+            writer.write(b"\x00\x00\x04\x04")      # Bolt 4.4 선택
+            while True:
+                signature, _ = await self._read_message(reader)
+                if signature == _GOODBYE:
+                    break
+                if signature == _HELLO:
+                    self._send(writer, {"server": "Neo4j/4.4.0", "connection_id": "bolt-stub"})
+                elif signature == _RUN:
+                    self.queries += 1
+                    await asyncio.sleep(self.latency)
+                    self._send(writer, {"fields": [], "t_first": 0})
+                elif signature in (_PULL, _DISCARD):
+                    self._send(writer, {"has_more": False, "type": "rw", "t_last": 0, "db": "neo4j"})
+                elif signature == _COMMIT:
+                    self._send(writer, {"bookmark": "stub:1"})
+                else:                               # BEGIN, ROLLBACK, RESET 등
+                    self._send(writer, {})
+                await writer.drain()
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        finally:
+            writer.close()
+
+    @staticmethod
+    async def _read_message(reader: asyncio.StreamReader):
+        data = b""
+        while True:
+            size = struct.unpack(">H", await reader.readexactly(2))[0]
+            if size == 0:
+                if data:
+                    break
+                continue                            # NOOP(keep-alive)
+            data += await reader.readexactly(size)
+        value, _ = _unpack(data)
+        return value
+
+    @staticmethod
+    def _send(writer: asyncio.StreamWriter, metadata: Dict[str, Any]) -> None:
+        body = bytes([0xB1, _SUCCESS]) + _pack(metadata)
+        writer.write(struct.pack(">H", len(body)) + body + b"\x00\x00")
+
+
+# ───────── 벤치마크 ─────────
+
+async def _measure(call, requests: int, concurrency: int) -> Dict[str, float]:
+    """call()을 requests번, 최대 concurrency개씩 동시에 실행하며 지연과 이벤트 루프 지연을 잰다."""
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies: List[float] = []
+    lag = {"max": 0.0}
+    done = asyncio.Event()
+
+    async def ticker():
+        # 이벤트 루프가 막히면 sleep이 늦게 깨어나므로 그 차이를 최대 지연으로 기록
+        while not done.is_set():
+            expected = time.perf_counter() + 0.005
+            await asyncio.sleep(0.005)
+            lag["max"] = max(lag["max"], time.perf_counter() - expected)
+
+    async def one():
+        async with semaphore:
+            started = time.perf_counter()
+            await call()
+            latencies.append(time.perf_counter() - started)
+
+    ticker_task = asyncio.create_task(ticker())
+    started = time.perf_counter()
+    await asyncio.gather(*(one() for _ in range(requests)))
+    elapsed = time.perf_counter() - started
+    done.set()
+    await ticker_task
+    latencies.sort()
+    return {
+        "rps": requests / elapsed,
+        "p50_ms": statistics.median(latencies) * 1000,
+        "p95_ms": latencies[int(len(latencies) * 0.95) - 1] * 1000,
+        "max_loop_lag_ms": lag["max"] * 1000,
+    }
+
+
+async def run_benchmark(requests: int, concurrency: int) -> Dict[str, Dict[str, float]]:
+    # 핸들러 모듈은 NEO4J_URI를 import 시점에 읽으므로 main()에서 환경 변수를 정한 뒤 불러옴
+    from neo4j_db.AsyncNeo4jHandler import AsyncNeo4jHandler
+    from neo4j_db.Neo4jHandler import Neo4jHandler
+    from services.executor_service import run_io
+
+    sync_handler = Neo4jHandler()
+    async_handler = AsyncNeo4jHandler()
+
+    async def sync_call():
+        sync_handler.get_node_descriptions("benchmark", "benchmark")
+
+    async def sync_io_call():
+        await run_io(sync_handler.get_node_descriptions, "benchmark", "benchmark")
+
+    async def async_call():
+        await async_handler.get_node_descriptions("benchmark", "benchmark")
+
+    results = {}
+    try:
+        for mode, call in (("sync", sync_call), ("sync_io", sync_io_call), ("async", async_call)):
+            await call()                            # 연결/인덱스 준비는 측정에서 제외
+            results[mode] = await _measure(call, requests, concurrency)
+    finally:
+        sync_handler.close()
+        await AsyncNeo4jHandler.close_driver()
+    return results
+
+
+def main(argv: List[str] = None) -> int:
+    parser = argparse.ArgumentParser(description="동기/비동기 Neo4j 핸들러 동시성 비교")
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=50, help="동시에 처리 중인 요청 수")
+    parser.add_argument("--latency-ms", type=float, default=20.0, help="스텁 서버의 쿼리당 지연")
+    parser.add_argument("--uri", help="실제 Neo4j 주소 (생략하면 스텁 서버 사용)")
+    args = parser.parse_args(argv)
+
+    stub = None
+    if args.uri:
+        os.environ["BRAINTRACE_NEO4J_URI"] = args.uri
+    else:
+        stub = StubBoltServer(args.latency_ms / 1000)
+        os.environ["BRAINTRACE_NEO4J_URI"] = stub.start()
+
+    try:
+        results = asyncio.run(run_benchmark(args.requests, args.concurrency))
+    finally:
+        if stub is not None:
+            stub.stop()
+
+    target = args.uri or f"stub ({args.latency_ms:g}ms/query)"
+    print(f"{args.requests} requests, concurrency {args.concurrency}, {target}")
+    print(f"{'mode':<10}{'req/s':>10}{'p50(ms)':>10}{'p95(ms)':>10}{'loop lag(ms)':>14}")
+    for mode, report in results.items():
+        print(f"{mode:<10}{report['rps']:>10.1f}{report['p50_ms']:>10.1f}{report['p95_ms']:>10.1f}"
+              f"{report['max_loop_lag_ms']:>14.1f}")
+    return 0
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.WARNING)
+    sys.exit(main())
@@ -0,0 +1,304 @@
+"""
+Neo4jHandler(동기)와 AsyncNeo4jHandler(비동기)가 함께 쓰는 Cypher 쿼리와 결과 가공 함수.
+드라이버 호출 방식만 다르고 쿼리와 후처리는 같아야 하므로 이곳에 모아 둡니다.
+"""
+import json
+import logging
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+# 그래프 조회 시 한 페이지에 담을 기본/최대 노드 수
+GRAPH_PAGE_SIZE = 500
+GRAPH_PAGE_SIZE_MAX = 5000
+
+# 질문 답변용 k-hop 스키마 확장 기본값
+SCHEMA_MAX_HOPS = 2        # 시드 노드에서 최대 몇 단계까지 확장할지
+SCHEMA_FAN_OUT = 10        # 한 노드에서 다음 단계로 따라갈 최대 관계 수
+SCHEMA_SCAN_LIMIT = 200    # 한 노드에서 fan_out개를 고르기 위해 읽는 최대 관계 수 (허브 노드의 조회 비용 상한)
+SCHEMA_MAX_NODES = 60      # 확장 결과에 포함할 최대 노드 수 (시드 포함)
+SCHEMA_HOP_DECAY = 0.5     # 단계가 멀어질 때마다 곱해지는 점수 감쇠율
+
+# brain_id 기반 조회/MERGE를 인덱스로 처리하기 위한 스키마
+INDEX_QUERIES = [
+    "CREATE INDEX node_brain_id IF NOT EXISTS FOR (n:Node) ON (n.brain_id)",
+    "CREATE INDEX node_brain_id_name IF NOT EXISTS FOR (n:Node) ON (n.brain_id, n.name)",
+    "CREATE INDEX rel_brain_id IF NOT EXISTS FOR ()-[r:REL]-() ON (r.brain_id)",
+]
+
+MERGE_NODE_QUERY = """
+MERGE (n:Node {name: $name, brain_id: $brain_id})
+ON CREATE SET
+    n.label = $label,
+    n.descriptions = $new_descriptions,
+    n.source_id = $source_id,
+    n.brain_id = $brain_id
+ON MATCH SET
+    n.label = $label,
+    n.source_id = $source_id,
+    n.brain_id = $brain_id,
+    n.descriptions = CASE
+        WHEN n.descriptions IS NULL THEN $new_descriptions
+        ELSE n.descriptions + [item IN $new_descriptions WHERE NOT item IN n.descriptions]
+    END
+"""
+
+# 양끝 노드가 모두 있을 때만 엣지가 만들어지므로, 실제로 저장된 엣지만 행으로 반환
+MERGE_EDGE_QUERY = """
+MATCH (a:Node {name: $source, brain_id: $brain_id}), (b:Node {name: $target, brain_id: $brain_id})
+MERGE (a)-[r:REL {relation: $relation, brain_id: $brain_id}]->(b)
+RETURN a.name AS source, b.name AS target, r.relation AS relation
+"""
+
+FETCH_ALL_NODES_QUERY = "MATCH (n:Node) RETURN n.label AS label, n.name AS name, n.descriptions AS descriptions"
+
+SCHEMA_DIRECT_QUERY = """
+MATCH (n:Node)
+WHERE n.name IN $names AND n.brain_id = $brain_id
+OPTIONAL MATCH (n)-[r]-(m:Node)
+WHERE m.brain_id = $brain_id
+RETURN
+collect(DISTINCT n) AS start_nodes,
+collect(DISTINCT m) AS direct_nodes,
+collect(DISTINCT r) AS direct_relationships
+"""
+
+K_HOP_SEED_QUERY = "MATCH (n:Node {brain_id: $brain_id}) WHERE n.name IN $names RETURN n"
+
+# 출발 노드마다 관계를 최대 $scan_limit개만 읽고, 그중 연결 수(degree)가 많은 이웃 $fan_out개를 고름
+# (관계에는 가중치가 없으므로 연결이 많은 개념을 우선. COUNT { (m)--() }는 노드의 degree 저장값을 읽어 비용이 일정)
+# 허브 노드의 관계가 $scan_limit개를 넘으면 저장 순서상 앞의 관계만 후보가 됨
+K_HOP_EXPAND_QUERY = """
+UNWIND $frontier AS f
+CALL {
+    WITH f
+    MATCH (n:Node {brain_id: $brain_id, name: f.name})-[r:REL]-(m:Node {brain_id: $brain_id})
+    WITH r, m LIMIT $scan_limit
+    WITH r, m, COUNT { (m)--() } AS degree
+    ORDER BY degree DESC, m.name
+    LIMIT $fan_out
+    RETURN r, m, degree
+}
+RETURN r, m, f.score * $decay AS score, degree
+"""
+
+FETCH_ALL_EDGES_QUERY = """
+MATCH (source:Node {brain_id: $brain_id})-[r:RELATES_TO {brain_id: $brain_id}]->(target:Node {brain_id: $brain_id})
+RETURN source.name AS source, target.name AS target, r.type AS type
+"""
+
+# Node 라벨 + brain_id 인덱스 사용
+GRAPH_NODES_QUERY = """
+MATCH (n:Node {brain_id: $brain_id})
+RETURN n.name AS name
+"""
+
+GRAPH_EDGES_QUERY = """
+MATCH (source:Node {brain_id: $brain_id})-[r:REL]->(target:Node {brain_id: $brain_id})
+RETURN source.name AS source, target.name AS target, r.relation AS relation
+"""
+
+DELETE_BRAIN_QUERY = """
+MATCH (n:Node {brain_id: $brain_id})
+DETACH DELETE n
+"""
+
+# descriptions는 serialize_descriptions의 JSON 문자열이므로 "source_id": "<id>" 쌍으로 비교
+# (source_id만으로 CONTAINS하면 1을 지울 때 12, 17 등의 description까지 함께 지워짐)
+STRIP_SOURCE_DESCRIPTIONS_QUERY = """
+MATCH (n:Node {brain_id: $brain_id})
+WITH n, [d in n.descriptions WHERE NOT (d CONTAINS ('"source_id": "' + $source_id + '"'))] as filtered_descriptions
+SET n.descriptions = filtered_descriptions
+"""
+
+# description이 비어있는 노드 삭제 (변경 이력 기록을 위해 삭제된 노드/엣지 반환)
+DELETE_EMPTY_NODES_QUERY = """
+MATCH (n:Node {brain_id: $brain_id})
+WHERE size(n.descriptions) = 0
+OPTIONAL MATCH (n)-[r:REL]-(:Node)
+WITH n, collect(CASE WHEN r IS NULL THEN NULL
+                     ELSE {source: startNode(r).name, target: endNode(r).name, relation: r.relation} END) AS rels
+WITH n, n.name AS name, rels
+DETACH DELETE n
+RETURN name, rels
+"""
+
+NODE_DESCRIPTIONS_QUERY = """
+MATCH (n:Node {name: $node_name, brain_id: $brain_id})
+RETURN n.descriptions as descriptions
+"""
+
+NODES_BY_SOURCE_ID_QUERY = """
+MATCH (n:Node {brain_id: $brain_id})
+WHERE ANY(desc IN n.descriptions WHERE desc CONTAINS ('"source_id": "' + $source_id + '"'))
+RETURN n.name as name
+"""
+
+# 같은 내용의 소스(중복 업로드)에 description을 복사할 때 원본 source_id가 포함된 노드 조회
+SOURCE_NODE_DESCRIPTIONS_QUERY = """
+MATCH (n:Node {brain_id: $brain_id})
+WHERE ANY(desc IN n.descriptions WHERE desc CONTAINS ('"source_id": "' + $source_id + '"'))
+RETURN n.name AS name, n.descriptions AS descriptions
+"""
+
+APPEND_DESCRIPTIONS_QUERY = """
+UNWIND $rows AS row
+MATCH (n:Node {name: row.name, brain_id: $brain_id})
+SET n.descriptions = n.descriptions + row.descriptions
+"""
+
+
+def serialize_descriptions(node: Dict[str, Any]) -> List[str]:
+    """
+    노드의 descriptions를 JSON 문자열 목록으로 변환합니다.
+    source_id가 없는 항목에는 노드의 source_id를 채워 넣습니다. (한글 깨짐 방지를 위해 ensure_ascii=False)
+    """
+    new_descriptions = []
+    for desc in node.get("descriptions", []):
+        # 이미 source_id가 포함되어 있지 않으면 추가
+        if isinstance(desc, dict) and "source_id" not in desc and "description" in desc:
+            desc["source_id"] = node.get("source_id", "")
+        new_descriptions.append(json.dumps(desc, ensure_ascii=False))
+    return new_descriptions
+
+
+def merge_node_params(node: Dict[str, Any], brain_id: str) -> Dict[str, Any]:
+    """MERGE_NODE_QUERY 파라미터"""
+    return {
+        "name": node["name"],
+        "label": node["label"],
+        "source_id": node.get("source_id", ""),
+        "new_descriptions": serialize_descriptions(node),
+        "brain_id": brain_id,
+    }
+
+
+def merge_edge_params(edge: Dict[str, Any], brain_id: str) -> Dict[str, Any]:
+    """MERGE_EDGE_QUERY 파라미터"""
+    return {
+        "source": edge["source"],
+        "target": edge["target"],
+        "relation": edge["relation"],
+        "brain_id": brain_id,
+    }
+
+
+def node_record_to_dict(record) -> Dict[str, Any]:
+    """FETCH_ALL_NODES_QUERY 결과 레코드를 dict로 변환합니다."""
+    raw = record["descriptions"]
+    return {
+        "label": record["label"],
+        "name": record["name"],
+        "descriptions": [json.loads(desc) for desc in raw] if raw is not None else []
+    }
+
+
+def parse_descriptions(raw: Optional[Iterable[Any]]) -> List[Dict]:
+    """descriptions 배열의 각 항목을 JSON으로 파싱합니다. 파싱할 수 없는 항목은 건너뜁니다."""
+    descriptions = []
+    for desc in raw or []:
+        if isinstance(desc, str):
+            try:
+                descriptions.append(json.loads(desc))
+            except json.JSONDecodeError:
+                logging.warning(f"JSON 파싱 실패: {desc}")
+        else:
+            descriptions.append(desc)
+    return descriptions
+
+
+def copied_description_rows(records: Iterable[Dict[str, Any]], from_source_id: str,
+                            to_source_id: str) -> List[Dict[str, Any]]:
+    """
+    SOURCE_NODE_DESCRIPTIONS_QUERY 결과에서 source_id가 from_source_id인 description을
+    to_source_id로 바꾼 복사본을 APPEND_DESCRIPTIONS_QUERY의 rows 형식으로 만듭니다.
+    (이미 to_source_id description이 있는 노드는 건너뛰므로 여러 번 호출해도 한 번만 복사됨)
+    """
+    rows = []
+    for record in records:
+        descriptions = parse_descriptions(record["descriptions"])
+        if any(str(desc.get("source_id")) == str(to_source_id) for desc in descriptions):
+            continue
+        copies = [json.dumps({**desc, "source_id": str(to_source_id)}, ensure_ascii=False)
+                  for desc in descriptions if str(desc.get("source_id")) == str(from_source_id)]
+        if copies:
+            rows.append({"name": record["name"], "descriptions": copies})
+    return rows
+
+
+def clamp_page_size(limit: int) -> int:
+    return max(1, min(int(limit), GRAPH_PAGE_SIZE_MAX))
+
+
+def graph_page_query(cursor: Optional[str]) -> str:
+    """
+    노드 이름 기준 커서 페이지 쿼리. 각 노드와 그 노드에서 나가는 엣지를 함께 반환합니다.
+    첫 페이지(cursor=None)에는 이름 조건을 붙이지 않습니다.
+    """
+    cursor_filter = "WHERE n.name > $cursor" if cursor is not None else ""
+    return f"""
+        MATCH (n:Node {{brain_id: $brain_id}})
+        {cursor_filter}
+        WITH n ORDER BY n.name LIMIT $limit
+        OPTIONAL MATCH (n)-[r:REL]->(m:Node {{brain_id: $brain_id}})
+        WITH n, collect(CASE WHEN m IS NULL THEN NULL
+                             ELSE {{target: m.name, relation: r.relation}} END) AS out
+        RETURN n.name AS name, out
+        ORDER BY name
+    """
+
+
+def graph_page_from_records(records: Iterable[Any], limit: int) -> Dict[str, Any]:
+    """graph_page_query 결과 레코드를 {"nodes", "links", "next_cursor"} 페이지로 변환합니다."""
+    nodes = []
+    links = []
+    for record in records:
+        name = record["name"]
+        nodes.append({"name": name})
+        for edge in record["out"]:
+            links.append({
+                "source": name,
+                "target": edge["target"],
+                "relation": edge["relation"]
+            })
+    next_cursor = nodes[-1]["name"] if len(nodes) == limit else None
+    return {
+        "nodes": nodes,
+        "links": links,
+        "next_cursor": next_cursor
+    }
+
+
+def select_k_hop_neighbours(records: Iterable[Any], scores: Dict[str, float],
+                            related_nodes: List[Any], relationships: Dict[str, Any],
+                            max_nodes: int) -> Tuple[List[Dict[str, Any]], int]:
+    """
+    K_HOP_EXPAND_QUERY 한 단계 결과에서 점수(같으면 degree) 순으로 남은 노드 수만큼 이웃을 채택합니다.
+    scores / related_nodes / relationships 는 제자리에서 갱신됩니다.
+
+    Returns:
+        (다음 단계 frontier, 후보 노드 수)
+    """
+    candidates = {}
+    for record in records:
+        rel, neighbour, score, degree = record["r"], record["m"], record["score"], record["degree"]
+        name = neighbour["name"]
+        if name in scores:
+            # 이미 포함된 노드 사이의 관계는 그대로 추가
+            relationships[rel.element_id] = rel
+            continue
+        best = candidates.get(name)
+        if best is None or score > best[1]:
+            candidates[name] = (neighbour, score, degree, [rel] + (best[3] if best else []))
+        else:
+            best[3].append(rel)
+
+    frontier = []
+    # 점수가 같으면(같은 단계의 이웃) 연결 수가 많은 노드부터
+    for name, (neighbour, score, _, rels) in sorted(candidates.items(), key=lambda x: (-x[1][1], -x[1][2], x[0])):
+        if len(scores) >= max_nodes:
+            break
+        scores[name] = score
+        related_nodes.append(neighbour)
+        for rel in rels:
+            relationships[rel.element_id] = rel
+        frontier.append({"name": name, "score": score})
+    return frontier, len(candidates)
@@ -0,0 +1,234 @@
+import json
+import logging
+import threading
+import time
+from collections import OrderedDict, deque
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+# 메모리에 유지할 브레인 그래프 스냅샷 최대 개수 (LRU)
+MAX_SNAPSHOTS = 64
+# 브레인별로 보관할 변경 이력 항목 수 (이보다 오래된 버전은 전체 재조회 필요)
+MAX_CHANGELOG_ENTRIES = 256
+
+# 버전 카운터는 프로세스 시작 시각(ms)에서 출발하므로
+# 서버를 재시작해도 이전에 발급한 버전보다 항상 큰 값이 나옵니다.
+_version_counter = int(time.time() * 1000)
+_versions: Dict[str, int] = {}
+_snapshots: "OrderedDict[str, GraphSnapshot]" = OrderedDict()
+_changelogs: Dict[str, "deque[ChangeEntry]"] = {}
+_lock = threading.Lock()
+
+
+class GraphSnapshot:
+    """특정 버전의 브레인 그래프와 직렬화된 JSON 본문"""
+
+    __slots__ = ("brain_id", "version", "data", "body", "etag")
+
+    def __init__(self, brain_id: str, version: int, data: Dict[str, Any]):
+        self.brain_id = brain_id
+        self.version = version
+        self.data = data
+        self.body = json.dumps(data, ensure_ascii=False).encode("utf-8")
+        self.etag = make_etag(brain_id, version)
+
+
+class ChangeEntry:
+    """
+    한 번의 그래프 쓰기로 생긴 변경 내용.
+    prev_version → version 으로의 전이를 나타내며, 내용을 알 수 없는 변경은 unknown=True 입니다.
+    """
+
+    __slots__ = ("prev_version", "version", "cleared", "unknown",
+                 "added_nodes", "removed_nodes", "added_links", "removed_links")
+
+    def __init__(self, prev_version: int, version: int, cleared: bool = False, unknown: bool = False,
+                 added_nodes: Iterable[str] = (), removed_nodes: Iterable[str] = (),
+                 added_links: Iterable[Dict[str, Any]] = (), removed_links: Iterable[Dict[str, Any]] = ()):
+        self.prev_version = prev_version
+        self.version = version
+        self.cleared = cleared
+        self.unknown = unknown
+        self.added_nodes = list(added_nodes)
+        self.removed_nodes = list(removed_nodes)
+        self.added_links = [_link_key(link) for link in added_links]
+        self.removed_links = [_link_key(link) for link in removed_links]
+
+
+def _link_key(link: Dict[str, Any]) -> Tuple[str, str, str]:
+    return (link["source"], link["target"], link.get("relation"))
+
+
+def _next_version() -> int:
+    global _version_counter
+    _version_counter += 1
+    return _version_counter
+
+
+def make_etag(brain_id: str, version: int) -> str:
+    """브레인 그래프 버전에 대한 약한 ETag 문자열을 만듭니다."""
+    return f'W/"{brain_id}-{version}"'
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """If-None-Match 헤더 값에 etag가 포함되어 있는지 확인합니다."""
+    if not if_none_match:
+        return False
+    candidates = [tag.strip() for tag in if_none_match.split(",")]
+    return "*" in candidates or etag in candidates
+
+
+def current_version(brain_id: str) -> int:
+    """
+    브레인 그래프의 현재 버전을 반환합니다.
+    이번 프로세스에서 처음 조회되는 브레인이면 새 버전을 발급합니다.
+    """
+    brain_id = str(brain_id)
+    with _lock:
+        version = _versions.get(brain_id)
+        if version is None:
+            version = _versions[brain_id] = _next_version()
+        return version
+
+
+def _append_change(brain_id: str, **changes) -> int:
+    with _lock:
+        prev_version = _versions.get(brain_id)
+        if prev_version is None:
+            prev_version = _next_version()
+        version = _versions[brain_id] = _next_version()
+        _snapshots.pop(brain_id, None)
+        log = _changelogs.get(brain_id)
+        if log is None:
+            log = _changelogs[brain_id] = deque(maxlen=MAX_CHANGELOG_ENTRIES)
+        log.append(ChangeEntry(prev_version, version, **changes))
+    return version
+
+
+def bump_version(brain_id: str) -> int:
+    """
+    내용을 알 수 없는 그래프 변경(예: 일부만 성공한 쓰기) 후 호출되어 버전을 올리고
+    캐시된 스냅샷을 무효화합니다. 이 변경을 건너는 delta 요청은 전체 재조회가 필요합니다.
+    Returns:
+        새 버전
+    """
+    brain_id = str(brain_id)
+    version = _append_change(brain_id, unknown=True)
+    logging.info("그래프 버전 갱신 - brain_id: %s, version: %s", brain_id, version)
+    return version
+
+
+def record_changes(brain_id: str,
+                   added_nodes: Iterable[str] = (),
+                   removed_nodes: Iterable[str] = (),
+                   added_links: Iterable[Dict[str, Any]] = (),
+                   removed_links: Iterable[Dict[str, Any]] = (),
+                   cleared: bool = False) -> int:
+    """
+    그래프 쓰기 결과를 변경 이력에 기록하고 버전을 올립니다.
+    Args:
+        brain_id: 브레인 ID
+        added_nodes: 추가(또는 갱신)된 노드 이름
+        removed_nodes: 삭제된 노드 이름
+        added_links / removed_links: {source, target, relation} 엣지
+        cleared: 브레인 그래프 전체가 삭제된 경우 True
+    Returns:
+        새 버전
+    """
+    brain_id = str(brain_id)
+    version = _append_change(brain_id, cleared=cleared,
+                             added_nodes=added_nodes, removed_nodes=removed_nodes,
+                             added_links=added_links, removed_links=removed_links)
+    logging.info("그래프 버전 갱신 - brain_id: %s, version: %s", brain_id, version)
+    return version
+
+
+def get_delta(brain_id: str, since: int) -> Optional[Dict[str, Any]]:
+    """
+    since 버전 이후의 노드/엣지 변경분을 합쳐서 반환합니다.
+    같은 노드가 추가 후 삭제되는 등의 중간 변경은 상쇄됩니다.
+
+    Returns:
+        {"version", "cleared", "nodes": {"added", "removed"}, "links": {"added", "removed"}}
+        변경 이력이 이미 잘려 나갔거나 내용을 알 수 없는 변경이 끼어 있으면 None (전체 재조회 필요)
+    """
+    brain_id = str(brain_id)
+    with _lock:
+        version = _versions.get(brain_id)
+        if version is None:
+            version = _versions[brain_id] = _next_version()
+        entries = [entry for entry in _changelogs.get(brain_id, ()) if entry.version > since]
+
+    if since > version:
+        return None
+    if entries and entries[0].prev_version != since:
+        return None
+    if not entries and since != version:
+        return None
+    if any(entry.unknown for entry in entries):
+        return None
+
+    cleared = False
+    nodes_added: Dict[str, None] = {}
+    nodes_removed: Dict[str, None] = {}
+    links_added: Dict[Tuple[str, str, str], None] = {}
+    links_removed: Dict[Tuple[str, str, str], None] = {}
+    for entry in entries:
+        if entry.cleared:
+            cleared = True
+            nodes_added.clear(); nodes_removed.clear()
+            links_added.clear(); links_removed.clear()
+        for name in entry.removed_nodes:
+            nodes_added.pop(name, None)
+            nodes_removed[name] = None
+        for key in entry.removed_links:
+            links_added.pop(key, None)
+            links_removed[key] = None
+        for name in entry.added_nodes:
+            nodes_removed.pop(name, None)
+            nodes_added[name] = None
+        for key in entry.added_links:
+            links_removed.pop(key, None)
+            links_added[key] = None
+
+    def to_links(keys) -> List[Dict[str, Any]]:
+        return [{"source": s, "target": t, "relation": r} for s, t, r in keys]
+
+    return {
+        "version": version,
+        "cleared": cleared,
+        "nodes": {
+            "added": [{"name": name} for name in nodes_added],
+            "removed": [{"name": name} for name in nodes_removed],
+        },
+        "links": {
+            "added": to_links(links_added),
+            "removed": to_links(links_removed),
+        },
+    }
+
+
+def get_snapshot(brain_id: str) -> Optional[GraphSnapshot]:
+    """현재 버전과 일치하는 스냅샷이 있으면 반환합니다."""
+    brain_id = str(brain_id)
+    with _lock:
+        snapshot = _snapshots.get(brain_id)
+        if snapshot is None or snapshot.version != _versions.get(brain_id):
+            return None
+        _snapshots.move_to_end(brain_id)
+        return snapshot
+
+
+def store_snapshot(brain_id: str, version: int, data: Dict[str, Any]) -> GraphSnapshot:
+    """
+    조회 시작 시점의 version으로 그래프 스냅샷을 저장합니다.
+    조회 도중 쓰기가 발생해 버전이 바뀌었다면 캐시에는 넣지 않고 스냅샷만 반환합니다.
+    """
+    brain_id = str(brain_id)
+    snapshot = GraphSnapshot(brain_id, version, data)
+    with _lock:
+        if _versions.get(brain_id) == version:
+            _snapshots[brain_id] = snapshot
+            _snapshots.move_to_end(brain_id)
+            while len(_snapshots) > MAX_SNAPSHOTS:
+                _snapshots.popitem(last=False)
+    return snapshot
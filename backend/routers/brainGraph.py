@@ -1,8 +1,16 @@
-from fastapi import APIRouter, HTTPException
-from models.request_models import ProcessTextRequest, AnswerRequest, GraphResponse
+from fastapi import APIRouter, HTTPException, Query, Request, Response
+from fastapi.responses import StreamingResponse
+from typing import Optional
+from models.request_models import ProcessTextRequest, ProcessPdfRequest, AnswerRequest, GraphResponse, GraphPageResponse, GraphDeltaResponse
 from services import ai_service, embedding_service
-from neo4j_db.Neo4jHandler import Neo4jHandler
+from services.executor_service import run_cpu, run_io
+from services import ingest_service
+from services import metrics_service
+from neo4j_db.AsyncNeo4jHandler import AsyncNeo4jHandler
+from neo4j_db.cypher import GRAPH_PAGE_SIZE, GRAPH_PAGE_SIZE_MAX
+from neo4j_db import graph_cache
 import logging
+import json
 from sqlite_db.sqlite_handler import SQLiteHandler
 
 ###임시 질답용 임포트
@@ -41,8 +49,9 @@ router = APIRouter(
 
 @router.get("/getNodeEdge/{brain_id}", response_model=GraphResponse,
            summary="브레인의 그래프 데이터 조회",
-           description="특정 브레인의 모든 노드와 엣지(관계) 정보를 반환합니다.")
-async def get_brain_graph(brain_id: str):
+           description="특정 브레인의 모든 노드와 엣지(관계) 정보를 반환합니다. "
+                       "ETag/If-None-Match를 지원하며, 그래프가 바뀌지 않았으면 304를 반환합니다.")
+async def get_brain_graph(brain_id: str, request: Request):
     """
     특정 브레인의 그래프 데이터를 반환합니다:
     
@@ -51,22 +60,116 @@ async def get_brain_graph(brain_id: str):
     반환값:
     - **nodes**: 노드 목록 (각 노드는 name 속성을 가짐)
     - **links**: 엣지 목록 (각 엣지는 source, target, relation 속성을 가짐)
+    
+    그래프는 버전별 스냅샷으로 메모리에 캐시되며, 노드/엣지 쓰기나 삭제가 일어나면 버전이 올라갑니다.
+    현재 버전은 X-Graph-Version 헤더로 전달되며 /delta 요청의 since 값으로 사용합니다.
     """
     logging.info(f"getNodeEdge 엔드포인트 호출됨 - brain_id: {brain_id}")
+    version = graph_cache.current_version(brain_id)
+    etag = graph_cache.make_etag(brain_id, version)
+    headers = {"ETag": etag, "Cache-Control": "no-cache", "X-Graph-Version": str(version)}
+
+    # 클라이언트가 가진 버전이 최신이면 본문 없이 304
+    if graph_cache.etag_matches(request.headers.get("if-none-match"), etag):
+        return Response(status_code=304, headers=headers)
+
+    snapshot = graph_cache.get_snapshot(brain_id)
+    if snapshot is None:
+        try:
+            neo4j_handler = AsyncNeo4jHandler()
+            graph_data = await neo4j_handler.get_brain_graph(brain_id)
+            logging.info(f"Neo4j에서 받은 데이터: nodes={len(graph_data['nodes'])}, links={len(graph_data['links'])}")
+            
+            if not graph_data['nodes'] and not graph_data['links']:
+                logging.warning(f"brain_id {brain_id}에 대한 데이터가 없습니다")
+        except Exception as e:
+            logging.error("그래프 데이터 조회 오류: %s", str(e))
+            raise HTTPException(status_code=500, detail=f"그래프 데이터 조회 중 오류가 발생했습니다: {str(e)}")
+        snapshot = graph_cache.store_snapshot(brain_id, version, graph_data)
+
+    return Response(content=snapshot.body, media_type="application/json", headers=headers)
+
+@router.get("/delta/{brain_id}", response_model=GraphDeltaResponse,
+           summary="브레인 그래프 변경분 조회",
+           description="since 버전 이후 추가/삭제된 노드와 엣지만 반환합니다.")
+async def get_brain_graph_delta(
+    brain_id: str,
+    since: int = Query(..., description="클라이언트가 가진 그래프 버전 (X-Graph-Version 또는 이전 delta의 version)")
+):
+    """
+    그래프 변경분을 반환합니다:
+    
+    - **brain_id**: 브레인 ID
+    - **since**: 기준 버전
+    
+    반환값:
+    - **version**: 현재 버전
+    - **nodes**, **links**: 추가/삭제된 노드와 엣지
+    - **full_resync**: true이면 변경 이력이 남아 있지 않으므로 getNodeEdge로 전체를 다시 조회해야 합니다
+    """
+    delta = graph_cache.get_delta(brain_id, since)
+    if delta is None:
+        return {
+            "since": since,
+            "version": graph_cache.current_version(brain_id),
+            "full_resync": True
+        }
+    logging.info("그래프 delta - brain_id: %s, since: %s, version: %s, 노드 +%d/-%d, 엣지 +%d/-%d",
+                 brain_id, since, delta["version"],
+                 len(delta["nodes"]["added"]), len(delta["nodes"]["removed"]),
+                 len(delta["links"]["added"]), len(delta["links"]["removed"]))
+    return {"since": since, "full_resync": False, **delta}
+
+@router.get("/getNodeEdge/{brain_id}/page", response_model=GraphPageResponse,
+           summary="브레인의 그래프 데이터 페이지 조회",
+           description="노드 이름 기준 커서로 그래프를 나누어 반환합니다. 각 엣지는 source 노드가 속한 페이지에 포함됩니다.")
+async def get_brain_graph_page(
+    brain_id: str,
+    cursor: Optional[str] = Query(None, description="이전 응답의 next_cursor (첫 페이지는 생략)"),
+    limit: int = Query(GRAPH_PAGE_SIZE, ge=1, le=GRAPH_PAGE_SIZE_MAX, description="페이지당 최대 노드 수")
+):
+    """
+    그래프 데이터를 페이지 단위로 반환합니다:
+    
+    - **brain_id**: 그래프를 조회할 브레인 ID
+    - **cursor**: 이전 페이지의 next_cursor
+    - **limit**: 페이지당 최대 노드 수
+    
+    반환값:
+    - **nodes**, **links**: 이번 페이지의 노드와 엣지
+    - **next_cursor**: 다음 페이지 커서 (없으면 null)
+    """
     try:
-        neo4j_handler = Neo4jHandler()
-        logging.info("Neo4j 핸들러 생성됨")
-        
-        graph_data = neo4j_handler.get_brain_graph(brain_id)
-        logging.info(f"Neo4j에서 받은 데이터: nodes={len(graph_data['nodes'])}, links={len(graph_data['links'])}")
-        
-        if not graph_data['nodes'] and not graph_data['links']:
-            logging.warning(f"brain_id {brain_id}에 대한 데이터가 없습니다")
-        
-        return graph_data
+        neo4j_handler = AsyncNeo4jHandler()
+        return await neo4j_handler.get_brain_graph_page(brain_id, cursor, limit)
     except Exception as e:
-        logging.error("그래프 데이터 조회 오류: %s", str(e))
-        raise HTTPException(status_code=500, detail=f"그래프 데이터 조회 중 오류가 발생했습니다: {str(e)}") 
+        logging.error("그래프 페이지 조회 오류: %s", str(e))
+        raise HTTPException(status_code=500, detail=f"그래프 페이지 조회 중 오류가 발생했습니다: {str(e)}")
+
+@router.get("/getNodeEdge/{brain_id}/stream",
+           summary="브레인의 그래프 데이터 스트리밍 조회",
+           description="그래프를 페이지 단위 NDJSON(application/x-ndjson)으로 스트리밍합니다. 한 줄이 한 페이지입니다.")
+async def stream_brain_graph(
+    brain_id: str,
+    page_size: int = Query(GRAPH_PAGE_SIZE, ge=1, le=GRAPH_PAGE_SIZE_MAX, description="한 줄(페이지)에 담을 최대 노드 수")
+):
+    """
+    그래프를 NDJSON으로 스트리밍합니다. 각 줄은 {"nodes", "links", "next_cursor"} 객체이며,
+    도중에 오류가 나면 {"error": ...} 줄을 보내고 스트림을 종료합니다.
+    """
+    neo4j_handler = AsyncNeo4jHandler()
+
+    async def generate():
+        try:
+            async for page in neo4j_handler.iter_brain_graph(brain_id, page_size):
+                yield json.dumps(page, ensure_ascii=False) + "\n"
+        except Exception as e:
+            logging.error("그래프 스트리밍 오류: %s", str(e))
+            yield json.dumps({"error": str(e)}, ensure_ascii=False) + "\n"
+        finally:
+            await neo4j_handler.close()
+
+    return StreamingResponse(generate(), media_type="application/x-ndjson")
 
 @router.post("/process_text", 
     summary="텍스트 처리 및 그래프 생성",
@@ -89,24 +192,15 @@ async def process_text_endpoint(request_data: ProcessTextRequest):
     
     logging.info("사용자 입력 텍스트: %s, source_id: %s, brain_id: %s", text, source_id, brain_id)
     
-    # Step 1: 텍스트에서 노드/엣지 추출 (AI 서비스)
-    nodes, edges = ai_service.extract_graph_components(text, source_id)
-    logging.info("추출된 노드: %s", nodes)
-    logging.info("추출된 엣지: %s", edges)
-
-    # Step 2: Neo4j에 노드와 엣지 저장 
-    neo4j_handler = Neo4jHandler()
-    neo4j_handler.insert_nodes_and_edges(nodes, edges, brain_id)
-    logging.info("Neo4j에 노드와 엣지 삽입 완료")
+    # 단계별 스팬(청킹, 청크별 LLM 추출, 중복 제거, Neo4j 저장, 임베딩)은 끝날 때 "ingest timing" 로그로 요약됨
+    with ingest_service.ingest_span("ingest.process_text", brain_id=brain_id, source_id=source_id, chars=len(text)):
+        # Step 1: 텍스트에서 노드/엣지 추출 (AI 서비스)
+        nodes, edges = await run_io(ai_service.extract_graph_components, text, source_id)
+        logging.info("추출된 노드: %s", nodes)
+        logging.info("추출된 엣지: %s", edges)
 
-    # Step 3: 노드 정보를 벡터 DB에 임베딩
-    # 컬렉션이 없으면 초기화
-    if not embedding_service.is_index_ready(brain_id):
-        embedding_service.initialize_collection(brain_id)
-    
-    # 노드 정보 임베딩 및 저장
-    embeddings = embedding_service.update_index_and_get_embeddings(nodes, brain_id)
-    logging.info("벡터 DB에 노드 임베딩 저장 완료")
+        # Step 2: Neo4j에 노드와 엣지 저장, Step 3: 벡터 DB 임베딩 및 반영 완료 표시
+        await ingest_service.save_graph_components(nodes, edges, brain_id, source_id)
 
     return {
         "message": "텍스트 처리 완료, 그래프(노드와 엣지)가 생성되었고 벡터 DB에 임베딩되었습니다.",
@@ -114,6 +208,56 @@ async def process_text_endpoint(request_data: ProcessTextRequest):
         "edges": edges
     }
 
+@router.post("/process_pdf",
+    summary="서버에 저장된 PDF 처리 및 그래프 생성",
+    description="업로드된 PDF에서 서버가 직접 페이지별 텍스트를 추출해 노드/엣지를 만들고 벡터 DB에 임베딩합니다.",
+    response_description="처리된 페이지/청크 수와 노드, 엣지 정보를 반환합니다.")
+async def process_pdf_endpoint(request_data: ProcessPdfRequest):
+    """
+    PDF를 서버에서 처리합니다 (클라이언트에서 텍스트를 추출해 /process_text로 보낼 필요 없음):
+    
+    - **pdf_id**: 업로드된 PDF ID
+    - **brain_id**: 브레인 ID (생략하면 PDF의 브레인)
+    - **force**: 같은 내용이 이미 반영되어 있어도 다시 처리
+    
+    반환값:
+    - **pages**, **chunks**: 추출한 페이지 수와 청크 수
+    - **nodes**, **edges**: 추출된 노드와 엣지 (각 description에 출처 페이지 범위 pages 포함)
+    - **skipped**: 같은 내용이 이미 반영되어 추출을 생략했으면 true (duplicate_of에 기존 소스 ID).
+      이때 기존 소스의 description과 벡터가 이 PDF의 source_id로 복사되므로 두 소스는 따로 삭제할 수 있습니다
+    """
+    db_handler = SQLiteHandler()
+    pdf = await run_io(db_handler.get_pdf, request_data.pdf_id)
+    if not pdf:
+        raise HTTPException(status_code=404, detail="PDF를 찾을 수 없습니다")
+    brain_id = request_data.brain_id or (str(pdf["brain_id"]) if pdf["brain_id"] is not None else None)
+    if not brain_id:
+        raise HTTPException(status_code=400, detail="brain_id 파라미터가 필요합니다.")
+
+    if not request_data.force:
+        content_hash = await run_io(db_handler.get_content_hash, request_data.pdf_id)
+        if content_hash:
+            existing = await run_io(db_handler.get_ingested_source, int(brain_id), content_hash["sha256"])
+            if existing:
+                logging.info("이미 반영된 PDF 내용 - pdf_id: %s, 기존 source_id: %s", request_data.pdf_id, existing["content_id"])
+                # 추출은 생략하되 원본의 description/벡터를 이 PDF의 source_id로 복사해 원본이 삭제돼도 남도록 함
+                try:
+                    await ingest_service.adopt_duplicate(brain_id, str(request_data.pdf_id), str(existing["content_id"]))
+                except Exception as e:
+                    logging.error("중복 PDF 그래프 복사 오류: %s", str(e))
+                    raise HTTPException(status_code=500, detail=f"PDF 처리 중 오류가 발생했습니다: {str(e)}")
+                return {"pdf_id": request_data.pdf_id, "brain_id": brain_id, "skipped": True,
+                        "duplicate_of": existing["content_id"]}
+
+    try:
+        result = await ingest_service.ingest_pdf(request_data.pdf_id, brain_id)
+    except ValueError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    except Exception as e:
+        logging.error("PDF 처리 오류: %s", str(e))
+        raise HTTPException(status_code=500, detail=f"PDF 처리 중 오류가 발생했습니다: {str(e)}")
+    return {**result, "skipped": False}
+
 @router.post("/answer",
     summary="질문에 대한 답변 생성",
     description="사용자의 질문에 대해 Neo4j에서 관련 정보를 찾아 답변을 생성합니다.",
@@ -121,7 +265,7 @@ async def process_text_endpoint(request_data: ProcessTextRequest):
 async def answer_endpoint(request_data: AnswerRequest):
     """
     사용자 질문을 받아 임베딩을 통해 유사한 노드를 찾고, 
-    해당 노드들의 2단계 깊이 스키마를 추출 후 LLM을 이용해 최종 답변 생성
+    해당 노드들에서 제한된 k-hop 스키마를 추출한 뒤 토큰 예산 안에서 LLM을 이용해 최종 답변 생성
     """
     question = request_data.question
     brain_id = request_data.brain_id  # 요청에서 brain_id 받아오기
@@ -133,50 +277,74 @@ async def answer_endpoint(request_data: AnswerRequest):
     
     logging.info("질문 접수: %s, brain_id: %s", question, brain_id)
     
+    # 단계별 소요 시간은 /metrics 히스토그램과 요청 끝의 구조화 로그에 함께 기록
+    timer = metrics_service.StageTimer(metrics_service.ANSWER_STAGE_SECONDS, brain_id=brain_id)
+    stats = {"brain_id": brain_id}
+    outcome = "error"
     try:
         # 사용자 질문 저장
         db_handler = SQLiteHandler()
-        chat_id = db_handler.save_chat(False, question, brain_id)
+        with timer.stage("save_question"):
+            chat_id = await run_io(db_handler.save_chat, False, question, brain_id)
         
         # Step 1: 컬렉션이 없으면 초기화
-        if not embedding_service.is_index_ready(brain_id):
-            embedding_service.initialize_collection(brain_id)
-            logging.info("Qdrant 컬렉션 초기화 완료: %s", brain_id)
+        with timer.stage("index_check"):
+            if not await run_io(embedding_service.is_index_ready, brain_id):
+                await run_io(embedding_service.initialize_collection, brain_id)
+                logging.info("Qdrant 컬렉션 초기화 완료: %s", brain_id)
         
         # Step 2: 질문 임베딩 계산
-        question_embedding = embedding_service.encode_text(question)
+        with timer.stage("embed"):
+            question_embedding = await run_cpu(embedding_service.encode_text, question)
         
         # Step 3: 임베딩을 통해 유사한 노드 검색
-        similar_nodes = embedding_service.search_similar_nodes(embedding=question_embedding, brain_id=brain_id)
+        with timer.stage("vector_search"):
+            similar_nodes = await run_io(embedding_service.search_similar_nodes, embedding=question_embedding, brain_id=brain_id)
         if not similar_nodes:
             raise Exception("질문과 유사한 노드를 찾지 못했습니다.")
         
-        # 노드 이름만 추출
-        similar_node_names = [node["name"] for node in similar_nodes]
-        logging.info("sim node name: %s", similar_node_names)
-        logging.info("sim node score: %s", [f"{node['name']}:{node['score']:.2f}" for node in similar_nodes])
+        # 노드 이름만 추출 (유사도 점수는 노드별 최고값을 k-hop 확장의 시드 점수로 사용)
+        seed_scores = {}
+        for node in similar_nodes:
+            seed_scores[node["name"]] = max(node["score"], seed_scores.get(node["name"], 0.0))
+        similar_node_names = list(seed_scores)
+        stats["seed_nodes"] = len(similar_node_names)
+        metrics_service.ANSWER_SEED_NODES.observe(len(similar_node_names), brain_id=brain_id)
+        logging.debug("sim node name: %s", similar_node_names)
+        logging.debug("sim node score: %s", [f"{node['name']}:{node['score']:.2f}" for node in similar_nodes])
         
-        # Step 4: 유사한 노드들의 2단계 깊이 스키마 조회
-        neo4j_handler = Neo4jHandler()
-        result = neo4j_handler.query_schema_by_node_names(similar_node_names, brain_id)
+        # Step 4: 유사한 노드들에서 출발해 제한된 k-hop 스키마 조회
+        neo4j_handler = AsyncNeo4jHandler()
+        with timer.stage("schema_query"):
+            result = await neo4j_handler.query_schema_k_hop(similar_node_names, brain_id, seed_scores=seed_scores)
         if not result:
             raise Exception("스키마 조회 결과가 없습니다.")
             
-        logging.info("### Neo4j 조회 결과 전체: %s", result)
-        
         # 결과를 즉시 처리
         nodes_result = result.get("nodes", [])
         related_nodes_result = result.get("relatedNodes", [])
         relationships_result = result.get("relationships", [])
+        stats["schema_nodes"] = len(nodes_result) + len(related_nodes_result)
+        stats["schema_relationships"] = len(relationships_result)
+        metrics_service.ANSWER_SCHEMA_NODES.observe(stats["schema_nodes"], brain_id=brain_id)
+        metrics_service.ANSWER_SCHEMA_RELATIONSHIPS.observe(stats["schema_relationships"], brain_id=brain_id)
         
-        logging.info("Neo4j search result: nodes=%d, related_nodes=%d, relationships=%d", 
-                   len(nodes_result), len(related_nodes_result), len(relationships_result))
-        
-        # Step 5: 스키마 간결화 및 텍스트 구성
-        raw_schema_text = ai_service.generate_schema_text(nodes_result, related_nodes_result, relationships_result)
+        # Step 5: 스키마 간결화 및 텍스트 구성 (점수 순, 토큰 예산 내)
+        with timer.stage("schema_text"):
+            raw_schema_text = ai_service.generate_schema_text(
+                nodes_result, related_nodes_result, relationships_result,
+                node_scores=result.get("scores"),
+                max_tokens=ai_service.SCHEMA_TOKEN_BUDGET
+            )
+        stats["schema_chars"] = len(raw_schema_text)
+        stats["schema_tokens"] = ai_service.estimate_tokens(raw_schema_text)
+        metrics_service.ANSWER_SCHEMA_TOKENS.observe(stats["schema_tokens"], brain_id=brain_id)
         
         # Step 6: LLM을을 사용해 최종 답변 생성
-        final_answer = ai_service.generate_answer(raw_schema_text, question)
+        with timer.stage("llm"):
+            final_answer, usage = await run_io(ai_service.generate_answer_with_usage, raw_schema_text, question)
+        stats.update(usage)
+        metrics_service.record_llm_usage("answer", usage)
         referenced_nodes = ai_service.extract_referenced_nodes(final_answer)
         final_answer = final_answer.split("EOF")[0].strip()
         
@@ -187,7 +355,9 @@ async def answer_endpoint(request_data: AnswerRequest):
             
         # AI 답변 저장
         # AI 답변 저장 및 chat_id 획득
-        chat_id = db_handler.save_chat(True, final_answer, brain_id, referenced_nodes)
+        with timer.stage("save_answer"):
+            chat_id = await run_io(db_handler.save_chat, True, final_answer, brain_id, referenced_nodes)
+        outcome = "ok"
 
         return {
             "answer": final_answer,
@@ -197,6 +367,13 @@ async def answer_endpoint(request_data: AnswerRequest):
     except Exception as e:
         logging.error("answer 오류: %s", str(e))
         raise HTTPException(status_code=500, detail=str(e))
+    finally:
+        total = timer.elapsed
+        metrics_service.ANSWER_SECONDS.observe(total, brain_id=brain_id, outcome=outcome)
+        logging.info("answer timing: %s", json.dumps(
+            {**stats, "outcome": outcome, "total_s": round(total, 4), "stages_s": timer.durations},
+            ensure_ascii=False
+        ))
 
 @router.get("/getSourceIds",
     summary="노드의 모든 source_id와 제목을 조회",
@@ -214,12 +391,12 @@ async def get_source_ids(node_name: str, brain_id: str):
     """
     logging.info(f"getSourceIds 엔드포인트 호출됨 - node_name: {node_name}, brain_id: {brain_id}")
     try:
-        neo4j_handler = Neo4jHandler()
+        neo4j_handler = AsyncNeo4jHandler()
         db = SQLiteHandler()
         logging.info("Neo4j 핸들러 생성됨")
         
         # Neo4j에서 노드의 descriptions 배열 조회
-        descriptions = neo4j_handler.get_node_descriptions(node_name, brain_id)
+        descriptions = await neo4j_handler.get_node_descriptions(node_name, brain_id)
         if not descriptions:
             return {"sources": []}
             
@@ -234,8 +411,8 @@ async def get_source_ids(node_name: str, brain_id: str):
                     seen_ids.add(source_id)
                     
                     # PDF와 TextFile 테이블에서 모두 조회
-                    pdf = db.get_pdf(int(source_id))
-                    textfile = db.get_textfile(int(source_id))
+                    pdf = await run_io(db.get_pdf, int(source_id))
+                    textfile = await run_io(db.get_textfile, int(source_id))
                     
                     title = None
                     if pdf:
@@ -272,11 +449,11 @@ async def get_nodes_by_source_id(source_id: str, brain_id: str):
     """
     logging.info(f"getNodesBySourceId 엔드포인트 호출됨 - source_id: {source_id}, brain_id: {brain_id}")
     try:
-        neo4j_handler = Neo4jHandler()
+        neo4j_handler = AsyncNeo4jHandler()
         logging.info("Neo4j 핸들러 생성됨")
         
         # Neo4j에서 source_id로 노드 조회
-        node_names = neo4j_handler.get_nodes_by_source_id(source_id, brain_id)
+        node_names = await neo4j_handler.get_nodes_by_source_id(source_id, brain_id)
         logging.info(f"조회된 노드 이름: {node_names}")
         
         return {"nodes": node_names}
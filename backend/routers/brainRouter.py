@@ -2,13 +2,14 @@ from fastapi import APIRouter, HTTPException, status
 from pydantic import BaseModel, Field
 from typing import List, Optional
 from sqlite_db.sqlite_handler import SQLiteHandler
-from neo4j_db.Neo4jHandler import Neo4jHandler
+from neo4j_db.AsyncNeo4jHandler import AsyncNeo4jHandler
+from services.executor_service import run_io
 import logging
 import sqlite3
 from datetime import date
 
 sqlite_handler = SQLiteHandler()
-neo4j_handler = Neo4jHandler()
+neo4j_handler = AsyncNeo4jHandler()
 
 router = APIRouter(
     prefix="/brains",
@@ -94,6 +95,32 @@ async def get_brain(brain_id: int):
         raise HTTPException(404, "브레인을 찾을 수 없습니다")
     return rec
 
+@router.get(
+    "/{brain_id}/ingested/{sha256}",
+    summary="같은 내용의 소스가 이미 반영되었는지 조회",
+    description="파일 내용 SHA-256으로 브레인에 이미 그래프/임베딩 반영이 끝난 소스가 있는지 확인합니다."
+)
+async def get_ingested_source(brain_id: int, sha256: str):
+    """
+    같은 내용의 소스가 이미 반영되었는지 반환합니다:
+
+    - **brain_id**: 브레인 ID
+    - **sha256**: 파일 내용 SHA-256 (업로드 응답의 sha256 또는 클라이언트에서 계산한 값)
+
+    반환값:
+    - **ingested**: true이면 /process_text를 생략해도 됩니다.
+      단, 생략한 소스는 자기 그래프/벡터가 없어 기존 소스를 삭제하면 함께 사라지므로,
+      기존 소스와 따로 유지해야 하면 /ingest/pdf(또는 /brainGraph/process_pdf)로 복사본을 만드세요
+    - **source_id**, **kind**: 이미 반영된 소스 (없으면 null)
+    """
+    found = await run_io(sqlite_handler.get_ingested_source, brain_id, sha256.lower())
+    return {
+        "sha256": sha256.lower(),
+        "ingested": found is not None,
+        "source_id": found["content_id"] if found else None,
+        "kind": found["kind"] if found else None
+    }
+
 @router.put(
     "/{brain_id}", response_model=BrainResponse,
     summary="브레인 수정", description="이름·아이콘·파일트리·생성일 중 필요한 필드만 갱신"
@@ -149,14 +176,14 @@ async def rename_brain(brain_id: int, data: BrainRename):
 async def delete_brain(brain_id: int):
     try:
         # 1. Neo4j에서 brain_id에 해당하는 모든 description 삭제
-        neo4j_handler.delete_descriptions_by_brain_id(str(brain_id))
+        await neo4j_handler.delete_descriptions_by_brain_id(str(brain_id))
         
         # 2. 벡터 DB에서 brain_id에 해당하는 컬렉션 전체 삭제
         from services.embedding_service import delete_collection
-        delete_collection(str(brain_id))
+        await run_io(delete_collection, str(brain_id))
         
         # 3. SQLite에서 brain 삭제
-        if not sqlite_handler.delete_brain(brain_id):
+        if not await run_io(sqlite_handler.delete_brain, brain_id):
             raise HTTPException(404, "브레인을 찾을 수 없습니다")
             
     except Exception as e:
@@ -175,11 +202,11 @@ async def delete_descriptions_by_source_id(brain_id: str, source_id: str):
     """
     try:
         # 1. Neo4j에서 description 삭제
-        neo4j_handler.delete_descriptions_by_source_id(source_id, brain_id)
+        await neo4j_handler.delete_descriptions_by_source_id(source_id, brain_id)
         
         # 2. 벡터 DB에서 임베딩 삭제
         from services.embedding_service import delete_node
-        delete_node(source_id, brain_id)
+        await run_io(delete_node, source_id, brain_id)
         
     except Exception as e:
         raise HTTPException(500, str(e))
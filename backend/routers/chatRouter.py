@@ -1,4 +1,5 @@
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, HTTPException, Query
+from typing import Optional
 from sqlite_db.sqlite_handler import SQLiteHandler
 import logging
 
@@ -48,14 +49,11 @@ async def get_referenced_nodes(chat_id: int):
     """
     try:
         db_handler = SQLiteHandler()
-        referenced_nodes_text = db_handler.get_referenced_nodes(chat_id)
+        referenced_nodes = db_handler.get_referenced_nodes(chat_id)
         
-        if referenced_nodes_text is None:
+        if referenced_nodes is None:
             raise HTTPException(status_code=404, detail=f"채팅 ID {chat_id}를 찾을 수 없습니다.")
             
-        # 텍스트를 배열로 파싱
-        referenced_nodes = [node.strip().strip('"') for node in referenced_nodes_text.split(",")] if referenced_nodes_text else []
-            
         return {"referenced_nodes": referenced_nodes}
     except Exception as e:
         logging.error(f"참고 노드 조회 중 오류 발생: {str(e)}")
@@ -63,25 +61,33 @@ async def get_referenced_nodes(chat_id: int):
 
 @router.get("/chatList/{brain_id}",
     summary="브레인 채팅 목록 조회",
-    description="특정 브레인 ID에 해당하는 모든 채팅 목록을 시간순으로 반환합니다.",
+    description="특정 브레인 ID에 해당하는 채팅 목록을 시간순으로 반환합니다. limit을 주면 최근 채팅부터 페이지 단위로 반환합니다.",
     response_description="채팅 목록을 배열로 반환합니다.")
-async def get_chat_list(brain_id: int):
+async def get_chat_list(
+    brain_id: int,
+    limit: Optional[int] = Query(None, ge=1, le=500, description="가져올 최대 채팅 수 (생략하면 전체)"),
+    before_id: Optional[int] = Query(None, description="이 chat_id보다 이전 채팅만 조회 (응답의 next_before_id)")
+):
     """
-    브레인 ID를 받아 해당 브레인의 모든 채팅 목록을 반환합니다:
+    브레인 ID를 받아 해당 브레인의 채팅 목록을 반환합니다:
     
     - **brain_id**: 조회할 브레인의 ID
+    - **limit**: 최근 몇 개의 채팅을 가져올지 (생략하면 전체)
+    - **before_id**: 이전 페이지를 가져올 때 기준이 되는 chat_id
     
     반환값:
     - **chats**: 채팅 목록 배열 (각 채팅은 chat_id, is_ai, message, referenced_nodes 정보를 포함)
+    - **next_before_id**: 더 오래된 채팅이 남아 있을 수 있으면 다음 요청의 before_id, 없으면 null
     """
     try:
         db_handler = SQLiteHandler()
-        chats = db_handler.get_chat_list(brain_id)
+        chats = db_handler.get_chat_list(brain_id, limit=limit, before_id=before_id)
         
         if chats is None:
             raise HTTPException(status_code=404, detail=f"브레인 ID {brain_id}를 찾을 수 없습니다.")
-            
-        return {"chats": chats}
+        
+        next_before_id = chats[0]["chat_id"] if limit is not None and len(chats) == limit else None
+        return {"chats": chats, "next_before_id": next_before_id}
     except Exception as e:
         logging.error(f"채팅 목록 조회 중 오류 발생: {str(e)}")
         raise HTTPException(status_code=500, detail=f"채팅 목록 조회 중 오류가 발생했습니다: {str(e)}") 
\ No newline at end of file
@@ -2,13 +2,14 @@ from fastapi import APIRouter, HTTPException, status, Query
 from pydantic import BaseModel, Field
 from typing import List, Optional,Dict,Any
 from sqlite_db.sqlite_handler import SQLiteHandler
-from neo4j_db.Neo4jHandler import Neo4jHandler
+from neo4j_db.AsyncNeo4jHandler import AsyncNeo4jHandler
 from services.embedding_service import delete_node
+from services.executor_service import run_io
 import logging
 
 # SQLite 핸들러 인스턴스 생성
 sqlite_handler = SQLiteHandler()
-neo4j_handler = Neo4jHandler()
+neo4j_handler = AsyncNeo4jHandler()
 
 # 라우터 정의
 router = APIRouter(
@@ -106,22 +107,21 @@ async def create_folder(folder_data: FolderCreate):
            summary="브레인의 폴더 목록 조회",
            description="특정 브레인에 속한 모든 폴더 목록을 반환합니다.")
 async def get_brain_folders(brain_id: int):
-    # 폴더 리스트
-    folders = sqlite_handler.get_brain_folders(brain_id)
-    result = []
-    for f in folders:
-        result.append({
-            "folder_id":   f["folder_id"],
-            "folder_name": f["folder_name"],
-            "brain_id":    brain_id,
-            "memos":       sqlite_handler.get_folder_memos(f["folder_id"]),
-            "pdfs":        sqlite_handler.get_folder_pdfs(f["folder_id"]),
-            "textfiles":   sqlite_handler.get_folder_textfiles(f["folder_id"]),
-            "voices":      sqlite_handler.get_folder_voices(f["folder_id"]),
-        })
+    # 폴더와 폴더별 메모/PDF/텍스트/음성을 한 번의 쿼리로 조회
+    return await run_io(sqlite_handler.get_brain_tree, brain_id)
+
+@router.get("/brain/{brain_id}/titles", response_model=List[FolderWithChildren],
+           summary="브레인의 폴더 트리 조회 (제목만)",
+           description="사이드바용으로 메모 본문(memo_text)을 제외한 폴더 트리를 반환합니다.")
+async def get_brain_folder_titles(brain_id: int):
+    """
+    브레인의 폴더 트리를 반환합니다:
     
-    # 루트를 목록 맨 앞에 추가
-    return result
+    - **brain_id**: 브레인 ID
+    
+    /brain/{brain_id} 와 같은 형식이지만 memos 항목에 memo_text가 없습니다.
+    """
+    return await run_io(sqlite_handler.get_brain_tree, brain_id, include_text=False)
 
 @router.get("/{folder_id}", response_model=FolderResponse,
            summary="특정 폴더 조회",
@@ -270,16 +270,16 @@ async def delete_folder_with_memos(
         # 2. Neo4j와 벡터 DB에서 각 파일 삭제
         for textfile in textfiles:
             source_id = str(textfile['txt_id'])
-            neo4j_handler.delete_descriptions_by_source_id(source_id, str(brain_id))
-            delete_node(source_id, brain_id)
+            await neo4j_handler.delete_descriptions_by_source_id(source_id, str(brain_id))
+            await run_io(delete_node, source_id, brain_id)
             
         for pdf in pdfs:
             source_id = str(pdf['pdf_id'])
-            neo4j_handler.delete_descriptions_by_source_id(source_id, str(brain_id))
-            delete_node(source_id, brain_id)
+            await neo4j_handler.delete_descriptions_by_source_id(source_id, str(brain_id))
+            await run_io(delete_node, source_id, brain_id)
 
         # 3. SQLite에서 폴더와 파일 삭제
-        result = sqlite_handler.delete_folder_with_memos(folder_id, brain_id)
+        result = await run_io(sqlite_handler.delete_folder_with_memos, folder_id, brain_id)
 
         if not result["success"]:
             raise HTTPException(status_code=404, detail="폴더 삭제 실패")
@@ -0,0 +1,164 @@
+from fastapi import APIRouter, HTTPException, Query, status
+from fastapi.responses import StreamingResponse
+from pydantic import BaseModel, Field
+from typing import List, Optional
+from models.request_models import ProcessTextRequest, ProcessPdfRequest
+from services import ingest_queue, ingest_service
+from services.executor_service import run_io
+from sqlite_db.sqlite_handler import SQLiteHandler
+import asyncio
+import json
+import logging
+
+sqlite_handler = SQLiteHandler()
+
+router = APIRouter(
+    prefix="/ingest",
+    tags=["ingest"],
+    responses={404: {"description": "Not found"}}
+)
+
+# SSE 연결 유지를 위한 하트비트 간격 (초)
+SSE_HEARTBEAT_SECONDS = 15
+
+class IngestJobResponse(BaseModel):
+    job_id:           int
+    kind:             str = Field(..., description="작업 종류 (text, pdf)")
+    brain_id:         str
+    source_id:        str
+    status:           str = Field(..., description="queued, running, done, failed")
+    stage:            str = Field(..., description="queued, chunking, extracting, graph, embedding, done")
+    total_chunks:     int = Field(..., description="전체 청크 수")
+    chunks_done:      int = Field(..., description="노드/엣지 추출이 끝난 청크 수")
+    total_nodes:      int = Field(..., description="추출된 노드 수")
+    nodes_written:    int = Field(..., description="Neo4j에 저장된 노드 수")
+    nodes_embedded:   int = Field(..., description="임베딩이 끝난 노드 수")
+    vectors_upserted: int = Field(..., description="벡터 DB에 저장된 벡터 수")
+    attempts:         int = Field(..., description="실행 횟수 (재개 포함)")
+    error:            Optional[str] = None
+    created_at:       Optional[str] = None
+    updated_at:       Optional[str] = None
+
+class IngestEnqueueResponse(BaseModel):
+    skipped:      bool = Field(False, description="같은 내용이 이미 반영되어 작업을 만들지 않았으면 true")
+    duplicate_of: Optional[int] = Field(None, description="이미 반영된 기존 소스 ID")
+    job:          Optional[IngestJobResponse] = None
+
+@router.post("/text", response_model=IngestEnqueueResponse, status_code=status.HTTP_202_ACCEPTED,
+    summary="텍스트 수집 작업 등록",
+    description="/brainGraph/process_text와 같은 처리를 백그라운드 작업으로 등록하고 바로 반환합니다.")
+async def enqueue_text(request_data: ProcessTextRequest):
+    """
+    텍스트 수집 작업을 등록합니다:
+
+    - **text**: 원문
+    - **brain_id**: 브레인 ID
+    - **source_id**: 소스 ID
+
+    진행 상황은 /ingest/jobs/{job_id} 또는 /ingest/jobs/{job_id}/events (SSE)로 확인합니다.
+    """
+    if not request_data.text:
+        raise HTTPException(status_code=400, detail="text 파라미터가 필요합니다.")
+    job = await ingest_queue.enqueue("text", request_data.brain_id, request_data.source_id, request_data.text)
+    return {"skipped": False, "job": job}
+
+@router.post("/pdf", response_model=IngestEnqueueResponse, status_code=status.HTTP_202_ACCEPTED,
+    summary="PDF 수집 작업 등록",
+    description="서버에 저장된 PDF의 텍스트 추출부터 임베딩까지를 백그라운드 작업으로 등록합니다.")
+async def enqueue_pdf(request_data: ProcessPdfRequest):
+    """
+    PDF 수집 작업을 등록합니다:
+
+    - **pdf_id**: 업로드된 PDF ID
+    - **brain_id**: 브레인 ID (생략하면 PDF의 브레인)
+    - **force**: 같은 내용이 이미 반영되어 있어도 다시 처리
+
+    같은 내용이 이미 반영되어 있으면 작업 없이 기존 소스의 description과 벡터를 이 PDF로 복사하고 skipped=true를 반환합니다.
+    """
+    pdf = await run_io(sqlite_handler.get_pdf, request_data.pdf_id)
+    if not pdf:
+        raise HTTPException(status_code=404, detail="PDF를 찾을 수 없습니다")
+    brain_id = request_data.brain_id or (str(pdf["brain_id"]) if pdf["brain_id"] is not None else None)
+    if not brain_id:
+        raise HTTPException(status_code=400, detail="brain_id 파라미터가 필요합니다.")
+
+    if not request_data.force:
+        content_hash = await run_io(sqlite_handler.get_content_hash, request_data.pdf_id)
+        if content_hash:
+            existing = await run_io(sqlite_handler.get_ingested_source, int(brain_id), content_hash["sha256"])
+            if existing:
+                # 작업은 만들지 않고 원본의 description/벡터만 이 PDF의 source_id로 복사
+                try:
+                    await ingest_service.adopt_duplicate(brain_id, str(request_data.pdf_id), str(existing["content_id"]))
+                except Exception as e:
+                    logging.error("중복 PDF 그래프 복사 오류: %s", str(e))
+                    raise HTTPException(status_code=500, detail=f"중복 PDF 반영 중 오류가 발생했습니다: {str(e)}")
+                return {"skipped": True, "duplicate_of": existing["content_id"]}
+
+    job = await ingest_queue.enqueue("pdf", brain_id, str(request_data.pdf_id))
+    return {"skipped": False, "job": job}
+
+@router.get("/jobs", response_model=List[IngestJobResponse],
+    summary="수집 작업 목록 조회")
+async def list_jobs(
+    brain_id: Optional[str] = Query(None, description="브레인 ID"),
+    status: Optional[str] = Query(None, description="작업 상태 (queued, running, done, failed)"),
+    limit: int = Query(50, ge=1, le=500, description="최대 개수")
+):
+    return await run_io(sqlite_handler.list_ingest_jobs, brain_id, status, limit)
+
+@router.get("/jobs/{job_id}", response_model=IngestJobResponse,
+    summary="수집 작업 상태 조회")
+async def get_job(job_id: int):
+    job = await run_io(sqlite_handler.get_ingest_job, job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="작업을 찾을 수 없습니다")
+    return job
+
+@router.post("/jobs/{job_id}/retry", response_model=IngestJobResponse,
+    summary="실패한 수집 작업 재시도",
+    description="실패한 작업을 다시 대기열에 넣습니다. 이미 끝난 청크와 임베딩 묶음은 건너뛰고 이어서 처리합니다.")
+async def retry_job(job_id: int):
+    job = await run_io(sqlite_handler.get_ingest_job, job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="작업을 찾을 수 없습니다")
+    if not await ingest_queue.retry(job_id):
+        raise HTTPException(status_code=409, detail=f"실패한 작업만 재시도할 수 있습니다 (현재 상태: {job['status']})")
+    return await run_io(sqlite_handler.get_ingest_job, job_id)
+
+@router.get("/jobs/{job_id}/events",
+    summary="수집 작업 진행 상황 스트리밍 (SSE)",
+    description="작업 상태가 바뀔 때마다 text/event-stream으로 전송하고, done 또는 failed가 되면 스트림을 닫습니다.")
+async def stream_job_events(job_id: int):
+    """
+    작업 진행 상황을 Server-Sent Events로 전송합니다:
+
+    - **event: progress**: 작업 상태 JSON (GET /ingest/jobs/{job_id}와 같은 형식)
+    - **event: end**: 작업이 done/failed로 끝났을 때 마지막으로 한 번 전송
+    """
+    job = await run_io(sqlite_handler.get_ingest_job, job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="작업을 찾을 수 없습니다")
+
+    async def generate():
+        last = None
+        while True:
+            updated = ingest_queue.subscribe(job_id)
+            current = await run_io(sqlite_handler.get_ingest_job, job_id)
+            if current is None:
+                yield "event: end\ndata: {}\n\n"
+                return
+            if current != last:
+                last = current
+                finished = current["status"] in ("done", "failed")
+                event = "end" if finished else "progress"
+                yield f"event: {event}\ndata: {json.dumps(current, ensure_ascii=False)}\n\n"
+                if finished:
+                    return
+            try:
+                await asyncio.wait_for(updated.wait(), SSE_HEARTBEAT_SECONDS)
+            except asyncio.TimeoutError:
+                yield ": keep-alive\n\n"
+
+    return StreamingResponse(generate(), media_type="text/event-stream",
+                             headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
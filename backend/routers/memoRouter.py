@@ -2,6 +2,8 @@ from fastapi import APIRouter, HTTPException, status, Query
 from pydantic import BaseModel, Field
 from typing import List, Optional
 from sqlite_db.sqlite_handler import SQLiteHandler
+from services.executor_service import run_io
+from models.request_models import BatchMoveRequest, BatchDeleteRequest, BatchMoveResponse, BatchDeleteResponse
 import logging
 
 # SQLite 핸들러 인스턴스 생성
@@ -212,6 +214,42 @@ async def delete_memo(memo_id: int):
     if not deleted:
         raise HTTPException(status_code=404, detail="메모를 찾을 수 없습니다")
 
+# ───────── BATCH MOVE / DELETE ─────────
+@router.put("/batch/move", response_model=BatchMoveResponse,
+            summary="메모 일괄 폴더 이동")
+async def move_memos_batch(request: BatchMoveRequest):
+    """
+    여러 메모의 폴더를 한 트랜잭션으로 변경합니다:
+
+    - **ids**: 이동할 메모 ID 목록
+    - **target_folder_id**: 대상 폴더 ID (null이면 폴더 밖으로 이동)
+    - **brain_id**: 브레인 ID (선택)
+    """
+    try:
+        moved = await run_io(sqlite_handler.move_many, "memo", request.ids, request.target_folder_id, request.brain_id)
+        return {"requested": len(request.ids), "moved": moved}
+    except ValueError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    except Exception as e:
+        logging.error("메모 일괄 이동 오류: %s", e)
+        raise HTTPException(status_code=500, detail="내부 서버 오류")
+
+@router.post("/batch/delete", response_model=BatchDeleteResponse,
+             summary="메모 일괄 삭제")
+async def delete_memos_batch(request: BatchDeleteRequest):
+    """
+    메모 여러 개를 한 트랜잭션으로 삭제합니다:
+
+    - **ids**: 삭제할 메모 ID 목록 (존재하지 않는 ID는 무시)
+    """
+    try:
+        deleted = await run_io(sqlite_handler.delete_many, "memo", request.ids)
+    except Exception as e:
+        logging.error("메모 일괄 삭제 오류: %s", e)
+        raise HTTPException(status_code=500, detail="내부 서버 오류")
+
+    return {"requested": len(request.ids), "deleted_ids": [item["id"] for item in deleted]}
+
 @router.put("/{memo_id}/isSource", response_model=MemoResponse,
            summary="메모를 소스로 설정",
            description="메모의 is_source 상태를 true로 설정합니다.")
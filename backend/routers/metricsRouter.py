@@ -0,0 +1,22 @@
+from fastapi import APIRouter, Response
+from services import metrics_service
+
+router = APIRouter(
+    tags=["metrics"],
+    responses={404: {"description": "Not found"}}
+)
+
+@router.get("/metrics",
+    summary="Prometheus 지표",
+    description="/brainGraph/answer 단계별 지연 시간, 스키마 크기, LLM 토큰 사용량 등을 Prometheus 텍스트 형식으로 반환합니다.")
+async def get_metrics():
+    """
+    주요 지표:
+
+    - **braintrace_answer_stage_seconds{stage, brain_id}**: 단계별 지연 (save_question, index_check, embed,
+      vector_search, schema_query, schema_text, llm, save_answer)
+    - **braintrace_answer_seconds{brain_id, outcome}**: 전체 지연
+    - **braintrace_answer_seed_nodes / schema_nodes / schema_relationships / schema_tokens{brain_id}**: 검색·스키마 크기
+    - **braintrace_llm_tokens{operation, kind}**: 호출당 prompt/completion 토큰 수
+    """
+    return Response(content=metrics_service.render(), media_type=metrics_service.CONTENT_TYPE)
@@ -3,6 +3,10 @@ from fastapi.responses import JSONResponse
 from pydantic import BaseModel, Field
 from typing import List, Optional
 from sqlite_db.sqlite_handler import SQLiteHandler
+from services.executor_service import run_io
+from services.upload_service import (save_uploads, dedupe_saved_uploads, rejected_upload, rejection_status,
+                                     rejected_files_header, MAX_PDF_BYTES)
+from models.request_models import BatchMoveRequest, BatchDeleteRequest, BatchMoveResponse, BatchDeleteResponse
 import logging
 import shutil, uuid, os, re
 from fastapi.responses import Response
@@ -37,6 +41,11 @@ class PdfResponse(BaseModel):
     folder_id: Optional[int]
     brain_id:  Optional[int]
 
+class PdfUploadResponse(PdfResponse):
+    sha256:           Optional[str] = Field(None, description="파일 내용 SHA-256")
+    duplicate_of:     Optional[int] = Field(None, description="같은 브레인에 이미 있는 같은 내용의 소스 ID")
+    already_ingested: bool = Field(False, description="true이면 같은 내용이 이미 그래프에 반영되어 /process_text를 생략해도 됨")
+
 # ───────── CREATE ─────────
 @router.post("/", response_model=PdfResponse, status_code=status.HTTP_201_CREATED,
              summary="PDF 파일 생성",
@@ -164,6 +173,51 @@ async def move_pdf_out_of_folder(brain_id: int,pdf_id: int):
         logging.error("PDF 폴더 제거 오류: %s", e)
         raise HTTPException(status_code=500, detail="내부 서버 오류")
 
+# ───────── BATCH MOVE / DELETE ─────────
+@router.put("/batch/move", response_model=BatchMoveResponse,
+            summary="PDF 일괄 폴더 이동")
+async def move_pdfs_batch(request: BatchMoveRequest):
+    """
+    여러 PDF의 폴더를 한 트랜잭션으로 변경합니다:
+
+    - **ids**: 이동할 PDF ID 목록
+    - **target_folder_id**: 대상 폴더 ID (null이면 폴더 밖으로 이동)
+    - **brain_id**: 브레인 ID (선택)
+    """
+    try:
+        moved = await run_io(sqlite_handler.move_many, "pdf", request.ids, request.target_folder_id, request.brain_id)
+        return {"requested": len(request.ids), "moved": moved}
+    except ValueError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    except Exception as e:
+        logging.error("PDF 일괄 이동 오류: %s", e)
+        raise HTTPException(status_code=500, detail="내부 서버 오류")
+
+@router.post("/batch/delete", response_model=BatchDeleteResponse,
+             summary="PDF 일괄 삭제")
+async def delete_pdfs_batch(request: BatchDeleteRequest):
+    """
+    PDF 여러 개를 한 트랜잭션으로 삭제합니다:
+
+    - **ids**: 삭제할 PDF ID 목록 (존재하지 않는 ID는 무시)
+    """
+    try:
+        deleted = await run_io(sqlite_handler.delete_many, "pdf", request.ids)
+    except Exception as e:
+        logging.error("PDF 일괄 삭제 오류: %s", e)
+        raise HTTPException(status_code=500, detail="내부 서버 오류")
+
+    # 로컬 디스크 파일 삭제
+    for item in deleted:
+        file_path = item["path"]
+        try:
+            if file_path and os.path.exists(file_path):
+                os.remove(file_path)
+        except Exception as e:
+            logging.error(f"❌ 로컬 파일 삭제 실패 ({file_path}): {e}")
+
+    return {"requested": len(request.ids), "deleted_ids": [item["id"] for item in deleted]}
+
 # ───────── GET BY FOLDER ─────────
 @router.get("/folder/{folder_id}", response_model=List[PdfResponse],
             summary="폴더에 속한 PDF 목록 조회")
@@ -198,43 +252,64 @@ os.makedirs(UPLOAD_DIR, exist_ok=True)
 def sanitize_filename(name):
     return re.sub(r'[^\w\-_\. ]', '_', name)
 
-@router.post("/upload", response_model=List[PdfResponse])
+@router.post("/upload", response_model=List[PdfUploadResponse],
+             summary="PDF 파일 업로드 및 저장",
+             description=".pdf 파일을 업로드하고 DB에 저장합니다. 저장하지 못한 파일은 X-Rejected-Files 헤더로 알리고, 모두 거절되면 413(크기 초과) 또는 415(형식 오류)를 반환합니다.")
 async def upload_pdfs(
+    response: Response,
     files: List[UploadFile] = File(...),
     folder_id: Optional[int] = Form(None),
     brain_id: Optional[int] = Form(None)
 ):
-    uploaded_pdfs = []
-
     if folder_id is not None and not sqlite_handler.get_folder(folder_id):
         raise HTTPException(status_code=404, detail="해당 폴더가 존재하지 않습니다.")
     if brain_id is not None and not sqlite_handler.get_brain(brain_id):
         raise HTTPException(status_code=404, detail="해당 Brain이 존재하지 않습니다.")
 
-    for file in files:
-        try:
-            ext = os.path.splitext(file.filename)[1].lower()
-            if ext != ".pdf":
-                continue
-
-            safe_name = sanitize_filename(file.filename)
-            unique_name = f"{uuid.uuid4().hex}_{safe_name}"
-            file_path = os.path.join(UPLOAD_DIR, unique_name)
-
-            content = await file.read()
-            with open(file_path, "wb") as f:
-                f.write(content)
-
-            created = sqlite_handler.create_pdf(
-                pdf_title=safe_name,
-                pdf_path=file_path,
-                folder_id=folder_id,
-                type="pdf",
-                brain_id=brain_id
-            )
-
-            uploaded_pdfs.append(created)
-        except Exception as e:
-            logging.error("PDF 업로드 실패 (%s): %s", file.filename, e)
+    # 1) 파일을 모두 디스크에 저장 (파일별 동시 처리, 고정 크기 버퍼로 스트리밍)
+    def dest_path_for(file: UploadFile) -> Optional[str]:
+        if os.path.splitext(file.filename)[1].lower() != ".pdf":
+            return None
+        return os.path.join(UPLOAD_DIR, f"{uuid.uuid4().hex}_{sanitize_filename(file.filename)}")
+
+    saved, rejected = [], []
+    for file, result in await save_uploads(files, dest_path_for, max_bytes=MAX_PDF_BYTES):
+        if isinstance(result, BaseException):
+            rejected.append(rejected_upload(file, result))  # 형식 오류/크기 초과/저장 실패
+            continue
+        saved.append({
+            "title": sanitize_filename(file.filename),
+            "path": result["path"],
+            "type": "pdf",
+            "size": result["size"],
+            "sha256": result["sha256"]
+        })
+
+    if not saved:
+        # 받은 파일이 모두 거절되면 빈 목록 대신 오류 (크기 초과 413, 형식 오류 415)
+        raise HTTPException(status_code=rejection_status(rejected),
+                            detail={"message": "업로드한 파일을 하나도 저장하지 못했습니다.", "rejected": rejected})
+
+    # 2) 같은 내용의 파일이 이미 있으면 하드 링크로 바꾸고 중복/반영 여부 표시
+    try:
+        known = await run_io(sqlite_handler.find_contents_by_hashes, [item["sha256"] for item in saved], brain_id)
+        await run_io(dedupe_saved_uploads, saved, known, brain_id)
+    except Exception as e:
+        logging.error("중복 파일 확인 실패: %s", e)
+
+    # 3) DB 레코드는 한 트랜잭션(커밋 1회)으로 일괄 생성
+    try:
+        uploaded_pdfs = await run_io(sqlite_handler.create_many, "pdf", saved, folder_id=folder_id, brain_id=brain_id)
+        for created, item in zip(uploaded_pdfs, saved):
+            created["duplicate_of"] = item.get("duplicate_of")
+            created["already_ingested"] = item.get("already_ingested", False)
+    except Exception as e:
+        logging.error("PDF 일괄 등록 실패: %s", e)
+        for item in saved:
+            if os.path.exists(item["path"]):
+                os.remove(item["path"])
+        raise HTTPException(status_code=500, detail="PDF 저장 중 오류 발생")
 
+    # 일부만 저장되었으면 거절된 파일과 이유를 헤더로 알림
+    response.headers.update(rejected_files_header(rejected))
     return uploaded_pdfs
\ No newline at end of file
@@ -1,8 +1,9 @@
 from fastapi import APIRouter, HTTPException
-from pydantic import BaseModel
-from typing import List, Dict
+from pydantic import BaseModel, Field
+from typing import List, Dict, Optional
 import logging
 from services import embedding_service
+from services.executor_service import run_cpu, run_io
 from sqlite_db.sqlite_handler import SQLiteHandler
 
 router = APIRouter(
@@ -18,6 +19,23 @@ class SearchRequest(BaseModel):
 class SearchResponse(BaseModel):
     source_ids: List[str]  # 중복 제거된 source_id 목록
 
+class FullTextSearchRequest(BaseModel):
+    query: str = Field(..., description="검색어 (공백으로 구분된 단어는 모두 포함되어야 함)", min_length=1)
+    brain_id: int = Field(..., description="브레인 ID")
+    kinds: Optional[List[str]] = Field(None, description="검색할 종류 (memo, pdf, text, voice, chat). 생략하면 전체")
+    limit: int = Field(20, ge=1, le=100, description="최대 결과 수")
+    title_only: bool = Field(False, description="제목만 검색할지 여부")
+
+class FullTextSearchResult(BaseModel):
+    type: str = Field(..., description="항목 종류 (memo, pdf, text, voice, chat)")
+    id: int = Field(..., description="항목 ID (memo_id, pdf_id, txt_id, voice_id, chat_id)")
+    title: Optional[str] = Field(None, description="제목 (채팅은 null)")
+    snippet: Optional[str] = Field(None, description="일치 부분을 [ ]로 표시한 발췌문")
+    score: Optional[float] = Field(None, description="BM25 관련도 점수 (높을수록 관련도 높음)")
+
+class FullTextSearchResponse(BaseModel):
+    results: List[FullTextSearchResult]
+
 @router.post("/getSimilarSourceIds",
     summary="유사도 기반 소스 검색",
     description="입력된 설명이나 키워드와 유사한 문장을 벡터DB에서 찾아 해당 source_id들을 반환합니다.",
@@ -37,7 +55,7 @@ async def search_similar_descriptions(request: SearchRequest):
     try:
         # 1. 텍스트 기반 제목 검색 (우선)
         db = SQLiteHandler()
-        title_results = db.search_titles_by_query(request.query, int(request.brain_id))
+        title_results = await run_io(db.search_titles_by_query, request.query, int(request.brain_id))
         
         # 제목 검색 결과의 source_id 추출 (숫자만)
         title_source_ids = []
@@ -50,13 +68,14 @@ async def search_similar_descriptions(request: SearchRequest):
                 title_source_ids.append(id_num)
         
         # 2. 벡터 DB 검색
-        if not embedding_service.is_index_ready(request.brain_id):
-            embedding_service.initialize_collection(request.brain_id)
+        if not await run_io(embedding_service.is_index_ready, request.brain_id):
+            await run_io(embedding_service.initialize_collection, request.brain_id)
             logging.info("Qdrant 컬렉션 초기화 완료: %s", request.brain_id)
         
-        query_embedding = embedding_service.encode_text(request.query)
+        query_embedding = await run_cpu(embedding_service.encode_text, request.query)
         
-        similar_descriptions = embedding_service.search_similar_descriptions(
+        similar_descriptions = await run_io(
+            embedding_service.search_similar_descriptions,
             embedding=query_embedding,
             brain_id=request.brain_id,
             limit=10
@@ -78,4 +97,32 @@ async def search_similar_descriptions(request: SearchRequest):
         
     except Exception as e:
         logging.error("검색 오류: %s", str(e))
-        raise HTTPException(status_code=500, detail=f"검색 중 오류가 발생했습니다: {str(e)}") 
\ No newline at end of file
+        raise HTTPException(status_code=500, detail=f"검색 중 오류가 발생했습니다: {str(e)}")
+
+@router.post("/fulltext",
+    summary="제목/메모/채팅 전문 검색",
+    description="FTS5(trigram) 인덱스로 제목, 메모 본문, 채팅 메시지를 검색해 BM25 관련도 순으로 반환합니다.",
+    response_model=FullTextSearchResponse)
+async def search_fulltext(request: FullTextSearchRequest):
+    """
+    키워드로 브레인의 콘텐츠를 검색합니다:
+    
+    - **query**: 검색어 (3글자 이상 단어는 인덱스 검색, 그보다 짧은 단어는 부분 일치 필터)
+    - **brain_id**: 브레인 ID
+    - **kinds**: 검색할 종류 목록
+    - **limit**: 최대 결과 수
+    - **title_only**: 제목만 검색
+    
+    반환값:
+    - **results**: type, id, title, snippet, score 목록
+    """
+    try:
+        db = SQLiteHandler()
+        results = await run_io(
+            db.search_content, request.query, request.brain_id,
+            kinds=request.kinds, limit=request.limit, title_only=request.title_only
+        )
+        return {"results": results}
+    except Exception as e:
+        logging.error("전문 검색 오류: %s", str(e))
+        raise HTTPException(status_code=500, detail=f"전문 검색 중 오류가 발생했습니다: {str(e)}")
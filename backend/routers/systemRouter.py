@@ -0,0 +1,49 @@
+from fastapi import APIRouter, Query
+from typing import Optional
+from services.executor_service import executor_stats, run_io
+from sqlite_db.pool import pool_stats
+from services.voiceService import asr_status
+from services import transcribe_queue, tracing
+
+router = APIRouter(
+    prefix="/system",
+    tags=["system"],
+    responses={404: {"description": "Not found"}}
+)
+
+@router.get("/executors",
+    summary="작업 실행기 상태 조회",
+    description="CPU/ASR/I/O 작업 풀의 대기열 길이, 실행 중인 작업 수, 누적 처리량과 SQLite 연결 풀 통계를 반환합니다.")
+async def get_executor_stats():
+    """
+    작업 실행기 상태를 반환합니다:
+    
+    - **cpu**, **asr**, **io**: max_workers, queued(대기 중), running(실행 중), completed, failed,
+      avg_wait_ms / max_wait_ms(대기 시간), avg_run_ms(실행 시간)
+    - **sqlite_pools**: DB 파일별 created / reused / idle 연결 수
+    """
+    return {**executor_stats(), "sqlite_pools": pool_stats()}
+
+@router.get("/asr",
+    summary="음성 인식 모델 상태 조회",
+    description="ASR 모델이 메모리에 올라와 있는지, 마지막 사용 후 경과 시간과 전사 작업 대기열 상태를 반환합니다.")
+async def get_asr_status():
+    """
+    - **queue**: workers, queue_limit, queued(대기 중), running(실행 중), avg_job_seconds(작업당 평균 처리 시간),
+      direct_limit / direct_active(대기열 없이 바로 전사 중인 요청 수)
+    """
+    return {**asr_status(), "queue": await run_io(transcribe_queue.queue_stats)}
+
+@router.get("/traces",
+    summary="최근 추적 스팬 조회",
+    description="BRAINTRACE_TRACING=memory일 때 프로세스에 보관된 최근 trace(수집/질의 파이프라인의 단계별 스팬)를 최신순으로 반환합니다.")
+async def get_traces(limit: int = Query(20, ge=1, le=200), trace_id: Optional[str] = None):
+    """
+    - **limit**: 반환할 trace 수
+    - **trace_id**: 특정 trace만 조회
+    
+    반환값:
+    - **mode**: 추적 설정 (none | memory | otel)
+    - **traces**: [{trace_id, root, spans}] 목록 (memory 모드가 아니면 null)
+    """
+    return {"mode": tracing.TRACING_MODE, "traces": tracing.recent_traces(limit, trace_id)}
@@ -1,7 +1,11 @@
-from fastapi import APIRouter, HTTPException, status, Query,UploadFile, File, Form
+from fastapi import APIRouter, HTTPException, status, Query,UploadFile, File, Form, Response
 from pydantic import BaseModel, Field
 from typing import List, Optional
 from sqlite_db.sqlite_handler import SQLiteHandler
+from services.executor_service import run_io
+from services.upload_service import (save_uploads, dedupe_saved_uploads, rejected_upload, rejection_status,
+                                     rejected_files_header, MAX_TEXT_BYTES)
+from models.request_models import BatchMoveRequest, BatchDeleteRequest, BatchMoveResponse, BatchDeleteResponse
 import logging, uuid, os, re
 
 sqlite_handler = SQLiteHandler()
@@ -34,6 +38,11 @@ class TextFileResponse(BaseModel):
     folder_id: Optional[int]
     brain_id:  Optional[int]
 
+class TextFileUploadResponse(TextFileResponse):
+    sha256:           Optional[str] = Field(None, description="파일 내용 SHA-256")
+    duplicate_of:     Optional[int] = Field(None, description="같은 브레인에 이미 있는 같은 내용의 소스 ID")
+    already_ingested: bool = Field(False, description="true이면 같은 내용이 이미 그래프에 반영되어 /process_text를 생략해도 됨")
+
 
 # ───────── CREATE ─────────
 @router.post("/", response_model=TextFileResponse, status_code=status.HTTP_201_CREATED,
@@ -222,52 +231,107 @@ async def get_textfiles_by_brain(
         logging.error("텍스트 파일 조회 오류: %s", e)
         raise HTTPException(status_code=500, detail="서버 오류")
     
+# ───────── BATCH MOVE / DELETE ─────────
+@router.put("/batch/move", response_model=BatchMoveResponse,
+            summary="텍스트 파일 일괄 폴더 이동")
+async def move_textfiles_batch(request: BatchMoveRequest):
+    """
+    여러 텍스트 파일의 폴더를 한 트랜잭션으로 변경합니다:
+
+    - **ids**: 이동할 텍스트 파일 ID 목록
+    - **target_folder_id**: 대상 폴더 ID (null이면 폴더 밖으로 이동)
+    - **brain_id**: 브레인 ID (선택)
+    """
+    try:
+        moved = await run_io(sqlite_handler.move_many, "text", request.ids, request.target_folder_id, request.brain_id)
+        return {"requested": len(request.ids), "moved": moved}
+    except ValueError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    except Exception as e:
+        logging.error("텍스트 파일 일괄 이동 오류: %s", e)
+        raise HTTPException(status_code=500, detail="내부 서버 오류")
+
+@router.post("/batch/delete", response_model=BatchDeleteResponse,
+             summary="텍스트 파일 일괄 삭제")
+async def delete_textfiles_batch(request: BatchDeleteRequest):
+    """
+    텍스트 파일 여러 개를 한 트랜잭션으로 삭제합니다:
+
+    - **ids**: 삭제할 텍스트 파일 ID 목록 (존재하지 않는 ID는 무시)
+    """
+    try:
+        deleted = await run_io(sqlite_handler.delete_many, "text", request.ids)
+    except Exception as e:
+        logging.error("텍스트 파일 일괄 삭제 오류: %s", e)
+        raise HTTPException(status_code=500, detail="내부 서버 오류")
+
+    return {"requested": len(request.ids), "deleted_ids": [item["id"] for item in deleted]}
+
 UPLOAD_TXT_DIR = "uploaded_txts"
 os.makedirs(UPLOAD_TXT_DIR, exist_ok=True)
 
 def sanitize_filename(name):
     return re.sub(r'[^\w\-_\. ]', '_', name)
 
-@router.post("/upload-txt", response_model=List[TextFileResponse],
+@router.post("/upload-txt", response_model=List[TextFileUploadResponse],
              summary="텍스트 파일 업로드 및 저장",
-             description=".txt 파일을 업로드하고 DB에 저장합니다.")
+             description=".txt 파일을 업로드하고 DB에 저장합니다. 저장하지 못한 파일은 X-Rejected-Files 헤더로 알리고, 모두 거절되면 413(크기 초과) 또는 415(형식 오류)를 반환합니다.")
 async def upload_textfiles(
+    response: Response,
     files: List[UploadFile] = File(...),
     folder_id: Optional[int] = Form(None),
     brain_id: Optional[int] = Form(None)
 ):
-    uploaded_textfiles = []
-
     # 폴더 및 Brain 유효성 검사
     if folder_id is not None and not sqlite_handler.get_folder(folder_id):
         raise HTTPException(status_code=404, detail="해당 폴더가 존재하지 않습니다.")
     if brain_id is not None and not sqlite_handler.get_brain(brain_id):
         raise HTTPException(status_code=404, detail="해당 Brain이 존재하지 않습니다.")
 
-    for file in files:
-        try:
-            ext = os.path.splitext(file.filename)[1].lower()
-            if ext != ".txt":
-                continue  # txt 파일만 처리
-
-            safe_name = sanitize_filename(file.filename)
-            unique_name = f"{uuid.uuid4().hex}_{safe_name}"
-            file_path = os.path.join(UPLOAD_TXT_DIR, unique_name)
-
-            content = await file.read()
-            with open(file_path, "wb") as f:
-                f.write(content)
-
-            created = sqlite_handler.create_textfile(
-                txt_title=safe_name,
-                txt_path=file_path,
-                folder_id=folder_id,
-                type="txt",
-                brain_id=brain_id
-            )
-            uploaded_textfiles.append(created)
-
-        except Exception as e:
-            logging.error("TXT 업로드 실패 (%s): %s", file.filename, e)
+    # 1) 파일을 모두 디스크에 저장 (파일별 동시 처리, 고정 크기 버퍼로 스트리밍)
+    def dest_path_for(file: UploadFile) -> Optional[str]:
+        if os.path.splitext(file.filename)[1].lower() != ".txt":
+            return None  # txt 파일만 처리
+        return os.path.join(UPLOAD_TXT_DIR, f"{uuid.uuid4().hex}_{sanitize_filename(file.filename)}")
+
+    saved, rejected = [], []
+    for file, result in await save_uploads(files, dest_path_for, max_bytes=MAX_TEXT_BYTES):
+        if isinstance(result, BaseException):
+            rejected.append(rejected_upload(file, result))  # 형식 오류/크기 초과/저장 실패
+            continue
+        saved.append({
+            "title": sanitize_filename(file.filename),
+            "path": result["path"],
+            "type": "txt",
+            "size": result["size"],
+            "sha256": result["sha256"]
+        })
+
+    if not saved:
+        # 받은 파일이 모두 거절되면 빈 목록 대신 오류 (크기 초과 413, 형식 오류 415)
+        raise HTTPException(status_code=rejection_status(rejected),
+                            detail={"message": "업로드한 파일을 하나도 저장하지 못했습니다.", "rejected": rejected})
+
+    # 2) 같은 내용의 파일이 이미 있으면 하드 링크로 바꾸고 중복/반영 여부 표시
+    try:
+        known = await run_io(sqlite_handler.find_contents_by_hashes, [item["sha256"] for item in saved], brain_id)
+        await run_io(dedupe_saved_uploads, saved, known, brain_id)
+    except Exception as e:
+        logging.error("중복 파일 확인 실패: %s", e)
 
+    # 3) DB 레코드는 한 트랜잭션(커밋 1회)으로 일괄 생성
+    try:
+        uploaded_textfiles = await run_io(sqlite_handler.create_many, "text", saved, folder_id=folder_id, brain_id=brain_id)
+        for created, item in zip(uploaded_textfiles, saved):
+            created["duplicate_of"] = item.get("duplicate_of")
+            created["already_ingested"] = item.get("already_ingested", False)
+    except Exception as e:
+        logging.error("TXT 일괄 등록 실패: %s", e)
+        for item in saved:
+            if os.path.exists(item["path"]):
+                os.remove(item["path"])
+        raise HTTPException(status_code=500, detail="텍스트 파일 저장 중 오류 발생")
+
+    # 일부만 저장되었으면 거절된 파일과 이유를 헤더로 알림
+    response.headers.update(rejected_files_header(rejected))
     return uploaded_textfiles
\ No newline at end of file
@@ -1,15 +1,29 @@
-from fastapi import APIRouter, HTTPException, status, Query, File, UploadFile
+from fastapi import APIRouter, HTTPException, status, Query, File, UploadFile, Request
+from fastapi.responses import StreamingResponse
+from starlette.background import BackgroundTask
 from pydantic import BaseModel, Field
 from typing import List, Optional
 from sqlite_db.sqlite_handler import SQLiteHandler
-from services.voiceService import transcribe
+from models.request_models import BatchMoveRequest, BatchDeleteRequest, BatchMoveResponse, BatchDeleteResponse
+from services.voiceService import (decode_audio, decode_audio_stream, transcribe_segments, transcribe_spans,
+                                   ASR_BATCH_SIZE, SAMPLE_RATE, SEEKABLE_ONLY_FORMATS)
+from services.vad_service import detect_speech
+from services import transcribe_stream, transcribe_queue
+from services.executor_service import run_asr, run_cpu, run_io
+from services.upload_service import save_upload, UploadTooLargeError, MAX_AUDIO_BYTES
+import asyncio
+import json
 import logging
 import os
 import tempfile
+import uuid
 from pathlib import Path
 
 
 sqlite_handler = SQLiteHandler()
+# 전사 작업용으로 받은 오디오 (작업이 끝나면 삭제)
+TRANSCRIBE_UPLOAD_DIR = os.path.join("uploads", "transcribe")
+os.makedirs(TRANSCRIBE_UPLOAD_DIR, exist_ok=True)
 router = APIRouter(
     prefix="/voices",
     tags=["voices"],
@@ -30,6 +44,31 @@ class VoiceUpdate(BaseModel):
     type:        Optional[str] = Field(None, description="파일 확장자명")
     brain_id:    Optional[int] = Field(None, description="새로운 Brain ID")
 
+class TranscriptionSessionResponse(BaseModel):
+    session_id:          str
+    status:              str = Field(..., description="recording, finishing, done, failed")
+    received_bytes:      int = Field(..., description="지금까지 받은 녹음 바이트 수")
+    next_seq:            int = Field(..., description="다음에 보낼 조각 번호 (seq)")
+    transcribed_seconds: float = Field(..., description="전사가 끝난 녹음 길이 (초)")
+    segments:            int = Field(..., description="전사된 구간 수")
+    text:                str = Field(..., description="지금까지 전사된 텍스트")
+    error:               Optional[str] = None
+
+class TranscribeJobResponse(BaseModel):
+    job_id:         int
+    voice_id:       Optional[int] = Field(None, description="결과가 연결되는 음성 파일 ID")
+    status:         str = Field(..., description="queued, running, done, failed")
+    duration:       Optional[float] = Field(None, description="오디오 길이 (초)")
+    text:           Optional[str] = Field(None, description="전사 결과 (done일 때)")
+    segments:       Optional[List[dict]] = Field(None, description="구간별 결과 [{start, end, text}]")
+    error:          Optional[str] = None
+    attempts:       int = Field(..., description="실행 횟수")
+    queue_position: Optional[int] = Field(None, description="앞에 남은 대기 작업 수 (queued일 때)")
+    eta_seconds:    Optional[int] = Field(None, description="완료까지 예상 시간 (queued/running일 때)")
+    created_at:     Optional[str] = None
+    started_at:     Optional[str] = None
+    finished_at:    Optional[str] = None
+
 class VoiceResponse(BaseModel):
     voice_id:    int
     voice_title: str
@@ -127,6 +166,42 @@ async def delete_voice(voice_id: int):
     if not sqlite_handler.delete_voice(voice_id):
         raise HTTPException(status_code=404, detail="음성 파일을 찾을 수 없습니다")
 
+# ───────── BATCH MOVE / DELETE ─────────
+@router.put("/batch/move", response_model=BatchMoveResponse,
+            summary="음성 파일 일괄 폴더 이동")
+async def move_voices_batch(request: BatchMoveRequest):
+    """
+    여러 음성 파일의 폴더를 한 트랜잭션으로 변경합니다:
+
+    - **ids**: 이동할 음성 파일 ID 목록
+    - **target_folder_id**: 대상 폴더 ID (null이면 폴더 밖으로 이동)
+    - **brain_id**: 브레인 ID (선택)
+    """
+    try:
+        moved = await run_io(sqlite_handler.move_many, "voice", request.ids, request.target_folder_id, request.brain_id)
+        return {"requested": len(request.ids), "moved": moved}
+    except ValueError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    except Exception as e:
+        logging.error("음성 파일 일괄 이동 오류: %s", e)
+        raise HTTPException(status_code=500, detail="내부 서버 오류")
+
+@router.post("/batch/delete", response_model=BatchDeleteResponse,
+             summary="음성 파일 일괄 삭제")
+async def delete_voices_batch(request: BatchDeleteRequest):
+    """
+    음성 파일 여러 개를 한 트랜잭션으로 삭제합니다:
+
+    - **ids**: 삭제할 음성 파일 ID 목록 (존재하지 않는 ID는 무시)
+    """
+    try:
+        deleted = await run_io(sqlite_handler.delete_many, "voice", request.ids)
+    except Exception as e:
+        logging.error("음성 파일 일괄 삭제 오류: %s", e)
+        raise HTTPException(status_code=500, detail="내부 서버 오류")
+
+    return {"requested": len(request.ids), "deleted_ids": [item["id"] for item in deleted]}
+
 # ───────── MOVE FOLDER ─────────
 @router.put(
     "/brain/{brain_id}/changeFolder/{target_folder_id}/{voice_id}",
@@ -226,33 +301,324 @@ async def get_voices_by_brain(
         logging.error("음성 파일 조회 오류: %s", e)
         raise HTTPException(status_code=500, detail="서버 오류")
 
+# SSE 연결 유지를 위한 하트비트 간격 (초)
+SSE_HEARTBEAT_SECONDS = 15
+
+def _sse(event: str, data) -> str:
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+async def _decode_upload(file: UploadFile):
+    """업로드 오디오를 16kHz 모노 waveform으로 디코딩합니다. (크기 초과 시 413)"""
+    ext = Path(file.filename).suffix or ".mp3"
+    logging.info(f"[변환 요청] 파일명: {file.filename}, 확장자: {ext}")
+
+    if ext.lower() not in SEEKABLE_ONLY_FORMATS:
+        # 업로드 스트림을 ffmpeg에 바로 흘려 보내 PCM으로 디코딩 (임시 파일 없음)
+        await file.seek(0)
+        try:
+            waveform = await run_io(decode_audio_stream, file.file, SAMPLE_RATE,
+                                    MAX_AUDIO_BYTES, file.filename or "")
+        except UploadTooLargeError as e:
+            raise HTTPException(status_code=413, detail=str(e))
+    else:
+        with tempfile.NamedTemporaryFile(delete=False, suffix=ext) as temp_file:
+            temp_file_path = temp_file.name
+        try:
+            saved = await save_upload(file, temp_file_path, max_bytes=MAX_AUDIO_BYTES)
+        except UploadTooLargeError as e:
+            os.unlink(temp_file_path)
+            raise HTTPException(status_code=413, detail=str(e))
+        logging.info(f"[파일 저장] 임시 경로: {temp_file_path}, 크기: {saved['size']} bytes")
+
+        try:
+            waveform = await run_io(decode_audio, temp_file_path)
+        finally:
+            os.unlink(temp_file_path)
+    return waveform
+
+async def _acquire_direct_slot() -> transcribe_queue.DirectSlot:
+    """
+    대기열을 거치지 않는 전사 요청의 처리 슬롯을 얻습니다. (업로드를 디코딩하기 전에 호출)
+    대기열이 가득 찼거나 동시에 처리 중인 요청이 TRANSCRIBE_DIRECT_LIMIT개면 429와 Retry-After를 반환합니다.
+    """
+    try:
+        return await transcribe_queue.acquire_direct_slot()
+    except transcribe_queue.TranscribeQueueFullError as e:
+        raise HTTPException(status_code=429, detail=str(e), headers={"Retry-After": str(e.retry_after)})
+
 @router.post("/transcribe",
     summary="음성 파일 텍스트 변환",
-    description="오디오 파일을 텍스트로 변환합니다.",
+    description="오디오 파일을 텍스트로 변환합니다. 동시에 처리 중인 요청이 많거나 전사 대기열이 가득 차면 429와 Retry-After를 반환합니다.",
     response_model=dict)
-async def transcribe_audio(file: UploadFile = File(...)):
+async def transcribe_audio(
+    file: UploadFile = File(...),
+    timestamps: bool = Query(False, description="true면 음성 구간별 시작/끝 시각과 텍스트를 함께 반환")
+):
     """
     다양한 오디오 파일(webm, mp3, wav 등)을 텍스트로 변환합니다.
+    무음 구간은 건너뛰고 음성 구간만 묶어서 추론합니다.
+
+    - **file**: 오디오 파일
+    - **timestamps**: true면 segments(start, end, text)와 duration, speech_seconds를 함께 반환
     """
+    slot = await _acquire_direct_slot()
     try:
-        ext = Path(file.filename).suffix or ".mp3"
-        logging.info(f"[변환 요청] 파일명: {file.filename}, 확장자: {ext}")
-
-        with tempfile.NamedTemporaryFile(delete=False, suffix=ext) as temp_file:
-            content = await file.read()
-            temp_file.write(content)
-            temp_file_path = temp_file.name
-            logging.info(f"[파일 저장] 임시 경로: {temp_file_path}")
-
-        text = transcribe(temp_file_path)
-        logging.info(f"[변환 완료] 추출 텍스트: {text[:30]}...")
-
-        os.unlink(temp_file_path)
-        return {"text": text}
+        waveform = await _decode_upload(file)
+        result = await run_asr(transcribe_segments, waveform)
+        logging.info(f"[변환 완료] 추출 텍스트: {result['text'][:30]}...")
+        return result if timestamps else {"text": result["text"]}
 
+    except HTTPException:
+        raise
     except Exception as e:
         logging.exception("음성 변환 중 예외 발생")  # ← traceback 포함 전체 로그 기록
         raise HTTPException(
             status_code=500,
             detail=f"음성 변환 중 오류가 발생했습니다: {str(e)}"
-        )
\ No newline at end of file
+        )
+    finally:
+        slot.release()
+
+# ───────── STREAMING TRANSCRIBE ─────────
+@router.post("/transcribe/stream",
+    summary="음성 파일 텍스트 변환 (SSE 스트리밍)",
+    description="음성 구간을 전사하는 대로 text/event-stream으로 전송합니다. 동시에 처리 중인 요청이 많거나 전사 대기열이 가득 차면 429와 Retry-After를 반환합니다.")
+async def transcribe_audio_stream(file: UploadFile = File(...)):
+    """
+    오디오 파일을 구간 단위로 전사하며 결과를 바로 전송합니다:
+
+    - **event: start**: {"duration", "segments"} (전체 길이와 음성 구간 수)
+    - **event: segment**: {"start", "end", "text"} (초 단위)
+    - **event: end**: {"text", "duration", "speech_seconds"}
+    - **event: error**: {"detail"}
+    """
+    slot = await _acquire_direct_slot()
+    try:
+        waveform = await _decode_upload(file)
+    except HTTPException:
+        slot.release()
+        raise
+    except Exception as e:
+        slot.release()
+        logging.exception("음성 디코딩 중 예외 발생")
+        raise HTTPException(status_code=500, detail=f"음성 변환 중 오류가 발생했습니다: {str(e)}")
+
+    async def generate():
+        duration = round(len(waveform) / SAMPLE_RATE, 2)
+        try:
+            spans = await run_cpu(detect_speech, waveform, SAMPLE_RATE)
+            yield _sse("start", {"duration": duration, "segments": len(spans)})
+            texts = []
+            for index in range(0, len(spans), ASR_BATCH_SIZE):
+                batch = spans[index:index + ASR_BATCH_SIZE]
+                for segment in await run_asr(transcribe_spans, waveform, batch):
+                    texts.append(segment["text"])
+                    yield _sse("segment", segment)
+            speech_seconds = round(sum(end - start for start, end in spans) / SAMPLE_RATE, 2)
+            yield _sse("end", {"text": " ".join(texts), "duration": duration, "speech_seconds": speech_seconds})
+        except Exception as e:
+            logging.exception("스트리밍 음성 변환 중 예외 발생")
+            yield _sse("error", {"detail": f"음성 변환 중 오류가 발생했습니다: {str(e)}"})
+        finally:
+            slot.release()
+
+    # 클라이언트가 첫 이벤트 전에 끊으면 generate()가 시작되지 않으므로 응답이 끝날 때도 슬롯을 반납
+    return StreamingResponse(generate(), media_type="text/event-stream",
+                             headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+                             background=BackgroundTask(slot.release))
+
+
+def _get_stream_session(session_id: str):
+    session = transcribe_stream.get_session(session_id)
+    if session is None:
+        raise HTTPException(status_code=404, detail="스트리밍 세션을 찾을 수 없습니다")
+    return session
+
+@router.post("/stream", response_model=TranscriptionSessionResponse, status_code=status.HTTP_201_CREATED,
+    summary="스트리밍 전사 세션 생성",
+    description="녹음 조각을 보내는 동안 끝난 음성 구간부터 전사하는 세션을 만듭니다.")
+async def create_stream_session():
+    """
+    스트리밍 전사 세션을 만듭니다. 이후 흐름:
+
+    1. PUT /voices/stream/{session_id}/chunk?seq=0,1,2,... 로 녹음 조각(원본 바이트)을 순서대로 전송
+    2. GET /voices/stream/{session_id}/events (SSE)로 구간별 전사 결과 수신
+    3. POST /voices/stream/{session_id}/finish 로 입력 종료 → 남은 구간까지 전사 후 end 이벤트
+    """
+    try:
+        session = transcribe_stream.create_session()
+    except transcribe_stream.StreamSessionLimitError as e:
+        raise HTTPException(status_code=429, detail=str(e))
+    except Exception as e:
+        logging.exception("스트리밍 세션 생성 오류")
+        raise HTTPException(status_code=500, detail=f"스트리밍 세션 생성 중 오류가 발생했습니다: {str(e)}")
+    return session.to_dict()
+
+@router.put("/stream/{session_id}/chunk", response_model=TranscriptionSessionResponse,
+    summary="스트리밍 세션에 녹음 조각 전송")
+async def append_stream_chunk(
+    session_id: str,
+    request: Request,
+    seq: int = Query(..., ge=0, description="조각 번호 (0부터 1씩 증가)")
+):
+    """
+    요청 본문(바이트)을 녹음에 이어 붙입니다. (예: MediaRecorder의 dataavailable 조각을 그대로 전송)
+
+    - **seq**: 조각 번호. 응답의 next_seq와 같아야 하며, 다르면(순서가 바뀌었거나 이미 받은 조각) 409를 반환합니다.
+      같은 세션의 조각 요청은 하나씩 처리되므로 두 요청의 본문이 섞여 들어가지 않습니다.
+      전송이 중간에 끊긴 조각은 반영되지 않으므로 같은 seq로 다시 보내면 됩니다.
+    """
+    session = _get_stream_session(session_id)
+    try:
+        await transcribe_stream.feed_chunk(session, seq, request.stream())
+    except UploadTooLargeError as e:
+        raise HTTPException(status_code=413, detail=str(e))
+    except ValueError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    except (BrokenPipeError, OSError) as e:
+        raise HTTPException(status_code=500, detail=f"녹음 조각 처리 중 오류가 발생했습니다: {str(e)}")
+    return session.to_dict()
+
+@router.post("/stream/{session_id}/finish", response_model=TranscriptionSessionResponse,
+    summary="스트리밍 세션 입력 종료")
+async def finish_stream_session(session_id: str):
+    session = _get_stream_session(session_id)
+    session.finish()
+    return session.to_dict()
+
+@router.get("/stream/{session_id}", response_model=TranscriptionSessionResponse,
+    summary="스트리밍 세션 상태 조회")
+async def get_stream_session(session_id: str):
+    return _get_stream_session(session_id).to_dict()
+
+@router.get("/stream/{session_id}/events",
+    summary="스트리밍 세션 전사 결과 수신 (SSE)")
+async def stream_session_events(session_id: str):
+    """
+    구간이 전사될 때마다 전송하고, 세션이 끝나면 스트림을 닫습니다:
+
+    - **event: segment**: {"start", "end", "text"} (녹음 시작 기준 초)
+    - **event: end**: 세션 상태 (GET /voices/stream/{session_id}와 같은 형식)
+
+    연결 전에 전사된 구간도 처음부터 모두 전송합니다.
+    """
+    session = _get_stream_session(session_id)
+
+    async def generate():
+        sent = 0
+        while True:
+            updated = session.subscribe()
+            while sent < len(session.segments):
+                yield _sse("segment", session.segments[sent])
+                sent += 1
+            if session.finished:
+                yield _sse("end", session.to_dict())
+                return
+            try:
+                await asyncio.wait_for(updated.wait(), SSE_HEARTBEAT_SECONDS)
+            except asyncio.TimeoutError:
+                yield ": keep-alive\n\n"
+
+    return StreamingResponse(generate(), media_type="text/event-stream",
+                             headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+
+@router.delete("/stream/{session_id}", status_code=status.HTTP_204_NO_CONTENT,
+    summary="스트리밍 세션 삭제")
+async def delete_stream_session(session_id: str):
+    if not await transcribe_stream.close_session(session_id):
+        raise HTTPException(status_code=404, detail="스트리밍 세션을 찾을 수 없습니다")
+
+
+# ───────── TRANSCRIBE JOBS ─────────
+@router.post("/transcribe/jobs", response_model=TranscribeJobResponse, status_code=status.HTTP_202_ACCEPTED,
+    summary="음성 전사 작업 등록",
+    description="전사를 고정 크기 워커 풀의 대기열에 등록하고 바로 반환합니다. 대기열이 가득 차면 업로드를 받기 전에 429와 Retry-After를 반환합니다.",
+    openapi_extra={"requestBody": {"content": {"multipart/form-data": {"schema": {
+        "type": "object",
+        "properties": {
+            "file": {"type": "string", "format": "binary", "description": "전사할 오디오 파일"},
+            "voice_id": {"type": "integer", "description": "결과(transcript)를 연결할 음성 파일 ID"}
+        }
+    }}}}})
+async def create_transcribe_job(request: Request):
+    """
+    전사 작업을 등록합니다 (multipart/form-data):
+
+    - **file**: 전사할 오디오 파일 (생략하면 voice_id의 저장된 파일을 전사)
+    - **voice_id**: 결과(transcript)를 연결할 음성 파일 ID
+
+    File/Form 파라미터로 받으면 핸들러가 실행되기 전에 본문(최대 MAX_AUDIO_BYTES)을 모두 받게 되므로,
+    대기열 여유를 먼저 확인한 뒤 본문을 직접 읽습니다.
+    진행 상황과 결과는 GET /voices/transcribe/jobs/{job_id}로 확인합니다.
+    """
+    try:
+        await transcribe_queue.check_capacity()
+    except transcribe_queue.TranscribeQueueFullError as e:
+        raise HTTPException(status_code=429, detail=str(e), headers={"Retry-After": str(e.retry_after)})
+
+    form = await request.form()
+    file = form.get("file")
+    if isinstance(file, str) or (file is not None and not file.filename):
+        file = None
+    voice_id = form.get("voice_id")
+    if voice_id in (None, ""):
+        voice_id = None
+    elif isinstance(voice_id, str) and voice_id.isdigit():
+        voice_id = int(voice_id)
+    else:
+        raise HTTPException(status_code=422, detail="voice_id는 정수여야 합니다.")
+
+    voice = None
+    if voice_id is not None:
+        voice = await run_io(sqlite_handler.get_voice, voice_id)
+        if not voice:
+            raise HTTPException(status_code=404, detail="음성 파일을 찾을 수 없습니다")
+
+    if file is not None:
+        ext = Path(file.filename or "").suffix or ".mp3"
+        audio_path = os.path.join(TRANSCRIBE_UPLOAD_DIR, f"{uuid.uuid4().hex}{ext}")
+        try:
+            await save_upload(file, audio_path, max_bytes=MAX_AUDIO_BYTES)
+        except UploadTooLargeError as e:
+            raise HTTPException(status_code=413, detail=str(e))
+        owns_audio = True
+    elif voice is not None:
+        audio_path = voice["voice_path"]
+        if not audio_path or not os.path.exists(audio_path):
+            raise HTTPException(status_code=400, detail="음성 파일이 서버에 저장되어 있지 않습니다. file을 함께 보내 주세요.")
+        owns_audio = False
+    else:
+        raise HTTPException(status_code=400, detail="file 또는 voice_id 파라미터가 필요합니다.")
+
+    try:
+        return await transcribe_queue.enqueue(audio_path, voice_id, owns_audio)
+    except transcribe_queue.TranscribeQueueFullError as e:
+        if owns_audio:
+            os.remove(audio_path)
+        raise HTTPException(status_code=429, detail=str(e), headers={"Retry-After": str(e.retry_after)})
+
+@router.get("/transcribe/jobs", response_model=List[TranscribeJobResponse],
+    summary="음성 전사 작업 목록 조회")
+async def list_transcribe_jobs(
+    voice_id: Optional[int] = Query(None, description="음성 파일 ID"),
+    status: Optional[str] = Query(None, description="작업 상태 (queued, running, done, failed)"),
+    limit: int = Query(50, ge=1, le=500, description="최대 개수")
+):
+    jobs = await run_io(sqlite_handler.list_transcribe_jobs, voice_id, status, limit)
+    return [await transcribe_queue.job_with_eta(job) for job in jobs]
+
+@router.get("/transcribe/jobs/{job_id}", response_model=TranscribeJobResponse,
+    summary="음성 전사 작업 상태/결과 조회")
+async def get_transcribe_job(job_id: int):
+    job = await run_io(sqlite_handler.get_transcribe_job, job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="작업을 찾을 수 없습니다")
+    return await transcribe_queue.job_with_eta(job)
+
+@router.get("/{voice_id}/transcript",
+    summary="음성 파일 전사 결과 조회",
+    description="음성 파일에 연결된 마지막 전사 결과를 반환합니다. (전사 전이면 transcript는 null)")
+async def get_voice_transcript(voice_id: int):
+    if not await run_io(sqlite_handler.get_voice, voice_id):
+        raise HTTPException(status_code=404, detail="음성 파일을 찾을 수 없습니다")
+    return {"voice_id": voice_id, "transcript": await run_io(sqlite_handler.get_voice_transcript, voice_id)}
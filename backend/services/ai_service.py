@@ -2,7 +2,8 @@ import logging
 from openai import OpenAI           # OpenAI 클라이언트 임포트
 import json
 from .chunk_service import chunk_text
-from typing import List
+from . import metrics_service, tracing
+from typing import Dict, List, Tuple
 
 import os
 from dotenv import load_dotenv  # dotenv 추가
@@ -47,19 +48,24 @@ def extract_referenced_nodes(llm_response: str) -> List[str]:
     except json.JSONDecodeError:
         return []
 
+@tracing.traced("ai.extract_graph")
 def extract_graph_components(text: str, source_id: str):
     """
     입력 텍스트에서 LLM을 활용해 노드와 엣지 정보를 추출합니다.
     텍스트가 2000자 이상인 경우 청킹하여 처리합니다.
     반환 형식: (nodes: list, edges: list)
     """
+    current = tracing.current_span()
+    current.set_attribute("chars", len(text))
     # 모든 노드와 엣지를 저장할 리스트
     all_nodes = []
     all_edges = []
     
     # 텍스트가 2000자 이상이면 청킹
     if len(text) >= 2000:
-        chunks = chunk_text(text)
+        with tracing.span("ai.chunk", chars=len(text)) as chunk_span:
+            chunks = chunk_text(text)
+            chunk_span.set_attribute("chunks", len(chunks))
         logging.info(f"✅ 텍스트가 {len(chunks)}개의 청크로 분할되어 처리됩니다.")
         
         # 각 청크별로 노드와 엣지 추출
@@ -73,14 +79,54 @@ def extract_graph_components(text: str, source_id: str):
         all_nodes, all_edges = _extract_from_chunk(text, source_id)
     
     # 중복 제거
-    all_nodes = _remove_duplicate_nodes(all_nodes)
-    all_edges = _remove_duplicate_edges(all_edges)
+    all_nodes, all_edges = _deduplicate(all_nodes, all_edges)
+    current.set_attributes(nodes=len(all_nodes), edges=len(all_edges))
     
     logging.info(f"✅ 총 {len(all_nodes)}개의 노드와 {len(all_edges)}개의 엣지가 추출되었습니다.")
     return all_nodes, all_edges
 
+def extract_chunk_components(chunk: str, source_id: str, provenance: dict = None):
+    """
+    청크 하나에서 노드와 엣지를 추출합니다. (중복 제거 전)
+    provenance가 주어지면 각 description에 함께 기록합니다. (예: {"pages": [3, 4]})
+    """
+    nodes, edges = _extract_from_chunk(chunk, source_id)
+    if provenance:
+        for node in nodes:
+            for desc in node["descriptions"]:
+                desc.update(provenance)
+    return nodes, edges
+
+def merge_graph_components(results: list):
+    """청크별 (nodes, edges) 결과를 합치고 중복을 제거합니다."""
+    all_nodes = [node for nodes, _ in results for node in nodes]
+    all_edges = [edge for _, edges in results for edge in edges]
+    all_nodes, all_edges = _deduplicate(all_nodes, all_edges)
+    logging.info(f"✅ 총 {len(all_nodes)}개의 노드와 {len(all_edges)}개의 엣지가 추출되었습니다.")
+    return all_nodes, all_edges
+
+def _deduplicate(nodes: list, edges: list) -> Tuple[list, list]:
+    """청크별 추출 결과의 중복 노드/엣지를 제거합니다."""
+    with tracing.span("ai.dedup", nodes_in=len(nodes), edges_in=len(edges)) as current:
+        nodes = _remove_duplicate_nodes(nodes)
+        edges = _remove_duplicate_edges(edges)
+        current.set_attributes(nodes_out=len(nodes), edges_out=len(edges))
+    metrics_service.INGEST_NODES.inc(len(nodes), stage="deduplicated")
+    metrics_service.INGEST_EDGES.inc(len(edges), stage="deduplicated")
+    return nodes, edges
+
+def _usage(response) -> Dict[str, int]:
+    """API 응답의 토큰 사용량 (보고되지 않은 값은 None)"""
+    return {
+        "prompt_tokens": getattr(response.usage, "prompt_tokens", None),
+        "completion_tokens": getattr(response.usage, "completion_tokens", None)
+    }
+
+@tracing.traced("ai.extract_chunk")
 def _extract_from_chunk(chunk: str, source_id: str):
     """개별 청크에서 노드와 엣지 정보를 추출합니다."""
+    current = tracing.current_span()
+    current.set_attribute("chars", len(chunk))
     prompt = (
     "다음 텍스트를 분석해서 노드와 엣지 정보를 추출해줘. "
     "노드는 { \"label\": string, \"name\": string, \"description\": string } 형식의 객체 배열, "
@@ -112,6 +158,9 @@ def _extract_from_chunk(chunk: str, source_id: str):
             # JSON만 돌려주도록 강제
             response_format={"type": "json_object"}
         )
+        usage = _usage(completion)
+        metrics_service.record_llm_usage("extract", usage)
+        current.set_attributes(**usage)
 
         # print("response: ", response)
         # data = json.loads(response)
@@ -158,9 +207,15 @@ def _extract_from_chunk(chunk: str, source_id: str):
             else:
                 logging.warning("필수 필드가 누락된 엣지: %s", edge)
         
+        metrics_service.INGEST_CHUNKS.inc(outcome="ok")
+        metrics_service.INGEST_NODES.inc(len(valid_nodes), stage="extracted")
+        metrics_service.INGEST_EDGES.inc(len(valid_edges), stage="extracted")
+        current.set_attributes(nodes=len(valid_nodes), edges=len(valid_edges))
         return valid_nodes, valid_edges
     except Exception as e:
         logging.error(f"청크 처리 중 오류 발생: {str(e)}")
+        metrics_service.INGEST_CHUNKS.inc(outcome="error")
+        current.record_error(e)
         return [], []
 
 def _remove_duplicate_nodes(nodes: list) -> list:
@@ -194,6 +249,17 @@ def generate_answer(schema_text: str, question: str) -> str:
     """
     스키마 텍스트와 질문을 기반으로 AI를 호출하여 최종 답변을 생성합니다.
     """
+    answer, _ = generate_answer_with_usage(schema_text, question)
+    return answer
+
+
+@tracing.traced("ai.generate_answer")
+def generate_answer_with_usage(schema_text: str, question: str) -> Tuple[str, Dict[str, int]]:
+    """
+    generate_answer와 같지만 API가 보고한 토큰 사용량도 함께 반환합니다.
+    Returns:
+        (답변, {"prompt_tokens", "completion_tokens"})
+    """
     prompt = (
     "다음 스키마와 질문을 바탕으로, 스키마에 명시된 정보나 연결된 관계를 통해 추론 가능한 범위 내에서만 자연어로 답변해줘. "
     "정보가 일부라도 있다면 해당 범위 내에서 최대한 설명하고, 스키마와 완전히 무관한 경우에만 '지식그래프에 해당 정보가 없습니다.'라고 출력해. "
@@ -216,22 +282,59 @@ def generate_answer(schema_text: str, question: str) -> str:
             model="gpt-4o",
             messages=[{"role": "user", "content": prompt}]
         )
+        usage = _usage(response)
         response = response.choices[0].message.content
 
         print("response: ", response)
         final_answer = response
-        return final_answer
+        return final_answer, usage
     except Exception as e:
         logging.error("GPT 응답 오류: %s", str(e))
         raise RuntimeError("GPT 응답 생성 중 오류 발생")
 import json
 import logging
 
-def generate_schema_text(nodes, related_nodes, relationships) -> str:
+try:
+    import tiktoken
+    _token_encoder = tiktoken.get_encoding("o200k_base")
+except Exception:
+    _token_encoder = None
+
+# 답변 프롬프트에 넣을 스키마 텍스트의 최대 토큰 수
+SCHEMA_TOKEN_BUDGET = 3000
+
+def estimate_tokens(text: str) -> int:
+    """
+    텍스트의 토큰 수를 계산합니다.
+    tiktoken이 설치되어 있지 않으면 ASCII 4자당 1토큰, 그 외(한글 등) 1자당 1토큰으로 보수적으로 추정합니다.
+    """
+    if _token_encoder is not None:
+        return len(_token_encoder.encode(text))
+    ascii_chars = sum(1 for ch in text if ord(ch) < 128)
+    return (ascii_chars + 3) // 4 + (len(text) - ascii_chars)
+
+def truncate_to_tokens(text: str, max_tokens: int) -> str:
+    """estimate_tokens 기준으로 max_tokens 안에 들어가도록 text의 뒷부분을 잘라 "…"를 붙입니다."""
+    if estimate_tokens(text) <= max_tokens:
+        return text
+    low, high = 0, len(text)
+    while low < high:
+        mid = (low + high + 1) // 2
+        if estimate_tokens(text[:mid] + "…") <= max_tokens:
+            low = mid
+        else:
+            high = mid - 1
+    return text[:low] + "…" if low else ""
+
+def generate_schema_text(nodes, related_nodes, relationships, node_scores=None, max_tokens=None) -> str:
     """
     Neo4j에서 가져온 노드, 인접 노드, 관계 데이터를 받아
     노드-관계-노드 형식의 스키마 텍스트를 생성합니다.
+
+    node_scores({노드 이름: 점수})가 주어지면 점수가 높은 노드가 포함된 줄부터 배치하고,
+    max_tokens가 주어지면 그 토큰 수를 넘기 전까지의 줄만 포함합니다.
     """
+    node_scores = node_scores or {}
     try:
         logging.info("generating schema text: %d개 노드, %d개 관련 노드, %d개 관계",
                     len(nodes) if isinstance(nodes, list) else 0,
@@ -302,8 +405,8 @@ def generate_schema_text(nodes, related_nodes, relationships) -> str:
                     if node_data["name"] not in all_nodes:
                         all_nodes[node_data["name"]] = node_data
 
-        # 관계 처리 (각 관계를 "노드-관계-노드" 형식으로 생성)
-        simplified_relationships = []
+        # 관계 처리 (각 관계를 "노드-관계-노드" 형식으로 생성, 값은 양 끝 노드 점수의 합)
+        simplified_relationships = {}
         
         if not relationships:
             logging.warning("관계 데이터가 비어 있습니다.")
@@ -368,7 +471,8 @@ def generate_schema_text(nodes, related_nodes, relationships) -> str:
                         
                         # 노드-관계-노드 형식 구성
                         relationship_str = f"{start_label}-{start_node_name}({start_desc_str}) -> {relation_label} -> {end_label}-{end_node_name}({end_desc_str})"
-                        simplified_relationships.append(relationship_str)
+                        score = node_scores.get(start_node_name, 0.0) + node_scores.get(end_node_name, 0.0)
+                        simplified_relationships[relationship_str] = max(score, simplified_relationships.get(relationship_str, score))
                     except Exception as e:
                         logging.error("관계 정보 추출 오류: %s", str(e))
                         continue
@@ -376,12 +480,12 @@ def generate_schema_text(nodes, related_nodes, relationships) -> str:
                     logging.error("관계 처리 오류: %s", str(e))
                     continue
         
-        # 중복 제거
-        simplified_relationships = list(set(simplified_relationships))
+        # 중복은 dict 키로 제거됨, 점수 내림차순 정렬
+        simplified_relationships = sorted(simplified_relationships, key=lambda rel_str: -simplified_relationships[rel_str])
         
         # 노드 정보 생성 (참고용으로 활용)
         node_info_list = []
-        for node in all_nodes.values():
+        for node in sorted(all_nodes.values(), key=lambda n: -node_scores.get(n.get("name"), 0.0)):
             try:
                 node_descs = []
                 for desc in node.get("descriptions", []):
@@ -415,6 +519,27 @@ def generate_schema_text(nodes, related_nodes, relationships) -> str:
             if all(name not in n for name in connected_node_names)
         ]
 
+        # 토큰 예산이 있으면 점수 순으로 예산 안에 들어가는 줄만 남김
+        # (description이 많은 허브 노드의 관계처럼 혼자 예산을 넘는 줄은 건너뛰고 다음 줄로 예산을 채움.
+        #  아무 줄도 들어가지 않으면 가장 점수가 높은 줄을 예산 길이로 잘라 넣음)
+        if max_tokens is not None:
+            remaining = max_tokens
+            lines = simplified_relationships + standalone_node_info_list if simplified_relationships else node_info_list
+            kept = {}
+            for line in lines:
+                cost = estimate_tokens(line) + 1
+                if cost > remaining:
+                    continue
+                remaining -= cost
+                kept[line] = line
+            if not kept and lines:
+                kept[lines[0]] = truncate_to_tokens(lines[0], max_tokens - 1)
+            if len(kept) < len(lines):
+                logging.info("스키마 토큰 예산(%d) 초과로 %d/%d줄만 포함", max_tokens, len(kept), len(lines))
+            simplified_relationships = [kept[line] for line in simplified_relationships if line in kept]
+            standalone_node_info_list = [kept[line] for line in standalone_node_info_list if line in kept]
+            node_info_list = [kept[line] for line in node_info_list if line in kept]
+
         relationship_text = "\n".join(simplified_relationships) if simplified_relationships else ""
         standalone_node_text = "\n".join(standalone_node_info_list) if standalone_node_info_list else ""
 
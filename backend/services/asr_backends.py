@@ -0,0 +1,155 @@
+"""
+음성 인식(ASR) 백엔드.
+
+voiceService는 ASRBackend 인터페이스(transcribe_batch, close)만 사용하므로 추론 엔진을 바꿔 끼울 수 있습니다.
+- transformers: Hugging Face 파이프라인 (PyTorch, GPU가 없으면 fp32 CPU 추론)
+- ct2: CTranslate2로 변환한 같은 체크포인트를 faster-whisper로 실행 (CPU int8 양자화)
+
+ct2 백엔드를 쓰려면 먼저 체크포인트를 변환해야 합니다:
+    python -m services.asr_backends --output data/asr/whisper-ko-ct2 --quantization int8
+"""
+import argparse
+import logging
+import os
+import time
+from typing import List
+
+import numpy as np
+
+ASR_MODEL_NAME = "o0dimplz0o/Fine-Tuned-Whisper-Large-v2-Zeroth-STT-KO"
+ASR_LANGUAGE = "ko"
+# 사용할 백엔드 (transformers, ct2)
+ASR_BACKEND = os.getenv("BRAINTRACE_ASR_BACKEND", "transformers")
+# 변환된 CTranslate2 모델 디렉터리와 연산 정밀도
+ASR_CT2_DIR = os.getenv("BRAINTRACE_ASR_CT2_DIR",
+                        os.path.join(os.path.dirname(os.path.dirname(__file__)), "data", "asr", "whisper-ko-ct2"))
+ASR_CT2_COMPUTE_TYPE = os.getenv("BRAINTRACE_ASR_CT2_COMPUTE_TYPE", "int8")
+ASR_CT2_THREADS = int(os.getenv("BRAINTRACE_ASR_CT2_THREADS", 0))     # 0이면 CTranslate2 기본값 (코어 수)
+ASR_BEAM_SIZE = int(os.getenv("BRAINTRACE_ASR_BEAM_SIZE", 1))       # ct2 빔 크기 (1 = transformers 기본값과 같은 greedy)
+
+
+class ASRBackend:
+    """16kHz 모노 float32 waveform 목록을 텍스트 목록으로 변환하는 추론 엔진"""
+
+    name = ""
+    model = ""
+
+    def transcribe_batch(self, arrays: List[np.ndarray], sample_rate: int, batch_size: int) -> List[str]:
+        raise NotImplementedError
+
+    def close(self) -> None:
+        """모델이 차지한 메모리를 해제합니다."""
+
+
+class TransformersBackend(ASRBackend):
+    name = "transformers"
+
+    def __init__(self, model_name: str = ASR_MODEL_NAME):
+        import torch
+        from transformers import pipeline
+
+        self.model = model_name
+        device = 0 if torch.cuda.is_available() else -1
+        logging.info(f"[ASR] 모델 로딩 시작: {model_name} (backend={self.name}, device={device})")
+        self._pipeline = pipeline(
+            "automatic-speech-recognition",
+            model=model_name,
+            device=device,
+            chunk_length_s=30,
+            stride_length_s=5,
+            return_timestamps=False,
+            generate_kwargs={"language": ASR_LANGUAGE}
+        )
+
+    def transcribe_batch(self, arrays: List[np.ndarray], sample_rate: int, batch_size: int) -> List[str]:
+        inputs = [{"array": array, "sampling_rate": sample_rate} for array in arrays]
+        return [output["text"] for output in self._pipeline(inputs, batch_size=batch_size)]
+
+    def close(self) -> None:
+        import torch
+
+        self._pipeline = None
+        if torch.cuda.is_available():
+            torch.cuda.empty_cache()
+
+
+class CTranslate2Backend(ASRBackend):
+    """
+    faster-whisper(CTranslate2) 백엔드. 인코더/디코더 가중치를 int8로 양자화해 CPU에서 실행합니다.
+    구간 단위 병렬화는 CTranslate2 내부 스레드(ASR_CT2_THREADS)가 담당하므로 batch_size는 사용하지 않습니다.
+    """
+    name = "ct2"
+
+    def __init__(self, model_dir: str = ASR_CT2_DIR, compute_type: str = ASR_CT2_COMPUTE_TYPE,
+                 cpu_threads: int = ASR_CT2_THREADS):
+        try:
+            from faster_whisper import WhisperModel
+        except ImportError:
+            raise RuntimeError("ct2 백엔드에 필요한 faster-whisper가 설치되어 있지 않습니다. (pip install -r requirements-ct2.txt)")
+        if not os.path.isfile(os.path.join(model_dir, "model.bin")):
+            raise RuntimeError(f"변환된 CTranslate2 모델이 없습니다: {model_dir} "
+                               f"(python -m services.asr_backends --output {model_dir})")
+
+        self.model = model_dir
+        logging.info(f"[ASR] 모델 로딩 시작: {model_dir} (backend={self.name}, compute_type={compute_type})")
+        self._model = WhisperModel(model_dir, device="cpu", compute_type=compute_type, cpu_threads=cpu_threads)
+
+    def transcribe_batch(self, arrays: List[np.ndarray], sample_rate: int, batch_size: int) -> List[str]:
+        texts = []
+        for array in arrays:
+            # VAD는 voiceService에서 이미 적용했으므로 여기서는 끔
+            segments, _ = self._model.transcribe(
+                array, language=ASR_LANGUAGE, beam_size=ASR_BEAM_SIZE,
+                vad_filter=False, condition_on_previous_text=False
+            )
+            texts.append("".join(segment.text for segment in segments))
+        return texts
+
+    def close(self) -> None:
+        self._model = None
+
+
+BACKENDS = {
+    TransformersBackend.name: TransformersBackend,
+    CTranslate2Backend.name: CTranslate2Backend,
+}
+
+
+def create_backend(name: str = ASR_BACKEND) -> ASRBackend:
+    if name not in BACKENDS:
+        raise ValueError(f"지원하지 않는 ASR 백엔드: {name} (사용 가능: {', '.join(BACKENDS)})")
+    started = time.perf_counter()
+    backend = BACKENDS[name]()
+    logging.info(f"✅ [ASR] 모델 로딩 완료: {time.perf_counter() - started:.1f}s")
+    return backend
+
+
+def convert_checkpoint(output_dir: str = ASR_CT2_DIR, model_name: str = ASR_MODEL_NAME,
+                       quantization: str = "int8", force: bool = False) -> str:
+    """
+    Hugging Face Whisper 체크포인트를 CTranslate2 형식으로 변환합니다.
+    faster-whisper가 읽는 tokenizer.json과 preprocessor_config.json도 함께 저장합니다.
+    """
+    try:
+        from ctranslate2.converters import TransformersConverter
+        from transformers import AutoProcessor
+    except ImportError:
+        raise RuntimeError("체크포인트 변환에는 ctranslate2와 transformers가 필요합니다. (pip install -r requirements-ct2.txt)")
+
+    logging.info(f"[ASR] 체크포인트 변환 시작: {model_name} → {output_dir} ({quantization})")
+    TransformersConverter(model_name).convert(output_dir, quantization=quantization, force=force)
+    # 파인튜닝 저장소에는 fast 토크나이저 파일이 없는 경우가 있어 프로세서로 다시 저장
+    AutoProcessor.from_pretrained(model_name).save_pretrained(output_dir)
+    logging.info(f"✅ [ASR] 체크포인트 변환 완료: {output_dir}")
+    return output_dir
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    parser = argparse.ArgumentParser(description="Whisper 체크포인트를 CTranslate2 형식으로 변환")
+    parser.add_argument("--model", default=ASR_MODEL_NAME, help="Hugging Face 모델 이름 또는 경로")
+    parser.add_argument("--output", default=ASR_CT2_DIR, help="변환 결과 디렉터리")
+    parser.add_argument("--quantization", default="int8", help="int8, int8_float32, float16, float32 등")
+    parser.add_argument("--force", action="store_true", help="출력 디렉터리가 있으면 덮어쓰기")
+    args = parser.parse_args()
+    convert_checkpoint(args.output, args.model, args.quantization, args.force)
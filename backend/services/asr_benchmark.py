@@ -0,0 +1,131 @@
+"""
+ASR 백엔드 정확도/속도 비교.
+
+매니페스트(JSONL, 한 줄에 {"audio": 오디오 경로, "text": 정답 전사})의 샘플을 백엔드별로 전사해
+WER/CER(정답 대비 오류율)과 RTF(처리 시간 / 오디오 길이, 1보다 작으면 실시간보다 빠름)를 출력합니다.
+첫 번째 백엔드를 기준으로 다른 백엔드의 WER 차이가 --max-wer-delta를 넘으면 종료 코드 1로 끝납니다.
+
+    python -m services.asr_benchmark --manifest data/asr/ko_samples.jsonl --backends transformers,ct2
+"""
+import argparse
+import json
+import logging
+import re
+import sys
+import time
+from typing import Any, Dict, List, Sequence
+
+from services.asr_backends import create_backend
+from services.voiceService import ASR_BATCH_SIZE, SAMPLE_RATE, decode_audio, transcribe_segments
+
+
+def normalize_text(text: str) -> str:
+    """문장부호를 지우고 공백을 하나로 정리합니다. (오류율 계산용)"""
+    text = re.sub(r"[^\w\s]", " ", text.lower())
+    return " ".join(text.split())
+
+
+def edit_distance(reference: Sequence[str], hypothesis: Sequence[str]) -> int:
+    previous = list(range(len(hypothesis) + 1))
+    for i, ref_token in enumerate(reference, 1):
+        current = [i] + [0] * len(hypothesis)
+        for j, hyp_token in enumerate(hypothesis, 1):
+            current[j] = min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + (ref_token != hyp_token))
+        previous = current
+    return previous[-1]
+
+
+def error_counts(reference: str, hypothesis: str) -> Dict[str, int]:
+    """단어(띄어쓰기 단위)와 글자(공백 제외) 단위 편집 거리 및 정답 길이"""
+    reference, hypothesis = normalize_text(reference), normalize_text(hypothesis)
+    ref_chars, hyp_chars = reference.replace(" ", ""), hypothesis.replace(" ", "")
+    return {
+        "word_errors": edit_distance(reference.split(), hypothesis.split()),
+        "words": len(reference.split()),
+        "char_errors": edit_distance(ref_chars, hyp_chars),
+        "chars": len(ref_chars)
+    }
+
+
+def load_manifest(path: str) -> List[Dict[str, str]]:
+    with open(path, "r", encoding="utf-8") as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def benchmark_backend(name: str, samples: List[Dict[str, Any]], batch_size: int = ASR_BATCH_SIZE) -> Dict[str, Any]:
+    """
+    samples({"audio", "text", "waveform"})를 전사해 오류율과 RTF를 계산합니다.
+    모델 로딩과 첫 추론(워밍업)은 RTF에서 제외합니다.
+    """
+    started = time.perf_counter()
+    backend = create_backend(name)
+    load_seconds = time.perf_counter() - started
+    try:
+        # 워밍업은 VAD를 거치지 않고 백엔드에 1초 분량을 직접 넣음 (첫 1초가 무음이어도 모델이 실행되도록)
+        backend.transcribe_batch([samples[0]["waveform"][:SAMPLE_RATE]], SAMPLE_RATE, 1)
+
+        totals = {"word_errors": 0, "words": 0, "char_errors": 0, "chars": 0}
+        audio_seconds = 0.0
+        compute_seconds = 0.0
+        for sample in samples:
+            started = time.perf_counter()
+            result = transcribe_segments(sample["waveform"], batch_size, backend)
+            compute_seconds += time.perf_counter() - started
+            audio_seconds += len(sample["waveform"]) / SAMPLE_RATE
+            for key, value in error_counts(sample["text"], result["text"]).items():
+                totals[key] += value
+            logging.info("[%s] %s: %s", name, sample["audio"], result["text"][:60])
+    finally:
+        backend.close()
+
+    return {
+        "backend": name,
+        "samples": len(samples),
+        "wer": round(totals["word_errors"] / max(totals["words"], 1), 4),
+        "cer": round(totals["char_errors"] / max(totals["chars"], 1), 4),
+        "audio_seconds": round(audio_seconds, 1),
+        "compute_seconds": round(compute_seconds, 1),
+        "rtf": round(compute_seconds / max(audio_seconds, 1e-9), 3),
+        "load_seconds": round(load_seconds, 1)
+    }
+
+
+def main(argv: List[str] = None) -> int:
+    parser = argparse.ArgumentParser(description="ASR 백엔드 WER/RTF 비교")
+    parser.add_argument("--manifest", required=True, help='JSONL: {"audio": 경로, "text": 정답 전사}')
+    parser.add_argument("--backends", default="transformers,ct2", help="쉼표로 구분한 백엔드 이름 (첫 번째가 기준)")
+    parser.add_argument("--batch-size", type=int, default=ASR_BATCH_SIZE)
+    parser.add_argument("--max-wer-delta", type=float, default=0.02, help="기준 대비 허용하는 WER 증가량")
+    args = parser.parse_args(argv)
+
+    samples = load_manifest(args.manifest)
+    if not samples:
+        parser.error("매니페스트에 샘플이 없습니다")
+    for sample in samples:
+        sample["waveform"] = decode_audio(sample["audio"])
+
+    reports = [benchmark_backend(name.strip(), samples, args.batch_size)
+               for name in args.backends.split(",") if name.strip()]
+
+    print(f"{'backend':<14}{'WER':>8}{'CER':>8}{'RTF':>8}{'audio(s)':>10}{'compute(s)':>12}{'load(s)':>9}")
+    for report in reports:
+        print(f"{report['backend']:<14}{report['wer']:>8.3f}{report['cer']:>8.3f}{report['rtf']:>8.3f}"
+              f"{report['audio_seconds']:>10.1f}{report['compute_seconds']:>12.1f}{report['load_seconds']:>9.1f}")
+
+    baseline = reports[0]
+    failed = False
+    for report in reports[1:]:
+        delta = report["wer"] - baseline["wer"]
+        if delta > args.max_wer_delta:
+            print(f"❌ {report['backend']} WER이 {baseline['backend']}보다 {delta:.3f} 높습니다 "
+                  f"(허용 {args.max_wer_delta:.3f})")
+            failed = True
+    for report in reports:
+        if report["rtf"] >= 1.0:
+            print(f"⚠️ {report['backend']}는 실시간보다 느립니다 (RTF {report['rtf']:.2f})")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    sys.exit(main())
@@ -29,4 +29,27 @@ def chunk_text(text: str, chunk_size: int = 1000, chunk_overlap: int = 200) -> l
         return chunks
     except Exception as e:
         logging.error(f"❌ 텍스트 청킹 중 오류 발생: {str(e)}")
-        raise RuntimeError("텍스트 청킹 중 오류가 발생했습니다.") 
\ No newline at end of file
+        raise RuntimeError("텍스트 청킹 중 오류가 발생했습니다.") 
+
+def chunk_text_with_offsets(text: str, chunk_size: int = 1000, chunk_overlap: int = 200) -> list[tuple[int, str]]:
+    """
+    chunk_text와 같은 규칙으로 분할하되, 각 청크가 원문에서 시작하는 문자 위치를 함께 반환합니다.
+
+    Returns:
+        list[tuple[int, str]]: (시작 위치, 청크) 리스트
+    """
+    try:
+        text_splitter = RecursiveCharacterTextSplitter(
+            chunk_size=chunk_size,
+            chunk_overlap=chunk_overlap,
+            length_function=len,
+            separators=["\n\n", "\n", ".", " ", ""],
+            add_start_index=True
+        )
+        documents = text_splitter.create_documents([text])
+        chunks = [(doc.metadata.get("start_index", 0), doc.page_content) for doc in documents]
+        logging.info(f"✅ 텍스트가 {len(chunks)}개의 청크로 분할되었습니다.")
+        return chunks
+    except Exception as e:
+        logging.error(f"❌ 텍스트 청킹 중 오류 발생: {str(e)}")
+        raise RuntimeError("텍스트 청킹 중 오류가 발생했습니다.")
@@ -7,6 +7,7 @@ import logging
 import os
 import uuid
 from typing import List, Dict, Optional
+from services import metrics_service, tracing
 
 # ================================================
 # Qdrant 및 KoE5 임베딩 모델 초기화
@@ -38,6 +39,7 @@ def get_collection_name(brain_id: str) -> str:
     return f"brain_{brain_id}"
 
 
+@tracing.traced("embedding.initialize_collection")
 def initialize_collection(brain_id: str) -> None:
     """
     Qdrant에서 기존 컬렉션을 삭제하고 새로 생성합니다.
@@ -70,6 +72,7 @@ def initialize_collection(brain_id: str) -> None:
         raise RuntimeError(f"컬렉션 생성 실패: {str(e)}")
 
 
+@tracing.traced("embedding.encode")
 def encode_text(text: str) -> List[float]:
     """
     주어진 텍스트를 KoE5 모델로 임베딩하여 벡터 반환
@@ -93,6 +96,16 @@ def encode_text(text: str) -> List[float]:
         raise RuntimeError(f"텍스트 임베딩 생성 실패: {str(e)}")
 
 
+# description 하나당 저장하는 표현 포맷 (포맷 수만큼 벡터가 생성됨)
+EMBEDDING_FORMATS = [
+    "{name}는 {label}이다. {description}",
+    "{name} ({label}): {description}",
+    "{label}인 {name}에 대한 설명: {description}",
+    "{description}"
+]
+
+
+@tracing.traced("embedding.upsert_nodes")
 def update_index_and_get_embeddings(nodes: List[Dict], brain_id: str) -> Dict[str, List[List[float]]]:
     """
     노드 목록을 여러 표현 포맷으로 임베딩하고 Qdrant에 저장
@@ -112,14 +125,8 @@ def update_index_and_get_embeddings(nodes: List[Dict], brain_id: str) -> Dict[st
     """
     collection_name = get_collection_name(brain_id)
     all_embeddings: Dict[str, List[List[float]]] = {}
-
-    # 사용할 표현 포맷 정의
-    formats = [
-        "{name}는 {label}이다. {description}",
-        "{name} ({label}): {description}",
-        "{label}인 {name}에 대한 설명: {description}",
-        "{description}"
-    ]
+    formats = EMBEDDING_FORMATS
+    vectors = 0
 
     for node in nodes:
         # 필수 키 확인
@@ -169,13 +176,17 @@ def update_index_and_get_embeddings(nodes: List[Dict], brain_id: str) -> Dict[st
                     ]
                 )
                 logging.info("노드 %s descriptor %d 저장 완료(UUID: %s)", source_id, idx, pid)
+                metrics_service.INGEST_VECTORS.inc()
+                vectors += 1
 
         all_embeddings[source_id] = embeddings_for_node
 
+    tracing.current_span().set_attributes(nodes=len(nodes), vectors=vectors)
     logging.info("컬렉션 %s에 %d개의 노드 임베딩 저장 완료", collection_name, len(all_embeddings))
     return all_embeddings
 
 
+@tracing.traced("embedding.search")
 def search_similar_nodes(
     embedding: List[float],
     brain_id: str,
@@ -247,6 +258,7 @@ def search_similar_nodes(
 
         # 그룹핑된 엔트리를 점수 내림차순으로 정렬, limit만큼 선택
         top_grouped = sorted(grouped.values(), key=lambda x: -x["score"])[:limit]
+        tracing.current_span().set_attribute("results", len(high_scores) + len(top_grouped))
 
         # 최종 반환: 고유사도(high_scores) + 그룹핑된 상위 결과
         return high_scores + top_grouped
@@ -302,6 +314,53 @@ def delete_node(source_id: str, brain_id: str) -> None:
         raise RuntimeError(f"노드 삭제 실패: {str(e)}")
 
 
+def copy_source_vectors(from_source_id: str, to_source_id: str, brain_id: str) -> int:
+    """from_source_id의 벡터를 다시 임베딩하지 않고 payload의 source_id만 바꿔 복사합니다.
+    (중복 업로드가 원본과 별개로 벡터를 갖게 되어 delete_node(원본)에도 남음)
+    Args:
+        from_source_id: 원본 source_id
+        to_source_id: 복사본에 붙일 source_id
+        brain_id: 브레인의 고유 식별자
+    Returns:
+        int: 복사한 벡터 수
+    Raises:
+        RuntimeError: 복사 실패 시
+    """
+    collection_name = get_collection_name(brain_id)
+    source_filter = models.Filter(
+        must=[models.FieldCondition(key="source_id", match=models.MatchValue(value=str(from_source_id)))]
+    )
+    copied = 0
+    offset = None
+    try:
+        while True:
+            points, offset = client.scroll(
+                collection_name=collection_name,
+                scroll_filter=source_filter,
+                limit=256,
+                offset=offset,
+                with_payload=True,
+                with_vectors=True
+            )
+            copies = []
+            for point in points:
+                # 원본 point ID 기준 uuid5라 여러 번 호출해도 같은 복사본에 덮어씀
+                pid = str(uuid.uuid5(uuid.NAMESPACE_DNS, f"{to_source_id}_{point.id}"))
+                payload = {**(point.payload or {}), "source_id": str(to_source_id), "point_id": pid}
+                copies.append(models.PointStruct(id=pid, vector=point.vector, payload=payload))
+            if copies:
+                client.upsert(collection_name=collection_name, points=copies)
+                copied += len(copies)
+            if offset is None:
+                break
+        logging.info("컬렉션 %s에서 source_id %s → %s 벡터 %d개 복사 완료",
+                     collection_name, from_source_id, to_source_id, copied)
+        return copied
+    except Exception as e:
+        logging.error("source_id %s 벡터 복사 실패: %s", from_source_id, str(e))
+        raise RuntimeError(f"벡터 복사 실패: {str(e)}")
+
+
 def delete_collection(brain_id: str) -> None:
     """벡터 데이터베이스에서 컬렉션을 삭제합니다.
     Args:
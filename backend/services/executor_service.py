@@ -0,0 +1,139 @@
+"""
+async 라우트에서 블로킹 작업을 이벤트 루프 밖에서 실행하기 위한 전용 실행기.
+
+- CPU 풀: 임베딩(KoE5) 등 모델 추론. 모델 자체가 여러 스레드를 쓰므로 작게 유지합니다.
+- ASR 풀: Whisper 전사 전용 단일 스레드. 전사는 한 번에 하나씩(voiceService._asr_lock)만 실행되므로
+  CPU 풀에서 돌리면 대기 중인 전사들이 워커를 모두 차지해 질문 임베딩(encode_text)까지 막힙니다.
+- I/O 풀: SQLite, Qdrant, OpenAI 호출, ffmpeg 등 대기 시간이 대부분인 작업.
+
+사용 예:
+    embedding = await run_cpu(embedding_service.encode_text, question)
+    result = await run_asr(voiceService.transcribe_segments, waveform)
+    answer = await run_io(ai_service.generate_answer, schema_text, question)
+"""
+import asyncio
+import contextvars
+import functools
+import logging
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, Optional, TypeVar
+
+T = TypeVar("T")
+
+# 풀 크기 (환경 변수로 조정 가능)
+CPU_WORKERS = int(os.getenv("BRAINTRACE_CPU_WORKERS", max(1, min(2, os.cpu_count() or 1))))
+IO_WORKERS = int(os.getenv("BRAINTRACE_IO_WORKERS", 16))
+
+
+class ManagedExecutor:
+    """
+    크기가 고정된 ThreadPoolExecutor 래퍼.
+    대기열 길이, 실행 중인 작업 수, 누적 완료/실패 수와 대기·실행 시간을 집계합니다.
+    """
+
+    def __init__(self, name: str, max_workers: int):
+        self.name = name
+        self.max_workers = max_workers
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._lock = threading.Lock()
+        self.running = 0
+        self.completed = 0
+        self.failed = 0
+        self.total_wait = 0.0
+        self.total_run = 0.0
+        self.max_wait = 0.0
+
+    def _get_executor(self) -> ThreadPoolExecutor:
+        if self._executor is None:
+            with self._lock:
+                if self._executor is None:
+                    self._executor = ThreadPoolExecutor(max_workers=self.max_workers,
+                                                        thread_name_prefix=f"braintrace-{self.name}")
+        return self._executor
+
+    def _call(self, ctx: contextvars.Context, func: Callable[[], T], submitted: float) -> T:
+        started = time.perf_counter()
+        wait = started - submitted
+        with self._lock:
+            self.running += 1
+            self.total_wait += wait
+            self.max_wait = max(self.max_wait, wait)
+        ok = False
+        try:
+            result = ctx.run(func)
+            ok = True
+            return result
+        finally:
+            elapsed = time.perf_counter() - started
+            with self._lock:
+                self.running -= 1
+                self.total_run += elapsed
+                if ok:
+                    self.completed += 1
+                else:
+                    self.failed += 1
+
+    async def run(self, func: Callable[..., T], *args: Any, **kwargs: Any) -> T:
+        """func(*args, **kwargs)를 풀에서 실행하고 결과를 기다립니다. (contextvars 전달)"""
+        loop = asyncio.get_running_loop()
+        call = functools.partial(func, *args, **kwargs)
+        ctx = contextvars.copy_context()
+        return await loop.run_in_executor(self._get_executor(), self._call, ctx, call, time.perf_counter())
+
+    def queue_depth(self) -> int:
+        """아직 워커를 배정받지 못하고 대기 중인 작업 수"""
+        executor = self._executor
+        return executor._work_queue.qsize() if executor is not None else 0
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            finished = self.completed + self.failed
+            return {
+                "max_workers": self.max_workers,
+                "queued": self.queue_depth(),
+                "running": self.running,
+                "completed": self.completed,
+                "failed": self.failed,
+                "avg_wait_ms": round(self.total_wait / finished * 1000, 2) if finished else 0.0,
+                "max_wait_ms": round(self.max_wait * 1000, 2),
+                "avg_run_ms": round(self.total_run / finished * 1000, 2) if finished else 0.0,
+            }
+
+    def shutdown(self, wait: bool = True) -> None:
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=wait, cancel_futures=True)
+
+
+cpu_executor = ManagedExecutor("cpu", CPU_WORKERS)
+asr_executor = ManagedExecutor("asr", 1)
+io_executor = ManagedExecutor("io", IO_WORKERS)
+
+
+async def run_cpu(func: Callable[..., T], *args: Any, **kwargs: Any) -> T:
+    """모델 추론 등 CPU를 오래 점유하는 작업을 CPU 풀에서 실행합니다."""
+    return await cpu_executor.run(func, *args, **kwargs)
+
+
+async def run_asr(func: Callable[..., T], *args: Any, **kwargs: Any) -> T:
+    """음성 전사(Whisper 로딩/추론)를 전용 ASR 스레드에서 실행합니다. (CPU 풀의 임베딩과 분리)"""
+    return await asr_executor.run(func, *args, **kwargs)
+
+
+async def run_io(func: Callable[..., T], *args: Any, **kwargs: Any) -> T:
+    """DB/네트워크/외부 프로세스 등 블로킹 I/O 작업을 I/O 풀에서 실행합니다."""
+    return await io_executor.run(func, *args, **kwargs)
+
+
+def executor_stats() -> Dict[str, Dict[str, Any]]:
+    return {"cpu": cpu_executor.stats(), "asr": asr_executor.stats(), "io": io_executor.stats()}
+
+
+def shutdown_executors(wait: bool = True) -> None:
+    for executor in (cpu_executor, asr_executor, io_executor):
+        executor.shutdown(wait=wait)
+    logging.info("🛑 작업 실행기 종료 완료")
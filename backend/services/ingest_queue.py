@@ -0,0 +1,185 @@
+"""
+SQLite에 저장되는 백그라운드 수집(ingest) 작업 큐와 워커.
+
+작업은 IngestJob 테이블에 쌓이고 INGEST_WORKERS개의 워커 태스크가 순서대로 가져가 처리합니다.
+단계: chunking → extracting(청크별 LLM 추출) → graph(Neo4j 저장) → embedding(벡터 DB) → done
+청크 추출 결과와 임베딩 진행도는 단계마다 DB에 기록되므로, 서버가 중간에 죽거나 작업이 실패해도
+다시 실행하면 마지막으로 끝난 청크(또는 임베딩 묶음) 다음부터 이어서 처리합니다.
+"""
+import asyncio
+import logging
+import os
+from typing import Any, Dict, List, Optional
+
+from services import ai_service, ingest_service
+from services.executor_service import run_io
+from sqlite_db.sqlite_handler import SQLiteHandler
+
+INGEST_WORKERS = int(os.getenv("BRAINTRACE_INGEST_WORKERS", 2))
+INGEST_POLL_INTERVAL = 5.0        # 알림이 없을 때 대기열을 다시 확인하는 간격 (초)
+EMBED_BATCH_SIZE = 20             # 임베딩 진행도를 기록하는 노드 묶음 크기
+
+db = SQLiteHandler()
+
+_wakeup: Optional[asyncio.Event] = None
+_workers: List[asyncio.Task] = []
+_job_events: Dict[int, asyncio.Event] = {}
+
+
+def _notify(job_id: int) -> None:
+    """작업 상태가 바뀌었음을 SSE 구독자에게 알림"""
+    event = _job_events.pop(job_id, None)
+    if event is not None:
+        event.set()
+
+
+def subscribe(job_id: int) -> asyncio.Event:
+    """
+    작업의 다음 상태 변경 때 set되는 Event를 반환합니다.
+    상태를 조회하기 전에 구독해야 조회와 대기 사이의 변경을 놓치지 않습니다.
+    """
+    return _job_events.setdefault(job_id, asyncio.Event())
+
+
+async def _update(job_id: int, **fields) -> None:
+    await run_io(db.update_ingest_job, job_id, **fields)
+    _notify(job_id)
+
+
+async def enqueue(kind: str, brain_id: str, source_id: str, payload: Optional[str] = None) -> Dict[str, Any]:
+    """작업을 대기열에 추가하고 워커를 깨웁니다."""
+    job = await run_io(db.create_ingest_job, kind, brain_id, source_id, payload)
+    if _wakeup is not None:
+        _wakeup.set()
+    return job
+
+
+async def retry(job_id: int) -> bool:
+    """실패한 작업을 마지막 완료 지점부터 다시 실행하도록 대기열에 넣습니다."""
+    requeued = await run_io(db.requeue_ingest_jobs, job_id) > 0
+    if requeued:
+        _notify(job_id)
+        if _wakeup is not None:
+            _wakeup.set()
+    return requeued
+
+
+async def _build_chunks(job: Dict[str, Any]) -> List[ingest_service.Chunk]:
+    if job["kind"] == "text":
+        return ingest_service.text_chunks(job["payload"] or "")
+    if job["kind"] == "pdf":
+        pdf = await run_io(db.get_pdf, int(job["source_id"]))
+        if not pdf:
+            raise ValueError(f"존재하지 않는 PDF ID: {job['source_id']}")
+        chunks, _ = await ingest_service.pdf_chunks(pdf["pdf_path"])
+        return chunks
+    raise ValueError(f"지원하지 않는 작업 종류: {job['kind']}")
+
+
+async def _extract_pending_chunks(job_id: int, source_id: str, chunks: List[Dict[str, Any]]) -> None:
+    """아직 결과가 없는 청크만 LLM으로 추출하고, 끝나는 대로 결과와 진행도를 기록합니다."""
+    semaphore = asyncio.Semaphore(ingest_service.INGEST_LLM_CONCURRENCY)
+
+    async def extract(chunk: Dict[str, Any]) -> None:
+        async with semaphore:
+            nodes, edges = await run_io(ai_service.extract_chunk_components,
+                                        chunk["text"], source_id, chunk["provenance"])
+            chunk["result"] = {"nodes": nodes, "edges": edges}
+            await run_io(db.save_ingest_chunk_result, job_id, chunk["chunk_index"], chunk["result"])
+            _notify(job_id)
+
+    await asyncio.gather(*(extract(chunk) for chunk in chunks if chunk["result"] is None))
+
+
+async def process_job(job: Dict[str, Any]) -> None:
+    with ingest_service.ingest_span("ingest.job", job_id=job["job_id"], kind=job["kind"],
+                                    brain_id=job["brain_id"], source_id=job["source_id"]):
+        await _process_job(job)
+
+
+async def _process_job(job: Dict[str, Any]) -> None:
+    job_id = job["job_id"]
+    brain_id = job["brain_id"]
+    source_id = job["source_id"]
+
+    # 1) 청킹 (재개 시에는 저장된 청크를 그대로 사용)
+    chunks = await run_io(db.get_ingest_chunks, job_id)
+    if not chunks:
+        await _update(job_id, stage="chunking")
+        built = await _build_chunks(job)
+        await run_io(db.save_ingest_chunks, job_id, built)
+        chunks = await run_io(db.get_ingest_chunks, job_id)
+    logging.info("수집 작업 %s: 청크 %d개 (완료 %d개)", job_id, len(chunks),
+                 sum(1 for chunk in chunks if chunk["result"] is not None))
+
+    # 2) 청크별 노드/엣지 추출
+    await _update(job_id, stage="extracting")
+    await _extract_pending_chunks(job_id, source_id, chunks)
+    nodes, edges = ai_service.merge_graph_components(
+        [(chunk["result"]["nodes"], chunk["result"]["edges"]) for chunk in chunks]
+    )
+
+    # 3) Neo4j 저장 (MERGE이므로 재실행해도 안전)
+    await _update(job_id, stage="graph", total_nodes=len(nodes))
+    await ingest_service.store_graph(nodes, edges, brain_id)
+    await _update(job_id, nodes_written=len(nodes))
+
+    # 4) 임베딩: 묶음마다 진행도를 기록하고, 재개 시 이미 끝난 묶음은 건너뜀
+    await _update(job_id, stage="embedding")
+    done_nodes = job.get("nodes_embedded", 0) or 0
+    vectors = job.get("vectors_upserted", 0) or 0
+    for start in range(done_nodes, len(nodes), EMBED_BATCH_SIZE):
+        batch = nodes[start:start + EMBED_BATCH_SIZE]
+        vectors += await ingest_service.embed_nodes(batch, brain_id)
+        await _update(job_id, nodes_embedded=start + len(batch), vectors_upserted=vectors)
+
+    await ingest_service.mark_ingested(source_id)
+    await _update(job_id, status="done", stage="done")
+    await run_io(db.delete_ingest_chunks, job_id)
+    logging.info("✅ 수집 작업 %s 완료: 노드 %d개, 엣지 %d개, 벡터 %d개", job_id, len(nodes), len(edges), vectors)
+
+
+async def _worker(index: int) -> None:
+    logging.info("수집 워커 %d 시작", index)
+    while True:
+        try:
+            job = await run_io(db.claim_ingest_job)
+        except Exception as e:
+            logging.error("수집 작업 할당 실패: %s", e)
+            job = None
+        if job is None:
+            _wakeup.clear()
+            try:
+                await asyncio.wait_for(_wakeup.wait(), INGEST_POLL_INTERVAL)
+            except asyncio.TimeoutError:
+                pass
+            continue
+
+        _notify(job["job_id"])
+        try:
+            await process_job(job)
+        except asyncio.CancelledError:
+            # 서버 종료: running 상태로 남겨 두면 다음 기동 시 다시 대기열에 들어감
+            raise
+        except Exception as e:
+            logging.exception("❌ 수집 작업 %s 실패", job["job_id"])
+            await _update(job["job_id"], status="failed", error=str(e))
+
+
+async def start_workers(count: int = INGEST_WORKERS) -> None:
+    """서버 시작 시 중단된 작업을 되돌리고 워커 태스크를 띄웁니다."""
+    global _wakeup
+    _wakeup = asyncio.Event()
+    requeued = await run_io(db.requeue_ingest_jobs)
+    if requeued:
+        logging.info("중단된 수집 작업 %d개를 다시 대기열에 넣었습니다", requeued)
+    for index in range(count):
+        _workers.append(asyncio.create_task(_worker(index)))
+    _wakeup.set()
+
+
+async def stop_workers() -> None:
+    for task in _workers:
+        task.cancel()
+    await asyncio.gather(*_workers, return_exceptions=True)
+    _workers.clear()
@@ -0,0 +1,192 @@
+"""
+소스(텍스트/PDF)를 지식 그래프와 벡터 DB에 반영하는 수집 파이프라인.
+
+process_text는 클라이언트가 보낸 텍스트를, ingest_pdf는 서버에 저장된 PDF 파일을
+직접 읽어 같은 단계(청킹 → 노드/엣지 추출 → Neo4j 저장 → 임베딩)를 거칩니다.
+PDF에서 추출한 description에는 출처 페이지 범위("pages": [시작, 끝])가 함께 기록됩니다.
+각 단계는 tracing 스팬으로 기록되고, 수집 한 건이 끝나면 단계별 누적 시간이 "ingest timing" 로그로 남습니다.
+"""
+import asyncio
+import json
+import logging
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+from neo4j_db.AsyncNeo4jHandler import AsyncNeo4jHandler
+from services import ai_service, embedding_service, tracing
+from services.chunk_service import chunk_text_with_offsets
+from services.executor_service import run_cpu, run_io
+from services.pdf_service import iter_pdf_pages, join_pages, page_at
+from sqlite_db.sqlite_handler import SQLiteHandler
+
+INGEST_CHUNK_SIZE = 1000
+INGEST_CHUNK_OVERLAP = 200
+INGEST_LLM_CONCURRENCY = 4         # 한 소스에서 동시에 보낼 LLM 추출 요청 수
+CHUNKING_THRESHOLD = 2000          # 이보다 짧은 텍스트는 청킹하지 않음 (extract_graph_components와 같은 기준)
+
+Chunk = Tuple[str, Optional[Dict[str, Any]]]   # (청크 텍스트, 출처 정보)
+
+
+@contextmanager
+def ingest_span(name: str, **attributes) -> Iterator[tracing.Span]:
+    """
+    수집 한 건 전체를 감싸는 루트 스팬.
+    끝나면 하위 스팬별 누적 시간을 로그 한 줄로 남기므로, 추적을 내보내지 않는 기본 설정에서도
+    문서 하나가 어느 단계(LLM 추출, Neo4j 저장, 임베딩 등)에서 오래 걸렸는지 확인할 수 있습니다.
+    """
+    root = None
+    try:
+        with tracing.span(name, **attributes) as root:
+            yield root
+    finally:
+        if root is not None:
+            logging.info("ingest timing: %s", json.dumps({
+                "name": name, **root.attributes, "status": root.status,
+                "total_s": round(root.elapsed, 4), "stages_s": root.stage_seconds
+            }, ensure_ascii=False, default=str))
+
+
+@tracing.traced("ingest.chunk")
+def text_chunks(text: str) -> List[Chunk]:
+    """텍스트 소스를 청크 목록으로 나눕니다."""
+    if len(text) < CHUNKING_THRESHOLD:
+        chunks = [(text, None)]
+    else:
+        chunks = [(chunk, None) for _, chunk in chunk_text_with_offsets(text, INGEST_CHUNK_SIZE, INGEST_CHUNK_OVERLAP)]
+    tracing.current_span().set_attributes(chars=len(text), chunks=len(chunks))
+    return chunks
+
+
+@tracing.traced("ingest.pdf_chunks")
+async def pdf_chunks(pdf_path: str) -> Tuple[List[Chunk], int]:
+    """
+    PDF를 페이지별로 추출해 청크 목록으로 나눕니다. 각 청크에는 출처 페이지 범위가 붙습니다.
+    Returns:
+        (청크 목록, 페이지 수)
+    """
+    pages = [(page_no, text) async for page_no, text in iter_pdf_pages(pdf_path)]
+    text, offsets = join_pages(pages)
+    logging.info("PDF 텍스트 추출 완료: %s, %d페이지, %d자", pdf_path, len(pages), len(text))
+    if not text.strip():
+        return [], len(pages)
+
+    chunks = []
+    for start, chunk in chunk_text_with_offsets(text, INGEST_CHUNK_SIZE, INGEST_CHUNK_OVERLAP):
+        first_page = page_at(offsets, start)
+        last_page = page_at(offsets, start + max(len(chunk) - 1, 0))
+        chunks.append((chunk, {"pages": [first_page, last_page]}))
+    tracing.current_span().set_attributes(pages=len(pages), chars=len(text), chunks=len(chunks))
+    return chunks, len(pages)
+
+
+async def store_graph(nodes: List[Dict], edges: List[Dict], brain_id: str) -> None:
+    """노드/엣지를 Neo4j에 저장합니다. (MERGE이므로 다시 실행해도 중복되지 않음)"""
+    neo4j_handler = AsyncNeo4jHandler()
+    await neo4j_handler.insert_nodes_and_edges(nodes, edges, brain_id)
+    logging.info("Neo4j에 노드와 엣지 삽입 완료")
+
+
+def count_vectors(nodes: List[Dict]) -> int:
+    """노드 목록을 임베딩할 때 저장되는 벡터 수"""
+    descriptions = sum(1 for node in nodes for desc in node.get("descriptions", []) if desc.get("description"))
+    return descriptions * len(embedding_service.EMBEDDING_FORMATS)
+
+
+@tracing.traced("ingest.embed")
+async def embed_nodes(nodes: List[Dict], brain_id: str) -> int:
+    """
+    노드를 벡터 DB에 임베딩합니다. (point ID가 내용 기반이므로 다시 실행해도 중복되지 않음)
+    Returns:
+        int: upsert한 벡터 수
+    """
+    if not await run_io(embedding_service.is_index_ready, brain_id):
+        await run_io(embedding_service.initialize_collection, brain_id)
+    # 모델 추론이 포함되므로 CPU 풀
+    await run_cpu(embedding_service.update_index_and_get_embeddings, nodes, brain_id)
+    return count_vectors(nodes)
+
+
+async def mark_ingested(source_id: str) -> None:
+    """같은 내용의 재업로드가 다시 추출/임베딩되지 않도록 반영 완료 표시"""
+    if str(source_id).isdigit():
+        await run_io(SQLiteHandler().mark_source_ingested, int(source_id))
+
+
+@tracing.traced("ingest.adopt_duplicate")
+async def adopt_duplicate(brain_id: str, source_id: str, duplicate_of: str) -> None:
+    """
+    같은 내용이 이미 반영되어 추출을 생략한 소스에 원본(duplicate_of)의 description과 벡터를 복사합니다.
+    LLM 추출/임베딩 없이 복사만 하며, 이후 원본과 중복 소스는 각각 삭제해도 서로의 그래프/벡터에 영향이 없습니다.
+    """
+    if str(source_id) == str(duplicate_of):
+        return
+    nodes = await AsyncNeo4jHandler().copy_descriptions_by_source_id(str(duplicate_of), str(source_id), brain_id)
+    vectors = 0
+    if await run_io(embedding_service.is_index_ready, brain_id):
+        vectors = await run_io(embedding_service.copy_source_vectors, str(duplicate_of), str(source_id), brain_id)
+    tracing.current_span().set_attributes(nodes=nodes, vectors=vectors)
+    await mark_ingested(source_id)
+
+
+async def save_graph_components(nodes: List[Dict], edges: List[Dict], brain_id: str, source_id: str) -> None:
+    """추출한 노드/엣지를 Neo4j에 저장하고 벡터 DB에 임베딩한 뒤 소스를 반영 완료로 표시합니다."""
+    await store_graph(nodes, edges, brain_id)
+    await embed_nodes(nodes, brain_id)
+    logging.info("벡터 DB에 노드 임베딩 저장 완료")
+    await mark_ingested(source_id)
+
+
+@tracing.traced("ingest.extract")
+async def extract_chunks(chunks: List[Chunk], source_id: str) -> Tuple[List[Dict], List[Dict]]:
+    """
+    (청크, 출처 정보) 목록에서 노드/엣지를 추출합니다.
+    LLM 요청은 INGEST_LLM_CONCURRENCY개까지 동시에 보내고, 결과는 청크 순서대로 합칩니다.
+    """
+    semaphore = asyncio.Semaphore(INGEST_LLM_CONCURRENCY)
+
+    async def extract(index: int, chunk: str, provenance: Optional[Dict[str, Any]]):
+        async with semaphore:
+            logging.info(f"청크 {index}/{len(chunks)} 처리 중...")
+            return await run_io(ai_service.extract_chunk_components, chunk, source_id, provenance)
+
+    results = await asyncio.gather(*(
+        extract(index, chunk, provenance) for index, (chunk, provenance) in enumerate(chunks, 1)
+    ))
+    return ai_service.merge_graph_components(results)
+
+
+async def ingest_pdf(pdf_id: int, brain_id: Optional[str] = None) -> Dict[str, Any]:
+    """
+    저장된 PDF를 서버에서 페이지별로 추출해 그래프/벡터 DB에 반영합니다.
+
+    Args:
+        pdf_id: Pdf 테이블 ID (그래프의 source_id로 사용)
+        brain_id: 반영할 브레인 ID (생략하면 PDF의 brain_id)
+    Returns:
+        {"pdf_id", "brain_id", "pages", "chunks", "nodes", "edges"}
+    """
+    db = SQLiteHandler()
+    pdf = await run_io(db.get_pdf, pdf_id)
+    if not pdf:
+        raise ValueError(f"존재하지 않는 PDF ID: {pdf_id}")
+    brain_id = str(brain_id or pdf["brain_id"])
+    source_id = str(pdf_id)
+
+    with ingest_span("ingest.pdf", brain_id=brain_id, source_id=source_id):
+        # Step 1~2: 페이지별 텍스트 추출(프로세스 풀) 및 청킹 (청크 위치로 출처 페이지 범위 계산)
+        chunks, page_total = await pdf_chunks(pdf["pdf_path"])
+        if not chunks:
+            return {"pdf_id": pdf_id, "brain_id": brain_id, "pages": page_total, "chunks": 0, "nodes": [], "edges": []}
+
+        # Step 3: 노드/엣지 추출 → Step 4: 저장 및 임베딩
+        nodes, edges = await extract_chunks(chunks, source_id)
+        await save_graph_components(nodes, edges, brain_id, source_id)
+
+    return {
+        "pdf_id": pdf_id,
+        "brain_id": brain_id,
+        "pages": page_total,
+        "chunks": len(chunks),
+        "nodes": nodes,
+        "edges": edges
+    }
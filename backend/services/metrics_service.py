@@ -0,0 +1,234 @@
+"""
+프로세스 내 지표(히스토그램/카운터)와 Prometheus 텍스트 형식 출력.
+
+외부 라이브러리 없이 레이블별 누적 값만 메모리에 유지하며, GET /metrics가 render()의 결과를 그대로 반환합니다.
+(text/plain; version=0.0.4 — Prometheus가 스크랩해 histogram_quantile로 p95 등을 계산)
+"""
+import math
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, Iterator, List, Sequence, Tuple
+
+CONTENT_TYPE = "text/plain; version=0.0.4"
+
+# 기본 버킷: 5ms ~ 60s (LLM 호출까지 포함하는 구간 지연)
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 20.0, 30.0, 60.0)
+COUNT_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100, 200, 500, 1000)
+TOKEN_BUCKETS = (50, 100, 250, 500, 1000, 2000, 3000, 4000, 8000, 16000, 32000)
+
+LabelValues = Tuple[str, ...]
+
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str], extra: str = "") -> str:
+    parts = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+def _format_number(value: float) -> str:
+    if value == math.inf:
+        return "+Inf"
+    return repr(float(value)) if not float(value).is_integer() else str(int(value))
+
+
+class _Metric:
+    kind = ""
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+
+    def _key(self, labels: Dict[str, str]) -> LabelValues:
+        if set(labels) != set(self.labelnames):
+            raise ValueError(f"{self.name} 레이블이 맞지 않습니다: {sorted(labels)} (필요: {list(self.labelnames)})")
+        return tuple(str(labels[name]) for name in self.labelnames)
+
+    def _header(self) -> List[str]:
+        return [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+
+    def render(self) -> List[str]:
+        raise NotImplementedError
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        super().__init__(name, documentation, labelnames)
+        self._values: Dict[LabelValues, float] = {}
+
+    def inc(self, amount: float = 1.0, **labels) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def value(self, **labels) -> float:
+        """레이블 조합의 현재 누적 값 (기록된 적이 없으면 0)"""
+        key = self._key(labels)
+        with self._lock:
+            return self._values.get(key, 0.0)
+
+    def render(self) -> List[str]:
+        with self._lock:
+            items = list(self._values.items())
+        return self._header() + [
+            f"{self.name}{_format_labels(self.labelnames, key)} {_format_number(value)}" for key, value in items
+        ]
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                 buckets: Sequence[float] = LATENCY_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets)) + (math.inf,)
+        self._series: Dict[LabelValues, List[float]] = {}     # [버킷별 개수..., 합계]
+
+    def observe(self, value: float, **labels) -> None:
+        key = self._key(labels)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = [0.0] * (len(self.buckets) + 1)
+            for index, bound in enumerate(self.buckets):
+                if value <= bound:
+                    series[index] += 1
+                    break
+            series[-1] += value
+
+    def render(self) -> List[str]:
+        with self._lock:
+            items = [(key, list(series)) for key, series in self._series.items()]
+        lines = self._header()
+        for key, series in items:
+            cumulative = 0.0
+            for bound, count in zip(self.buckets, series):
+                cumulative += count
+                le = f'le="{_format_number(bound)}"'
+                lines.append(f"{self.name}_bucket{_format_labels(self.labelnames, key, le)} {_format_number(cumulative)}")
+            labels = _format_labels(self.labelnames, key)
+            lines.append(f"{self.name}_sum{labels} {_format_number(series[-1])}")
+            lines.append(f"{self.name}_count{labels} {_format_number(cumulative)}")
+        return lines
+
+    @contextmanager
+    def time(self, **labels) -> Iterator[None]:
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - started, **labels)
+
+
+class StageTimer:
+    """
+    요청 하나의 단계별 소요 시간을 히스토그램에 기록하고 구조화 로그용으로 함께 모아 둡니다.
+
+        timer = StageTimer(ANSWER_STAGE_SECONDS, brain_id=brain_id)
+        with timer.stage("embed"):
+            ...
+        timer.durations   # {"embed": 0.012, ...}
+    """
+
+    def __init__(self, histogram: Histogram, **labels):
+        self.histogram = histogram
+        self.labels = labels
+        self.durations: Dict[str, float] = {}
+        self.started = time.perf_counter()
+
+    @contextmanager
+    def stage(self, name: str) -> Iterator[None]:
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - started
+            self.durations[name] = round(self.durations.get(name, 0.0) + elapsed, 4)
+            self.histogram.observe(elapsed, stage=name, **self.labels)
+
+    @property
+    def elapsed(self) -> float:
+        return time.perf_counter() - self.started
+
+
+_registry: List[_Metric] = []
+_registry_lock = threading.Lock()
+
+
+def _register(metric: _Metric) -> _Metric:
+    with _registry_lock:
+        if any(existing.name == metric.name for existing in _registry):
+            raise ValueError(f"이미 등록된 지표 이름입니다: {metric.name}")
+        _registry.append(metric)
+    return metric
+
+
+def counter(name: str, documentation: str, labelnames: Sequence[str] = ()) -> Counter:
+    return _register(Counter(name, documentation, labelnames))
+
+
+def histogram(name: str, documentation: str, labelnames: Sequence[str] = (),
+              buckets: Sequence[float] = LATENCY_BUCKETS) -> Histogram:
+    return _register(Histogram(name, documentation, labelnames, buckets))
+
+
+def render() -> str:
+    """등록된 모든 지표를 Prometheus 텍스트 형식으로 출력"""
+    with _registry_lock:
+        metrics = list(_registry)
+    lines: List[str] = []
+    for metric in metrics:
+        lines.extend(metric.render())
+    return "\n".join(lines) + "\n"
+
+
+# ───────── /brainGraph/answer 파이프라인 지표 ─────────
+ANSWER_STAGE_SECONDS = histogram(
+    "braintrace_answer_stage_seconds", "Latency of each /brainGraph/answer stage", ("stage", "brain_id"))
+ANSWER_SECONDS = histogram(
+    "braintrace_answer_seconds", "End-to-end /brainGraph/answer latency", ("brain_id", "outcome"))
+ANSWER_SEED_NODES = histogram(
+    "braintrace_answer_seed_nodes", "Similar nodes returned by the vector search", ("brain_id",), COUNT_BUCKETS)
+ANSWER_SCHEMA_NODES = histogram(
+    "braintrace_answer_schema_nodes", "Nodes in the k-hop schema sent to the LLM", ("brain_id",), COUNT_BUCKETS)
+ANSWER_SCHEMA_RELATIONSHIPS = histogram(
+    "braintrace_answer_schema_relationships", "Relationships in the k-hop schema", ("brain_id",), COUNT_BUCKETS)
+ANSWER_SCHEMA_TOKENS = histogram(
+    "braintrace_answer_schema_tokens", "Estimated tokens of the schema text", ("brain_id",), TOKEN_BUCKETS)
+LLM_TOKENS = histogram(
+    "braintrace_llm_tokens", "Tokens per LLM call as reported by the API", ("operation", "kind"), TOKEN_BUCKETS)
+LLM_TOKENS_TOTAL = counter(
+    "braintrace_llm_tokens_total", "Total LLM tokens as reported by the API", ("operation", "kind"))
+
+
+def record_llm_usage(operation: str, usage: Dict[str, int]) -> None:
+    """LLM 응답의 토큰 사용량(prompt_tokens, completion_tokens)을 기록"""
+    for kind in ("prompt", "completion"):
+        tokens = usage.get(f"{kind}_tokens")
+        if tokens is not None:
+            LLM_TOKENS.observe(tokens, operation=operation, kind=kind)
+            LLM_TOKENS_TOTAL.inc(tokens, operation=operation, kind=kind)
+
+
+# ───────── 수집(ingest) 파이프라인 지표 ─────────
+SPAN_SECONDS = histogram(
+    "braintrace_span_seconds", "Duration of each traced span (services.tracing)", ("span",))
+INGEST_CHUNKS = counter(
+    "braintrace_ingest_chunks_total", "Chunks sent to LLM graph extraction", ("outcome",))
+INGEST_NODES = counter(
+    "braintrace_ingest_nodes_total", "Nodes extracted (before dedup), kept after dedup and written to Neo4j", ("stage",))
+INGEST_EDGES = counter(
+    "braintrace_ingest_edges_total", "Edges extracted (before dedup), kept after dedup and written to Neo4j", ("stage",))
+INGEST_VECTORS = counter(
+    "braintrace_ingest_vectors_total", "Vectors upserted into the vector DB")
+RETRIES = counter(
+    "braintrace_retries_total", "Retried attempts of external calls", ("operation",))
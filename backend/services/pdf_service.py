@@ -0,0 +1,112 @@
+"""
+저장된 PDF 파일에서 서버 측으로 페이지별 텍스트를 추출합니다.
+
+페이지 묶음(PDF_PAGE_BATCH) 단위로 프로세스 풀에서 병렬 추출하고, 추출이 끝난 순서가 아니라
+페이지 순서대로 내보냅니다. 동시에 처리 중인 묶음 수를 워커 수로 제한하므로
+문서 크기와 관계없이 메모리에는 몇 묶음 분량의 텍스트만 올라갑니다.
+"""
+import asyncio
+import bisect
+import logging
+import os
+from concurrent.futures import ProcessPoolExecutor
+from typing import AsyncIterator, List, Optional, Tuple
+
+try:
+    from pypdf import PdfReader
+except ImportError:  # pypdf 미설치 시 추출 기능만 비활성화
+    PdfReader = None
+
+PDF_WORKERS = max(1, min(4, os.cpu_count() or 1))
+PDF_PAGE_BATCH = 8                 # 워커 한 번 호출에 처리할 페이지 수
+PAGE_SEPARATOR = "\n\n"            # 페이지 텍스트를 이어 붙일 때 사이에 넣는 구분자
+
+_process_pool: Optional[ProcessPoolExecutor] = None
+
+
+def _require_pypdf() -> None:
+    if PdfReader is None:
+        raise RuntimeError("PDF 텍스트 추출에 필요한 pypdf가 설치되어 있지 않습니다. (pip install pypdf)")
+
+
+def _get_process_pool() -> ProcessPoolExecutor:
+    global _process_pool
+    if _process_pool is None:
+        _process_pool = ProcessPoolExecutor(max_workers=PDF_WORKERS)
+    return _process_pool
+
+
+def shutdown_pdf_pool() -> None:
+    global _process_pool
+    if _process_pool is not None:
+        _process_pool.shutdown(wait=False, cancel_futures=True)
+        _process_pool = None
+
+
+def page_count(pdf_path: str) -> int:
+    _require_pypdf()
+    return len(PdfReader(pdf_path).pages)
+
+
+def _extract_page_range(pdf_path: str, start: int, end: int) -> List[str]:
+    """[start, end) 범위 페이지의 텍스트 추출 (프로세스 풀 워커에서 실행)"""
+    reader = PdfReader(pdf_path)
+    texts = []
+    for index in range(start, end):
+        try:
+            texts.append(reader.pages[index].extract_text() or "")
+        except Exception as e:
+            logging.warning("PDF 페이지 %d 추출 실패 (%s): %s", index + 1, pdf_path, e)
+            texts.append("")
+    return texts
+
+
+async def iter_pdf_pages(pdf_path: str) -> AsyncIterator[Tuple[int, str]]:
+    """
+    PDF의 (페이지 번호(1부터), 텍스트)를 페이지 순서대로 내보냅니다.
+    최대 PDF_WORKERS개의 페이지 묶음을 미리 추출해 둡니다.
+    """
+    _require_pypdf()
+    loop = asyncio.get_running_loop()
+    total = await loop.run_in_executor(None, page_count, pdf_path)
+    pool = _get_process_pool()
+
+    ranges = [(start, min(start + PDF_PAGE_BATCH, total)) for start in range(0, total, PDF_PAGE_BATCH)]
+    pending = []
+    next_range = 0
+    try:
+        while next_range < len(ranges) or pending:
+            while next_range < len(ranges) and len(pending) < PDF_WORKERS:
+                start, end = ranges[next_range]
+                pending.append((start, loop.run_in_executor(pool, _extract_page_range, pdf_path, start, end)))
+                next_range += 1
+            start, future = pending.pop(0)
+            for offset, text in enumerate(await future):
+                yield start + offset + 1, text
+    finally:
+        for _, future in pending:
+            future.cancel()
+
+
+def join_pages(pages: List[Tuple[int, str]]) -> Tuple[str, List[Tuple[int, int]]]:
+    """
+    페이지 텍스트를 하나로 이어 붙이고 각 페이지의 시작 위치를 함께 반환합니다.
+    Returns:
+        (전체 텍스트, [(페이지 번호, 시작 문자 위치)])
+    """
+    parts = []
+    offsets = []
+    position = 0
+    for page_no, text in pages:
+        offsets.append((page_no, position))
+        parts.append(text)
+        position += len(text) + len(PAGE_SEPARATOR)
+    return PAGE_SEPARATOR.join(parts), offsets
+
+
+def page_at(offsets: List[Tuple[int, int]], position: int) -> Optional[int]:
+    """join_pages 결과의 문자 위치가 속한 페이지 번호"""
+    if not offsets:
+        return None
+    index = bisect.bisect_right([start for _, start in offsets], position) - 1
+    return offsets[max(index, 0)][0]
@@ -0,0 +1,253 @@
+"""
+파이프라인 단계별 추적 스팬 (OpenTelemetry 호환).
+
+스팬은 OpenTelemetry와 같은 구성(이름, trace_id/span_id/parent_id, 속성, 상태)을 가지며
+BRAINTRACE_TRACING 설정에 따라 내보내집니다.
+
+- none(기본): 내보내지 않음 (no-op)
+- memory: 프로세스 내 InMemorySpanExporter에 최근 스팬을 보관 (테스트, GET /system/traces)
+- otel: opentelemetry-api가 설치되어 있으면 전역 TracerProvider로 함께 기록 (exporter 구성은 OTel SDK 쪽에서)
+
+설정과 관계없이 스팬별 소요 시간은 braintrace_span_seconds 히스토그램(/metrics)에 남고,
+루트 스팬은 하위 스팬 이름별 누적 시간(stage_seconds)을 모아 요청 끝의 구조화 로그에 쓸 수 있게 합니다.
+부모 관계는 contextvars로 이어지므로 run_io/run_cpu로 넘긴 작업 안의 스팬도 같은 trace에 묶입니다.
+
+    with tracing.span("neo4j.write", nodes=len(nodes)) as current:
+        ...
+        current.set_attribute("edges", len(edges))
+"""
+import asyncio
+import functools
+import logging
+import os
+import secrets
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager, nullcontext
+from contextvars import ContextVar
+from typing import Any, Callable, Dict, Iterator, List, Optional
+
+from services import metrics_service
+
+TRACING_MODE = os.getenv("BRAINTRACE_TRACING", "none").lower()
+TRACING_MAX_SPANS = int(os.getenv("BRAINTRACE_TRACING_MAX_SPANS", 2000))   # memory 모드에서 보관하는 최근 스팬 수
+
+_current: ContextVar[Optional["Span"]] = ContextVar("braintrace_span", default=None)
+_stage_lock = threading.Lock()
+
+
+def _otel_value(value: Any) -> Any:
+    """OTel 속성은 str/bool/int/float만 허용"""
+    return value if isinstance(value, (str, bool, int, float)) else str(value)
+
+
+class Span:
+    def __init__(self, name: str, parent: Optional["Span"], attributes: Dict[str, Any]):
+        self.name = name
+        self.trace_id = parent.trace_id if parent else secrets.token_hex(16)
+        self.span_id = secrets.token_hex(8)
+        self.parent_id = parent.span_id if parent else None
+        self.root = parent.root if parent else self
+        self.attributes: Dict[str, Any] = dict(attributes)
+        self.status = "ok"
+        self.error: Optional[str] = None
+        self.start_time = time.time()
+        self.duration: Optional[float] = None
+        self.stage_seconds: Dict[str, float] = {}     # 루트 스팬에서만 채워짐
+        self._started = time.perf_counter()
+        self._otel = None
+
+    def set_attribute(self, key: str, value: Any) -> None:
+        self.attributes[key] = value
+        if self._otel is not None and value is not None:
+            self._otel.set_attribute(key, _otel_value(value))
+
+    def set_attributes(self, **attributes) -> None:
+        for key, value in attributes.items():
+            self.set_attribute(key, value)
+
+    def add(self, key: str, amount: float = 1) -> None:
+        """수치 속성에 amount를 더함 (재시도 횟수, 벡터 수 등)"""
+        self.set_attribute(key, self.attributes.get(key, 0) + amount)
+
+    def record_error(self, error: BaseException) -> None:
+        """예외를 삼키고 계속 진행하는 경우에도 스팬을 실패로 표시"""
+        self.status = "error"
+        self.error = f"{type(error).__name__}: {error}"
+        if self._otel is not None:
+            self._otel.record_exception(error)
+
+    @property
+    def elapsed(self) -> float:
+        return self.duration if self.duration is not None else time.perf_counter() - self._started
+
+    def _end(self) -> None:
+        self.duration = time.perf_counter() - self._started
+        if self.root is not self:
+            with _stage_lock:
+                self.root.stage_seconds[self.name] = round(self.root.stage_seconds.get(self.name, 0.0) + self.duration, 4)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "name": self.name,
+            "trace_id": self.trace_id,
+            "span_id": self.span_id,
+            "parent_id": self.parent_id,
+            "start_time": self.start_time,
+            "duration_s": round(self.duration, 4) if self.duration is not None else None,
+            "status": self.status,
+            "error": self.error,
+            "attributes": self.attributes
+        }
+
+
+class _NoOpSpan(Span):
+    """current_span()이 스팬 밖에서 호출됐을 때 반환되는 빈 스팬"""
+
+    def __init__(self):
+        super().__init__("noop", None, {})
+
+    def set_attribute(self, key: str, value: Any) -> None:
+        pass
+
+    def record_error(self, error: BaseException) -> None:
+        pass
+
+
+_NOOP_SPAN = _NoOpSpan()
+
+
+class SpanExporter:
+    """끝난 스팬을 받는 인터페이스"""
+
+    def export(self, span: Span) -> None:
+        raise NotImplementedError
+
+
+class NoOpSpanExporter(SpanExporter):
+    def export(self, span: Span) -> None:
+        pass
+
+
+class InMemorySpanExporter(SpanExporter):
+    """최근 max_spans개의 끝난 스팬을 메모리에 보관"""
+
+    def __init__(self, max_spans: int = TRACING_MAX_SPANS):
+        self._spans = deque(maxlen=max_spans)
+        self._lock = threading.Lock()
+
+    def export(self, span: Span) -> None:
+        with self._lock:
+            self._spans.append(span)
+
+    def get_finished_spans(self, name: Optional[str] = None, trace_id: Optional[str] = None) -> List[Span]:
+        with self._lock:
+            spans = list(self._spans)
+        return [span for span in spans
+                if (name is None or span.name == name) and (trace_id is None or span.trace_id == trace_id)]
+
+    def clear(self) -> None:
+        with self._lock:
+            self._spans.clear()
+
+
+def _load_otel_tracer():
+    if TRACING_MODE != "otel":
+        return None
+    try:
+        from opentelemetry import trace as otel_trace
+    except ImportError:
+        logging.warning("BRAINTRACE_TRACING=otel이지만 opentelemetry-api가 설치되어 있지 않아 추적을 내보내지 않습니다")
+        return None
+    return otel_trace.get_tracer("braintrace")
+
+
+_exporter: SpanExporter = InMemorySpanExporter() if TRACING_MODE == "memory" else NoOpSpanExporter()
+_otel_tracer = _load_otel_tracer()
+
+
+def set_exporter(exporter: SpanExporter) -> SpanExporter:
+    """exporter를 교체하고 이전 exporter를 반환 (테스트에서 InMemorySpanExporter를 끼울 때 사용)"""
+    global _exporter
+    previous, _exporter = _exporter, exporter
+    return previous
+
+
+def get_exporter() -> SpanExporter:
+    return _exporter
+
+
+def current_span() -> Span:
+    """현재 스팬. 스팬 밖이면 아무것도 기록하지 않는 빈 스팬"""
+    return _current.get() or _NOOP_SPAN
+
+
+@contextmanager
+def span(name: str, **attributes) -> Iterator[Span]:
+    """이름이 name인 스팬을 열고 블록이 끝나면 닫습니다. 예외가 나면 status=error로 기록하고 다시 던집니다."""
+    current = Span(name, _current.get(), attributes)
+    token = _current.set(current)
+    otel_context = nullcontext()
+    if _otel_tracer is not None:
+        otel_attributes = {key: _otel_value(value) for key, value in attributes.items() if value is not None}
+        otel_context = _otel_tracer.start_as_current_span(name, attributes=otel_attributes)
+    try:
+        with otel_context as otel_span:
+            current._otel = otel_span
+            yield current
+    except BaseException as e:
+        current.status = "error"
+        current.error = f"{type(e).__name__}: {e}"
+        raise
+    finally:
+        _current.reset(token)
+        current._end()
+        metrics_service.SPAN_SECONDS.observe(current.duration, span=name)
+        try:
+            _exporter.export(current)
+        except Exception as e:
+            logging.warning("스팬 내보내기 실패: %s", e)
+
+
+def traced(name: Optional[str] = None, **attributes) -> Callable:
+    """함수 호출 전체를 스팬으로 감싸는 데코레이터 (동기/async 함수 모두 지원)"""
+    def decorator(func: Callable) -> Callable:
+        span_name = name or f"{func.__module__}.{func.__qualname__}"
+
+        if asyncio.iscoroutinefunction(func):
+            @functools.wraps(func)
+            async def async_wrapper(*args, **kwargs):
+                with span(span_name, **attributes):
+                    return await func(*args, **kwargs)
+            return async_wrapper
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with span(span_name, **attributes):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def recent_traces(limit: int = 20, trace_id: Optional[str] = None) -> Optional[List[Dict[str, Any]]]:
+    """
+    memory 모드에서 최근 trace를 루트 스팬 기준으로 최신순 반환합니다. (다른 모드면 None)
+    각 trace는 {"trace_id", "root", "spans"} 형식입니다.
+    """
+    if not isinstance(_exporter, InMemorySpanExporter):
+        return None
+    traces: Dict[str, List[Span]] = {}
+    for finished in _exporter.get_finished_spans(trace_id=trace_id):
+        traces.setdefault(finished.trace_id, []).append(finished)
+    result = []
+    for tid, spans in traces.items():
+        spans.sort(key=lambda s: s.start_time)
+        root = next((s for s in spans if s.parent_id is None), None)
+        result.append({
+            "trace_id": tid,
+            "root": root.to_dict() if root else None,
+            "spans": [s.to_dict() for s in spans]
+        })
+    result.sort(key=lambda t: t["spans"][0]["start_time"], reverse=True)
+    return result[:limit]
@@ -0,0 +1,189 @@
+"""
+SQLite에 저장되는 음성 전사 작업 큐와 고정 크기 워커 풀.
+
+요청마다 바로 추론하지 않고 TranscribeJob 테이블에 쌓은 뒤 TRANSCRIBE_WORKERS개의 워커가 순서대로 처리하므로,
+업로드가 몰려도 동시에 실행되는 디코딩/추론 수는 일정합니다. 대기 작업이 TRANSCRIBE_QUEUE_LIMIT개 이상이면
+새 작업을 받지 않고(TranscribeQueueFullError) 예상 대기 시간을 알려 줍니다.
+대기열을 거치지 않고 바로 전사하는 요청(/voices/transcribe, /voices/transcribe/stream)도 acquire_direct_slot으로
+동시에 TRANSCRIBE_DIRECT_LIMIT개까지만 디코딩/전사하므로, 업로드가 몰려도 메모리에 올라가는 waveform 수가 일정합니다.
+완료된 전사 결과는 작업과 연결된 Voice.transcript에 함께 저장됩니다.
+"""
+import asyncio
+import logging
+import math
+import os
+from typing import Any, Dict, List, Optional
+
+from services.executor_service import run_asr, run_io
+from services.voiceService import decode_audio, transcribe_segments
+from sqlite_db.sqlite_handler import SQLiteHandler
+
+TRANSCRIBE_WORKERS = int(os.getenv("BRAINTRACE_TRANSCRIBE_WORKERS", 1))
+TRANSCRIBE_QUEUE_LIMIT = int(os.getenv("BRAINTRACE_TRANSCRIBE_QUEUE_LIMIT", 20))
+TRANSCRIBE_DIRECT_LIMIT = int(os.getenv("BRAINTRACE_TRANSCRIBE_DIRECT_LIMIT", 2))   # 동시에 처리하는 즉시 전사 요청 수
+TRANSCRIBE_POLL_INTERVAL = 5.0      # 알림이 없을 때 대기열을 다시 확인하는 간격 (초)
+DEFAULT_JOB_SECONDS = 60.0          # 완료된 작업이 없을 때 예상 대기 시간 계산에 쓰는 작업당 시간
+_JOB_SECONDS_SMOOTHING = 0.3        # 작업당 평균 처리 시간의 지수 이동 평균 가중치
+
+db = SQLiteHandler()
+
+_wakeup: Optional[asyncio.Event] = None
+_workers: List[asyncio.Task] = []
+_avg_job_seconds = DEFAULT_JOB_SECONDS
+_direct_active = 0
+
+
+class TranscribeQueueFullError(RuntimeError):
+    """대기열(또는 즉시 전사 슬롯)이 가득 차 작업을 받을 수 없을 때 발생"""
+
+    def __init__(self, queued: int, retry_after: int, what: str = "전사 대기열", state: str = "대기"):
+        super().__init__(f"{what}이 가득 찼습니다 ({state} {queued}건). 약 {retry_after}초 후 다시 시도해 주세요.")
+        self.queued = queued
+        self.retry_after = retry_after
+
+
+def estimate_wait_seconds(ahead: int, running: int) -> int:
+    """앞에 ahead개의 대기 작업과 running개의 실행 중 작업이 있을 때 작업이 끝나기까지의 예상 시간"""
+    rounds = math.ceil((ahead + running + 1) / max(TRANSCRIBE_WORKERS, 1))
+    return int(rounds * _avg_job_seconds)
+
+
+async def job_with_eta(job: Dict[str, Any]) -> Dict[str, Any]:
+    """작업 정보에 대기 순번(queue_position)과 예상 완료 시간(eta_seconds)을 붙여 반환합니다."""
+    if job["status"] in ("queued", "running"):
+        counts = await run_io(db.count_transcribe_jobs)
+        ahead = await run_io(db.queue_position_transcribe_job, job["job_id"]) if job["status"] == "queued" else 0
+        running = counts["running"] if job["status"] == "queued" else 0
+        job["queue_position"] = ahead
+        job["eta_seconds"] = estimate_wait_seconds(ahead, running)
+    else:
+        job["queue_position"] = None
+        job["eta_seconds"] = None
+    return job
+
+
+async def check_capacity() -> None:
+    """
+    대기 작업이 TRANSCRIBE_QUEUE_LIMIT개 이상이면 TranscribeQueueFullError를 발생시킵니다.
+    업로드 본문을 받기 전에 호출하면 받을 수 없는 작업의 오디오를 저장하지 않고 바로 거절할 수 있습니다.
+    """
+    counts = await run_io(db.count_transcribe_jobs)
+    if counts["queued"] >= TRANSCRIBE_QUEUE_LIMIT:
+        raise TranscribeQueueFullError(counts["queued"], estimate_wait_seconds(0, counts["running"]))
+
+
+class DirectSlot:
+    """acquire_direct_slot이 반환하는 즉시 전사 슬롯. release()는 여러 번 호출해도 한 번만 반납합니다."""
+
+    def __init__(self):
+        self._held = True
+
+    def release(self) -> None:
+        global _direct_active
+        if self._held:
+            self._held = False
+            _direct_active -= 1
+
+
+async def acquire_direct_slot() -> DirectSlot:
+    """
+    대기열을 거치지 않는 즉시 전사 요청의 슬롯을 얻습니다. 기다리지 않고 바로 거절하므로
+    대기열이 가득 찼거나 이미 TRANSCRIBE_DIRECT_LIMIT개의 요청이 처리 중이면 TranscribeQueueFullError를 발생시킵니다.
+    업로드를 디코딩하기 전에 얻고, 전사가 끝나면(또는 실패하면) 반드시 release()해야 합니다.
+    """
+    global _direct_active
+    await check_capacity()
+    if _direct_active >= TRANSCRIBE_DIRECT_LIMIT:
+        raise TranscribeQueueFullError(_direct_active, int(_avg_job_seconds), what="즉시 전사 슬롯", state="처리 중")
+    _direct_active += 1
+    return DirectSlot()
+
+
+async def enqueue(audio_path: str, voice_id: Optional[int] = None, owns_audio: bool = False) -> Dict[str, Any]:
+    """
+    작업을 대기열에 추가하고 워커를 깨웁니다.
+    대기 작업이 TRANSCRIBE_QUEUE_LIMIT개 이상이면 TranscribeQueueFullError를 발생시킵니다.
+    (업로드 전 check_capacity를 통과했어도 그 사이 다른 요청이 대기열을 채웠을 수 있으므로 다시 확인)
+    """
+    await check_capacity()
+    job = await run_io(db.create_transcribe_job, audio_path, voice_id, owns_audio)
+    if _wakeup is not None:
+        _wakeup.set()
+    return await job_with_eta(job)
+
+
+def queue_stats() -> Dict[str, Any]:
+    counts = db.count_transcribe_jobs()
+    return {
+        "workers": TRANSCRIBE_WORKERS,
+        "queue_limit": TRANSCRIBE_QUEUE_LIMIT,
+        "direct_limit": TRANSCRIBE_DIRECT_LIMIT,
+        "direct_active": _direct_active,
+        "queued": counts["queued"],
+        "running": counts["running"],
+        "avg_job_seconds": round(_avg_job_seconds, 1)
+    }
+
+
+async def process_job(job: Dict[str, Any]) -> None:
+    global _avg_job_seconds
+    job_id = job["job_id"]
+    started = asyncio.get_running_loop().time()
+    waveform = await run_io(decode_audio, job["audio_path"])
+    result = await run_asr(transcribe_segments, waveform)
+    await run_io(db.complete_transcribe_job, job_id, result["text"], result["segments"], result["duration"])
+    elapsed = asyncio.get_running_loop().time() - started
+    _avg_job_seconds += _JOB_SECONDS_SMOOTHING * (elapsed - _avg_job_seconds)
+    logging.info("✅ 전사 작업 %s 완료: %.1fs 음성, %.1fs 소요", job_id, result["duration"], elapsed)
+
+
+def _remove_owned_audio(job: Dict[str, Any]) -> None:
+    """업로드로 받은 임시 오디오는 작업이 끝나면(성공/실패) 삭제"""
+    if job["owns_audio"] and os.path.exists(job["audio_path"]):
+        os.remove(job["audio_path"])
+
+
+async def _worker(index: int) -> None:
+    logging.info("전사 워커 %d 시작", index)
+    while True:
+        try:
+            job = await run_io(db.claim_transcribe_job)
+        except Exception as e:
+            logging.error("전사 작업 할당 실패: %s", e)
+            job = None
+        if job is None:
+            _wakeup.clear()
+            try:
+                await asyncio.wait_for(_wakeup.wait(), TRANSCRIBE_POLL_INTERVAL)
+            except asyncio.TimeoutError:
+                pass
+            continue
+
+        try:
+            await process_job(job)
+        except asyncio.CancelledError:
+            # 서버 종료: running 상태로 남겨 두면 다음 기동 시 다시 대기열에 들어감
+            raise
+        except Exception as e:
+            logging.exception("❌ 전사 작업 %s 실패", job["job_id"])
+            await run_io(db.fail_transcribe_job, job["job_id"], str(e))
+        _remove_owned_audio(job)
+
+
+async def start_workers(count: int = TRANSCRIBE_WORKERS) -> None:
+    """서버 시작 시 중단된 작업을 되돌리고 워커 태스크를 띄웁니다."""
+    global _wakeup
+    _wakeup = asyncio.Event()
+    requeued = await run_io(db.requeue_transcribe_jobs)
+    if requeued:
+        logging.info("중단된 전사 작업 %d개를 다시 대기열에 넣었습니다", requeued)
+    for index in range(count):
+        _workers.append(asyncio.create_task(_worker(index)))
+    _wakeup.set()
+
+
+async def stop_workers() -> None:
+    for task in _workers:
+        task.cancel()
+    await asyncio.gather(*_workers, return_exceptions=True)
+    _workers.clear()
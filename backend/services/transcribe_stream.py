@@ -0,0 +1,291 @@
+"""
+녹음과 전사를 겹쳐 진행하는 스트리밍 전사 세션.
+
+클라이언트는 세션을 만든 뒤 녹음 조각(MediaRecorder의 webm 조각 등)에 0부터 시작하는 seq를 붙여 순서대로 보내고,
+서버는 세션마다 띄운 ffmpeg 프로세스에 조각을 이어서 흘려 보내 16kHz PCM으로 디코딩합니다.
+전사 태스크는 쌓인 PCM에서 VAD로 "끝난" 음성 구간(뒤에 충분한 무음이 오거나 최대 길이로 잘린 구간)을 찾아
+바로 전사하고 구독자(SSE)에게 알립니다. 전사가 끝난 앞부분 PCM은 버리므로 메모리 사용량은 녹음 길이와 무관합니다.
+"""
+import asyncio
+import logging
+import os
+import subprocess
+import threading
+import time
+import uuid
+from typing import Any, AsyncIterator, Dict, List, Optional
+
+import numpy as np
+
+from services.executor_service import run_asr, run_cpu, run_io
+from services.upload_service import UploadTooLargeError, MAX_AUDIO_BYTES
+from services.vad_service import (VAD_FRAME_MS, VAD_MAX_SEGMENT_S, VAD_MIN_DB, VAD_MIN_SILENCE_MS,
+                                  detect_speech, frame_energies)
+from services.voiceService import ASR_BATCH_SIZE, SAMPLE_RATE, ffmpeg_pcm_command, pcm_to_float, transcribe_spans
+
+STREAM_POLL_SECONDS = 0.5          # 새 PCM이 쌓였는지 확인하는 간격
+STREAM_MIN_WINDOW_S = 2.0          # 이보다 짧게 쌓였으면 VAD를 돌리지 않음 (배경 소음 추정이 불안정)
+STREAM_SILENCE_WINDOW_S = 10.0     # 이만큼 쌓였는데 음성 구간이 없으면 앞쪽의 무음(VAD_MIN_DB 미만)을 버림
+STREAM_KEEP_SILENCE_S = 1.0        # 무음을 버릴 때도 남겨 두는 끝부분 (말이 시작되는 중일 수 있음)
+STREAM_IDLE_TIMEOUT = float(os.getenv("BRAINTRACE_STREAM_IDLE_TIMEOUT", 300))   # 조각이 오지 않으면 세션 종료 (초)
+STREAM_MAX_SESSIONS = int(os.getenv("BRAINTRACE_STREAM_MAX_SESSIONS", 8))
+STREAM_READ_SIZE = 64 * 1024
+
+_BYTES_PER_SAMPLE = 2              # s16le
+_sessions: Dict[str, "TranscriptionSession"] = {}
+
+
+def _silent_prefix(waveform: np.ndarray) -> int:
+    """앞에서부터 에너지가 VAD_MIN_DB 미만인(무음) 프레임이 이어지는 샘플 수"""
+    audible = np.flatnonzero(frame_energies(waveform, SAMPLE_RATE) >= VAD_MIN_DB)
+    if len(audible) == 0:
+        return len(waveform)
+    return int(audible[0]) * (SAMPLE_RATE * VAD_FRAME_MS // 1000)
+
+
+class StreamSessionLimitError(RuntimeError):
+    """동시에 열 수 있는 세션 수를 넘었을 때 발생"""
+
+
+class StreamChunkOrderError(ValueError):
+    """조각 번호(seq)가 다음에 받을 번호와 다를 때 발생 (순서가 바뀌었거나 이미 받은 조각)"""
+
+    def __init__(self, seq: int, expected: int):
+        super().__init__(f"조각 순서가 맞지 않습니다: seq={seq}, 다음에 받을 seq={expected}")
+        self.seq = seq
+        self.expected = expected
+
+
+class TranscriptionSession:
+    def __init__(self, session_id: str, max_bytes: int = MAX_AUDIO_BYTES):
+        self.session_id = session_id
+        self.max_bytes = max_bytes
+        self.received_bytes = 0
+        self.next_seq = 0                  # 다음에 받을 조각 번호
+        self.segments: List[Dict[str, Any]] = []
+        self.status = "recording"          # recording → finishing → done | failed
+        self.error: Optional[str] = None
+        self.created_at = time.time()
+        self.last_activity = time.monotonic()
+
+        self._proc = subprocess.Popen(
+            ffmpeg_pcm_command("pipe:0", SAMPLE_RATE),
+            stdin=subprocess.PIPE, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL
+        )
+        self._pcm = bytearray()            # 아직 전사하지 않은 PCM
+        self._base_sample = 0              # _pcm[0]의 녹음 전체 기준 샘플 위치
+        self._pcm_lock = threading.Lock()
+        self._write_lock = threading.Lock()
+        self._chunk_lock = asyncio.Lock()  # 조각 요청을 하나씩 순서대로 처리
+        self._eof = threading.Event()
+        self._changed = asyncio.Event()
+        self._reader = threading.Thread(target=self._read_pcm, name=f"stream-{session_id}", daemon=True)
+        self._reader.start()
+        self._task = asyncio.create_task(self._transcribe_loop())
+
+    # ───────── 입력 ─────────
+    def _read_pcm(self) -> None:
+        fd = self._proc.stdout.fileno()
+        while True:
+            data = os.read(fd, STREAM_READ_SIZE)
+            if not data:
+                break
+            with self._pcm_lock:
+                self._pcm += data
+        self._eof.set()
+
+    def feed(self, data: bytes) -> None:
+        """녹음 조각을 ffmpeg에 이어서 씁니다. (I/O 풀에서 실행)"""
+        if self.status != "recording":
+            raise ValueError(f"조각을 받을 수 없는 상태입니다: {self.status}")
+        with self._write_lock:
+            self.received_bytes += len(data)
+            if self.received_bytes > self.max_bytes:
+                error = UploadTooLargeError(self.session_id, self.max_bytes)
+                # 워커 스레드이므로 알림은 전사 태스크가 ffmpeg 종료를 보고 보냄
+                self.status = "failed"
+                self.error = str(error)
+                self._proc.kill()
+                raise error
+            self._proc.stdin.write(data)
+            self._proc.stdin.flush()
+        self.last_activity = time.monotonic()
+
+    def finish(self) -> None:
+        """입력을 닫습니다. 남은 음성까지 전사하면 status가 done이 됩니다."""
+        if self.status == "recording":
+            self.status = "finishing"
+            self._close_stdin()
+            self._notify()
+
+    def _close_stdin(self) -> None:
+        with self._write_lock:
+            try:
+                self._proc.stdin.close()
+            except OSError:
+                pass
+
+    def _fail(self, error: str) -> None:
+        self.status = "failed"
+        self.error = error
+        self._proc.kill()
+        self._notify()
+
+    # ───────── 전사 ─────────
+    def _take_window(self):
+        with self._pcm_lock:
+            usable = len(self._pcm) - len(self._pcm) % _BYTES_PER_SAMPLE
+            return pcm_to_float(bytes(self._pcm[:usable])), self._base_sample
+
+    def _drop_samples(self, samples: int) -> None:
+        if samples <= 0:
+            return
+        with self._pcm_lock:
+            del self._pcm[:samples * _BYTES_PER_SAMPLE]
+            self._base_sample += samples
+
+    async def _process_window(self, final: bool) -> None:
+        waveform, base = self._take_window()
+        if len(waveform) < STREAM_MIN_WINDOW_S * SAMPLE_RATE and not final:
+            return
+        spans = await run_cpu(detect_speech, waveform, SAMPLE_RATE)
+        if not final:
+            # 끝난 구간만 전사: 뒤에 무음이 충분히 이어졌거나, 최대 길이로 잘려 다음 구간이 이어지는 경우
+            tail = len(waveform) - VAD_MIN_SILENCE_MS * SAMPLE_RATE // 1000
+            closed = [span for index, span in enumerate(spans)
+                      if span[1] <= tail or (index + 1 < len(spans) and spans[index + 1][0] == span[1])]
+            if not spans and len(waveform) >= STREAM_SILENCE_WINDOW_S * SAMPLE_RATE:
+                # VAD가 음성 구간을 못 찾았어도 실제로 조용한(VAD_MIN_DB 미만) 앞부분만 버림
+                silent = min(_silent_prefix(waveform), len(waveform) - int(STREAM_KEEP_SILENCE_S * SAMPLE_RATE))
+                if silent > 0:
+                    self._drop_samples(silent)
+                    return
+                if len(waveform) >= VAD_MAX_SEGMENT_S * SAMPLE_RATE:
+                    # 소리는 있는데 음성 구간으로 잡히지 않으면 버리지 않고 최대 길이만큼 ASR에 맡김
+                    closed = [(0, int(VAD_MAX_SEGMENT_S * SAMPLE_RATE))]
+        else:
+            closed = spans
+
+        if closed:
+            segments = await run_asr(transcribe_spans, waveform, closed, ASR_BATCH_SIZE, None, base)
+            if segments:
+                self.segments.extend(segments)
+                self._notify()
+            self._drop_samples(len(waveform) if final else closed[-1][1])
+        elif final:
+            self._drop_samples(len(waveform))
+
+    async def _transcribe_loop(self) -> None:
+        try:
+            while True:
+                final = self._eof.is_set()
+                await self._process_window(final)
+                if final:
+                    break
+                if self.status == "recording" and time.monotonic() - self.last_activity > STREAM_IDLE_TIMEOUT:
+                    self.finish()
+                    logging.info("스트리밍 세션 %s: %.0fs 동안 조각이 없어 입력을 닫습니다", self.session_id, STREAM_IDLE_TIMEOUT)
+                await asyncio.sleep(STREAM_POLL_SECONDS)
+
+            if self.status != "failed":
+                await run_io(self._proc.wait)
+                if self._proc.returncode != 0 and not self.segments:
+                    raise RuntimeError(f"ffmpeg 디코딩 실패 (종료 코드 {self._proc.returncode})")
+                self.status = "done"
+                logging.info("✅ 스트리밍 세션 %s 완료: 구간 %d개", self.session_id, len(self.segments))
+        except asyncio.CancelledError:
+            self._proc.kill()
+            raise
+        except Exception as e:
+            logging.exception("❌ 스트리밍 세션 %s 실패", self.session_id)
+            self._fail(str(e))
+        self._notify()
+
+    # ───────── 구독 ─────────
+    def _notify(self) -> None:
+        event, self._changed = self._changed, asyncio.Event()
+        event.set()
+
+    def subscribe(self) -> asyncio.Event:
+        """다음 변경 때 set되는 Event. 상태를 읽기 전에 구독해야 변경을 놓치지 않습니다."""
+        return self._changed
+
+    @property
+    def finished(self) -> bool:
+        return self.status in ("done", "failed")
+
+    @property
+    def text(self) -> str:
+        return " ".join(segment["text"] for segment in self.segments)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "session_id": self.session_id,
+            "status": self.status,
+            "received_bytes": self.received_bytes,
+            "next_seq": self.next_seq,
+            "transcribed_seconds": round(self._base_sample / SAMPLE_RATE, 2),
+            "segments": len(self.segments),
+            "text": self.text,
+            "error": self.error
+        }
+
+    async def close(self) -> None:
+        self._close_stdin()
+        self._proc.kill()
+        self._task.cancel()
+        await asyncio.gather(self._task, return_exceptions=True)
+
+
+def create_session() -> TranscriptionSession:
+    _sessions_cleanup()
+    active = sum(1 for session in _sessions.values() if not session.finished)
+    if active >= STREAM_MAX_SESSIONS:
+        raise StreamSessionLimitError(f"동시에 진행할 수 있는 스트리밍 세션 수({STREAM_MAX_SESSIONS})를 넘었습니다")
+    session = TranscriptionSession(uuid.uuid4().hex)
+    _sessions[session.session_id] = session
+    return session
+
+
+def get_session(session_id: str) -> Optional[TranscriptionSession]:
+    return _sessions.get(session_id)
+
+
+async def close_session(session_id: str) -> bool:
+    session = _sessions.pop(session_id, None)
+    if session is None:
+        return False
+    await session.close()
+    return True
+
+
+def _sessions_cleanup() -> None:
+    """끝난 지 STREAM_IDLE_TIMEOUT이 지난 세션을 목록에서 지움"""
+    now = time.monotonic()
+    for session_id, session in list(_sessions.items()):
+        if session.finished and now - session.last_activity > STREAM_IDLE_TIMEOUT:
+            _sessions.pop(session_id, None)
+
+
+async def close_all_sessions() -> None:
+    for session_id in list(_sessions):
+        await close_session(session_id)
+
+
+async def feed_chunk(session: TranscriptionSession, seq: int, body: AsyncIterator[bytes]) -> None:
+    """
+    seq번째 녹음 조각(body)을 끝까지 받은 뒤 한 번에 ffmpeg에 씁니다.
+    같은 세션의 조각은 하나씩 처리하며 seq가 next_seq와 다르면 아무것도 쓰지 않고 StreamChunkOrderError를 던집니다.
+    (조각을 다 받기 전에 연결이 끊기면 쓰지 않으므로 같은 seq로 다시 보낼 수 있음)
+    """
+    async with session._chunk_lock:
+        if seq != session.next_seq:
+            raise StreamChunkOrderError(seq, session.next_seq)
+        data = bytearray()
+        async for part in body:
+            data += part
+            if session.received_bytes + len(data) > session.max_bytes:
+                break                      # feed에서 크기 초과로 세션을 실패 처리
+        if data:
+            await run_io(session.feed, bytes(data))
+        session.next_seq += 1
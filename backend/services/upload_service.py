@@ -0,0 +1,184 @@
+"""
+업로드 파일을 고정 크기 버퍼로 디스크에 스트리밍 저장하는 유틸리티.
+
+업로드 전체를 메모리에 올리지 않고 UPLOAD_CHUNK_SIZE 단위로 복사하면서
+크기 제한을 검사하고 SHA-256 해시를 함께 계산합니다. (중복 업로드 판별용)
+복사는 I/O 풀에서 실행되며, 여러 파일 업로드는 파일별로 동시에 처리됩니다.
+"""
+import asyncio
+import hashlib
+import json
+import logging
+import os
+from typing import Any, BinaryIO, Callable, Dict, List, Optional, Tuple, Union
+
+from fastapi import UploadFile
+
+from services.executor_service import run_io
+
+UPLOAD_CHUNK_SIZE = 1024 * 1024              # 1MB 단위 복사 (업로드 1건당 최대 버퍼)
+
+# 종류별 최대 업로드 크기
+MAX_PDF_BYTES = 100 * 1024 * 1024            # 100MB
+MAX_TEXT_BYTES = 20 * 1024 * 1024            # 20MB
+MAX_AUDIO_BYTES = 500 * 1024 * 1024          # 500MB (약 수 시간 분량의 압축 음성)
+
+# 여러 파일 업로드에서 저장하지 못한 파일 목록을 담는 응답 헤더 (목록 응답 형식은 그대로 유지)
+REJECTED_FILES_HEADER = "X-Rejected-Files"
+
+
+class UploadTooLargeError(ValueError):
+    """업로드 크기가 제한을 넘었을 때 발생"""
+
+    def __init__(self, filename: str, max_bytes: int):
+        super().__init__(f"파일 크기 제한 초과 ({filename}): 최대 {max_bytes // (1024 * 1024)}MB")
+        self.filename = filename
+        self.max_bytes = max_bytes
+
+
+class UnsupportedUploadError(ValueError):
+    """받을 수 없는 형식(확장자)의 파일일 때 발생"""
+
+    def __init__(self, filename: str):
+        super().__init__(f"지원하지 않는 파일 형식입니다 ({filename})")
+        self.filename = filename
+
+
+def copy_stream(src: BinaryIO, dest_path: str, max_bytes: Optional[int] = None,
+                filename: str = "") -> Dict[str, Any]:
+    """
+    src를 dest_path로 청크 단위 복사하며 크기와 SHA-256을 계산합니다.
+    임시 파일(.part)에 먼저 쓰고 완료되면 이름을 바꾸므로, 실패 시 반쯤 쓰인 파일이 남지 않습니다.
+
+    Returns:
+        {"path", "size", "sha256"}
+    """
+    tmp_path = dest_path + ".part"
+    digest = hashlib.sha256()
+    size = 0
+    try:
+        with open(tmp_path, "wb") as out:
+            while True:
+                chunk = src.read(UPLOAD_CHUNK_SIZE)
+                if not chunk:
+                    break
+                size += len(chunk)
+                if max_bytes is not None and size > max_bytes:
+                    raise UploadTooLargeError(filename or os.path.basename(dest_path), max_bytes)
+                digest.update(chunk)
+                out.write(chunk)
+        os.replace(tmp_path, dest_path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+    return {"path": dest_path, "size": size, "sha256": digest.hexdigest()}
+
+
+async def save_upload(file: UploadFile, dest_path: str, max_bytes: Optional[int] = None) -> Dict[str, Any]:
+    """UploadFile 하나를 dest_path에 스트리밍 저장합니다. (I/O 풀에서 실행)"""
+    await file.seek(0)
+    return await run_io(copy_stream, file.file, dest_path, max_bytes, file.filename or "")
+
+
+async def save_uploads(
+    files: List[UploadFile],
+    dest_path_for: Callable[[UploadFile], Optional[str]],
+    max_bytes: Optional[int] = None
+) -> List[Tuple[UploadFile, Union[Dict[str, Any], BaseException]]]:
+    """
+    여러 업로드 파일을 동시에 저장합니다.
+
+    Args:
+        files: 업로드 파일 목록
+        dest_path_for: 파일별 저장 경로를 반환하는 함수 (None을 반환하면 받을 수 없는 형식으로 보고 저장하지 않음)
+        max_bytes: 파일당 최대 크기
+    Returns:
+        (파일, 저장 결과 dict 또는 예외) 목록. 입력 순서를 유지하며,
+        저장하지 않은 파일은 UnsupportedUploadError, 크기 초과는 UploadTooLargeError가 결과로 들어갑니다.
+    """
+    targets = [(file, dest_path_for(file)) for file in files]
+    saving = [(file, dest_path) for file, dest_path in targets if dest_path is not None]
+
+    results = await asyncio.gather(
+        *(save_upload(file, dest_path, max_bytes) for file, dest_path in saving),
+        return_exceptions=True
+    )
+    for (file, _), result in zip(saving, results):
+        if isinstance(result, BaseException):
+            logging.error("업로드 저장 실패 (%s): %s", file.filename, result)
+    saved = iter(results)
+    return [(file, next(saved) if dest_path is not None else UnsupportedUploadError(file.filename or ""))
+            for file, dest_path in targets]
+
+
+def rejected_upload(file: UploadFile, error: BaseException) -> Dict[str, Any]:
+    """저장하지 못한 업로드 파일의 거절 정보 {"filename", "status", "reason"} (status는 해당 HTTP 상태 코드)"""
+    if isinstance(error, UploadTooLargeError):
+        status = 413
+    elif isinstance(error, UnsupportedUploadError):
+        status = 415
+    else:
+        status = 500
+    return {"filename": file.filename or "", "status": status, "reason": str(error)}
+
+
+def rejection_status(rejected: List[Dict[str, Any]]) -> int:
+    """모든 파일이 거절되었을 때 응답할 상태 코드 (크기 초과 413 > 형식 오류 415 > 저장 실패 500)"""
+    statuses = {item["status"] for item in rejected}
+    return next((status for status in (413, 415, 500) if status in statuses), 400)
+
+
+def rejected_files_header(rejected: List[Dict[str, Any]]) -> Dict[str, str]:
+    """거절된 파일 목록을 REJECTED_FILES_HEADER 헤더로 (헤더에 넣을 수 있도록 비ASCII 문자는 \\u 이스케이프)"""
+    return {REJECTED_FILES_HEADER: json.dumps(rejected)} if rejected else {}
+
+
+def link_duplicate(existing_path: str, dest_path: str) -> bool:
+    """
+    dest_path를 같은 내용의 기존 파일(existing_path)에 대한 하드 링크로 바꿔 디스크 사용량을 한 벌로 줄입니다.
+    파일시스템이 하드 링크를 지원하지 않으면 복사본을 그대로 둡니다.
+    """
+    tmp_path = dest_path + ".link"
+    try:
+        if os.path.samefile(existing_path, dest_path):
+            return True
+        os.link(existing_path, tmp_path)
+        os.replace(tmp_path, dest_path)
+        return True
+    except OSError as e:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        logging.warning("하드 링크 생성 실패, 복사본 유지 (%s → %s): %s", existing_path, dest_path, e)
+        return False
+
+
+def dedupe_saved_uploads(saved: List[Dict[str, Any]], known: Dict[str, Dict[str, Any]],
+                         brain_id: Optional[int] = None) -> List[Dict[str, Any]]:
+    """
+    저장된 업로드 중 내용이 같은 파일이 이미 있으면 하드 링크로 바꾸고 중복 정보를 채웁니다.
+
+    Args:
+        saved: {"path", "sha256", ...} 목록 (제자리에서 갱신)
+        known: SQLiteHandler.find_contents_by_hashes 결과
+        brain_id: 업로드 대상 브레인 ID
+    Returns:
+        saved. 각 항목에 duplicate_of(같은 브레인의 기존 소스 ID)와 already_ingested가 추가됩니다.
+    """
+    first_in_batch: Dict[str, str] = {}
+    for item in saved:
+        sha256 = item["sha256"]
+        existing = known.get(sha256)
+        source_path = None
+        if existing and existing.get("path") and os.path.exists(existing["path"]):
+            source_path = existing["path"]
+        elif sha256 in first_in_batch:
+            source_path = first_in_batch[sha256]
+        if source_path:
+            link_duplicate(source_path, item["path"])
+        first_in_batch.setdefault(sha256, item["path"])
+
+        same_brain = existing is not None and existing["brain_id"] == brain_id
+        item["duplicate_of"] = existing["content_id"] if same_brain else None
+        item["already_ingested"] = bool(same_brain and existing["ingested"])
+    return saved
@@ -0,0 +1,105 @@
+"""
+에너지 기반 음성 구간 검출(VAD).
+
+16kHz 모노 waveform을 VAD_FRAME_MS 단위 프레임으로 나눠 RMS 에너지(dBFS)를 계산하고,
+녹음의 배경 소음 수준보다 VAD_MARGIN_DB 이상 큰 프레임을 음성으로 판단합니다.
+배경 소음 추정은 녹음 전체가 음성일 때(쉼 없는 발화, 일정한 음량) 음성 자체를 소음으로 보므로,
+VAD_SPEECH_DB 이상인 프레임은 상대 기준과 관계없이 항상 음성으로 봅니다.
+짧은 쉼은 하나의 구간으로 합치고, 너무 짧은 잡음은 버리며, Whisper 입력 창(VAD_MAX_SEGMENT_S)보다
+긴 구간은 가장 조용한 지점에서 나눕니다. 무음 구간은 추론하지 않으므로 긴 강의 녹음의 연산량이 줄어듭니다.
+"""
+import os
+from typing import List, Tuple
+
+import numpy as np
+
+VAD_FRAME_MS = 30
+VAD_MARGIN_DB = float(os.getenv("BRAINTRACE_VAD_MARGIN_DB", 12))   # 배경 소음보다 이만큼 크면 음성
+VAD_MIN_DB = -55.0                 # 이보다 작은 에너지는 배경 소음이 낮아도 무음으로 취급
+VAD_SPEECH_DB = float(os.getenv("BRAINTRACE_VAD_SPEECH_DB", -35))   # 이보다 큰 에너지는 항상 음성 (임계값 상한)
+VAD_MIN_SILENCE_MS = 600           # 이보다 짧은 쉼은 같은 구간으로 합침
+VAD_MIN_SPEECH_MS = 250            # 이보다 짧은 음성 구간은 잡음으로 보고 버림
+VAD_PAD_MS = 200                   # 구간 앞뒤로 덧붙이는 여유 (단어 끝 잘림 방지)
+VAD_MAX_SEGMENT_S = 28.0           # Whisper 입력 창(30초)보다 약간 짧게
+VAD_SPLIT_SEARCH_S = 5.0           # 긴 구간을 나눌 때 가장 조용한 프레임을 찾는 범위 (끝에서부터)
+
+Segment = Tuple[int, int]          # [시작 샘플, 끝 샘플)
+
+
+def frame_energies(waveform: np.ndarray, sample_rate: int, frame_ms: int = VAD_FRAME_MS) -> np.ndarray:
+    """프레임별 RMS 에너지(dBFS). 마지막의 불완전한 프레임은 0으로 채워 계산합니다."""
+    frame_len = max(1, sample_rate * frame_ms // 1000)
+    n_frames = -(-len(waveform) // frame_len)
+    if n_frames == 0:
+        return np.zeros(0, dtype=np.float32)
+    padded = np.zeros(n_frames * frame_len, dtype=np.float32)
+    padded[:len(waveform)] = waveform
+    frames = padded.reshape(n_frames, frame_len)
+    rms = np.sqrt(np.mean(frames * frames, axis=1))
+    return 20.0 * np.log10(np.maximum(rms, 1e-10))
+
+
+def _runs(mask: np.ndarray) -> List[Tuple[int, int]]:
+    """불리언 배열에서 True가 이어지는 [시작, 끝) 구간 목록"""
+    if not mask.any():
+        return []
+    edges = np.diff(np.concatenate(([0], mask.astype(np.int8), [0])))
+    return list(zip(np.flatnonzero(edges == 1).tolist(), np.flatnonzero(edges == -1).tolist()))
+
+
+def _split_long(start: int, end: int, energies: np.ndarray, max_frames: int, search_frames: int) -> List[Tuple[int, int]]:
+    """max_frames보다 긴 프레임 구간을 끝부분 search_frames 안에서 가장 조용한 프레임 기준으로 나눕니다."""
+    pieces = []
+    while end - start > max_frames:
+        window_start = start + max(1, max_frames - search_frames)
+        window_end = start + max_frames
+        cut = window_start + int(np.argmin(energies[window_start:window_end]))
+        pieces.append((start, cut))
+        start = cut
+    pieces.append((start, end))
+    return pieces
+
+
+def detect_speech(waveform: np.ndarray, sample_rate: int) -> List[Segment]:
+    """
+    음성이 있는 구간을 샘플 단위로 반환합니다.
+
+    Returns:
+        [(시작 샘플, 끝 샘플)] 목록 (시간 순서, 서로 겹치지 않음). 음성이 없으면 빈 목록
+    """
+    energies = frame_energies(waveform, sample_rate)
+    if len(energies) == 0:
+        return []
+
+    # 배경 소음 수준은 조용한 쪽 10% 프레임으로 추정.
+    # 쉼이 거의 없는 녹음에서는 그 값이 음성 크기가 되므로 임계값을 VAD_SPEECH_DB로 제한
+    noise_floor = float(np.percentile(energies, 10))
+    threshold = min(max(noise_floor + VAD_MARGIN_DB, VAD_MIN_DB), VAD_SPEECH_DB)
+    runs = _runs(energies > threshold)
+
+    # 짧은 쉼으로 끊긴 구간 합치기
+    min_gap = VAD_MIN_SILENCE_MS // VAD_FRAME_MS
+    merged: List[List[int]] = []
+    for start, end in runs:
+        if merged and start - merged[-1][1] < min_gap:
+            merged[-1][1] = end
+        else:
+            merged.append([start, end])
+
+    min_speech = max(1, VAD_MIN_SPEECH_MS // VAD_FRAME_MS)
+    pad = VAD_PAD_MS // VAD_FRAME_MS
+    max_frames = int(VAD_MAX_SEGMENT_S * 1000 // VAD_FRAME_MS)
+    search_frames = int(VAD_SPLIT_SEARCH_S * 1000 // VAD_FRAME_MS)
+    frame_len = sample_rate * VAD_FRAME_MS // 1000
+
+    segments: List[Segment] = []
+    for start, end in merged:
+        if end - start < min_speech:
+            continue
+        start = max(0, start - pad)
+        end = min(len(energies), end + pad)
+        if segments and start * frame_len < segments[-1][1]:
+            start = segments[-1][1] // frame_len
+        for piece_start, piece_end in _split_long(start, end, energies, max_frames, search_frames):
+            segments.append((piece_start * frame_len, min(piece_end * frame_len, len(waveform))))
+    return segments
@@ -1,52 +1,264 @@
 import subprocess
-import tempfile
-from transformers import pipeline
-import torch
-import librosa
 import logging
 import os
+import gc
+import threading
+import time
+import numpy as np
+from typing import Any, BinaryIO, Dict, List, Optional, Tuple, Union
+from services.asr_backends import ASRBackend, ASR_BACKEND, create_backend
+from services.vad_service import detect_speech
+
+SAMPLE_RATE = 16000
+# 마지막 사용 후 이 시간(초)이 지나면 모델을 메모리에서 내림 (0이면 내리지 않음)
+ASR_IDLE_TIMEOUT = float(os.getenv("BRAINTRACE_ASR_IDLE_TIMEOUT", 600))
+# 서버 시작 시 모델을 미리 올려 둘지 여부
+ASR_WARMUP = os.getenv("BRAINTRACE_ASR_WARMUP", "0") == "1"
+# VAD로 나눈 음성 구간을 한 번에 추론할 개수
+ASR_BATCH_SIZE = int(os.getenv("BRAINTRACE_ASR_BATCH_SIZE", 2))
+# ffmpeg 표준입력으로 흘려 보낼 때의 버퍼 크기
+DECODE_CHUNK_SIZE = 1024 * 1024
+# moov 박스가 파일 끝에 있을 수 있어 파이프로는 디코딩하지 못하는 컨테이너 (임시 파일 경유)
+SEEKABLE_ONLY_FORMATS = {".mp4", ".m4a", ".mov", ".3gp", ".aac"}
+
+# 프로세스 전체에서 공유하는 ASR 백엔드 (services.asr_backends, BRAINTRACE_ASR_BACKEND로 선택).
+# 로딩/추론/해제는 모두 _asr_lock 안에서만 일어나므로 동시에 한 요청만 모델을 사용합니다.
+_asr_backend: Optional[ASRBackend] = None
+_asr_lock = threading.Lock()
+_asr_last_used = 0.0
+_evictor = None
+
+
+def _get_backend_locked() -> ASRBackend:
+    """_asr_lock을 잡은 상태에서 호출. 모델이 없으면 로딩합니다."""
+    global _asr_backend
+    if _asr_backend is None:
+        _asr_backend = create_backend(ASR_BACKEND)
+        _start_evictor()
+    _touch_locked()
+    return _asr_backend
+
+
+def _touch_locked():
+    global _asr_last_used
+    _asr_last_used = time.monotonic()
+
+
+def _evict_idle_loop():
+    interval = max(ASR_IDLE_TIMEOUT / 4, 1.0)
+    while True:
+        time.sleep(interval)
+        with _asr_lock:
+            if _asr_backend is not None and time.monotonic() - _asr_last_used >= ASR_IDLE_TIMEOUT:
+                _release_locked()
+                logging.info(f"🧹 [ASR] {ASR_IDLE_TIMEOUT:.0f}s 동안 사용하지 않아 모델을 내렸습니다")
+
+
+def _start_evictor():
+    global _evictor
+    if ASR_IDLE_TIMEOUT > 0 and (_evictor is None or not _evictor.is_alive()):
+        _evictor = threading.Thread(target=_evict_idle_loop, name="asr-evictor", daemon=True)
+        _evictor.start()
+
+
+def _release_locked():
+    global _asr_backend
+    if _asr_backend is not None:
+        _asr_backend.close()
+    _asr_backend = None
+    gc.collect()
+
+
+def unload_asr_pipeline():
+    """모델을 메모리에서 내립니다. (다음 transcribe 호출 때 다시 로딩)"""
+    with _asr_lock:
+        _release_locked()
+
+
+def warm_up():
+    """모델을 로딩하고 1초 무음으로 한 번 추론해 첫 요청의 지연을 없앱니다."""
+    with _asr_lock:
+        backend = _get_backend_locked()
+        backend.transcribe_batch([np.zeros(SAMPLE_RATE, dtype=np.float32)], SAMPLE_RATE, 1)
+        _touch_locked()
+    logging.info("✅ [ASR] 워밍업 완료")
+
+
+def asr_status() -> dict:
+    backend = _asr_backend
+    loaded = backend is not None
+    return {
+        "backend": ASR_BACKEND,
+        "model": backend.model if loaded else None,
+        "loaded": loaded,
+        "idle_seconds": round(time.monotonic() - _asr_last_used, 1) if loaded else None,
+        "idle_timeout": ASR_IDLE_TIMEOUT
+    }
 
-def transcribe(audio_path: str) -> str:
-    try:
-        logging.info(f"[Transcribe] 시작: {audio_path}")
-        device = 0 if torch.cuda.is_available() else -1
 
-        # Whisper pipeline
-        asr = pipeline(
-            "automatic-speech-recognition",
-            model="o0dimplz0o/Fine-Tuned-Whisper-Large-v2-Zeroth-STT-KO",
-            device=device,
-            chunk_length_s=30,
-            stride_length_s=5,
-            return_timestamps=False,
-            generate_kwargs={"language": "ko"}
-        )
+def ffmpeg_pcm_command(input_arg: str, sample_rate: int) -> list:
+    # 16kHz 모노 16bit PCM을 표준출력으로 내보냄 (중간 wav 파일 없음)
+    return [
+        "ffmpeg", "-nostdin", "-hide_banner", "-loglevel", "error",
+        "-i", input_arg,
+        "-f", "s16le", "-acodec", "pcm_s16le", "-ac", "1", "-ar", str(sample_rate),
+        "pipe:1"
+    ]
 
-        # webm/mp3 → wav 변환
-        with tempfile.NamedTemporaryFile(delete=False, suffix=".wav") as tmp_wav:
-            wav_path = tmp_wav.name
 
-        command = [
-            "ffmpeg",
-            "-y", "-i", audio_path,
-            "-ar", "16000", "-ac", "1", wav_path
-        ]
+def pcm_to_float(pcm: bytes) -> np.ndarray:
+    return np.frombuffer(pcm, dtype=np.int16).astype(np.float32) / 32768.0
 
 
-        subprocess.run(command, check=True, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
-        logging.info(f"[ffmpeg 변환 완료] {wav_path}")
+def decode_audio(source: Union[str, bytes], sample_rate: int = SAMPLE_RATE) -> np.ndarray:
+    """
+    ffmpeg로 오디오를 디코딩해 [-1, 1] 범위의 float32 모노 waveform으로 반환합니다.
+    출력은 파이프로 바로 받으므로 임시 파일을 만들지 않고, 리샘플링은 ffmpeg에서 한 번만 합니다.
 
+    Args:
+        source: 오디오 파일 경로 또는 파일 내용(bytes)
+    """
+    from_bytes = isinstance(source, (bytes, bytearray))
+    result = subprocess.run(
+        ffmpeg_pcm_command("pipe:0" if from_bytes else source, sample_rate),
+        input=bytes(source) if from_bytes else None,
+        stdin=None if from_bytes else subprocess.DEVNULL,
+        stdout=subprocess.PIPE, stderr=subprocess.PIPE, check=True
+    )
+    return pcm_to_float(result.stdout)
 
-        # librosa로 로딩
-        waveform, _ = librosa.load(wav_path, sr=16000)
-        logging.info(f"[Waveform 로딩 완료] 길이: {len(waveform)}")
 
-        result = asr({"array": waveform, "sampling_rate": 16000})
-        
-        # wav 파일 삭제
-        os.unlink(wav_path)
+def decode_audio_stream(src: BinaryIO, sample_rate: int = SAMPLE_RATE,
+                        max_bytes: Optional[int] = None, filename: str = "") -> np.ndarray:
+    """
+    파일 객체(업로드 스트림 등)를 DECODE_CHUNK_SIZE 단위로 ffmpeg 표준입력에 흘려 보내며 디코딩합니다.
+    입력 전체를 메모리나 디스크에 모으지 않으며, max_bytes를 넘으면 UploadTooLargeError를 발생시킵니다.
+    (mp4/m4a처럼 탐색(seek)이 필요한 컨테이너는 파이프로 읽지 못할 수 있으므로 decode_audio(경로)를 사용)
+    """
+    from services.upload_service import UploadTooLargeError
+
+    proc = subprocess.Popen(
+        ffmpeg_pcm_command("pipe:0", sample_rate),
+        stdin=subprocess.PIPE, stdout=subprocess.PIPE, stderr=subprocess.PIPE
+    )
+    feed_error = []
+
+    def feed():
+        size = 0
+        try:
+            while True:
+                chunk = src.read(DECODE_CHUNK_SIZE)
+                if not chunk:
+                    break
+                size += len(chunk)
+                if max_bytes is not None and size > max_bytes:
+                    raise UploadTooLargeError(filename or "audio", max_bytes)
+                proc.stdin.write(chunk)
+        except BrokenPipeError:
+            pass  # ffmpeg가 먼저 종료됨 (에러는 종료 코드로 확인)
+        except BaseException as e:
+            feed_error.append(e)
+            proc.kill()
+        finally:
+            try:
+                proc.stdin.close()
+            except OSError:
+                pass
+
+    # 입력 쓰기와 출력 읽기를 동시에 해야 파이프 버퍼가 차서 멈추지 않음
+    feeder = threading.Thread(target=feed, name="ffmpeg-feed", daemon=True)
+    feeder.start()
+    stderr_chunks = []
+    stderr_reader = threading.Thread(target=lambda: stderr_chunks.append(proc.stderr.read()), daemon=True)
+    stderr_reader.start()
+    pcm = proc.stdout.read()
+    proc.wait()
+    feeder.join()
+    stderr_reader.join()
+
+    if feed_error:
+        raise feed_error[0]
+    if proc.returncode != 0:
+        raise subprocess.CalledProcessError(proc.returncode, proc.args, output=None, stderr=b"".join(stderr_chunks))
+    return pcm_to_float(pcm)
+
+
+def transcribe_spans(waveform: np.ndarray, spans: List[Tuple[int, int]], batch_size: int = ASR_BATCH_SIZE,
+                     backend: Optional[ASRBackend] = None, offset: int = 0) -> List[Dict[str, Any]]:
+    """
+    waveform의 [시작, 끝) 샘플 구간들을 전사합니다. 텍스트가 비어 있는 구간은 결과에서 빠집니다.
+
+    Args:
+        offset: 반환하는 start/end에 더할 샘플 수 (스트리밍에서 잘라 낸 앞부분 길이)
+    Returns:
+        [{"start", "end", "text"}] (초 단위)
+    """
+    if not spans:
+        return []
+    arrays = [waveform[start:end] for start, end in spans]
+    if backend is not None:
+        texts = backend.transcribe_batch(arrays, SAMPLE_RATE, batch_size)
+    else:
+        # 공유 백엔드로 추론 (동시 요청은 순서대로 처리)
+        with _asr_lock:
+            texts = _get_backend_locked().transcribe_batch(arrays, SAMPLE_RATE, batch_size)
+            _touch_locked()
+
+    segments = []
+    for (start, end), text in zip(spans, texts):
+        text = text.strip()
+        if text:
+            segments.append({
+                "start": round((start + offset) / SAMPLE_RATE, 2),
+                "end": round((end + offset) / SAMPLE_RATE, 2),
+                "text": text
+            })
+    return segments
+
+
+def transcribe_segments(waveform: np.ndarray, batch_size: int = ASR_BATCH_SIZE,
+                        backend: Optional[ASRBackend] = None) -> Dict[str, Any]:
+    """
+    VAD로 무음을 걸러 낸 음성 구간들을 batch_size개씩 묶어 추론하고, 시간 순서대로 이어 붙입니다.
+
+    Args:
+        waveform: 16kHz 모노 float32 waveform
+        batch_size: 파이프라인에 한 번에 넣을 구간 수
+        backend: 사용할 백엔드 (생략하면 공유 백엔드, 벤치마크용)
+    Returns:
+        {"text", "segments": [{"start", "end", "text"}] (초 단위), "duration", "speech_seconds"}
+    """
+    duration = len(waveform) / SAMPLE_RATE
+    spans = detect_speech(waveform, SAMPLE_RATE)
+    speech_seconds = sum(end - start for start, end in spans) / SAMPLE_RATE
+    logging.info(f"[VAD] 전체 {duration:.1f}s 중 음성 {speech_seconds:.1f}s, 구간 {len(spans)}개")
+    if not spans:
+        return {"text": "", "segments": [], "duration": round(duration, 2), "speech_seconds": 0.0}
+
+    segments = transcribe_spans(waveform, spans, batch_size, backend)
+    return {
+        "text": " ".join(segment["text"] for segment in segments),
+        "segments": segments,
+        "duration": round(duration, 2),
+        "speech_seconds": round(speech_seconds, 2)
+    }
+
+
+def transcribe_waveform(waveform: np.ndarray) -> str:
+    """16kHz 모노 float32 waveform을 텍스트로 변환합니다."""
+    logging.info(f"[Waveform 로딩 완료] 길이: {len(waveform)}")
+    return transcribe_segments(waveform)["text"]
+
+
+def transcribe(audio_path: str) -> str:
+    try:
+        logging.info(f"[Transcribe] 시작: {audio_path}")
+
+        # webm/mp3 등 → 16kHz 모노 PCM을 파이프로 바로 디코딩
+        waveform = decode_audio(audio_path)
+        logging.info(f"[ffmpeg 디코딩 완료] {audio_path}")
 
-        return result["text"]
+        return transcribe_waveform(waveform)
 
     except subprocess.CalledProcessError as e:
         logging.exception("ffmpeg 변환 실패")
@@ -0,0 +1,97 @@
+"""
+SQLite 연결 풀 벤치마크.
+
+임시 DB에 스키마를 만들고 get_brain / get_memos_by_brain_and_folder 조회를 반복해 초당 호출 수를 비교합니다.
+
+- pooled: 현재 SQLiteHandler (풀에서 설정이 끝난 연결을 빌려 씀)
+- fresh: 풀 도입 전 방식 (호출마다 sqlite3.connect 후 close, PRAGMA 없음)
+
+    python -m sqlite_db.benchmark --calls 20000 --threads 1,4
+"""
+import argparse
+import os
+import sqlite3
+import sys
+import tempfile
+import threading
+import time
+from typing import Callable, Dict, List
+
+from sqlite_db.sqlite_handler import SQLiteHandler
+
+GET_BRAIN_QUERY = "SELECT brain_id, brain_name, user_id, icon_key, created_at FROM Brain WHERE brain_id=?"
+GET_MEMOS_QUERY = ("SELECT memo_id, memo_title, memo_text, memo_date, is_source, type, folder_id, brain_id "
+                   "FROM Memo WHERE brain_id = ? AND folder_id IS NULL ORDER BY memo_date DESC")
+
+
+def _fresh_call(db_path: str, query: str, brain_id: int) -> list:
+    """풀 도입 전 SQLiteHandler 메서드와 같은 연결 사용 방식"""
+    conn = sqlite3.connect(db_path)
+    try:
+        return conn.execute(query, (brain_id,)).fetchall()
+    finally:
+        conn.close()
+
+
+def _calls_per_second(call: Callable[[], object], calls: int, threads: int) -> float:
+    per_thread = calls // threads
+
+    def worker():
+        for _ in range(per_thread):
+            call()
+
+    workers = [threading.Thread(target=worker) for _ in range(threads)]
+    started = time.perf_counter()
+    for thread in workers:
+        thread.start()
+    for thread in workers:
+        thread.join()
+    return per_thread * threads / (time.perf_counter() - started)
+
+
+def run_benchmark(db_path: str, calls: int, thread_counts: List[int]) -> List[Dict[str, object]]:
+    handler = SQLiteHandler(db_path)
+    handler._init_db()
+    user = handler.create_user("benchmark", "benchmark")
+    brain = handler.create_brain("benchmark", user["user_id"])
+    brain_id = brain["brain_id"]
+    for index in range(50):
+        handler.create_memo(f"memo {index}", "본문", brain_id=brain_id)
+
+    cases = {
+        "get_brain": (lambda: handler.get_brain(brain_id),
+                      lambda: _fresh_call(db_path, GET_BRAIN_QUERY, brain_id)),
+        "get_memos_by_brain_and_folder": (lambda: handler.get_memos_by_brain_and_folder(brain_id),
+                                          lambda: _fresh_call(db_path, GET_MEMOS_QUERY, brain_id)),
+    }
+    rows = []
+    for name, (pooled, fresh) in cases.items():
+        for threads in thread_counts:
+            rows.append({
+                "method": name,
+                "threads": threads,
+                "fresh": _calls_per_second(fresh, calls, threads),
+                "pooled": _calls_per_second(pooled, calls, threads),
+            })
+    return rows
+
+
+def main(argv: List[str] = None) -> int:
+    parser = argparse.ArgumentParser(description="SQLite 연결 풀 사용 전후 get_* 초당 호출 수 비교")
+    parser.add_argument("--calls", type=int, default=20000, help="경우마다 실행할 호출 수")
+    parser.add_argument("--threads", default="1,4", help="쉼표로 구분한 동시 스레드 수")
+    args = parser.parse_args(argv)
+    thread_counts = [int(count) for count in args.threads.split(",") if count.strip()]
+
+    with tempfile.TemporaryDirectory() as tmp:
+        rows = run_benchmark(os.path.join(tmp, "bench.db"), args.calls, thread_counts)
+
+    print(f"{'method':<32}{'threads':>8}{'fresh(/s)':>12}{'pooled(/s)':>12}{'speedup':>9}")
+    for row in rows:
+        print(f"{row['method']:<32}{row['threads']:>8}{row['fresh']:>12.0f}{row['pooled']:>12.0f}"
+              f"{row['pooled'] / row['fresh']:>8.1f}x")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,338 @@
+import json
+import logging
+import sqlite3
+from typing import Callable, List, Optional, Tuple, Union
+
+
+def parse_referenced_nodes(raw: Optional[str]) -> List[str]:
+    """
+    Chat.referenced_nodes 값을 노드 이름 목록으로 변환합니다.
+    JSON 배열(현재 형식)과 쉼표로 이어 붙인 예전 텍스트 형식을 모두 읽습니다.
+    """
+    if not raw:
+        return []
+    if raw.startswith("["):
+        try:
+            nodes = json.loads(raw)
+            if isinstance(nodes, list):
+                return [str(node) for node in nodes]
+        except json.JSONDecodeError:
+            pass
+    return [node.strip().strip('"') for node in raw.split(",") if node.strip()]
+
+
+def _convert_referenced_nodes_to_json(conn: sqlite3.Connection) -> None:
+    """쉼표로 이어 붙인 Chat.referenced_nodes 값을 JSON 배열 문자열로 변환합니다."""
+    rows = conn.execute(
+        "SELECT chat_id, referenced_nodes FROM Chat "
+        "WHERE referenced_nodes IS NOT NULL AND referenced_nodes NOT LIKE '[%'"
+    ).fetchall()
+    conn.executemany(
+        "UPDATE Chat SET referenced_nodes = ? WHERE chat_id = ?",
+        [(json.dumps(parse_referenced_nodes(raw), ensure_ascii=False), chat_id) for chat_id, raw in rows]
+    )
+
+# v7에서 만들었던 ContentBigram 동기화 트리거 (v8에서 제거)
+_BIGRAM_TABLES = ["memo", "pdf", "textfile", "voice", "chat"]
+
+
+# 버전별 스키마 마이그레이션.
+# DB의 PRAGMA user_version에 마지막으로 적용된 버전이 기록되며,
+# _init_db 시 그보다 높은 버전만 순서대로 한 번씩 적용됩니다.
+# 새 마이그레이션은 항상 목록 끝에 다음 버전 번호로 추가하고, 이미 배포된 항목은 수정하지 않습니다.
+# 각 단계는 SQL 문자열이거나, 같은 트랜잭션 안에서 연결을 받아 실행되는 함수입니다.
+MIGRATIONS: List[Tuple[int, str, List[Union[str, Callable[[sqlite3.Connection], None]]]]] = [
+    (1, "brain_id / folder_id / is_delete 조회용 인덱스", [
+        # 폴더 목록, 기본 폴더 조회
+        "CREATE INDEX IF NOT EXISTS idx_folder_brain ON Folder(brain_id, is_default)",
+        # 폴더별(또는 폴더 없음) 목록: WHERE folder_id = ? / IS NULL ORDER BY *_date DESC
+        "CREATE INDEX IF NOT EXISTS idx_memo_folder_date ON Memo(folder_id, memo_date)",
+        "CREATE INDEX IF NOT EXISTS idx_pdf_folder_date ON Pdf(folder_id, pdf_date)",
+        "CREATE INDEX IF NOT EXISTS idx_voice_folder_date ON Voice(folder_id, voice_date)",
+        "CREATE INDEX IF NOT EXISTS idx_textfile_folder_date ON TextFile(folder_id, txt_date)",
+        # 브레인별 목록/삭제/제목 검색: WHERE brain_id = ? AND folder_id IS [NOT] NULL
+        "CREATE INDEX IF NOT EXISTS idx_memo_brain_folder ON Memo(brain_id, folder_id, memo_date)",
+        "CREATE INDEX IF NOT EXISTS idx_pdf_brain_folder ON Pdf(brain_id, folder_id, pdf_date)",
+        "CREATE INDEX IF NOT EXISTS idx_voice_brain_folder ON Voice(brain_id, folder_id, voice_date)",
+        "CREATE INDEX IF NOT EXISTS idx_textfile_brain_folder ON TextFile(brain_id, folder_id, txt_date)",
+        # 휴지통: WHERE brain_id = ? AND is_delete = 1 ORDER BY memo_date DESC
+        "CREATE INDEX IF NOT EXISTS idx_memo_brain_deleted ON Memo(brain_id, is_delete, memo_date)",
+        # 채팅 목록: WHERE brain_id = ? ORDER BY chat_id
+        "CREATE INDEX IF NOT EXISTS idx_chat_brain_chat ON Chat(brain_id, chat_id)",
+    ]),
+    (2, "제목/메모/채팅 전문 검색용 FTS5(trigram) 인덱스", [
+        # Memo/Pdf/TextFile/Voice/Chat의 ID는 모두 Sequence(content_id)에서 발급되어 서로 겹치지 않으므로
+        # 원본 ID를 그대로 rowid로 사용합니다. (트리거에서 rowid로 바로 갱신/삭제 가능)
+        """
+        CREATE VIRTUAL TABLE IF NOT EXISTS ContentSearch USING fts5(
+            kind UNINDEXED,
+            brain_id UNINDEXED,
+            deleted UNINDEXED,
+            title,
+            body,
+            tokenize = 'trigram'
+        )
+        """,
+        # 기존 데이터 색인
+        "INSERT INTO ContentSearch(rowid, kind, brain_id, deleted, title, body) "
+        "SELECT memo_id, 'memo', brain_id, is_delete, memo_title, memo_text FROM Memo",
+        "INSERT INTO ContentSearch(rowid, kind, brain_id, deleted, title, body) "
+        "SELECT pdf_id, 'pdf', brain_id, 0, pdf_title, NULL FROM Pdf",
+        "INSERT INTO ContentSearch(rowid, kind, brain_id, deleted, title, body) "
+        "SELECT txt_id, 'text', brain_id, 0, txt_title, NULL FROM TextFile",
+        "INSERT INTO ContentSearch(rowid, kind, brain_id, deleted, title, body) "
+        "SELECT voice_id, 'voice', brain_id, 0, voice_title, NULL FROM Voice",
+        "INSERT INTO ContentSearch(rowid, kind, brain_id, deleted, title, body) "
+        "SELECT chat_id, 'chat', brain_id, 0, NULL, message FROM Chat",
+        # 동기화 트리거
+        """
+        CREATE TRIGGER IF NOT EXISTS memo_search_ai AFTER INSERT ON Memo BEGIN
+            INSERT INTO ContentSearch(rowid, kind, brain_id, deleted, title, body)
+            VALUES (new.memo_id, 'memo', new.brain_id, new.is_delete, new.memo_title, new.memo_text);
+        END
+        """,
+        """
+        CREATE TRIGGER IF NOT EXISTS memo_search_au
+        AFTER UPDATE OF memo_title, memo_text, brain_id, is_delete ON Memo BEGIN
+            DELETE FROM ContentSearch WHERE rowid = old.memo_id;
+            INSERT INTO ContentSearch(rowid, kind, brain_id, deleted, title, body)
+            VALUES (new.memo_id, 'memo', new.brain_id, new.is_delete, new.memo_title, new.memo_text);
+        END
+        """,
+        """
+        CREATE TRIGGER IF NOT EXISTS memo_search_ad AFTER DELETE ON Memo BEGIN
+            DELETE FROM ContentSearch WHERE rowid = old.memo_id;
+        END
+        """,
+        """
+        CREATE TRIGGER IF NOT EXISTS pdf_search_ai AFTER INSERT ON Pdf BEGIN
+            INSERT INTO ContentSearch(rowid, kind, brain_id, deleted, title, body)
+            VALUES (new.pdf_id, 'pdf', new.brain_id, 0, new.pdf_title, NULL);
+        END
+        """,
+        """
+        CREATE TRIGGER IF NOT EXISTS pdf_search_au AFTER UPDATE OF pdf_title, brain_id ON Pdf BEGIN
+            DELETE FROM ContentSearch WHERE rowid = old.pdf_id;
+            INSERT INTO ContentSearch(rowid, kind, brain_id, deleted, title, body)
+            VALUES (new.pdf_id, 'pdf', new.brain_id, 0, new.pdf_title, NULL);
+        END
+        """,
+        """
+        CREATE TRIGGER IF NOT EXISTS pdf_search_ad AFTER DELETE ON Pdf BEGIN
+            DELETE FROM ContentSearch WHERE rowid = old.pdf_id;
+        END
+        """,
+        """
+        CREATE TRIGGER IF NOT EXISTS textfile_search_ai AFTER INSERT ON TextFile BEGIN
+            INSERT INTO ContentSearch(rowid, kind, brain_id, deleted, title, body)
+            VALUES (new.txt_id, 'text', new.brain_id, 0, new.txt_title, NULL);
+        END
+        """,
+        """
+        CREATE TRIGGER IF NOT EXISTS textfile_search_au AFTER UPDATE OF txt_title, brain_id ON TextFile BEGIN
+            DELETE FROM ContentSearch WHERE rowid = old.txt_id;
+            INSERT INTO ContentSearch(rowid, kind, brain_id, deleted, title, body)
+            VALUES (new.txt_id, 'text', new.brain_id, 0, new.txt_title, NULL);
+        END
+        """,
+        """
+        CREATE TRIGGER IF NOT EXISTS textfile_search_ad AFTER DELETE ON TextFile BEGIN
+            DELETE FROM ContentSearch WHERE rowid = old.txt_id;
+        END
+        """,
+        """
+        CREATE TRIGGER IF NOT EXISTS voice_search_ai AFTER INSERT ON Voice BEGIN
+            INSERT INTO ContentSearch(rowid, kind, brain_id, deleted, title, body)
+            VALUES (new.voice_id, 'voice', new.brain_id, 0, new.voice_title, NULL);
+        END
+        """,
+        """
+        CREATE TRIGGER IF NOT EXISTS voice_search_au AFTER UPDATE OF voice_title, brain_id ON Voice BEGIN
+            DELETE FROM ContentSearch WHERE rowid = old.voice_id;
+            INSERT INTO ContentSearch(rowid, kind, brain_id, deleted, title, body)
+            VALUES (new.voice_id, 'voice', new.brain_id, 0, new.voice_title, NULL);
+        END
+        """,
+        """
+        CREATE TRIGGER IF NOT EXISTS voice_search_ad AFTER DELETE ON Voice BEGIN
+            DELETE FROM ContentSearch WHERE rowid = old.voice_id;
+        END
+        """,
+        """
+        CREATE TRIGGER IF NOT EXISTS chat_search_ai AFTER INSERT ON Chat BEGIN
+            INSERT INTO ContentSearch(rowid, kind, brain_id, deleted, title, body)
+            VALUES (new.chat_id, 'chat', new.brain_id, 0, NULL, new.message);
+        END
+        """,
+        """
+        CREATE TRIGGER IF NOT EXISTS chat_search_au AFTER UPDATE OF message, brain_id ON Chat BEGIN
+            DELETE FROM ContentSearch WHERE rowid = old.chat_id;
+            INSERT INTO ContentSearch(rowid, kind, brain_id, deleted, title, body)
+            VALUES (new.chat_id, 'chat', new.brain_id, 0, NULL, new.message);
+        END
+        """,
+        """
+        CREATE TRIGGER IF NOT EXISTS chat_search_ad AFTER DELETE ON Chat BEGIN
+            DELETE FROM ContentSearch WHERE rowid = old.chat_id;
+        END
+        """,
+    ]),
+    (3, "Chat.referenced_nodes를 JSON 배열로 변환", [
+        _convert_referenced_nodes_to_json,
+    ]),
+    (4, "업로드 파일 내용 해시(중복 업로드 판별) 테이블", [
+        # content_id는 Pdf/TextFile/Voice의 ID(= 그래프의 source_id)
+        """
+        CREATE TABLE IF NOT EXISTS ContentHash (
+            content_id INTEGER PRIMARY KEY,
+            kind TEXT NOT NULL,
+            brain_id INTEGER,
+            sha256 TEXT NOT NULL,
+            size INTEGER,
+            path TEXT,
+            ingested INTEGER NOT NULL DEFAULT 0,
+            created_at DATETIME DEFAULT CURRENT_TIMESTAMP
+        )
+        """,
+        # 해시로 같은 내용의 파일/소스 조회: WHERE sha256 IN (...)
+        "CREATE INDEX IF NOT EXISTS idx_contenthash_sha_brain ON ContentHash(sha256, brain_id)",
+        # 원본 항목이 삭제되거나 다른 브레인으로 옮겨지면 함께 반영
+        """
+        CREATE TRIGGER IF NOT EXISTS pdf_hash_ad AFTER DELETE ON Pdf BEGIN
+            DELETE FROM ContentHash WHERE content_id = old.pdf_id;
+        END
+        """,
+        """
+        CREATE TRIGGER IF NOT EXISTS pdf_hash_au AFTER UPDATE OF brain_id ON Pdf
+        WHEN old.brain_id IS NOT new.brain_id BEGIN
+            UPDATE ContentHash SET brain_id = new.brain_id, ingested = 0 WHERE content_id = new.pdf_id;
+        END
+        """,
+        """
+        CREATE TRIGGER IF NOT EXISTS textfile_hash_ad AFTER DELETE ON TextFile BEGIN
+            DELETE FROM ContentHash WHERE content_id = old.txt_id;
+        END
+        """,
+        """
+        CREATE TRIGGER IF NOT EXISTS textfile_hash_au AFTER UPDATE OF brain_id ON TextFile
+        WHEN old.brain_id IS NOT new.brain_id BEGIN
+            UPDATE ContentHash SET brain_id = new.brain_id, ingested = 0 WHERE content_id = new.txt_id;
+        END
+        """,
+        """
+        CREATE TRIGGER IF NOT EXISTS voice_hash_ad AFTER DELETE ON Voice BEGIN
+            DELETE FROM ContentHash WHERE content_id = old.voice_id;
+        END
+        """,
+        """
+        CREATE TRIGGER IF NOT EXISTS voice_hash_au AFTER UPDATE OF brain_id ON Voice
+        WHEN old.brain_id IS NOT new.brain_id BEGIN
+            UPDATE ContentHash SET brain_id = new.brain_id, ingested = 0 WHERE content_id = new.voice_id;
+        END
+        """,
+    ]),
+    (5, "백그라운드 수집(ingest) 작업 큐", [
+        # status: queued → running → done | failed (failed/중단된 작업은 마지막 완료 청크부터 재개)
+        # stage: chunking → extracting → graph → embedding → done
+        """
+        CREATE TABLE IF NOT EXISTS IngestJob (
+            job_id INTEGER PRIMARY KEY AUTOINCREMENT,
+            kind TEXT NOT NULL,
+            brain_id TEXT NOT NULL,
+            source_id TEXT NOT NULL,
+            payload TEXT,
+            status TEXT NOT NULL DEFAULT 'queued',
+            stage TEXT NOT NULL DEFAULT 'queued',
+            total_chunks INTEGER NOT NULL DEFAULT 0,
+            chunks_done INTEGER NOT NULL DEFAULT 0,
+            total_nodes INTEGER NOT NULL DEFAULT 0,
+            nodes_written INTEGER NOT NULL DEFAULT 0,
+            nodes_embedded INTEGER NOT NULL DEFAULT 0,
+            vectors_upserted INTEGER NOT NULL DEFAULT 0,
+            attempts INTEGER NOT NULL DEFAULT 0,
+            error TEXT,
+            created_at DATETIME DEFAULT CURRENT_TIMESTAMP,
+            updated_at DATETIME DEFAULT CURRENT_TIMESTAMP
+        )
+        """,
+        # 대기 작업 선택: WHERE status = 'queued' ORDER BY job_id
+        "CREATE INDEX IF NOT EXISTS idx_ingestjob_status ON IngestJob(status, job_id)",
+        "CREATE INDEX IF NOT EXISTS idx_ingestjob_brain ON IngestJob(brain_id, job_id)",
+        # 청크별 추출 결과 (재개 시 이미 끝난 청크는 다시 LLM에 보내지 않음)
+        """
+        CREATE TABLE IF NOT EXISTS IngestChunk (
+            job_id INTEGER NOT NULL,
+            chunk_index INTEGER NOT NULL,
+            chunk_text TEXT NOT NULL,
+            provenance TEXT,
+            result TEXT,
+            PRIMARY KEY (job_id, chunk_index)
+        )
+        """,
+    ]),
+    (6, "음성 전사 작업 큐와 Voice.transcript", [
+        """
+        CREATE TABLE IF NOT EXISTS TranscribeJob (
+            job_id INTEGER PRIMARY KEY AUTOINCREMENT,
+            voice_id INTEGER,
+            audio_path TEXT NOT NULL,
+            owns_audio INTEGER NOT NULL DEFAULT 0,
+            status TEXT NOT NULL DEFAULT 'queued',
+            duration REAL,
+            text TEXT,
+            segments TEXT,
+            error TEXT,
+            attempts INTEGER NOT NULL DEFAULT 0,
+            created_at DATETIME DEFAULT CURRENT_TIMESTAMP,
+            started_at DATETIME,
+            finished_at DATETIME
+        )
+        """,
+        "CREATE INDEX IF NOT EXISTS idx_transcribejob_status ON TranscribeJob(status, job_id)",
+        "CREATE INDEX IF NOT EXISTS idx_transcribejob_voice ON TranscribeJob(voice_id, job_id)",
+        # 마지막으로 완료된 전사 결과
+        "ALTER TABLE Voice ADD COLUMN transcript TEXT",
+    ]),
+    (7, "1~2글자 검색어용 FTS5 bigram 인덱스 (v8에서 제거, 새 DB에는 만들지 않음)", [
+        # 트리거가 Python에서 등록한 SQL 함수 bigrams()를 호출해 다른 연결(sqlite3 CLI, 백업 스크립트 등)에서
+        # 원본 테이블에 쓸 수 없었으므로 더 이상 만들지 않음. 짧은 검색어는 ContentSearch LIKE로 처리
+    ]),
+    (8, "ContentBigram 인덱스와 동기화 트리거 제거", [
+        *(f"DROP TRIGGER IF EXISTS {table}_bigram_{event}"
+          for table in _BIGRAM_TABLES for event in ("ai", "au", "ad")),
+        "DROP TABLE IF EXISTS ContentBigram",
+    ]),
+]
+
+
+def get_schema_version(conn: sqlite3.Connection) -> int:
+    return conn.execute("PRAGMA user_version").fetchone()[0]
+
+
+def apply_migrations(conn: sqlite3.Connection) -> int:
+    """
+    아직 적용되지 않은 마이그레이션을 버전 순서대로 적용합니다.
+    각 마이그레이션은 user_version 갱신과 함께 하나의 트랜잭션으로 커밋되므로
+    중간에 실패하면 해당 버전은 통째로 롤백되고 다음 기동 시 다시 시도됩니다.
+    Returns:
+        적용 후 스키마 버전
+    """
+    current = get_schema_version(conn)
+    for version, description, statements in MIGRATIONS:
+        if version <= current:
+            continue
+        try:
+            conn.execute("BEGIN")
+            for statement in statements:
+                if callable(statement):
+                    statement(conn)
+                else:
+                    conn.execute(statement)
+            conn.execute(f"PRAGMA user_version = {int(version)}")
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+        current = version
+        logging.info("✅ SQLite 마이그레이션 v%d 적용: %s", version, description)
+    return current
@@ -0,0 +1,143 @@
+import logging
+import queue
+import sqlite3
+import threading
+from typing import Dict
+
+# 연결마다 한 번만 적용하는 PRAGMA 설정
+CONNECT_TIMEOUT = 30                  # 잠금 대기 시간 (초)
+CONNECTION_PRAGMAS = (
+    "PRAGMA journal_mode=WAL;",
+    "PRAGMA busy_timeout=30000;",
+    "PRAGMA synchronous=NORMAL;",      # WAL 모드에서는 NORMAL로도 커밋 내구성이 유지됨
+    "PRAGMA mmap_size=268435456;",     # 256MB 메모리 매핑 읽기
+    "PRAGMA cache_size=-16000;",       # 연결당 약 16MB 페이지 캐시
+)
+# 풀에 보관할 유휴 연결 최대 개수 (초과분은 반납 시 닫힘)
+POOL_MAX_IDLE = 8
+
+
+class PooledConnection:
+    """
+    풀에서 빌린 sqlite3.Connection 래퍼.
+    close()를 호출하면 실제로 닫지 않고 진행 중인 트랜잭션을 롤백한 뒤 풀에 반납합니다.
+    그 외 속성/메서드는 모두 원래 연결로 위임됩니다.
+    """
+
+    __slots__ = ("_pool", "_conn")
+
+    def __init__(self, pool: "ConnectionPool", conn: sqlite3.Connection):
+        object.__setattr__(self, "_pool", pool)
+        object.__setattr__(self, "_conn", conn)
+
+    def __getattr__(self, name):
+        conn = object.__getattribute__(self, "_conn")
+        if conn is None:
+            raise sqlite3.ProgrammingError("Cannot operate on a closed database.")
+        return getattr(conn, name)
+
+    def __setattr__(self, name, value):
+        setattr(self._conn, name, value)
+
+    def close(self):
+        conn = self._conn
+        if conn is None:
+            return
+        object.__setattr__(self, "_conn", None)
+        self._pool.release(conn)
+
+    def __enter__(self):
+        return self._conn.__enter__()
+
+    def __exit__(self, *exc):
+        return self._conn.__exit__(*exc)
+
+    def __del__(self):
+        # close() 없이 버려진 연결도 풀로 돌려보냄
+        try:
+            self.close()
+        except Exception:
+            pass
+
+
+class ConnectionPool:
+    """
+    하나의 DB 파일에 대한 큐 기반 연결 풀.
+    빌릴 때마다 다른 스레드/호출과 겹치지 않는 연결을 하나씩 내주므로,
+    한 메서드 안에서 다른 메서드를 호출해도(중첩 사용) 안전합니다.
+    유휴 연결이 없으면 새로 만들고, 반납 시 유휴 연결이 POOL_MAX_IDLE개를 넘으면 닫습니다.
+    """
+
+    def __init__(self, db_path: str, max_idle: int = POOL_MAX_IDLE):
+        self.db_path = db_path
+        self._idle: "queue.LifoQueue[sqlite3.Connection]" = queue.LifoQueue(maxsize=max_idle)
+        self._lock = threading.Lock()
+        self.created = 0
+        self.reused = 0
+
+    def _new_connection(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.db_path, timeout=CONNECT_TIMEOUT, check_same_thread=False)
+        for pragma in CONNECTION_PRAGMAS:
+            conn.execute(pragma)
+        with self._lock:
+            self.created += 1
+        return conn
+
+    def acquire(self) -> PooledConnection:
+        try:
+            conn = self._idle.get_nowait()
+            with self._lock:
+                self.reused += 1
+        except queue.Empty:
+            conn = self._new_connection()
+        return PooledConnection(self, conn)
+
+    def release(self, conn: sqlite3.Connection) -> None:
+        try:
+            if conn.in_transaction:
+                conn.rollback()
+            conn.row_factory = None
+            self._idle.put_nowait(conn)
+        except queue.Full:
+            conn.close()
+        except sqlite3.Error as e:
+            logging.warning("SQLite 연결 반납 실패, 연결을 닫습니다: %s", str(e))
+            conn.close()
+
+    def close_all(self) -> None:
+        """유휴 연결을 모두 닫습니다. (빌려 간 연결은 반납 시 다시 풀에 들어감)"""
+        while True:
+            try:
+                self._idle.get_nowait().close()
+            except queue.Empty:
+                break
+
+    def stats(self) -> Dict[str, int]:
+        return {"created": self.created, "reused": self.reused, "idle": self._idle.qsize()}
+
+
+_pools: Dict[str, ConnectionPool] = {}
+_pools_lock = threading.Lock()
+
+
+def get_pool(db_path: str) -> ConnectionPool:
+    """db_path별로 프로세스 전체에서 공유하는 연결 풀을 반환합니다."""
+    pool = _pools.get(db_path)
+    if pool is None:
+        with _pools_lock:
+            pool = _pools.get(db_path)
+            if pool is None:
+                pool = _pools[db_path] = ConnectionPool(db_path)
+    return pool
+
+
+def close_all_pools() -> None:
+    with _pools_lock:
+        for pool in _pools.values():
+            pool.close_all()
+
+
+def pool_stats() -> Dict[str, Dict[str, int]]:
+    """DB 파일별 연결 풀 통계"""
+    with _pools_lock:
+        return {db_path: pool.stats() for db_path, pool in _pools.items()}
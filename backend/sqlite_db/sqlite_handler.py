@@ -1,5 +1,24 @@
 import sqlite3, json, logging, os, hashlib,datetime
 from typing import List, Dict, Any, Optional
+from sqlite_db.pool import get_pool
+from sqlite_db.migrations import apply_migrations, parse_referenced_nodes
+
+# 전문 검색(ContentSearch) 설정
+FTS_MIN_TERM_LENGTH = 3     # trigram 토크나이저로 인덱스 검색이 가능한 최소 글자 수
+SEARCH_TITLE_WEIGHT = 10.0  # BM25 점수에서 본문 대비 제목 가중치
+SEARCH_LIMIT = 20
+
+# update_ingest_job으로 갱신할 수 있는 수집 작업 필드
+INGEST_JOB_FIELDS = ("status", "stage", "total_chunks", "chunks_done", "total_nodes",
+                     "nodes_written", "nodes_embedded", "vectors_upserted", "error")
+
+# 일괄 처리(create_many / move_many / delete_many)용 콘텐츠 종류별 테이블 정보
+CONTENT_TABLES = {
+    "memo":  {"table": "Memo",     "id": "memo_id",  "title": "memo_title",  "path": None,         "date": "memo_date"},
+    "pdf":   {"table": "Pdf",      "id": "pdf_id",   "title": "pdf_title",   "path": "pdf_path",   "date": "pdf_date"},
+    "text":  {"table": "TextFile", "id": "txt_id",   "title": "txt_title",   "path": "txt_path",   "date": "txt_date"},
+    "voice": {"table": "Voice",    "id": "voice_id", "title": "voice_title", "path": "voice_path", "date": "voice_date"},
+}
 
 
 class SQLiteHandler:
@@ -13,14 +32,21 @@ class SQLiteHandler:
             self.db_path = db_path
         
         #self._init_db()
+        # 같은 DB 파일을 쓰는 핸들러들은 하나의 연결 풀을 공유
+        self._pool = get_pool(self.db_path)
     
+    def _connect(self):
+        """
+        풀에서 WAL/busy_timeout 등이 설정된 연결을 빌려옵니다.
+        conn.close()를 호출하면 연결이 닫히지 않고 풀로 반납됩니다.
+        """
+        return self._pool.acquire()
+
     def _init_db(self):
         """SQLite 데이터베이스와 테이블 초기화"""
         try:
             
-            conn = sqlite3.connect(self.db_path, timeout=30,check_same_thread=False)
-            conn.execute("PRAGMA journal_mode=WAL;")
-            conn.execute("PRAGMA busy_timeout=30000;")
+            conn = self._connect()
             cursor = conn.cursor()
             
             # 시퀀스 테이블 생성
@@ -143,8 +169,11 @@ class SQLiteHandler:
             ''')
 
             conn.commit()
+
+            # 버전별 스키마 마이그레이션 (인덱스 등)
+            schema_version = apply_migrations(conn)
             conn.close()
-            logging.info("SQLite 데이터베이스 초기화 완료: %s", self.db_path)
+            logging.info("SQLite 데이터베이스 초기화 완료: %s (schema v%d)", self.db_path, schema_version)
         except Exception as e:
             logging.error("SQLite 데이터베이스 초기화 오류: %s", str(e))
         finally:
@@ -160,7 +189,7 @@ class SQLiteHandler:
         try:
             hashed_pw = self._hash_password(password)
             
-            conn = sqlite3.connect(self.db_path)
+            conn = self._connect()
             cursor = conn.cursor()
             
             cursor.execute(
@@ -184,7 +213,7 @@ class SQLiteHandler:
     def delete_user(self, user_id: int) -> bool:
         """사용자 삭제"""
         try:
-            conn = sqlite3.connect(self.db_path)
+            conn = self._connect()
             cursor = conn.cursor()
             
             cursor.execute("DELETE FROM User WHERE user_id = ?", (user_id,))
@@ -206,7 +235,7 @@ class SQLiteHandler:
     def update_username(self, user_id: int, new_username: str) -> bool:
         """사용자 이름 업데이트"""
         try:
-            conn = sqlite3.connect(self.db_path)
+            conn = self._connect()
             cursor = conn.cursor()
             
             cursor.execute(
@@ -236,7 +265,7 @@ class SQLiteHandler:
         try:
             hashed_pw = self._hash_password(new_password)
             
-            conn = sqlite3.connect(self.db_path)
+            conn = self._connect()
             cursor = conn.cursor()
             
             cursor.execute(
@@ -261,7 +290,7 @@ class SQLiteHandler:
     def get_user(self, user_id: int) -> Optional[dict]:
         """사용자 정보 조회"""
         try:
-            conn = sqlite3.connect(self.db_path)
+            conn = self._connect()
             cursor = conn.cursor()
             
             cursor.execute("SELECT user_id, user_name FROM User WHERE user_id = ?", (user_id,))
@@ -280,7 +309,7 @@ class SQLiteHandler:
     def get_all_users(self) -> List[dict]:
         """모든 사용자 조회"""
         try:
-            conn = sqlite3.connect(self.db_path)
+            conn = self._connect()
             cursor = conn.cursor()
             
             cursor.execute("SELECT user_id, user_name FROM User")
@@ -298,7 +327,7 @@ class SQLiteHandler:
         try:
             hashed_pw = self._hash_password(password)
             
-            conn = sqlite3.connect(self.db_path)
+            conn = self._connect()
             cursor = conn.cursor()
             
             cursor.execute(
@@ -329,7 +358,7 @@ class SQLiteHandler:
             if created_at is None:
                 created_at = datetime.date.today().isoformat()   # '2025-05-07'
 
-            conn = sqlite3.connect(self.db_path)
+            conn = self._connect()
             cur  = conn.cursor()
             cur.execute(
                 """INSERT INTO Brain
@@ -359,7 +388,7 @@ class SQLiteHandler:
     def delete_brain(self, brain_id: int) -> bool:
         """브레인과 관련된 모든 데이터 삭제"""
         try:
-            conn = sqlite3.connect(self.db_path)
+            conn = self._connect()
             cursor = conn.cursor()
             
             # 트랜잭션 시작
@@ -409,7 +438,7 @@ class SQLiteHandler:
     def update_brain_name(self, brain_id: int, new_brain_name: str) -> bool:
         """브레인 이름 업데이트"""
         try:
-            conn = sqlite3.connect(self.db_path)
+            conn = self._connect()
             cursor = conn.cursor()
             
             cursor.execute(
@@ -433,7 +462,7 @@ class SQLiteHandler:
     
     def get_brain(self, brain_id: int) -> dict | None:
         try:
-            conn = sqlite3.connect(self.db_path)
+            conn = self._connect()
             cur  = conn.cursor()
             cur.execute(
                 """SELECT brain_id, brain_name, user_id,
@@ -459,7 +488,7 @@ class SQLiteHandler:
     def get_user_brains(self, user_id: int) -> List[dict]:
         """특정 사용자의 모든 브레인"""
         try:
-            conn = sqlite3.connect(self.db_path)
+            conn = self._connect()
             cur  = conn.cursor()
             cur.execute(
                 """SELECT brain_id, brain_name, user_id,
@@ -484,7 +513,7 @@ class SQLiteHandler:
     def get_all_brains(self) -> List[dict]:
         """시스템의 모든 브레인"""
         try:
-            conn = sqlite3.connect(self.db_path)
+            conn = self._connect()
             cur  = conn.cursor()
             cur.execute(
                 """SELECT brain_id, brain_name, user_id,
@@ -514,7 +543,7 @@ class SQLiteHandler:
             if not brain:
                 raise ValueError(f"존재하지 않는 브레인 ID: {brain_id}")
                 
-            conn = sqlite3.connect(self.db_path)
+            conn = self._connect()
             cursor = conn.cursor()
             
             cursor.execute(
@@ -544,7 +573,7 @@ class SQLiteHandler:
     def delete_folder(self, folder_id: int) -> bool:
         """폴더 삭제"""
         try:
-            conn = sqlite3.connect(self.db_path)
+            conn = self._connect()
             cursor = conn.cursor()
             
             cursor.execute("DELETE FROM Folder WHERE folder_id = ?", (folder_id,))
@@ -573,7 +602,7 @@ class SQLiteHandler:
             if folder['brain_id'] != brain_id:
                 raise ValueError("해당 brain_id에 속하지 않은 폴더입니다")
 
-            conn = sqlite3.connect(self.db_path)
+            conn = self._connect()
             cursor = conn.cursor()
 
             cursor.execute("DELETE FROM TextFile WHERE folder_id = ?", (folder_id,))
@@ -619,7 +648,7 @@ class SQLiteHandler:
             if not folder:
                 raise ValueError(f"존재하지 않는 폴더 ID: {folder_id}")
             
-            conn = sqlite3.connect(self.db_path)
+            conn = self._connect()
             cursor = conn.cursor()
             
             # 업데이트할 필드 지정
@@ -663,7 +692,7 @@ class SQLiteHandler:
     def get_folder(self, folder_id: int) -> Optional[dict]:
         """폴더 정보 조회"""
         try:
-            conn = sqlite3.connect(self.db_path)
+            conn = self._connect()
             cursor = conn.cursor()
             
             cursor.execute(
@@ -690,7 +719,7 @@ class SQLiteHandler:
     def get_brain_folders(self, brain_id: int) -> List[dict]:
         """브레인의 모든 폴더 조회"""
         try:
-            conn = sqlite3.connect(self.db_path)
+            conn = self._connect()
             cursor = conn.cursor()
             
             cursor.execute(
@@ -713,11 +742,115 @@ class SQLiteHandler:
         except Exception as e:
             logging.error("브레인 폴더 목록 조회 오류: %s", str(e))
             return []
-    
+
+    def get_brain_tree(self, brain_id: int, include_text: bool = True) -> List[dict]:
+        """
+        브레인의 모든 폴더와 폴더별 메모/PDF/텍스트/음성 목록을 한 번의 쿼리로 조회합니다.
+        (폴더마다 get_folder_* 를 호출하던 N+1 조회 대체)
+
+        Args:
+            brain_id: 브레인 ID
+            include_text: False이면 메모 본문(memo_text)을 읽지 않고 제목 목록만 반환
+        Returns:
+            [{"folder_id", "folder_name", "brain_id", "memos", "pdfs", "textfiles", "voices"}, ...]
+            각 항목 dict는 get_folder_memos / get_folder_pdfs / get_folder_textfiles / get_folder_voices 와 같은 형식
+        """
+        memo_text = "m.memo_text" if include_text else "NULL"
+        # seg: 0=폴더, 1=메모, 2=PDF, 3=텍스트, 4=음성 (폴더 행을 먼저 받아 빈 폴더도 포함)
+        sql = f"""
+            SELECT 0 AS seg, f.folder_id, f.folder_name, NULL AS item_id, NULL AS title, NULL AS body,
+                   NULL AS item_date, NULL AS is_source, NULL AS type, NULL AS item_brain_id
+            FROM Folder f WHERE f.brain_id = :brain_id
+            UNION ALL
+            SELECT 1, m.folder_id, NULL, m.memo_id, m.memo_title, {memo_text},
+                   m.memo_date, m.is_source, NULL, NULL
+            FROM Memo m JOIN Folder f ON f.folder_id = m.folder_id WHERE f.brain_id = :brain_id
+            UNION ALL
+            SELECT 2, p.folder_id, NULL, p.pdf_id, p.pdf_title, p.pdf_path,
+                   p.pdf_date, NULL, p.type, p.brain_id
+            FROM Pdf p JOIN Folder f ON f.folder_id = p.folder_id WHERE f.brain_id = :brain_id
+            UNION ALL
+            SELECT 3, t.folder_id, NULL, t.txt_id, t.txt_title, t.txt_path,
+                   t.txt_date, NULL, t.type, t.brain_id
+            FROM TextFile t JOIN Folder f ON f.folder_id = t.folder_id WHERE f.brain_id = :brain_id
+            UNION ALL
+            SELECT 4, v.folder_id, NULL, v.voice_id, v.voice_title, v.voice_path,
+                   v.voice_date, NULL, v.type, v.brain_id
+            FROM Voice v JOIN Folder f ON f.folder_id = v.folder_id WHERE f.brain_id = :brain_id
+            ORDER BY seg, item_date DESC, item_id DESC, folder_id
+        """
+        try:
+            conn = self._connect()
+            cursor = conn.cursor()
+            cursor.execute(sql, {"brain_id": brain_id})
+            rows = cursor.fetchall()
+            conn.close()
+
+            folders: Dict[int, dict] = {}
+            for seg, folder_id, folder_name, item_id, title, body, item_date, is_source, type_, item_brain_id in rows:
+                if seg == 0:
+                    folders[folder_id] = {
+                        "folder_id": folder_id,
+                        "folder_name": folder_name,
+                        "brain_id": brain_id,
+                        "memos": [],
+                        "pdfs": [],
+                        "textfiles": [],
+                        "voices": [],
+                    }
+                    continue
+                folder = folders[folder_id]
+                if seg == 1:
+                    memo = {
+                        "memo_id": item_id,
+                        "memo_title": title,
+                        "memo_text": body,
+                        "memo_date": item_date,
+                        "is_source": bool(is_source),
+                        "folder_id": folder_id
+                    }
+                    if not include_text:
+                        del memo["memo_text"]
+                    folder["memos"].append(memo)
+                elif seg == 2:
+                    folder["pdfs"].append({
+                        "pdf_id": item_id,
+                        "pdf_title": title,
+                        "pdf_path": body,
+                        "pdf_date": item_date,
+                        "type": type_,
+                        "folder_id": folder_id,
+                        "brain_id": item_brain_id,
+                    })
+                elif seg == 3:
+                    folder["textfiles"].append({
+                        "txt_id": item_id,
+                        "txt_title": title,
+                        "txt_path": body,
+                        "txt_date": item_date,
+                        "type": type_,
+                        "folder_id": folder_id,
+                        "brain_id": item_brain_id
+                    })
+                else:
+                    folder["voices"].append({
+                        "voice_id": item_id,
+                        "voice_title": title,
+                        "voice_path": body,
+                        "voice_date": item_date,
+                        "type": type_,
+                        "folder_id": folder_id,
+                        "brain_id": item_brain_id,
+                    })
+            return list(folders.values())
+        except Exception as e:
+            logging.error("브레인 폴더 트리 조회 오류: %s", str(e))
+            return []
+
     def get_default_folder(self, brain_id: int) -> Optional[dict]:
         """브레인의 기본 폴더 조회"""
         try:
-            conn = sqlite3.connect(self.db_path)
+            conn = self._connect()
             cursor = conn.cursor()
             
             cursor.execute(
@@ -742,28 +875,32 @@ class SQLiteHandler:
             return None
     
     # Memo 관련 메서드
-    def _get_next_id(self) -> int:
-        """다음 ID 값을 가져옵니다."""
+    def _get_next_id(self, cursor: Optional[sqlite3.Cursor] = None) -> int:
+        """
+        다음 ID 값을 가져옵니다.
+
+        cursor를 넘기면 호출한 쪽의 트랜잭션 안에서 시퀀스를 증가시키므로,
+        ID 발급과 INSERT가 같은 연결/트랜잭션에서 함께 커밋(또는 롤백)됩니다.
+        UPDATE가 먼저 쓰기 잠금을 잡기 때문에 동시에 호출돼도 같은 ID가 나오지 않습니다.
+        """
         try:
-            conn = sqlite3.connect(self.db_path)
-            cursor = conn.cursor()
-            
-            # 트랜잭션 시작
-            cursor.execute("BEGIN TRANSACTION")
-            
-            # 현재 값 조회
-            cursor.execute("SELECT value FROM Sequence WHERE name = 'content_id'")
-            current_value = cursor.fetchone()[0]
-            
-            # 값 증가
-            new_value = current_value + 1
-            cursor.execute("UPDATE Sequence SET value = ? WHERE name = 'content_id'", (new_value,))
-            
-            # 트랜잭션 커밋
-            conn.commit()
-            conn.close()
-            
-            return new_value
+            if cursor is not None:
+                cursor.execute("UPDATE Sequence SET value = value + 1 WHERE name = 'content_id'")
+                cursor.execute("SELECT value FROM Sequence WHERE name = 'content_id'")
+                return cursor.fetchone()[0]
+
+            conn = self._connect()
+            try:
+                own_cursor = conn.cursor()
+                # 쓰기 잠금을 바로 잡는 트랜잭션으로 증가 후 조회
+                own_cursor.execute("BEGIN IMMEDIATE")
+                own_cursor.execute("UPDATE Sequence SET value = value + 1 WHERE name = 'content_id'")
+                own_cursor.execute("SELECT value FROM Sequence WHERE name = 'content_id'")
+                new_value = own_cursor.fetchone()[0]
+                conn.commit()
+                return new_value
+            finally:
+                conn.close()
         except Exception as e:
             logging.error("ID 생성 오류: %s", str(e))
             raise RuntimeError(f"ID 생성 오류: {str(e)}")
@@ -783,11 +920,11 @@ class SQLiteHandler:
                 if not brain:
                     raise ValueError(f"존재하지 않는 브레인 ID: {brain_id}")
                     
-            conn = sqlite3.connect(self.db_path)
+            conn = self._connect()
             cursor = conn.cursor()
             
             # 새 ID 생성
-            memo_id = self._get_next_id()
+            memo_id = self._get_next_id(cursor)
             
             cursor.execute(
                 "INSERT INTO Memo (memo_id, memo_title, memo_text, folder_id, is_source, type, brain_id) VALUES (?, ?, ?, ?, ?, ?, ?)",
@@ -823,7 +960,7 @@ class SQLiteHandler:
     def delete_memo(self, memo_id: int) -> bool:
         """메모 삭제"""
         try:
-            conn = sqlite3.connect(self.db_path)
+            conn = self._connect()
             cursor = conn.cursor()
             
             cursor.execute("DELETE FROM Memo WHERE memo_id = ?", (memo_id,))
@@ -862,7 +999,7 @@ class SQLiteHandler:
                 if not brain:
                     raise ValueError(f"존재하지 않는 Brain ID: {brain_id}")
             
-            conn = sqlite3.connect(self.db_path)
+            conn = self._connect()
             cursor = conn.cursor()
             
             # 업데이트할 필드 지정
@@ -935,7 +1072,7 @@ class SQLiteHandler:
     def get_memo(self, memo_id: int) -> Optional[dict]:
         """메모 정보 조회"""
         try:
-            conn = sqlite3.connect(self.db_path)
+            conn = self._connect()
             cursor = conn.cursor()
             
             cursor.execute(
@@ -965,7 +1102,7 @@ class SQLiteHandler:
     def get_folder_memos(self, folder_id: int) -> List[dict]:
         """폴더의 모든 메모 조회"""
         try:
-            conn = sqlite3.connect(self.db_path)
+            conn = self._connect()
             cursor = conn.cursor()
             
             cursor.execute(
@@ -994,7 +1131,7 @@ class SQLiteHandler:
     def get_folder_memo_titles(self, folder_id: int) -> List[dict]:
         """폴더의 모든 메모 제목만 조회"""
         try:
-            conn = sqlite3.connect(self.db_path)
+            conn = self._connect()
             cursor = conn.cursor()
             
             cursor.execute(
@@ -1021,7 +1158,7 @@ class SQLiteHandler:
     def get_default_memos(self) -> List[dict]:
         """폴더가 없는 모든 메모 조회"""
         try:
-            conn = sqlite3.connect(self.db_path)
+            conn = self._connect()
             cursor = conn.cursor()
             
             cursor.execute(
@@ -1049,7 +1186,7 @@ class SQLiteHandler:
     def get_default_memo_titles(self) -> List[dict]:
         """폴더가 없는 모든 메모의 제목만 조회"""
         try:
-            conn = sqlite3.connect(self.db_path)
+            conn = self._connect()
             cursor = conn.cursor()
             
             cursor.execute(
@@ -1087,11 +1224,11 @@ class SQLiteHandler:
                 brain = self.get_brain(brain_id)
                 if not brain:
                     raise ValueError(f"존재하지 않는 Brain ID: {brain_id}")
-            conn = sqlite3.connect(self.db_path)
+            conn = self._connect()
             cursor = conn.cursor()
             
             # 새 ID 생성
-            pdf_id = self._get_next_id()
+            pdf_id = self._get_next_id(cursor)
             
             cursor.execute(
                 "INSERT INTO Pdf (pdf_id, pdf_title, pdf_path, folder_id, type, brain_id) VALUES (?, ?, ?, ?, ?, ?)",
@@ -1129,7 +1266,7 @@ class SQLiteHandler:
     def get_pdfs_by_folder(self, folder_id: int) -> List[Dict[str, Any]]:
         """특정 폴더에 속한 PDF 목록을 조회합니다."""
         try:
-            conn = sqlite3.connect(self.db_path)
+            conn = self._connect()
             cursor = conn.cursor()
 
             cursor.execute("""
@@ -1162,7 +1299,7 @@ class SQLiteHandler:
     def delete_pdf(self, pdf_id: int) -> bool:
         """PDF 삭제"""
         try:
-            conn = sqlite3.connect(self.db_path)
+            conn = self._connect()
             cursor = conn.cursor()
             
             cursor.execute("DELETE FROM Pdf WHERE pdf_id = ?", (pdf_id,))
@@ -1186,7 +1323,7 @@ class SQLiteHandler:
         brain_id: int,
         folder_id: Optional[int] = None
     ) -> List[dict]:
-        conn   = sqlite3.connect(self.db_path)
+        conn   = self._connect()
         cursor = conn.cursor()
 
         if folder_id is None:
@@ -1231,7 +1368,7 @@ class SQLiteHandler:
                 if not self.get_brain(brain_id):
                     raise ValueError(f"존재하지 않는 Brain ID: {brain_id}")
             
-            conn = sqlite3.connect(self.db_path)
+            conn = self._connect()
             cursor = conn.cursor()
             
             # 업데이트할 필드 지정
@@ -1298,7 +1435,7 @@ class SQLiteHandler:
     def get_pdf(self, pdf_id: int) -> Optional[dict]:
         """PDF 정보 조회"""
         try:
-            conn = sqlite3.connect(self.db_path)
+            conn = self._connect()
             cursor = conn.cursor()
             
             cursor.execute(
@@ -1328,7 +1465,7 @@ class SQLiteHandler:
     def get_folder_pdfs(self, folder_id: int) -> List[dict]:
         """폴더의 모든 PDF 조회"""
         try:
-            conn = sqlite3.connect(self.db_path)
+            conn = self._connect()
             cursor = conn.cursor()
             
             cursor.execute(
@@ -1368,10 +1505,10 @@ class SQLiteHandler:
                 if not self.get_brain(brain_id):
                     raise ValueError(f"존재하지 않는 Brain ID: {brain_id}")
                     
-            conn = sqlite3.connect(self.db_path)
+            conn = self._connect()
             cursor = conn.cursor()
             
-            voice_id = self._get_next_id()
+            voice_id = self._get_next_id(cursor)
             
             cursor.execute(
                 "INSERT INTO Voice (voice_id, voice_title, voice_path, folder_id, type, brain_id) VALUES (?, ?, ?, ?, ?, ?)",
@@ -1407,7 +1544,7 @@ class SQLiteHandler:
         brain_id: int,
         folder_id: Optional[int] = None
     ) -> List[Dict]:
-        conn   = sqlite3.connect(self.db_path)
+        conn   = self._connect()
         cursor = conn.cursor()
 
         if folder_id is None:
@@ -1439,7 +1576,7 @@ class SQLiteHandler:
     def get_folder_voices(self, folder_id: int) -> List[dict]:
         """폴더에 속한 음성 파일 목록 조회"""
         try:
-            conn = sqlite3.connect(self.db_path)
+            conn = self._connect()
             cursor = conn.cursor()
         
             cursor.execute(
@@ -1469,7 +1606,7 @@ class SQLiteHandler:
     def delete_voice(self, voice_id: int) -> bool:
         """음성 파일 삭제"""
         try:
-            conn = sqlite3.connect(self.db_path)
+            conn = self._connect()
             cursor = conn.cursor()
             
             cursor.execute("DELETE FROM Voice WHERE voice_id = ?", (voice_id,))
@@ -1506,7 +1643,7 @@ class SQLiteHandler:
                 if not self.get_brain(brain_id):
                     raise ValueError(f"존재하지 않는 Brain ID: {brain_id}")
             
-            conn = sqlite3.connect(self.db_path)
+            conn = self._connect()
             cursor = conn.cursor()
             
             update_fields = []
@@ -1569,7 +1706,7 @@ class SQLiteHandler:
     def get_voice(self, voice_id: int) -> Optional[dict]:
         """음성 파일 정보 조회"""
         try:
-            conn = sqlite3.connect(self.db_path)
+            conn = self._connect()
             cursor = conn.cursor()
             
             cursor.execute(
@@ -1600,7 +1737,7 @@ class SQLiteHandler:
     def get_folder_voices(self, folder_id: int) -> List[dict]:
         """폴더의 모든 음성 파일 조회"""
         try:
-            conn = sqlite3.connect(self.db_path)
+            conn = self._connect()
             cursor = conn.cursor()
             
             cursor.execute(
@@ -1636,10 +1773,10 @@ class SQLiteHandler:
                 if not folder:
                     raise ValueError(f"존재하지 않는 폴더 ID: {folder_id}")
                     
-            conn = sqlite3.connect(self.db_path)
+            conn = self._connect()
             cursor = conn.cursor()
             
-            txt_id = self._get_next_id()
+            txt_id = self._get_next_id(cursor)
             
             cursor.execute(
                 "INSERT INTO TextFile (txt_id, txt_title, txt_path, folder_id, type, brain_id) VALUES (?, ?, ?, ?, ?, ?)",
@@ -1676,7 +1813,7 @@ class SQLiteHandler:
         brain_id: int,
         folder_id: Optional[int] = None
     ) -> List[Dict]:
-        conn   = sqlite3.connect(self.db_path)
+        conn   = self._connect()
         cursor = conn.cursor()
 
         if folder_id is None:
@@ -1708,7 +1845,7 @@ class SQLiteHandler:
     def get_folder_textfiles(self, folder_id: int) -> List[dict]:
         """폴더에 속한 텍스트 파일 목록 조회"""
         try:
-            conn = sqlite3.connect(self.db_path)
+            conn = self._connect()
             cursor = conn.cursor()
             cursor.execute(
                 "SELECT txt_id, txt_title, txt_path, txt_date, type, folder_id, brain_id "
@@ -1736,7 +1873,7 @@ class SQLiteHandler:
     def delete_textfile(self, txt_id: int) -> bool:
         """텍스트 파일 삭제"""
         try:
-            conn = sqlite3.connect(self.db_path)
+            conn = self._connect()
             cursor = conn.cursor()
             
             cursor.execute("DELETE FROM TextFile WHERE txt_id = ?", (txt_id,))
@@ -1773,7 +1910,7 @@ class SQLiteHandler:
                 if not self.get_brain(brain_id):
                     raise ValueError(f"존재하지 않는 Brain ID: {brain_id}")
             
-            conn = sqlite3.connect(self.db_path)
+            conn = self._connect()
             cursor = conn.cursor()
             
             update_fields = []
@@ -1836,7 +1973,7 @@ class SQLiteHandler:
     def get_textfile(self, txt_id: int) -> Optional[dict]:
         """텍스트 파일 정보 조회"""
         try:
-            conn = sqlite3.connect(self.db_path)
+            conn = self._connect()
             cursor = conn.cursor()
             
             cursor.execute(
@@ -1866,7 +2003,7 @@ class SQLiteHandler:
     def get_textfiles_by_folder(self, folder_id: int) -> List[dict]:
         """폴더의 모든 텍스트 파일 조회"""
         try:
-            conn = sqlite3.connect(self.db_path)
+            conn = self._connect()
             cursor = conn.cursor()
             
             cursor.execute(
@@ -1896,7 +2033,7 @@ class SQLiteHandler:
     def get_default_memos(self) -> List[Dict[str, Any]]:
         """folder_id가 NULL인 메모(루트 메모) 목록 조회"""
         try:
-            conn = sqlite3.connect(self.db_path)
+            conn = self._connect()
             cursor = conn.cursor()
             cursor.execute("""
                 SELECT memo_id, memo_title, memo_text, memo_date, is_source, type, folder_id
@@ -1926,7 +2063,7 @@ class SQLiteHandler:
     def get_default_pdfs(self) -> List[Dict[str, Any]]:
         """folder_id가 NULL인 PDF(루트 PDF) 목록 조회"""
         try:
-            conn = sqlite3.connect(self.db_path)
+            conn = self._connect()
             cursor = conn.cursor()
             cursor.execute("""
                 SELECT pdf_id, pdf_title, pdf_path, pdf_date, type, folder_id, brain_id
@@ -1956,7 +2093,7 @@ class SQLiteHandler:
     def get_default_textfiles(self) -> List[Dict[str, Any]]:
         """folder_id가 NULL인 텍스트 파일(루트 TXT) 목록 조회"""
         try:
-            conn = sqlite3.connect(self.db_path)
+            conn = self._connect()
             cursor = conn.cursor()
             cursor.execute("""
                 SELECT txt_id, txt_title, txt_path, txt_date, type, folder_id, brain_id
@@ -1986,7 +2123,7 @@ class SQLiteHandler:
     def get_default_voices(self) -> List[Dict[str, Any]]:
         """folder_id가 NULL인 음성 파일(루트 VOICE) 목록 조회"""
         try:
-            conn = sqlite3.connect(self.db_path)
+            conn = self._connect()
             cursor = conn.cursor()
             cursor.execute("""
                 SELECT voice_id, voice_title, voice_path, voice_date, type, folder_id, brain_id
@@ -2018,7 +2155,7 @@ class SQLiteHandler:
         brain_id: int,
         folder_id: Optional[int] = None
     ) -> List[Dict]:
-        conn   = sqlite3.connect(self.db_path)
+        conn   = self._connect()
         cursor = conn.cursor()
 
         if folder_id is None:
@@ -2051,7 +2188,7 @@ class SQLiteHandler:
     def get_trash_bin_memos(self, brain_id: int) -> List[Dict]:
         """특정 Brain의 휴지통에 있는 모든 메모를 조회합니다."""
         try:
-            conn = sqlite3.connect(self.db_path)
+            conn = self._connect()
             cursor = conn.cursor()
             
             cursor.execute("""
@@ -2074,14 +2211,14 @@ class SQLiteHandler:
     def save_chat(self, is_ai: bool, message: str, brain_id: int, referenced_nodes: List[str] = None) -> int:
         """채팅 메시지를 저장합니다."""
         try:
-            conn = sqlite3.connect(self.db_path)
+            conn = self._connect()
             cursor = conn.cursor()
             
-            # referenced_nodes를 텍스트 형식으로 변환
-            referenced_nodes_text = ", ".join(referenced_nodes) if referenced_nodes else None
+            # referenced_nodes를 JSON 배열 문자열로 저장 (노드 이름에 쉼표가 있어도 안전)
+            referenced_nodes_text = json.dumps(referenced_nodes, ensure_ascii=False) if referenced_nodes else None
             
             # 새 ID 생성
-            chat_id = self._get_next_id()
+            chat_id = self._get_next_id(cursor)
             
             cursor.execute(
                 "INSERT INTO Chat (chat_id, is_ai, message, brain_id, referenced_nodes) VALUES (?, ?, ?, ?, ?)",
@@ -2108,7 +2245,7 @@ class SQLiteHandler:
             bool: 삭제 성공 여부
         """
         try:
-            conn = sqlite3.connect(self.db_path)
+            conn = self._connect()
             cursor = conn.cursor()
             cursor.execute("DELETE FROM Chat WHERE chat_id = ?", (chat_id,))
             deleted = cursor.rowcount > 0
@@ -2125,7 +2262,7 @@ class SQLiteHandler:
             logging.error(f"채팅 삭제 중 오류 발생: {str(e)}")
             return False
     
-    def get_referenced_nodes(self, chat_id: int) -> str | None:
+    def get_referenced_nodes(self, chat_id: int) -> List[str] | None:
         """
         특정 채팅 ID에 해당하는 대화의 참고 노드 목록을 조회합니다.
         
@@ -2133,10 +2270,10 @@ class SQLiteHandler:
             chat_id (int): 조회할 채팅의 ID
             
         Returns:
-            str | None: 참고 노드 목록 문자열 (쉼표로 구분) 또는 None
+            List[str] | None: 참고 노드 이름 목록 또는 None (채팅이 없는 경우)
         """
         try:
-            conn = sqlite3.connect(self.db_path)
+            conn = self._connect()
             cursor = conn.cursor()
             
             cursor.execute("SELECT referenced_nodes FROM Chat WHERE chat_id = ?", (chat_id,))
@@ -2144,33 +2281,49 @@ class SQLiteHandler:
             
             conn.close()
             
-            return result[0] if result else None
+            return parse_referenced_nodes(result[0]) if result else None
         except Exception as e:
             logging.error(f"참고 노드 조회 중 오류 발생: {str(e)}")
             return None
     
-    def get_chat_list(self, brain_id: int) -> List[Dict] | None:
+    def get_chat_list(self, brain_id: int, limit: Optional[int] = None,
+                      before_id: Optional[int] = None) -> List[Dict] | None:
         """
-        특정 브레인 ID에 해당하는 모든 채팅 목록을 조회합니다.
+        특정 브레인 ID에 해당하는 채팅 목록을 chat_id 오름차순으로 조회합니다.
+        limit을 주면 chat_id 기준 키셋 페이지네이션으로 가장 최근 limit개(또는 before_id 이전 limit개)만 읽습니다.
         
         Args:
             brain_id (int): 조회할 브레인의 ID
+            limit (int, optional): 가져올 최대 채팅 수 (None이면 전체)
+            before_id (int, optional): 이 chat_id보다 오래된 채팅만 조회 (이전 페이지의 가장 오래된 chat_id)
             
         Returns:
             List[Dict] | None: 채팅 목록 (각 채팅은 chat_id, is_ai, message, referenced_nodes 정보를 포함) 또는 None
         """
         try:
-            conn = sqlite3.connect(self.db_path)
+            conn = self._connect()
             cursor = conn.cursor()
             
-            cursor.execute("""
-                SELECT chat_id, is_ai, message, referenced_nodes 
-                FROM Chat 
-                WHERE brain_id = ? 
-                ORDER BY chat_id ASC
-            """, (brain_id,))
-            
-            rows = cursor.fetchall()
+            if limit is None:
+                cursor.execute("""
+                    SELECT chat_id, is_ai, message, referenced_nodes 
+                    FROM Chat 
+                    WHERE brain_id = ? 
+                    ORDER BY chat_id ASC
+                """, (brain_id,))
+                rows = cursor.fetchall()
+            else:
+                # (brain_id, chat_id) 인덱스를 역순으로 읽어 필요한 만큼만 가져온 뒤 시간순으로 뒤집음
+                where = "brain_id = ?" if before_id is None else "brain_id = ? AND chat_id < ?"
+                params = (brain_id,) if before_id is None else (brain_id, before_id)
+                cursor.execute(f"""
+                    SELECT chat_id, is_ai, message, referenced_nodes 
+                    FROM Chat 
+                    WHERE {where}
+                    ORDER BY chat_id DESC
+                    LIMIT ?
+                """, params + (limit,))
+                rows = cursor.fetchall()[::-1]
             conn.close()
             
             if not rows:
@@ -2181,7 +2334,7 @@ class SQLiteHandler:
                     "chat_id": row[0],
                     "is_ai": bool(row[1]),
                     "message": row[2],
-                    "referenced_nodes": [node.strip().strip('"') for node in row[3].split(",")] if row[3] else []
+                    "referenced_nodes": parse_referenced_nodes(row[3])
                 }
                 for row in rows
             ]
@@ -2192,7 +2345,7 @@ class SQLiteHandler:
     def get_brain_id_by_folder(self, folder_id: int) -> Optional[int]:
         """폴더 ID로 브레인 ID를 조회합니다."""
         try:
-            conn = sqlite3.connect(self.db_path)
+            conn = self._connect()
             cursor = conn.cursor()
             
             cursor.execute(
@@ -2208,6 +2361,92 @@ class SQLiteHandler:
             logging.error("폴더의 브레인 ID 조회 오류: %s", str(e))
             return None
     
+    def search_content(self, query: str, brain_id: int, kinds: Optional[List[str]] = None,
+                       limit: int = SEARCH_LIMIT, title_only: bool = False,
+                       whole_phrase: bool = False) -> List[Dict]:
+        """
+        ContentSearch(FTS5 trigram) 인덱스로 제목/메모 본문/채팅 메시지를 검색합니다.
+
+        공백으로 나눈 검색어 중 3글자 이상은 ContentSearch MATCH로 찾고(BM25 순위),
+        trigram으로 찾을 수 없는 1~2글자 검색어는 같은 테이블의 title/body에 LIKE 조건으로 AND 결합합니다.
+        짧은 검색어만 있으면 제목에 검색어가 들어 있는 결과를 먼저(SEARCH_TITLE_WEIGHT) 보여 줍니다.
+
+        Args:
+            query: 검색어
+            brain_id: 브레인 ID
+            kinds: 검색할 종류 목록 (memo / pdf / text / voice / chat), None이면 전체
+            limit: 최대 결과 수
+            title_only: True이면 제목만 검색
+            whole_phrase: True이면 공백으로 나누지 않고 query 전체를 하나의 부분 문자열로 검색
+        Returns:
+            List[Dict]: type, id, title, snippet, score 를 포함하는 결과 목록
+        """
+        terms = [query.strip()] if whole_phrase else query.split()
+        if not terms or not terms[0]:
+            return []
+        fts_terms = [t for t in terms if len(t) >= FTS_MIN_TERM_LENGTH]
+        like_patterns = ["%" + t.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_") + "%"
+                         for t in terms if len(t) < FTS_MIN_TERM_LENGTH]
+        column = "title : " if title_only else ""
+
+        def quote(term):
+            return '"' + term.replace('"', '""') + '"'
+
+        where, params, select_params = [], [], []
+        if fts_terms:
+            where.append("ContentSearch MATCH ?")
+            params.append(" AND ".join(column + quote(t) for t in fts_terms))
+            # bm25 가중치는 컬럼 순서(kind, brain_id, deleted, title, body)를 따름. 값이 작을수록 관련도 높음
+            select = ("snippet(ContentSearch, -1, '[', ']', '…', 12) AS snippet, "
+                      f"bm25(ContentSearch, 0, 0, 0, {SEARCH_TITLE_WEIGHT}, 1.0) AS score")
+            order = "score"
+        else:
+            # 짧은 검색어만 있으면 BM25를 쓸 수 없으므로 제목/본문에 들어 있는 검색어 수로 점수를 매김 (작을수록 관련도 높음)
+            hits = " + ".join(
+                f"coalesce(title LIKE ? ESCAPE '\\', 0) * {SEARCH_TITLE_WEIGHT} + coalesce(body LIKE ? ESCAPE '\\', 0)"
+                for _ in like_patterns)
+            select = f"substr(coalesce(body, title), 1, 60) AS snippet, -({hits}) AS score"
+            select_params = [p for pattern in like_patterns for p in (pattern, pattern)]
+            order = "score, ContentSearch.rowid DESC"
+
+        where.append("ContentSearch.brain_id = ? AND ContentSearch.deleted = 0")
+        params.append(int(brain_id))
+        if kinds:
+            where.append(f"ContentSearch.kind IN ({', '.join('?' for _ in kinds)})")
+            params.extend(kinds)
+        for pattern in like_patterns:
+            if title_only:
+                where.append("ContentSearch.title LIKE ? ESCAPE '\\'")
+                params.append(pattern)
+            else:
+                where.append("(ContentSearch.title LIKE ? ESCAPE '\\' OR ContentSearch.body LIKE ? ESCAPE '\\')")
+                params.extend([pattern, pattern])
+
+        sql = f"""
+            SELECT ContentSearch.kind, ContentSearch.rowid, ContentSearch.title, {select}
+            FROM ContentSearch
+            WHERE {' AND '.join(where)}
+            ORDER BY {order}
+            LIMIT ?
+        """
+        params = select_params + params + [int(limit)]
+
+        conn = self._connect()
+        try:
+            rows = conn.execute(sql, params).fetchall()
+        finally:
+            conn.close()
+        return [
+            {
+                "type": row[0],
+                "id": row[1],
+                "title": row[2],
+                "snippet": row[3],
+                "score": -row[4] if row[4] is not None else None
+            }
+            for row in rows
+        ]
+
     def search_titles_by_query(self, query: str, brain_id: int) -> List[Dict]:
         """query를 포함하는 제목 검색
         
@@ -2219,7 +2458,19 @@ class SQLiteHandler:
             List[Dict]: 검색 결과 목록. 각 항목은 type(pdf/text), id, title을 포함
         """
         try:
-            conn = sqlite3.connect(self.db_path)
+            # 기존 LIKE '%query%'와 같이 query 전체를 포함하는 제목을 모두 반환 (LIMIT -1 = 제한 없음)
+            results = self.search_content(query, brain_id, kinds=["pdf", "text"], limit=-1,
+                                          title_only=True, whole_phrase=True)
+            return [{"type": r["type"], "id": r["id"], "title": r["title"]} for r in results]
+        except sqlite3.OperationalError as e:
+            # FTS 인덱스가 없는 DB(마이그레이션 v2 미적용)에서는 LIKE 검색으로 대체
+            logging.warning("전문 검색 인덱스 사용 불가, LIKE 검색으로 대체: %s", str(e))
+        except Exception as e:
+            logging.error("제목 검색 오류: %s", str(e))
+            return []
+
+        try:
+            conn = self._connect()
             cursor = conn.cursor()
             
             # PDF와 TextFile 테이블에서 제목 검색
@@ -2248,4 +2499,708 @@ class SQLiteHandler:
             logging.error("제목 검색 오류: %s", str(e))
             return []
     
-   
\ No newline at end of file
+   
+
+    # 일괄 처리 메서드
+    def _content_table(self, kind: str) -> dict:
+        info = CONTENT_TABLES.get(kind)
+        if info is None:
+            raise ValueError(f"지원하지 않는 콘텐츠 종류: {kind}")
+        return info
+
+    def create_many(self, kind: str, items: List[Dict[str, Any]],
+                    folder_id: Optional[int] = None, brain_id: Optional[int] = None) -> List[dict]:
+        """
+        파일 콘텐츠(pdf / text / voice)를 한 트랜잭션에서 일괄 생성합니다.
+        ID 블록을 한 번에 발급받고 executemany로 INSERT 하므로 항목 수와 관계없이 커밋은 한 번입니다.
+
+        Args:
+            kind: "pdf" | "text" | "voice"
+            items: [{"title", "path", "type"}] 목록. "sha256"/"size"가 있으면 ContentHash에도 기록
+            folder_id: 모든 항목이 속할 폴더 ID
+            brain_id: 모든 항목이 속할 브레인 ID
+        Returns:
+            List[dict]: create_pdf / create_textfile / create_voice 와 같은 형식의 생성 결과
+        """
+        info = self._content_table(kind)
+        if info["path"] is None:
+            raise ValueError(f"일괄 생성을 지원하지 않는 콘텐츠 종류: {kind}")
+        if not items:
+            return []
+        if folder_id is not None and not self.get_folder(folder_id):
+            raise ValueError(f"존재하지 않는 폴더 ID: {folder_id}")
+        if brain_id is not None and not self.get_brain(brain_id):
+            raise ValueError(f"존재하지 않는 Brain ID: {brain_id}")
+
+        table, id_col, title_col, path_col, date_col = (
+            info["table"], info["id"], info["title"], info["path"], info["date"]
+        )
+        try:
+            conn = self._connect()
+            try:
+                cursor = conn.cursor()
+                cursor.execute("BEGIN IMMEDIATE")
+                # 항목 수만큼의 ID 블록을 한 번에 발급
+                cursor.execute("UPDATE Sequence SET value = value + ? WHERE name = 'content_id'", (len(items),))
+                cursor.execute("SELECT value FROM Sequence WHERE name = 'content_id'")
+                last_id = cursor.fetchone()[0]
+                first_id = last_id - len(items) + 1
+
+                rows = [
+                    (first_id + i, item["title"], item["path"], folder_id, item.get("type"), brain_id)
+                    for i, item in enumerate(items)
+                ]
+                cursor.executemany(
+                    f"INSERT INTO {table} ({id_col}, {title_col}, {path_col}, folder_id, type, brain_id) "
+                    "VALUES (?, ?, ?, ?, ?, ?)",
+                    rows
+                )
+                # 내용 해시가 있으면 같은 트랜잭션에서 함께 기록 (중복 업로드 판별용)
+                hashes = [
+                    (first_id + i, kind, brain_id, item["sha256"], item.get("size"), item["path"])
+                    for i, item in enumerate(items) if item.get("sha256")
+                ]
+                if hashes:
+                    cursor.executemany(
+                        "INSERT OR REPLACE INTO ContentHash (content_id, kind, brain_id, sha256, size, path) "
+                        "VALUES (?, ?, ?, ?, ?, ?)",
+                        hashes
+                    )
+                cursor.execute(
+                    f"SELECT {id_col}, {date_col} FROM {table} WHERE {id_col} BETWEEN ? AND ?",
+                    (first_id, last_id)
+                )
+                dates = dict(cursor.fetchall())
+                conn.commit()
+            finally:
+                conn.close()
+
+            logging.info("%s 일괄 생성 완료: %d개 (id %s~%s), folder_id=%s, brain_id=%s",
+                         table, len(rows), first_id, last_id, folder_id, brain_id)
+            return [
+                {
+                    id_col: row[0],
+                    title_col: row[1],
+                    path_col: row[2],
+                    date_col: dates.get(row[0]),
+                    "type": row[4],
+                    "folder_id": folder_id,
+                    "brain_id": brain_id,
+                    "sha256": item.get("sha256")
+                }
+                for row, item in zip(rows, items)
+            ]
+        except Exception as e:
+            logging.error("%s 일괄 생성 오류: %s", table, str(e))
+            raise RuntimeError(f"{table} 일괄 생성 오류: {str(e)}")
+
+    def move_many(self, kind: str, ids: List[int], folder_id: Optional[int],
+                  brain_id: Optional[int] = None) -> int:
+        """
+        여러 콘텐츠의 folder_id(및 brain_id)를 한 트랜잭션에서 변경합니다.
+        folder_id가 None이면 폴더 밖(루트)으로 이동합니다.
+        Returns:
+            int: 실제로 변경된 행 수
+        """
+        info = self._content_table(kind)
+        if not ids:
+            return 0
+        if folder_id is not None and not self.get_folder(folder_id):
+            raise ValueError(f"존재하지 않는 폴더 ID: {folder_id}")
+
+        table, id_col = info["table"], info["id"]
+        try:
+            conn = self._connect()
+            try:
+                cursor = conn.cursor()
+                if brain_id is None:
+                    cursor.executemany(f"UPDATE {table} SET folder_id = ? WHERE {id_col} = ?",
+                                       [(folder_id, item_id) for item_id in ids])
+                else:
+                    cursor.executemany(f"UPDATE {table} SET folder_id = ?, brain_id = ? WHERE {id_col} = ?",
+                                       [(folder_id, brain_id, item_id) for item_id in ids])
+                moved = cursor.rowcount
+                conn.commit()
+            finally:
+                conn.close()
+            logging.info("%s 일괄 이동 완료: %d/%d개 → folder_id=%s", table, moved, len(ids), folder_id)
+            return moved
+        except Exception as e:
+            logging.error("%s 일괄 이동 오류: %s", table, str(e))
+            raise RuntimeError(f"{table} 일괄 이동 오류: {str(e)}")
+
+    def delete_many(self, kind: str, ids: List[int]) -> List[dict]:
+        """
+        여러 콘텐츠를 한 트랜잭션에서 삭제합니다.
+        Returns:
+            List[dict]: 실제로 삭제된 항목의 {"id", "path"} 목록 (메모는 path가 None)
+        """
+        info = self._content_table(kind)
+        if not ids:
+            return []
+
+        table, id_col = info["table"], info["id"]
+        path_expr = info["path"] or "NULL"
+        placeholders = ", ".join("?" for _ in ids)
+        try:
+            conn = self._connect()
+            try:
+                cursor = conn.cursor()
+                cursor.execute("BEGIN IMMEDIATE")
+                cursor.execute(f"SELECT {id_col}, {path_expr} FROM {table} WHERE {id_col} IN ({placeholders})", ids)
+                deleted = [{"id": row[0], "path": row[1]} for row in cursor.fetchall()]
+                cursor.executemany(f"DELETE FROM {table} WHERE {id_col} = ?", [(item["id"],) for item in deleted])
+                conn.commit()
+            finally:
+                conn.close()
+            logging.info("%s 일괄 삭제 완료: %d/%d개", table, len(deleted), len(ids))
+            return deleted
+        except Exception as e:
+            logging.error("%s 일괄 삭제 오류: %s", table, str(e))
+            raise RuntimeError(f"{table} 일괄 삭제 오류: {str(e)}")
+
+    # 내용 해시(중복 업로드) 관련 메서드
+    def find_contents_by_hashes(self, hashes: List[str], brain_id: Optional[int] = None) -> Dict[str, dict]:
+        """
+        해시별로 이미 저장된 콘텐츠를 하나씩 찾습니다.
+        같은 브레인에서 그래프 반영(ingested)까지 끝난 항목을 가장 우선합니다.
+        Returns:
+            {sha256: {"content_id", "kind", "brain_id", "path", "size", "ingested"}}
+        """
+        hashes = list(dict.fromkeys(h for h in hashes if h))
+        if not hashes:
+            return {}
+        placeholders = ", ".join("?" for _ in hashes)
+        try:
+            conn = self._connect()
+            try:
+                cursor = conn.cursor()
+                cursor.execute(
+                    f"""
+                    SELECT sha256, content_id, kind, brain_id, path, size, ingested
+                    FROM ContentHash
+                    WHERE sha256 IN ({placeholders})
+                    ORDER BY (brain_id IS ?) DESC, ingested DESC, content_id
+                    """,
+                    (*hashes, brain_id)
+                )
+                found = {}
+                for sha256, content_id, kind, row_brain_id, path, size, ingested in cursor.fetchall():
+                    found.setdefault(sha256, {
+                        "content_id": content_id,
+                        "kind": kind,
+                        "brain_id": row_brain_id,
+                        "path": path,
+                        "size": size,
+                        "ingested": bool(ingested)
+                    })
+            finally:
+                conn.close()
+            return found
+        except Exception as e:
+            logging.error("콘텐츠 해시 조회 오류: %s", str(e))
+            raise RuntimeError(f"콘텐츠 해시 조회 오류: {str(e)}")
+
+    def get_content_hash(self, content_id: int) -> Optional[dict]:
+        """소스 ID로 기록된 내용 해시 정보를 조회합니다."""
+        try:
+            conn = self._connect()
+            try:
+                cursor = conn.cursor()
+                cursor.execute(
+                    "SELECT content_id, kind, brain_id, sha256, size, path, ingested FROM ContentHash WHERE content_id = ?",
+                    (content_id,)
+                )
+                row = cursor.fetchone()
+            finally:
+                conn.close()
+            if not row:
+                return None
+            return {
+                "content_id": row[0],
+                "kind": row[1],
+                "brain_id": row[2],
+                "sha256": row[3],
+                "size": row[4],
+                "path": row[5],
+                "ingested": bool(row[6])
+            }
+        except Exception as e:
+            logging.error("콘텐츠 해시 조회 오류: %s", str(e))
+            raise RuntimeError(f"콘텐츠 해시 조회 오류: {str(e)}")
+
+    def get_ingested_source(self, brain_id: int, sha256: str) -> Optional[dict]:
+        """브레인에 같은 내용으로 그래프 반영이 끝난 소스가 있으면 반환합니다."""
+        found = self.find_contents_by_hashes([sha256], brain_id).get(sha256)
+        if found and found["brain_id"] == brain_id and found["ingested"]:
+            return found
+        return None
+
+    def mark_source_ingested(self, source_id: int, ingested: bool = True) -> bool:
+        """소스의 그래프/임베딩 반영 완료 여부를 기록합니다. (해시가 기록된 소스만 해당)"""
+        try:
+            conn = self._connect()
+            try:
+                cursor = conn.cursor()
+                cursor.execute("UPDATE ContentHash SET ingested = ? WHERE content_id = ?",
+                               (1 if ingested else 0, source_id))
+                updated = cursor.rowcount > 0
+                conn.commit()
+            finally:
+                conn.close()
+            return updated
+        except Exception as e:
+            logging.error("소스 반영 상태 갱신 오류: %s", str(e))
+            raise RuntimeError(f"소스 반영 상태 갱신 오류: {str(e)}")
+
+    # 수집(ingest) 작업 큐 관련 메서드
+    def _ingest_job_from_row(self, cursor, row) -> Optional[dict]:
+        if row is None:
+            return None
+        job = dict(zip([col[0] for col in cursor.description], row))
+        job.pop("payload", None)
+        return job
+
+    def create_ingest_job(self, kind: str, brain_id: str, source_id: str, payload: Optional[str] = None) -> dict:
+        """
+        수집 작업을 대기열에 추가합니다.
+        Args:
+            kind: "text" | "pdf"
+            payload: text 작업의 원문 (pdf 작업은 None, 서버에 저장된 파일을 읽음)
+        """
+        try:
+            conn = self._connect()
+            try:
+                cursor = conn.cursor()
+                cursor.execute(
+                    "INSERT INTO IngestJob (kind, brain_id, source_id, payload) VALUES (?, ?, ?, ?)",
+                    (kind, str(brain_id), str(source_id), payload)
+                )
+                job_id = cursor.lastrowid
+                conn.commit()
+            finally:
+                conn.close()
+            logging.info("수집 작업 등록: job_id=%s, kind=%s, source_id=%s, brain_id=%s", job_id, kind, source_id, brain_id)
+            return self.get_ingest_job(job_id)
+        except Exception as e:
+            logging.error("수집 작업 등록 오류: %s", str(e))
+            raise RuntimeError(f"수집 작업 등록 오류: {str(e)}")
+
+    def get_ingest_job(self, job_id: int, include_payload: bool = False) -> Optional[dict]:
+        try:
+            conn = self._connect()
+            try:
+                cursor = conn.cursor()
+                cursor.execute("SELECT * FROM IngestJob WHERE job_id = ?", (job_id,))
+                row = cursor.fetchone()
+                job = self._ingest_job_from_row(cursor, row)
+                if job is not None and include_payload:
+                    job["payload"] = row[[col[0] for col in cursor.description].index("payload")]
+            finally:
+                conn.close()
+            return job
+        except Exception as e:
+            logging.error("수집 작업 조회 오류: %s", str(e))
+            raise RuntimeError(f"수집 작업 조회 오류: {str(e)}")
+
+    def list_ingest_jobs(self, brain_id: Optional[str] = None, status: Optional[str] = None,
+                         limit: int = 50) -> List[dict]:
+        """최근 수집 작업 목록 (job_id 내림차순)"""
+        where = []
+        params: List[Any] = []
+        if brain_id is not None:
+            where.append("brain_id = ?")
+            params.append(str(brain_id))
+        if status is not None:
+            where.append("status = ?")
+            params.append(status)
+        where_sql = f"WHERE {' AND '.join(where)}" if where else ""
+        try:
+            conn = self._connect()
+            try:
+                cursor = conn.cursor()
+                cursor.execute(f"SELECT * FROM IngestJob {where_sql} ORDER BY job_id DESC LIMIT ?", (*params, limit))
+                jobs = [self._ingest_job_from_row(cursor, row) for row in cursor.fetchall()]
+            finally:
+                conn.close()
+            return jobs
+        except Exception as e:
+            logging.error("수집 작업 목록 조회 오류: %s", str(e))
+            raise RuntimeError(f"수집 작업 목록 조회 오류: {str(e)}")
+
+    def claim_ingest_job(self) -> Optional[dict]:
+        """가장 오래된 대기 작업 하나를 running으로 바꾸고 (payload 포함) 반환합니다."""
+        try:
+            conn = self._connect()
+            try:
+                cursor = conn.cursor()
+                cursor.execute("BEGIN IMMEDIATE")
+                cursor.execute("SELECT job_id FROM IngestJob WHERE status = 'queued' ORDER BY job_id LIMIT 1")
+                row = cursor.fetchone()
+                if row is None:
+                    conn.rollback()
+                    return None
+                cursor.execute(
+                    "UPDATE IngestJob SET status = 'running', attempts = attempts + 1, error = NULL, "
+                    "updated_at = CURRENT_TIMESTAMP WHERE job_id = ?",
+                    (row[0],)
+                )
+                conn.commit()
+            finally:
+                conn.close()
+            return self.get_ingest_job(row[0], include_payload=True)
+        except Exception as e:
+            logging.error("수집 작업 할당 오류: %s", str(e))
+            raise RuntimeError(f"수집 작업 할당 오류: {str(e)}")
+
+    def update_ingest_job(self, job_id: int, **fields) -> bool:
+        """작업 상태/진행도 갱신 (INGEST_JOB_FIELDS에 있는 필드만)"""
+        unknown = set(fields) - set(INGEST_JOB_FIELDS)
+        if unknown:
+            raise ValueError(f"알 수 없는 수집 작업 필드: {', '.join(sorted(unknown))}")
+        if not fields:
+            return False
+        assignments = ", ".join(f"{name} = ?" for name in fields)
+        try:
+            conn = self._connect()
+            try:
+                cursor = conn.cursor()
+                cursor.execute(
+                    f"UPDATE IngestJob SET {assignments}, updated_at = CURRENT_TIMESTAMP WHERE job_id = ?",
+                    (*fields.values(), job_id)
+                )
+                updated = cursor.rowcount > 0
+                conn.commit()
+            finally:
+                conn.close()
+            return updated
+        except Exception as e:
+            logging.error("수집 작업 갱신 오류: %s", str(e))
+            raise RuntimeError(f"수집 작업 갱신 오류: {str(e)}")
+
+    def save_ingest_chunks(self, job_id: int, chunks: List[tuple]) -> int:
+        """
+        작업의 청크 목록을 저장하고 total_chunks를 기록합니다. 이미 저장된 청크는 그대로 둡니다.
+        Args:
+            chunks: [(청크 텍스트, 출처 정보 dict 또는 None)]
+        """
+        try:
+            conn = self._connect()
+            try:
+                cursor = conn.cursor()
+                cursor.executemany(
+                    "INSERT OR IGNORE INTO IngestChunk (job_id, chunk_index, chunk_text, provenance) VALUES (?, ?, ?, ?)",
+                    [
+                        (job_id, index, text, json.dumps(provenance, ensure_ascii=False) if provenance else None)
+                        for index, (text, provenance) in enumerate(chunks)
+                    ]
+                )
+                cursor.execute(
+                    "UPDATE IngestJob SET total_chunks = ?, stage = 'extracting', updated_at = CURRENT_TIMESTAMP "
+                    "WHERE job_id = ?",
+                    (len(chunks), job_id)
+                )
+                conn.commit()
+            finally:
+                conn.close()
+            return len(chunks)
+        except Exception as e:
+            logging.error("수집 청크 저장 오류: %s", str(e))
+            raise RuntimeError(f"수집 청크 저장 오류: {str(e)}")
+
+    def get_ingest_chunks(self, job_id: int) -> List[dict]:
+        """작업의 청크 목록 (chunk_index 순). result는 추출이 끝난 청크만 채워집니다."""
+        try:
+            conn = self._connect()
+            try:
+                cursor = conn.cursor()
+                cursor.execute(
+                    "SELECT chunk_index, chunk_text, provenance, result FROM IngestChunk "
+                    "WHERE job_id = ? ORDER BY chunk_index",
+                    (job_id,)
+                )
+                rows = cursor.fetchall()
+            finally:
+                conn.close()
+            return [
+                {
+                    "chunk_index": index,
+                    "text": text,
+                    "provenance": json.loads(provenance) if provenance else None,
+                    "result": json.loads(result) if result else None
+                }
+                for index, text, provenance, result in rows
+            ]
+        except Exception as e:
+            logging.error("수집 청크 조회 오류: %s", str(e))
+            raise RuntimeError(f"수집 청크 조회 오류: {str(e)}")
+
+    def save_ingest_chunk_result(self, job_id: int, chunk_index: int, result: Dict[str, Any]) -> int:
+        """
+        청크 추출 결과를 저장하고 chunks_done을 갱신합니다.
+        Returns:
+            int: 추출이 끝난 청크 수
+        """
+        try:
+            conn = self._connect()
+            try:
+                cursor = conn.cursor()
+                cursor.execute(
+                    "UPDATE IngestChunk SET result = ? WHERE job_id = ? AND chunk_index = ?",
+                    (json.dumps(result, ensure_ascii=False), job_id, chunk_index)
+                )
+                cursor.execute(
+                    "UPDATE IngestJob SET chunks_done = "
+                    "(SELECT COUNT(*) FROM IngestChunk WHERE job_id = ? AND result IS NOT NULL), "
+                    "updated_at = CURRENT_TIMESTAMP WHERE job_id = ?",
+                    (job_id, job_id)
+                )
+                cursor.execute("SELECT chunks_done FROM IngestJob WHERE job_id = ?", (job_id,))
+                done = cursor.fetchone()[0]
+                conn.commit()
+            finally:
+                conn.close()
+            return done
+        except Exception as e:
+            logging.error("수집 청크 결과 저장 오류: %s", str(e))
+            raise RuntimeError(f"수집 청크 결과 저장 오류: {str(e)}")
+
+    def delete_ingest_chunks(self, job_id: int) -> None:
+        """완료된 작업의 청크 데이터를 정리합니다."""
+        try:
+            conn = self._connect()
+            try:
+                conn.execute("DELETE FROM IngestChunk WHERE job_id = ?", (job_id,))
+                conn.commit()
+            finally:
+                conn.close()
+        except Exception as e:
+            logging.error("수집 청크 삭제 오류: %s", str(e))
+            raise RuntimeError(f"수집 청크 삭제 오류: {str(e)}")
+
+    def requeue_ingest_jobs(self, job_id: Optional[int] = None) -> int:
+        """
+        중단된(running) 작업이나 실패한(failed) 작업을 다시 대기열에 넣습니다.
+        job_id를 생략하면 서버 재시작 시 남아 있던 running 작업 전체를 되돌립니다.
+        Returns:
+            int: 다시 대기열에 들어간 작업 수
+        """
+        try:
+            conn = self._connect()
+            try:
+                cursor = conn.cursor()
+                if job_id is None:
+                    cursor.execute("UPDATE IngestJob SET status = 'queued', updated_at = CURRENT_TIMESTAMP "
+                                   "WHERE status = 'running'")
+                else:
+                    cursor.execute("UPDATE IngestJob SET status = 'queued', error = NULL, updated_at = CURRENT_TIMESTAMP "
+                                   "WHERE job_id = ? AND status = 'failed'", (job_id,))
+                count = cursor.rowcount
+                conn.commit()
+            finally:
+                conn.close()
+            return count
+        except Exception as e:
+            logging.error("수집 작업 재등록 오류: %s", str(e))
+            raise RuntimeError(f"수집 작업 재등록 오류: {str(e)}")
+
+    # 음성 전사 작업 큐 관련 메서드
+    def _transcribe_job_from_row(self, cursor, row) -> Optional[dict]:
+        if row is None:
+            return None
+        job = dict(zip([col[0] for col in cursor.description], row))
+        job["owns_audio"] = bool(job["owns_audio"])
+        job["segments"] = json.loads(job["segments"]) if job["segments"] else None
+        return job
+
+    def create_transcribe_job(self, audio_path: str, voice_id: Optional[int] = None, owns_audio: bool = False) -> dict:
+        """
+        전사 작업을 대기열에 추가합니다.
+        Args:
+            audio_path: 전사할 오디오 파일 경로
+            voice_id: 결과를 연결할 Voice ID (없으면 결과는 작업에만 저장)
+            owns_audio: True면 작업이 끝난 뒤 audio_path를 삭제 (업로드 임시 파일)
+        """
+        try:
+            conn = self._connect()
+            try:
+                cursor = conn.cursor()
+                cursor.execute(
+                    "INSERT INTO TranscribeJob (voice_id, audio_path, owns_audio) VALUES (?, ?, ?)",
+                    (voice_id, audio_path, int(owns_audio))
+                )
+                job_id = cursor.lastrowid
+                conn.commit()
+            finally:
+                conn.close()
+            logging.info("전사 작업 등록: job_id=%s, voice_id=%s", job_id, voice_id)
+            return self.get_transcribe_job(job_id)
+        except Exception as e:
+            logging.error("전사 작업 등록 오류: %s", str(e))
+            raise RuntimeError(f"전사 작업 등록 오류: {str(e)}")
+
+    def get_transcribe_job(self, job_id: int) -> Optional[dict]:
+        try:
+            conn = self._connect()
+            try:
+                cursor = conn.cursor()
+                cursor.execute("SELECT * FROM TranscribeJob WHERE job_id = ?", (job_id,))
+                job = self._transcribe_job_from_row(cursor, cursor.fetchone())
+            finally:
+                conn.close()
+            return job
+        except Exception as e:
+            logging.error("전사 작업 조회 오류: %s", str(e))
+            raise RuntimeError(f"전사 작업 조회 오류: {str(e)}")
+
+    def list_transcribe_jobs(self, voice_id: Optional[int] = None, status: Optional[str] = None,
+                             limit: int = 50) -> List[dict]:
+        """최근 전사 작업 목록 (job_id 내림차순)"""
+        where = []
+        params: List[Any] = []
+        if voice_id is not None:
+            where.append("voice_id = ?")
+            params.append(voice_id)
+        if status is not None:
+            where.append("status = ?")
+            params.append(status)
+        where_sql = f"WHERE {' AND '.join(where)}" if where else ""
+        try:
+            conn = self._connect()
+            try:
+                cursor = conn.cursor()
+                cursor.execute(f"SELECT * FROM TranscribeJob {where_sql} ORDER BY job_id DESC LIMIT ?", (*params, limit))
+                jobs = [self._transcribe_job_from_row(cursor, row) for row in cursor.fetchall()]
+            finally:
+                conn.close()
+            return jobs
+        except Exception as e:
+            logging.error("전사 작업 목록 조회 오류: %s", str(e))
+            raise RuntimeError(f"전사 작업 목록 조회 오류: {str(e)}")
+
+    def count_transcribe_jobs(self) -> Dict[str, int]:
+        """상태별 전사 작업 수 (queued, running)"""
+        try:
+            conn = self._connect()
+            try:
+                rows = conn.execute(
+                    "SELECT status, COUNT(*) FROM TranscribeJob WHERE status IN ('queued', 'running') GROUP BY status"
+                ).fetchall()
+            finally:
+                conn.close()
+            counts = {"queued": 0, "running": 0}
+            counts.update(dict(rows))
+            return counts
+        except Exception as e:
+            logging.error("전사 작업 수 조회 오류: %s", str(e))
+            raise RuntimeError(f"전사 작업 수 조회 오류: {str(e)}")
+
+    def queue_position_transcribe_job(self, job_id: int) -> int:
+        """대기 중인 작업 앞에 남은 대기 작업 수 (대기 중이 아니면 0)"""
+        try:
+            conn = self._connect()
+            try:
+                row = conn.execute(
+                    "SELECT COUNT(*) FROM TranscribeJob WHERE status = 'queued' AND job_id < ? "
+                    "AND EXISTS (SELECT 1 FROM TranscribeJob WHERE job_id = ? AND status = 'queued')",
+                    (job_id, job_id)
+                ).fetchone()
+            finally:
+                conn.close()
+            return row[0]
+        except Exception as e:
+            logging.error("전사 작업 순번 조회 오류: %s", str(e))
+            raise RuntimeError(f"전사 작업 순번 조회 오류: {str(e)}")
+
+    def claim_transcribe_job(self) -> Optional[dict]:
+        """가장 오래된 대기 작업 하나를 running으로 바꾸고 반환합니다."""
+        try:
+            conn = self._connect()
+            try:
+                cursor = conn.cursor()
+                cursor.execute("BEGIN IMMEDIATE")
+                cursor.execute("SELECT job_id FROM TranscribeJob WHERE status = 'queued' ORDER BY job_id LIMIT 1")
+                row = cursor.fetchone()
+                if row is None:
+                    conn.rollback()
+                    return None
+                cursor.execute(
+                    "UPDATE TranscribeJob SET status = 'running', attempts = attempts + 1, error = NULL, "
+                    "started_at = CURRENT_TIMESTAMP WHERE job_id = ?",
+                    (row[0],)
+                )
+                conn.commit()
+            finally:
+                conn.close()
+            return self.get_transcribe_job(row[0])
+        except Exception as e:
+            logging.error("전사 작업 할당 오류: %s", str(e))
+            raise RuntimeError(f"전사 작업 할당 오류: {str(e)}")
+
+    def complete_transcribe_job(self, job_id: int, text: str, segments: List[dict], duration: float) -> None:
+        """전사 결과를 저장하고, 연결된 Voice가 있으면 같은 트랜잭션에서 transcript를 갱신합니다."""
+        try:
+            conn = self._connect()
+            try:
+                cursor = conn.cursor()
+                cursor.execute(
+                    "UPDATE TranscribeJob SET status = 'done', text = ?, segments = ?, duration = ?, "
+                    "finished_at = CURRENT_TIMESTAMP WHERE job_id = ?",
+                    (text, json.dumps(segments, ensure_ascii=False), duration, job_id)
+                )
+                cursor.execute(
+                    "UPDATE Voice SET transcript = ? "
+                    "WHERE voice_id = (SELECT voice_id FROM TranscribeJob WHERE job_id = ?)",
+                    (text, job_id)
+                )
+                conn.commit()
+            finally:
+                conn.close()
+        except Exception as e:
+            logging.error("전사 결과 저장 오류: %s", str(e))
+            raise RuntimeError(f"전사 결과 저장 오류: {str(e)}")
+
+    def fail_transcribe_job(self, job_id: int, error: str) -> None:
+        try:
+            conn = self._connect()
+            try:
+                conn.execute(
+                    "UPDATE TranscribeJob SET status = 'failed', error = ?, finished_at = CURRENT_TIMESTAMP "
+                    "WHERE job_id = ?",
+                    (error, job_id)
+                )
+                conn.commit()
+            finally:
+                conn.close()
+        except Exception as e:
+            logging.error("전사 작업 실패 기록 오류: %s", str(e))
+            raise RuntimeError(f"전사 작업 실패 기록 오류: {str(e)}")
+
+    def requeue_transcribe_jobs(self) -> int:
+        """서버 재시작 시 running으로 남아 있던 전사 작업을 다시 대기열에 넣습니다."""
+        try:
+            conn = self._connect()
+            try:
+                cursor = conn.cursor()
+                cursor.execute("UPDATE TranscribeJob SET status = 'queued', started_at = NULL WHERE status = 'running'")
+                count = cursor.rowcount
+                conn.commit()
+            finally:
+                conn.close()
+            return count
+        except Exception as e:
+            logging.error("전사 작업 재등록 오류: %s", str(e))
+            raise RuntimeError(f"전사 작업 재등록 오류: {str(e)}")
+
+    def get_voice_transcript(self, voice_id: int) -> Optional[str]:
+        """Voice에 연결된 마지막 전사 결과"""
+        try:
+            conn = self._connect()
+            try:
+                row = conn.execute("SELECT transcript FROM Voice WHERE voice_id = ?", (voice_id,)).fetchone()
+            finally:
+                conn.close()
+            return row[0] if row else None
+        except Exception as e:
+            logging.error("전사 결과 조회 오류: %s", str(e))
+            raise RuntimeError(f"전사 결과 조회 오류: {str(e)}")
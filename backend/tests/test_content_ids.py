@@ -0,0 +1,46 @@
+"""여러 스레드가 동시에 메모/PDF/채팅을 만들어도 Sequence에서 발급한 ID가 겹치지 않는지 확인"""
+import threading
+
+from sqlite_db.sqlite_handler import SQLiteHandler
+
+THREADS = 8
+ROUNDS = 25
+
+
+def test_concurrent_creates_get_unique_ids(tmp_path):
+    handler = SQLiteHandler(str(tmp_path / "ids.db"))
+    handler._init_db()
+    user = handler.create_user("ids", "ids")
+    brain_id = handler.create_brain("ids", user["user_id"])["brain_id"]
+
+    ids = []
+    errors = []
+    lock = threading.Lock()
+    barrier = threading.Barrier(THREADS)
+
+    def worker(index):
+        barrier.wait()
+        try:
+            for round_ in range(ROUNDS):
+                created = [
+                    handler.create_memo(f"memo {index}-{round_}", "본문", brain_id=brain_id)["memo_id"],
+                    handler.create_pdf(f"pdf {index}-{round_}", "/tmp/x.pdf", brain_id=brain_id)["pdf_id"],
+                    handler.save_chat(round_ % 2 == 0, f"chat {index}-{round_}", brain_id),
+                ]
+                with lock:
+                    ids.extend(created)
+        except Exception as e:
+            with lock:
+                errors.append(e)
+
+    workers = [threading.Thread(target=worker, args=(index,)) for index in range(THREADS)]
+    for thread in workers:
+        thread.start()
+    for thread in workers:
+        thread.join()
+    handler._pool.close_all()
+
+    assert not errors
+    assert -1 not in ids                      # save_chat 실패
+    assert len(ids) == THREADS * ROUNDS * 3
+    assert len(set(ids)) == len(ids)
@@ -0,0 +1,103 @@
+"""추출을 생략한 중복 소스가 원본 description을 복사받아 원본 삭제 후에도 그래프가 남는지 확인"""
+import asyncio
+import json
+
+import pytest
+from pydantic import ValidationError
+
+from models.request_models import ProcessPdfRequest
+from neo4j_db import graph_cache
+from neo4j_db.AsyncNeo4jHandler import AsyncNeo4jHandler
+from neo4j_db.Neo4jHandler import Neo4jHandler
+from neo4j_db.cypher import (
+    APPEND_DESCRIPTIONS_QUERY, NODES_BY_SOURCE_ID_QUERY, SOURCE_NODE_DESCRIPTIONS_QUERY,
+    STRIP_SOURCE_DESCRIPTIONS_QUERY,
+    copied_description_rows, parse_descriptions,
+)
+
+
+def desc(text, source_id):
+    return json.dumps({"description": text, "source_id": source_id}, ensure_ascii=False)
+
+
+class FakeGraph:
+    """노드 이름 → descriptions(JSON 문자열 목록)로 Cypher 쿼리 몇 개를 흉내냄"""
+
+    def __init__(self):
+        self.nodes = {
+            "A": [desc("원본 설명", "1"), desc("다른 소스", "12")],
+            "B": [desc("다른 소스만", "12")],
+        }
+
+    def run(self, query, params):
+        pattern = f'"source_id": "{params.get("source_id")}"'      # 쿼리의 CONTAINS 조건과 같은 문자열
+        if query == SOURCE_NODE_DESCRIPTIONS_QUERY:
+            return [{"name": name, "descriptions": list(descs)} for name, descs in self.nodes.items()
+                    if any(pattern in d for d in descs)]
+        if query == APPEND_DESCRIPTIONS_QUERY:
+            for row in params["rows"]:
+                self.nodes[row["name"]] = self.nodes[row["name"]] + row["descriptions"]
+            return []
+        if query == STRIP_SOURCE_DESCRIPTIONS_QUERY:
+            for name, descs in self.nodes.items():
+                self.nodes[name] = [d for d in descs if pattern not in d]
+            return []
+        raise AssertionError(f"예상하지 못한 쿼리: {query}")
+
+    def sources(self, name):
+        return [d["source_id"] for d in parse_descriptions(self.nodes[name])]
+
+
+def test_copied_rows_match_source_id_exactly_and_only_once():
+    graph = FakeGraph()
+    records = graph.run(SOURCE_NODE_DESCRIPTIONS_QUERY, {"source_id": "1"})
+    rows = copied_description_rows(records, "1", "7")
+    # source_id 12는 "1"을 포함하지만 복사 대상은 source_id가 정확히 1인 description뿐
+    assert rows == [{"name": "A", "descriptions": [desc("원본 설명", "7")]}]
+
+    graph.run(APPEND_DESCRIPTIONS_QUERY, {"rows": rows})
+    again = copied_description_rows(graph.run(SOURCE_NODE_DESCRIPTIONS_QUERY, {"source_id": "1"}), "1", "7")
+    assert again == []
+
+
+def test_sync_copy_survives_original_delete():
+    graph = FakeGraph()
+    handler = Neo4jHandler.__new__(Neo4jHandler)
+    handler.driver = type("Driver", (), {"close": lambda _: None})()
+    handler._execute_with_retry = graph.run
+
+    since = graph_cache.current_version("dup-sync")
+    assert handler.copy_descriptions_by_source_id("1", "7", "dup-sync") == 1
+    assert graph_cache.get_delta("dup-sync", since)["nodes"]["added"] == [{"name": "A"}]
+
+    graph.run(STRIP_SOURCE_DESCRIPTIONS_QUERY, {"source_id": "1", "brain_id": "dup-sync"})
+    assert graph.sources("A") == ["12", "7"]
+
+
+def test_async_copy_survives_original_delete():
+    graph = FakeGraph()
+    handler = AsyncNeo4jHandler()
+
+    async def execute(query, params):
+        return graph.run(query, params)
+    handler._execute_with_retry = execute
+
+    assert asyncio.run(handler.copy_descriptions_by_source_id("1", "7", "dup-async")) == 1
+    graph.run(STRIP_SOURCE_DESCRIPTIONS_QUERY, {"source_id": "1", "brain_id": "dup-async"})
+    assert graph.sources("A") == ["12", "7"]
+    assert graph.sources("B") == ["12"]
+
+
+def test_source_queries_compare_whole_source_id():
+    # FakeGraph와 같은 "source_id": "<id>" 쌍으로 비교해야 1을 지울 때 12의 description이 남음
+    condition = """CONTAINS ('"source_id": "' + $source_id + '"')"""
+    for query in (STRIP_SOURCE_DESCRIPTIONS_QUERY, SOURCE_NODE_DESCRIPTIONS_QUERY, NODES_BY_SOURCE_ID_QUERY):
+        assert condition in query
+
+
+def test_pdf_request_rejects_non_numeric_brain_id():
+    # 중복 소스 조회 전에 int(brain_id)를 하므로 숫자가 아니면 500 대신 요청 검증(422)에서 거절
+    assert ProcessPdfRequest(pdf_id=1, brain_id="12").brain_id == "12"
+    assert ProcessPdfRequest(pdf_id=1).brain_id is None
+    with pytest.raises(ValidationError):
+        ProcessPdfRequest(pdf_id=1, brain_id="brain-a")
@@ -0,0 +1,103 @@
+"""마이그레이션을 적용한 DB에서 목록 조회 쿼리가 v1 인덱스를 타는지 EXPLAIN QUERY PLAN으로 확인"""
+import sqlite3
+
+import pytest
+
+from sqlite_db.migrations import MIGRATIONS, apply_migrations, get_schema_version
+from sqlite_db.sqlite_handler import SQLiteHandler
+
+
+@pytest.fixture
+def handler(tmp_path):
+    handler = SQLiteHandler(str(tmp_path / "migrations.db"))
+    handler._init_db()
+    yield handler
+    handler._pool.close_all()
+
+
+def _traced_selects(handler, monkeypatch, call):
+    """call() 동안 핸들러가 실행한 SELECT 문(파라미터가 채워진 형태)을 모읍니다."""
+    statements = []
+    acquire = handler._pool.acquire
+
+    def traced_acquire():
+        conn = acquire()
+        conn.set_trace_callback(statements.append)
+        return conn
+
+    monkeypatch.setattr(handler._pool, "acquire", traced_acquire)
+    try:
+        call()
+    finally:
+        monkeypatch.setattr(handler._pool, "acquire", acquire)
+    return [sql for sql in statements if sql.lstrip().upper().startswith("SELECT")]
+
+
+def _query_plan(handler, sql):
+    conn = sqlite3.connect(handler.db_path)
+    try:
+        return " | ".join(row[3] for row in conn.execute(f"EXPLAIN QUERY PLAN {sql}"))
+    finally:
+        conn.close()
+
+
+def test_migrations_reach_latest_version(handler):
+    conn = sqlite3.connect(handler.db_path)
+    try:
+        assert get_schema_version(conn) == MIGRATIONS[-1][0]
+    finally:
+        conn.close()
+
+
+LISTING_QUERIES = [
+    ("get_brain_folders", lambda h, b, f: h.get_brain_folders(b), "idx_folder_brain"),
+    ("get_memos_by_brain_and_folder(root)", lambda h, b, f: h.get_memos_by_brain_and_folder(b), "idx_memo_brain_folder"),
+    ("get_memos_by_brain_and_folder(folder)", lambda h, b, f: h.get_memos_by_brain_and_folder(b, f), "idx_memo_brain_folder"),
+    ("get_pdfs_by_brain_and_folder", lambda h, b, f: h.get_pdfs_by_brain_and_folder(b), "idx_pdf_brain_folder"),
+    ("get_voices_by_brain_and_folder", lambda h, b, f: h.get_voices_by_brain_and_folder(b), "idx_voice_brain_folder"),
+    ("get_textfiles_by_brain_and_folder", lambda h, b, f: h.get_textfiles_by_brain_and_folder(b), "idx_textfile_brain_folder"),
+    ("get_folder_memos", lambda h, b, f: h.get_folder_memos(f), "idx_memo_folder_date"),
+    ("get_folder_pdfs", lambda h, b, f: h.get_folder_pdfs(f), "idx_pdf_folder_date"),
+    ("get_folder_voices", lambda h, b, f: h.get_folder_voices(f), "idx_voice_folder_date"),
+    ("get_folder_textfiles", lambda h, b, f: h.get_folder_textfiles(f), "idx_textfile_folder_date"),
+    ("get_trash_bin_memos", lambda h, b, f: h.get_trash_bin_memos(b), "idx_memo_brain_deleted"),
+    ("get_chat_list", lambda h, b, f: h.get_chat_list(b), "idx_chat_brain_chat"),
+    ("get_chat_list(limit)", lambda h, b, f: h.get_chat_list(b, limit=20), "idx_chat_brain_chat"),
+]
+
+# folder_id IS NOT NULL은 범위 조건이라 인덱스로 찾은 뒤 memo_date 정렬이 따로 필요함
+UNSORTED_BY_INDEX = {"get_memos_by_brain_and_folder(folder)"}
+
+
+@pytest.mark.parametrize("name,call,index", LISTING_QUERIES, ids=[q[0] for q in LISTING_QUERIES])
+def test_listing_queries_use_index(handler, monkeypatch, name, call, index):
+    user = handler.create_user("migration", "migration")
+    brain_id = handler.create_brain("migration", user["user_id"])["brain_id"]
+    folder_id = handler.create_folder("folder", brain_id)["folder_id"]
+
+    selects = _traced_selects(handler, monkeypatch, lambda: call(handler, brain_id, folder_id))
+    assert selects, f"{name}: 실행된 SELECT가 없음"
+    plan = _query_plan(handler, selects[-1])
+    assert index in plan, f"{name}: {plan}"
+    if name not in UNSORTED_BY_INDEX:
+        assert "USE TEMP B-TREE FOR ORDER BY" not in plan, f"{name}: {plan}"
+
+
+def test_v8_drops_bigram_triggers_that_need_a_python_function(handler):
+    # 예전 v7을 적용한 DB 흉내: 등록되지 않은 SQL 함수 bigrams()를 호출하는 트리거가 남아 있음
+    conn = sqlite3.connect(handler.db_path)
+    try:
+        conn.execute("CREATE VIRTUAL TABLE ContentBigram USING fts5(title)")
+        conn.execute("CREATE TRIGGER chat_bigram_ai AFTER INSERT ON Chat BEGIN "
+                     "INSERT INTO ContentBigram(title) VALUES (bigrams(new.message)); END")
+        conn.execute("PRAGMA user_version = 7")
+        conn.commit()
+        with pytest.raises(sqlite3.OperationalError, match="no such function: bigrams"):
+            conn.execute("INSERT INTO Chat (is_ai, message) VALUES (0, 'x')")
+        conn.rollback()
+
+        assert apply_migrations(conn) == MIGRATIONS[-1][0]
+        conn.execute("INSERT INTO Chat (is_ai, message) VALUES (0, 'x')")
+        assert conn.execute("SELECT count(*) FROM sqlite_master WHERE name LIKE '%bigram%'").fetchone()[0] == 0
+    finally:
+        conn.close()
@@ -0,0 +1,101 @@
+"""insert_nodes_and_edges가 실제로 저장된 엣지만 변경 이력에 기록하는지 확인 (Neo4j 없이 가짜 트랜잭션 사용)"""
+import asyncio
+
+from neo4j_db import graph_cache
+from neo4j_db.AsyncNeo4jHandler import AsyncNeo4jHandler
+from neo4j_db.Neo4jHandler import Neo4jHandler
+from neo4j_db.cypher import MERGE_EDGE_QUERY
+
+NODES = [
+    {"name": "A", "label": "개념", "source_id": "1", "descriptions": []},
+    {"name": "B", "label": "개념", "source_id": "1", "descriptions": []},
+]
+EDGES = [
+    {"source": "A", "target": "B", "relation": "관련"},
+    {"source": "A", "target": "없는노드", "relation": "관련"},
+]
+
+
+class FakeRecord:
+    def __init__(self, data):
+        self._data = data
+
+    def data(self):
+        return dict(self._data)
+
+
+class FakeResult:
+    def __init__(self, record):
+        self.record = record
+
+    def single(self):
+        return self.record
+
+
+def run_query(query, params, names):
+    """MATCH가 실패하면(없는 노드) 행이 없는 결과를 돌려주는 MERGE_EDGE_QUERY 흉내"""
+    if query != MERGE_EDGE_QUERY:
+        names.add(params["name"])
+        return FakeResult(None)
+    if params["source"] in names and params["target"] in names:
+        return FakeResult(FakeRecord({"source": params["source"], "target": params["target"],
+                                      "relation": params["relation"]}))
+    return FakeResult(None)
+
+
+class FakeSession:
+    def __init__(self):
+        self.names = set()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def execute_write(self, fn, *args):
+        tx = type("Tx", (), {"run": lambda _, query, params: run_query(query, params, self.names)})()
+        return fn(tx, *args)
+
+
+class FakeAsyncResult(FakeResult):
+    async def single(self):
+        return self.record
+
+
+class FakeAsyncSession(FakeSession):
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        return False
+
+    async def execute_write(self, fn, *args):
+        async def run(_, query, params):
+            return FakeAsyncResult(run_query(query, params, self.names).record)
+        tx = type("Tx", (), {"run": run})()
+        return await fn(tx, *args)
+
+
+def added_links(brain_id, since):
+    delta = graph_cache.get_delta(brain_id, since)
+    return [(link["source"], link["target"]) for link in delta["links"]["added"]]
+
+
+def test_sync_insert_records_only_stored_edges():
+    handler = Neo4jHandler.__new__(Neo4jHandler)
+    handler.driver = type("Driver", (), {"session": lambda _: FakeSession(), "close": lambda _: None})()
+    since = graph_cache.current_version("test-sync")
+    handler.insert_nodes_and_edges(NODES, EDGES, "test-sync")
+    assert added_links("test-sync", since) == [("A", "B")]
+
+
+def test_async_insert_records_only_stored_edges(monkeypatch):
+    driver = type("Driver", (), {"session": lambda _: FakeAsyncSession()})()
+
+    async def get_driver():
+        return driver
+    monkeypatch.setattr(AsyncNeo4jHandler, "_get_driver", staticmethod(get_driver))
+    since = graph_cache.current_version("test-async")
+    asyncio.run(AsyncNeo4jHandler().insert_nodes_and_edges(NODES, EDGES, "test-async"))
+    assert added_links("test-async", since) == [("A", "B")]
@@ -0,0 +1,62 @@
+"""질문 답변용 스키마 확장(k-hop 이웃 선택)과 스키마 텍스트 토큰 예산 처리 확인"""
+import json
+import re
+
+import pytest
+
+from neo4j_db.cypher import K_HOP_EXPAND_QUERY, select_k_hop_neighbours
+
+
+class FakeRel:
+    def __init__(self, element_id):
+        self.element_id = element_id
+
+
+def record(name, score, degree):
+    return {"r": FakeRel(f"rel-{name}"), "m": {"name": name}, "score": score, "degree": degree}
+
+
+def test_expand_query_limits_each_frontier_node_inside_subquery():
+    subquery = re.search(r"CALL \{(.*)\}", K_HOP_EXPAND_QUERY, re.S).group(1)
+    assert "LIMIT $scan_limit" in subquery and "LIMIT $fan_out" in subquery
+    assert "ORDER BY degree DESC" in subquery
+
+
+def test_ties_are_broken_by_degree():
+    scores = {"seed": 1.0}
+    related, relationships = [], {}
+    records = [record("가", 0.5, 1), record("나", 0.5, 7), record("다", 0.5, 3), record("seed", 0.5, 9)]
+    frontier, candidates = select_k_hop_neighbours(records, scores, related, relationships, max_nodes=3)
+    assert candidates == 3
+    assert [f["name"] for f in frontier] == ["나", "다"]
+    assert set(relationships) == {"rel-나", "rel-다", "rel-seed"}
+
+
+@pytest.fixture
+def ai_service(monkeypatch):
+    # ai_service는 임포트 시 OpenAI 클라이언트를 만들므로 의존성이 있을 때만 실행
+    for module in ("dotenv", "openai", "langchain"):
+        pytest.importorskip(module)
+    monkeypatch.setenv("OPENAI_API_KEY", "test")
+    from services import ai_service
+    return ai_service
+
+
+def node(name, *descriptions):
+    return {"name": name, "label": "개념",
+            "descriptions": [json.dumps({"description": d, "source_id": "1"}, ensure_ascii=False) for d in descriptions]}
+
+
+def test_oversize_top_line_does_not_empty_the_budget(ai_service):
+    hub = node("허브", *(f"아주 긴 설명 {i}" * 20 for i in range(20)))
+    small = [node(f"작은{i}", "짧은 설명") for i in range(3)]
+    scores = {"허브": 1.0, "작은0": 0.9, "작은1": 0.8, "작은2": 0.7}
+    text = ai_service.generate_schema_text([hub, *small], [], [], scores, max_tokens=60)
+    assert text.splitlines() == ["개념-작은0(짧은 설명)", "개념-작은1(짧은 설명)", "개념-작은2(짧은 설명)"]
+
+
+def test_single_oversize_line_is_truncated_to_budget(ai_service):
+    hub = node("허브", "아주 긴 설명" * 100)
+    text = ai_service.generate_schema_text([hub], [], [], {"허브": 1.0}, max_tokens=50)
+    assert text.startswith("개념-허브(아주 긴 설명") and text.endswith("…")
+    assert ai_service.estimate_tokens(text) <= 50
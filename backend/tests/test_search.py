@@ -0,0 +1,70 @@
+"""ContentSearch(trigram) 전문 검색과 1~2글자 검색어 LIKE 처리 동작 확인"""
+import sqlite3
+
+import pytest
+
+from sqlite_db.sqlite_handler import SQLiteHandler
+
+
+@pytest.fixture
+def seeded(tmp_path):
+    handler = SQLiteHandler(str(tmp_path / "search.db"))
+    handler._init_db()
+    user = handler.create_user("search", "search")
+    brain_id = handler.create_brain("search", user["user_id"])["brain_id"]
+    ids = {
+        "meeting": handler.create_memo("주간 회의록", "다음 회의 안건 정리", brain_id=brain_id)["memo_id"],
+        "body_only": handler.create_memo("메모", "회의 일정 공유", brain_id=brain_id)["memo_id"],
+        "other": handler.create_memo("독서", "소설 감상", brain_id=brain_id)["memo_id"],
+        "report": handler.create_pdf("project report", "/tmp/a.pdf", brain_id=brain_id)["pdf_id"],
+        "plan": handler.create_pdf("report project plan", "/tmp/b.pdf", brain_id=brain_id)["pdf_id"],
+    }
+    yield handler, brain_id, ids
+    handler._pool.close_all()
+
+
+def test_plain_connection_can_write_indexed_tables(seeded):
+    # 검색 색인 트리거는 SQL만 사용하므로 sqlite3 CLI나 백업 스크립트 같은 다른 연결에서도 쓰기가 가능해야 함
+    handler, brain_id, ids = seeded
+    conn = sqlite3.connect(handler.db_path)
+    try:
+        conn.execute("INSERT INTO Chat (chat_id, is_ai, message, brain_id) VALUES (?, 0, ?, ?)",
+                     (ids["plan"] + 100, "외부 연결에서 쓴 회의 메시지", brain_id))
+        conn.execute("UPDATE Memo SET memo_title = ? WHERE memo_id = ?", ("회의록 수정", ids["meeting"]))
+        conn.commit()
+        assert conn.execute("SELECT name FROM sqlite_master WHERE name = 'ContentBigram'").fetchone() is None
+    finally:
+        conn.close()
+    assert ids["plan"] + 100 in {r["id"] for r in handler.search_content("메시지", brain_id)}
+
+
+def test_two_letter_terms_rank_title_matches_first(seeded):
+    handler, brain_id, ids = seeded
+    results = handler.search_content("회의", brain_id)
+    assert [r["id"] for r in results] == [ids["meeting"], ids["body_only"]]   # 제목 일치가 먼저
+    assert all(r["score"] is not None for r in results)
+
+
+def test_single_letter_matches_any_position(seeded):
+    handler, brain_id, ids = seeded
+    found = {r["id"] for r in handler.search_content("록", brain_id)}
+    assert ids["meeting"] in found and ids["other"] not in found
+
+
+def test_short_and_long_terms_are_combined(seeded):
+    handler, brain_id, ids = seeded
+    results = handler.search_content("회의 안건 정리", brain_id)
+    assert [r["id"] for r in results] == [ids["meeting"]]
+    assert handler.search_content("회의 감상", brain_id) == []
+
+
+def test_deleted_memo_is_not_found_by_short_term(seeded):
+    handler, brain_id, ids = seeded
+    handler.update_memo(ids["body_only"], is_delete=True)
+    assert [r["id"] for r in handler.search_content("일정", brain_id)] == []
+
+
+def test_title_search_matches_whole_phrase(seeded):
+    handler, brain_id, ids = seeded
+    assert [r["id"] for r in handler.search_titles_by_query("project report", brain_id)] == [ids["report"]]
+    assert {r["id"] for r in handler.search_titles_by_query("report", brain_id)} == {ids["report"], ids["plan"]}
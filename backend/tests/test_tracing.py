@@ -0,0 +1,111 @@
+"""수집 파이프라인 스팬의 부모/자식 관계, 루트의 단계별 누적 시간(stage_seconds), 관련 카운터 증가 확인"""
+import asyncio
+import json
+
+import pytest
+
+from neo4j_db.Neo4jHandler import Neo4jHandler
+from services import metrics_service, tracing
+
+
+@pytest.fixture
+def exporter():
+    exporter = tracing.InMemorySpanExporter()
+    previous = tracing.set_exporter(exporter)
+    yield exporter
+    tracing.set_exporter(previous)
+
+
+def only(exporter, name, trace_id):
+    spans = exporter.get_finished_spans(name, trace_id)
+    assert len(spans) == 1, f"{name} 스팬 수: {len(spans)}"
+    return spans[0]
+
+
+class FakeCompletions:
+    """OpenAI chat.completions 흉내: 청크 텍스트에 "실패"가 들어 있으면 예외"""
+
+    def create(self, messages, **kwargs):
+        if "실패" in messages[-1]["content"]:
+            raise RuntimeError("LLM 오류")
+        content = json.dumps({"nodes": [{"label": "개념", "name": "회의", "description": "회의 설명"}], "edges": []})
+        message = type("Message", (), {"content": content})()
+        choice = type("Choice", (), {"message": message})()
+        usage = type("Usage", (), {"prompt_tokens": 10, "completion_tokens": 5})()
+        return type("Completion", (), {"choices": [choice], "usage": usage})()
+
+
+def test_ingest_spans_and_chunk_counters(exporter, monkeypatch):
+    # ingest_service는 임베딩 모델/벡터 DB/OpenAI 클라이언트를 임포트하므로 전체 의존성이 있을 때만 실행
+    for module in ("dotenv", "langchain", "openai", "qdrant_client", "torch", "transformers"):
+        pytest.importorskip(module)
+    monkeypatch.setenv("OPENAI_API_KEY", "test")
+    from services import ai_service, ingest_service
+    monkeypatch.setattr(ai_service, "client", type("Client", (), {"chat": type("Chat", (), {
+        "completions": FakeCompletions()})()})())
+
+    text = ("회의 안건을 정리한다. " * 200) + "실패"
+    ok_before = metrics_service.INGEST_CHUNKS.value(outcome="ok")
+    error_before = metrics_service.INGEST_CHUNKS.value(outcome="error")
+
+    async def ingest():
+        with ingest_service.ingest_span("ingest.text", source_id="1") as root:
+            chunks = ingest_service.text_chunks(text)
+            nodes, _ = await ingest_service.extract_chunks(chunks, "1")
+        return root, chunks, nodes
+
+    root, chunks, nodes = asyncio.run(ingest())
+    failed = sum("실패" in chunk for chunk, _ in chunks)
+    assert len(chunks) > failed >= 1 and [node["name"] for node in nodes] == ["회의"]
+
+    chunk_span = only(exporter, "ingest.chunk", root.trace_id)
+    extract_span = only(exporter, "ingest.extract", root.trace_id)
+    llm_spans = exporter.get_finished_spans("ai.extract_chunk", root.trace_id)
+    assert root.parent_id is None
+    assert chunk_span.parent_id == root.span_id and extract_span.parent_id == root.span_id
+    assert chunk_span.attributes["chunks"] == len(chunks)
+    # run_io 스레드에서 실행된 LLM 호출도 같은 trace의 ingest.extract 아래에 묶임
+    assert len(llm_spans) == len(chunks)
+    assert all(span.parent_id == extract_span.span_id and span.root is root for span in llm_spans)
+    assert [span.status for span in llm_spans].count("error") == failed
+
+    assert set(root.stage_seconds) == {"ingest.chunk", "ingest.extract", "ai.extract_chunk"}
+    assert root.stage_seconds["ingest.extract"] <= root.elapsed
+    assert metrics_service.INGEST_CHUNKS.value(outcome="ok") - ok_before == len(chunks) - failed
+    assert metrics_service.INGEST_CHUNKS.value(outcome="error") - error_before == failed
+
+
+class FlakySession:
+    """처음 failures번은 연결 오류를 내고 그다음부터 빈 결과를 돌려주는 Neo4j 세션 흉내"""
+
+    def __init__(self, state):
+        self.state = state
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def run(self, query, parameters):
+        if self.state["failures"] > 0:
+            self.state["failures"] -= 1
+            raise ConnectionError("일시적인 연결 오류")
+        return []
+
+
+def test_neo4j_retries_are_counted_on_span_and_metric(exporter):
+    state = {"failures": 2}
+    handler = Neo4jHandler.__new__(Neo4jHandler)
+    handler.driver = type("Driver", (), {"session": lambda _: FlakySession(state), "close": lambda _: None})()
+    retries_before = metrics_service.RETRIES.value(operation="neo4j")
+
+    with tracing.span("ingest.text") as root:
+        assert handler._execute_with_retry("RETURN 1", {}) == []
+
+    query_span = only(exporter, "neo4j.query", root.trace_id)
+    assert query_span.parent_id == root.span_id
+    assert query_span.attributes["retries"] == 2 and query_span.status == "ok"
+    assert set(root.stage_seconds) == {"neo4j.query"}
+    assert only(exporter, "ingest.text", root.trace_id) is root
+    assert metrics_service.RETRIES.value(operation="neo4j") - retries_before == 2
@@ -0,0 +1,105 @@
+"""전사 대기열/즉시 전사 슬롯이 가득 찼을 때 업로드를 저장하거나 디코딩하기 전에 429로 거절하는지 확인"""
+import asyncio
+
+import httpx
+import pytest
+from fastapi import FastAPI
+
+from routers import voiceRouter
+from services import transcribe_queue
+
+UPLOAD = {"file": ("a.mp3", b"\0" * 1024, "audio/mpeg")}
+
+
+@pytest.fixture
+def queue(monkeypatch, tmp_path):
+    state = {"queued": 0, "saved": []}
+    monkeypatch.setattr(voiceRouter, "TRANSCRIBE_UPLOAD_DIR", str(tmp_path))
+    monkeypatch.setattr(transcribe_queue.db, "count_transcribe_jobs",
+                        lambda: {"queued": state["queued"], "running": 1})
+
+    async def fake_save_upload(file, dest_path, max_bytes=None):
+        with open(dest_path, "wb") as out:
+            out.write(await file.read())
+        state["saved"].append(dest_path)
+    monkeypatch.setattr(voiceRouter, "save_upload", fake_save_upload)
+    return state
+
+
+def post(path, **kwargs) -> httpx.Response:
+    app = FastAPI()
+    app.include_router(voiceRouter.router)
+
+    async def send():
+        async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test") as client:
+            return await client.post(path, **kwargs)
+    return asyncio.run(send())
+
+
+def post_job(**kwargs) -> httpx.Response:
+    return post("/voices/transcribe/jobs", **kwargs)
+
+
+def test_full_queue_rejects_before_reading_upload(queue, monkeypatch):
+    queue["queued"] = transcribe_queue.TRANSCRIBE_QUEUE_LIMIT
+
+    async def no_form(self, *args, **kwargs):
+        raise AssertionError("대기열이 가득 찼는데 업로드 본문을 읽음")
+    monkeypatch.setattr(voiceRouter.Request, "form", no_form)
+
+    response = post_job(files=UPLOAD)
+    assert response.status_code == 429
+    assert int(response.headers["Retry-After"]) > 0
+    assert queue["saved"] == []
+
+
+def test_enqueue_still_checks_capacity(queue, monkeypatch, tmp_path):
+    async def fill_then_enqueue(*args):
+        queue["queued"] = transcribe_queue.TRANSCRIBE_QUEUE_LIMIT      # 업로드하는 사이 다른 요청이 대기열을 채움
+        await transcribe_queue.check_capacity()
+    monkeypatch.setattr(transcribe_queue, "enqueue", fill_then_enqueue)
+
+    response = post_job(files=UPLOAD)
+    assert response.status_code == 429
+    assert len(queue["saved"]) == 1 and list(tmp_path.iterdir()) == []     # 받은 오디오는 지움
+
+
+def test_voice_id_must_be_integer(queue):
+    assert post_job(data={"voice_id": "abc"}).status_code == 422
+
+
+@pytest.fixture
+def direct(queue, monkeypatch):
+    """즉시 전사 슬롯 1개, 디코딩/전사는 가짜로 바꿔 슬롯 처리만 확인"""
+    monkeypatch.setattr(transcribe_queue, "TRANSCRIBE_DIRECT_LIMIT", 1)
+    decoded = []
+
+    async def fake_decode(file):
+        decoded.append(file.filename)
+        return [0.0] * 16000
+    monkeypatch.setattr(voiceRouter, "_decode_upload", fake_decode)
+    monkeypatch.setattr(voiceRouter, "transcribe_segments", lambda waveform: {"text": "소리", "segments": []})
+    monkeypatch.setattr(voiceRouter, "transcribe_spans", lambda waveform, spans: [])
+    monkeypatch.setattr(voiceRouter, "detect_speech", lambda waveform, rate: [])
+    return decoded
+
+
+@pytest.mark.parametrize("path", ["/voices/transcribe", "/voices/transcribe/stream"])
+def test_direct_transcribe_is_limited_before_decoding(direct, path):
+    held = asyncio.run(transcribe_queue.acquire_direct_slot())       # 다른 요청이 처리 중
+    try:
+        response = post(path, files=UPLOAD)
+        assert response.status_code == 429 and "Retry-After" in response.headers
+        assert direct == []
+    finally:
+        held.release()
+
+    assert post(path, files=UPLOAD).status_code == 200
+    assert post(path, files=UPLOAD).status_code == 200              # 끝난 요청의 슬롯은 반납됨
+    assert transcribe_queue.queue_stats()["direct_active"] == 0
+
+
+def test_direct_transcribe_respects_full_queue(direct, queue):
+    queue["queued"] = transcribe_queue.TRANSCRIBE_QUEUE_LIMIT
+    assert post("/voices/transcribe", files=UPLOAD).status_code == 429
+    assert direct == []
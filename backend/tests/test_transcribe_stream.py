@@ -0,0 +1,109 @@
+"""스트리밍 세션이 음성 구간이 없는 창을 처리할 때 실제 무음만 버리는지 확인 (ffmpeg/ASR 없이)"""
+import asyncio
+import threading
+
+import numpy as np
+import pytest
+
+from services import transcribe_stream
+from services.vad_service import VAD_MAX_SEGMENT_S
+from services.voiceService import SAMPLE_RATE
+
+
+def noise(seconds, dbfs, seed=0):
+    samples = np.random.default_rng(seed).standard_normal(int(seconds * SAMPLE_RATE)) * 10 ** (dbfs / 20)
+    return samples.astype(np.float32)
+
+
+def make_session(waveform):
+    session = transcribe_stream.TranscriptionSession.__new__(transcribe_stream.TranscriptionSession)
+    session.session_id = "test"
+    session.segments = []
+    session._pcm = bytearray((np.clip(waveform, -1, 1) * 32767).astype(np.int16).tobytes())
+    session._base_sample = 0
+    session._pcm_lock = threading.Lock()
+    session._changed = asyncio.Event()
+    return session
+
+
+@pytest.fixture
+def transcribed(monkeypatch):
+    calls = []
+
+    def fake_transcribe_spans(waveform, spans, batch_size, backend, base):
+        calls.append(spans)
+        return [{"start": (base + start) / SAMPLE_RATE, "end": (base + end) / SAMPLE_RATE, "text": "소리"}
+                for start, end in spans]
+    monkeypatch.setattr(transcribe_stream, "transcribe_spans", fake_transcribe_spans)
+    return calls
+
+
+def test_digital_silence_is_dropped_except_tail(transcribed):
+    session = make_session(np.zeros(12 * SAMPLE_RATE, dtype=np.float32))
+    asyncio.run(session._process_window(final=False))
+    assert session._base_sample == 11 * SAMPLE_RATE
+    assert transcribed == []
+
+
+def test_audible_audio_without_vad_speech_is_kept(transcribed):
+    # -45 dBFS: VAD가 음성으로 보지 않지만 무음(VAD_MIN_DB)보다 큼 → 예전에는 10초가 지나면 버려졌음
+    session = make_session(noise(12, -45))
+    asyncio.run(session._process_window(final=False))
+    assert session._base_sample == 0
+    assert transcribed == []
+
+
+def test_long_audible_window_is_sent_to_asr(transcribed):
+    session = make_session(noise(30, -45))
+    asyncio.run(session._process_window(final=False))
+    max_samples = int(VAD_MAX_SEGMENT_S * SAMPLE_RATE)
+    assert transcribed == [[(0, max_samples)]]
+    assert session._base_sample == max_samples
+    assert [segment["text"] for segment in session.segments] == ["소리"]
+
+
+def make_feed_session():
+    session = transcribe_stream.TranscriptionSession.__new__(transcribe_stream.TranscriptionSession)
+    session.max_bytes = 1024
+    session.received_bytes = 0
+    session.next_seq = 0
+    session.fed = []
+    session.feed = session.fed.append
+    session._chunk_lock = asyncio.Lock()
+    return session
+
+
+async def body(*parts, delay=0.0):
+    for part in parts:
+        await asyncio.sleep(delay)
+        yield part
+
+
+def test_chunks_must_arrive_in_seq_order():
+    session = make_feed_session()
+
+    async def scenario():
+        await transcribe_stream.feed_chunk(session, 0, body(b"a", b"b"))
+        with pytest.raises(transcribe_stream.StreamChunkOrderError):
+            await transcribe_stream.feed_chunk(session, 0, body(b"again"))     # 이미 받은 조각
+        with pytest.raises(transcribe_stream.StreamChunkOrderError):
+            await transcribe_stream.feed_chunk(session, 2, body(b"skip"))      # 건너뛴 조각
+        await transcribe_stream.feed_chunk(session, 1, body(b"c"))
+
+    asyncio.run(scenario())
+    assert session.fed == [b"ab", b"c"]
+    assert session.next_seq == 2
+
+
+def test_concurrent_chunks_are_not_interleaved():
+    session = make_feed_session()
+
+    async def scenario():
+        return await asyncio.gather(
+            transcribe_stream.feed_chunk(session, 0, body(b"0a", b"0b", b"0c", delay=0.01)),
+            transcribe_stream.feed_chunk(session, 0, body(b"xa", b"xb", delay=0.01)),
+            return_exceptions=True)
+
+    results = asyncio.run(scenario())
+    assert results[0] is None and isinstance(results[1], transcribe_stream.StreamChunkOrderError)
+    assert session.fed == [b"0a0b0c"]
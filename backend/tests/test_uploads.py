@@ -0,0 +1,62 @@
+"""여러 파일 업로드에서 거절된 파일(크기 초과, 형식 오류)을 알려 주는지 확인"""
+import asyncio
+import json
+
+import httpx
+import pytest
+from fastapi import FastAPI
+
+from routers import pdfRouter, textFileRouter
+from services.upload_service import REJECTED_FILES_HEADER
+from sqlite_db.sqlite_handler import SQLiteHandler
+
+
+@pytest.fixture
+def upload(monkeypatch, tmp_path):
+    handler = SQLiteHandler(str(tmp_path / "uploads.db"))
+    handler._init_db()
+    for router, dir_name in ((pdfRouter, "UPLOAD_DIR"), (textFileRouter, "UPLOAD_TXT_DIR")):
+        monkeypatch.setattr(router, "sqlite_handler", handler)
+        monkeypatch.setattr(router, dir_name, str(tmp_path))
+    monkeypatch.setattr(pdfRouter, "MAX_PDF_BYTES", 100)
+    monkeypatch.setattr(textFileRouter, "MAX_TEXT_BYTES", 100)
+
+    app = FastAPI()
+    app.include_router(pdfRouter.router)
+    app.include_router(textFileRouter.router)
+
+    def post(path, files):
+        async def send():
+            async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test") as client:
+                return await client.post(path, files=[("files", file) for file in files])
+        return asyncio.run(send())
+
+    yield post
+    handler._pool.close_all()
+
+
+def test_all_rejected_returns_413_with_reasons(upload):
+    response = upload("/pdfs/upload", [("big.pdf", b"x" * 200, "application/pdf"),
+                                       ("note.txt", b"x", "text/plain")])
+    assert response.status_code == 413
+    rejected = response.json()["detail"]["rejected"]
+    assert [(item["filename"], item["status"]) for item in rejected] == [("big.pdf", 413), ("note.txt", 415)]
+
+
+def test_wrong_type_only_returns_415(upload):
+    response = upload("/textfiles/upload-txt", [("doc.pdf", b"x", "application/pdf")])
+    assert response.status_code == 415
+
+
+def test_partial_upload_reports_rejected_files_in_header(upload):
+    response = upload("/textfiles/upload-txt", [("메모.txt", b"hello", "text/plain"),
+                                                ("큰 파일.txt", b"x" * 200, "text/plain")])
+    assert response.status_code == 200
+    assert [item["txt_title"] for item in response.json()] == ["메모.txt"]
+    rejected = json.loads(response.headers[REJECTED_FILES_HEADER])
+    assert [(item["filename"], item["status"]) for item in rejected] == [("큰 파일.txt", 413)]
+
+
+def test_no_header_when_everything_is_saved(upload):
+    response = upload("/pdfs/upload", [("a.pdf", b"%PDF", "application/pdf")])
+    assert response.status_code == 200 and REJECTED_FILES_HEADER not in response.headers
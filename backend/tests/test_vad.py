@@ -0,0 +1,49 @@
+"""에너지 기반 VAD가 쉼 없는 음성/일정한 음량의 녹음을 무음으로 버리지 않는지 확인"""
+import numpy as np
+
+from services.vad_service import VAD_MAX_SEGMENT_S, detect_speech
+
+SAMPLE_RATE = 16000
+
+
+def tone(seconds, dbfs):
+    """dbfs 크기(RMS)의 440Hz 사인파"""
+    t = np.arange(int(seconds * SAMPLE_RATE)) / SAMPLE_RATE
+    amplitude = np.sqrt(2) * 10 ** (dbfs / 20)
+    return (amplitude * np.sin(2 * np.pi * 440 * t)).astype(np.float32)
+
+
+def covered(segments):
+    return sum(end - start for start, end in segments)
+
+
+def test_continuous_speech_with_10db_variation_is_speech():
+    # 6초 동안 0.5초마다 -30 / -20 dBFS를 오가는 쉼 없는 발화
+    waveform = np.concatenate([tone(0.5, -30 if i % 2 else -20) for i in range(12)])
+    segments = detect_speech(waveform, SAMPLE_RATE)
+    assert segments
+    assert covered(segments) >= 0.95 * len(waveform)
+
+
+def test_constant_level_long_recording_is_split_not_dropped():
+    waveform = tone(40, -25)
+    segments = detect_speech(waveform, SAMPLE_RATE)
+    assert covered(segments) >= 0.95 * len(waveform)
+    assert len(segments) >= 2
+    assert all(end - start <= VAD_MAX_SEGMENT_S * SAMPLE_RATE for start, end in segments)
+
+
+def test_quiet_noise_and_silence_are_not_speech():
+    rng = np.random.default_rng(0)
+    assert detect_speech(np.zeros(SAMPLE_RATE * 3, dtype=np.float32), SAMPLE_RATE) == []
+    assert detect_speech((rng.standard_normal(SAMPLE_RATE * 3) * 10 ** (-50 / 20)).astype(np.float32),
+                         SAMPLE_RATE) == []
+
+
+def test_speech_between_pauses_is_still_found():
+    waveform = np.concatenate([np.zeros(SAMPLE_RATE * 2, dtype=np.float32), tone(2, -25),
+                               np.zeros(SAMPLE_RATE * 2, dtype=np.float32)])
+    segments = detect_speech(waveform, SAMPLE_RATE)
+    assert len(segments) == 1
+    start, end = segments[0]
+    assert 1.7 * SAMPLE_RATE <= start <= 2 * SAMPLE_RATE and 4 * SAMPLE_RATE <= end <= 4.3 * SAMPLE_RATE